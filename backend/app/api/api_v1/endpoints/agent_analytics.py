@@ -3,9 +3,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
-from app.api.deps import get_db
+from app.api.deps import get_read_db
 from app.crud.crud_email_processing_data import email_processing_data
-from app.crud.crud_spam_handler_data import spam_handler_data
+from app.crud.crud_telemetry_rollup import (
+    email_processing_rollup,
+    spam_handler_rollup,
+)
+from app.crud.crud_topk_sketch import email_processing_sketches, spam_handler_sketches
 
 router = APIRouter()
 
@@ -13,7 +17,7 @@ router = APIRouter()
 @router.get("/email-statistics/{agent_name}")
 def get_agent_email_statistics(
     agent_name: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: Optional[datetime] = Query(
         None, description="Start date for statistics"
     ),
@@ -23,17 +27,12 @@ def get_agent_email_statistics(
     Get email statistics for a specific agent
     """
     try:
-        # Get email processing data for the agent
-        items, total = email_processing_data.get_multi(
-            db,
-            skip=0,
-            limit=10000,  # Get all records for accurate statistics
-            agent_name=agent_name,
-            start_date=start_date,
-            end_date=end_date,
-        )
+        # Totals come from the hourly rollups, top lists from the top-K sketches
+        window = dict(start_date=start_date, end_date=end_date, agent_name=agent_name)
+        totals = email_processing_rollup.summarize(db, **window)
+        total_emails = int(totals["total_count"])
 
-        if not items:
+        if not total_emails:
             return {
                 "total_emails": 0,
                 "success_rate": 0,
@@ -50,13 +49,12 @@ def get_agent_email_statistics(
             }
 
         # Calculate basic statistics
-        total_emails = len(items)
-        emails_opened = sum(1 for item in items if item.is_opened)
-        emails_clicked = sum(1 for item in items if item.is_link_clicked)
-        emails_failed = sum(1 for item in items if item.error_occurred)
+        emails_opened = int(totals["opened_count"])
+        emails_clicked = int(totals["clicked_count"])
+        emails_failed = int(totals["error_count"])
         emails_successful = total_emails - emails_failed
 
-        total_duration = sum(item.total_duration_seconds or 0 for item in items)
+        total_duration = float(totals["total_duration_seconds"])
         avg_duration = total_duration / total_emails if total_emails > 0 else 0
 
         # Calculate rates
@@ -68,41 +66,13 @@ def get_agent_email_statistics(
         error_rate = (emails_failed / total_emails * 100) if total_emails > 0 else 0
 
         # Get top recipients (using sender_email as recipient for outgoing emails)
-        recipient_counts = {}
-        for item in items:
-            if item.sender_email:
-                recipient_counts[item.sender_email] = (
-                    recipient_counts.get(item.sender_email, 0) + 1
-                )
-
         top_recipients = [
-            {"email": email, "count": count}
-            for email, count in sorted(
-                recipient_counts.items(), key=lambda x: x[1], reverse=True
-            )[:5]
+            {"email": entry["value"], "count": entry["count"]}
+            for entry in email_processing_sketches.top(db, "sender", k=5, **window)
         ]
 
         # Get status distribution
-        status_counts = {
-            "Sent": 0,
-            "Opened": 0,
-            "Clicked": 0,
-            "Unsubscribed": 0,
-            "Error": 0,
-        }
-
-        for item in items:
-            if item.error_occurred:
-                status_counts["Error"] += 1
-            elif item.is_unsubscribe_clicked:
-                status_counts["Unsubscribed"] += 1
-            elif item.is_link_clicked:
-                status_counts["Clicked"] += 1
-            elif item.is_opened:
-                status_counts["Opened"] += 1
-            else:
-                status_counts["Sent"] += 1
-
+        status_counts = email_processing_data.get_status_counts(db, **window)
         status_distribution = [
             {"status": status, "count": count}
             for status, count in status_counts.items()
@@ -110,18 +80,9 @@ def get_agent_email_statistics(
         ]
 
         # Get popular subjects
-        subject_counts = {}
-        for item in items:
-            if item.email_subject:
-                subject_counts[item.email_subject] = (
-                    subject_counts.get(item.email_subject, 0) + 1
-                )
-
         popular_subjects = [
-            {"subject": subject, "count": count}
-            for subject, count in sorted(
-                subject_counts.items(), key=lambda x: x[1], reverse=True
-            )[:5]
+            {"subject": entry["value"], "count": entry["count"]}
+            for entry in email_processing_sketches.top(db, "subject", k=5, **window)
         ]
 
         return {
@@ -148,7 +109,7 @@ def get_agent_email_statistics(
 @router.get("/spam-statistics/{agent_name}")
 def get_agent_spam_statistics(
     agent_name: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: Optional[datetime] = Query(
         None, description="Start date for statistics"
     ),
@@ -158,17 +119,12 @@ def get_agent_spam_statistics(
     Get spam statistics for a specific agent
     """
     try:
-        # Get spam handler data for the agent
-        items, total = spam_handler_data.get_multi(
-            db,
-            skip=0,
-            limit=10000,  # Get all records for accurate statistics
-            agent_name=agent_name,
-            start_date=start_date,
-            end_date=end_date,
-        )
+        # Totals come from the hourly rollups, top lists from the top-K sketches
+        window = dict(start_date=start_date, end_date=end_date, agent_name=agent_name)
+        totals = spam_handler_rollup.summarize(db, **window)
+        total_operations = int(totals["total_count"])
 
-        if not items:
+        if not total_operations:
             return {
                 "total_operations": 0,
                 "total_spam_found": 0,
@@ -183,13 +139,12 @@ def get_agent_spam_statistics(
             }
 
         # Calculate basic statistics
-        total_operations = len(items)
-        total_spam_found = sum(item.spam_emails_found or 0 for item in items)
-        total_moved_to_inbox = sum(item.moved_to_inbox or 0 for item in items)
-        operations_failed = sum(1 for item in items if item.error_occurred)
+        total_spam_found = int(totals["spam_found"])
+        total_moved_to_inbox = int(totals["moved_to_inbox"])
+        operations_failed = int(totals["error_count"])
         operations_successful = total_operations - operations_failed
 
-        total_processing_time = sum(item.total_time_seconds or 0 for item in items)
+        total_processing_time = float(totals["total_time_seconds"])
         avg_processing_time = (
             total_processing_time / total_operations if total_operations > 0 else 0
         )
@@ -204,53 +159,22 @@ def get_agent_spam_statistics(
             (operations_failed / total_operations * 100) if total_operations > 0 else 0
         )
 
-        # Get top spam senders
-        sender_counts = {}
-        for item in items:
-            if (
-                item.sender_email
-                and item.spam_emails_found
-                and item.spam_emails_found > 0
-            ):
-                sender_counts[item.sender_email] = (
-                    sender_counts.get(item.sender_email, 0) + item.spam_emails_found
-                )
-
+        # Get top spam senders, weighted by spam emails found
         top_senders = [
-            {"sender_email": sender, "count": count}
-            for sender, count in sorted(
-                sender_counts.items(), key=lambda x: x[1], reverse=True
-            )[:5]
+            {"sender_email": entry["value"], "count": entry["count"]}
+            for entry in spam_handler_sketches.top(db, "sender", k=5, **window)
         ]
 
         # Get operations by profile
-        profile_counts = {}
-        for item in items:
-            if item.profile_name:
-                profile_counts[item.profile_name] = (
-                    profile_counts.get(item.profile_name, 0) + 1
-                )
-
         operations_by_profile = [
-            {"profile_name": profile, "count": count}
-            for profile, count in sorted(
-                profile_counts.items(), key=lambda x: x[1], reverse=True
-            )[:5]
+            {"profile_name": entry["value"], "count": entry["count"]}
+            for entry in spam_handler_sketches.top(db, "profile", k=5, **window)
         ]
 
         # Get common spam subjects
-        subject_counts = {}
-        for item in items:
-            if item.spam_email_subjects:
-                for subject in item.spam_email_subjects:
-                    if subject:
-                        subject_counts[subject] = subject_counts.get(subject, 0) + 1
-
         common_spam_subjects = [
-            {"subject": subject, "count": count}
-            for subject, count in sorted(
-                subject_counts.items(), key=lambda x: x[1], reverse=True
-            )[:5]
+            {"subject": entry["value"], "count": entry["count"]}
+            for entry in spam_handler_sketches.top(db, "subject", k=5, **window)
         ]
 
         return {
@@ -275,7 +199,7 @@ def get_agent_spam_statistics(
 @router.get("/combined-analytics/{agent_name}")
 def get_agent_combined_analytics(
     agent_name: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: Optional[datetime] = Query(
         None, description="Start date for analytics"
     ),
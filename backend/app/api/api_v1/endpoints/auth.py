@@ -1,11 +1,18 @@
 from datetime import timedelta
-from typing import Any
+from typing import Any, Awaitable, Dict, Optional, TypeVar
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import create_access_token
+from app.core.concurrency import run_crud
+from app.core.database import get_async_db, get_db
+from app.core.security import (
+    PasswordHasherBusy,
+    create_access_token,
+    password_hasher,
+)
 from app.core.config import settings
+from app.core.email_delivery import email_queue
 from app.core.email import (
     send_verification_email,
     send_password_reset_email,
@@ -24,19 +31,49 @@ from app.schemas.user import (
     PasswordResetConfirm,
     ResendVerificationRequest,
 )
-from app.api.deps import get_current_user
+from app.api.deps import get_current_active_superuser, get_current_user
+from app.models.user import User as UserModel
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+
+async def _password_work(operation: Awaitable[T]) -> T:
+    """Await a hashing-pool operation, answering 503 when the pool is full"""
+    try:
+        return await operation
+    except PasswordHasherBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+
+
+async def _authenticate(
+    db: AsyncSession, email: str, password: str
+) -> Optional[UserModel]:
+    """user.authenticate with the bcrypt check on the hashing pool"""
+    user_obj = await run_crud(db, user.get_by_email, email=email)
+    if not user_obj:
+        return None
+    if not await _password_work(
+        password_hasher.verify(password, user_obj.hashed_password)
+    ):
+        return None
+    return user_obj
+
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def login_for_access_token(
+    db: AsyncSession = Depends(get_async_db),
+    form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user_obj = user.authenticate(
+    user_obj = await _authenticate(
         db, email=form_data.username, password=form_data.password
     )
     if not user_obj:
@@ -60,11 +97,13 @@ def login_for_access_token(
 
 
 @router.post("/login/json", response_model=Token)
-def login_json(login_data: LoginRequest, db: Session = Depends(get_db)) -> Any:
+async def login_json(
+    login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)
+) -> Any:
     """
     JSON login endpoint
     """
-    user_obj = user.authenticate(
+    user_obj = await _authenticate(
         db, email=login_data.email, password=login_data.password
     )
     if not user_obj:
@@ -87,16 +126,16 @@ def login_json(login_data: LoginRequest, db: Session = Depends(get_db)) -> Any:
 
 
 @router.post("/register")
-def register(
+async def register(
     user_data: RegisterRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Any:
     """
     Create new user account and send verification email
     """
     # Check if user already exists
-    existing_user = user.get_by_email(db, email=user_data.email)
+    existing_user = await run_crud(db, user.get_by_email, email=user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -107,10 +146,15 @@ def register(
     user_create = UserCreate(
         email=user_data.email, password=user_data.password, name=user_data.name
     )
-    new_user = user.create(db, obj_in=user_create)
+    hashed_password = await _password_work(password_hasher.hash(user_data.password))
+    new_user = await run_crud(
+        db, user.create, obj_in=user_create, hashed_password=hashed_password
+    )
 
     # Generate verification token
-    verification_token = user.create_verification_token(db, user=new_user)
+    verification_token = await run_crud(
+        db, user.create_verification_token, user=new_user
+    )
     verification_link = create_verification_link(verification_token)
 
     # Send verification email in background
@@ -237,13 +281,24 @@ def forgot_password(
 
 
 @router.post("/reset-password")
-def reset_password(request: PasswordResetConfirm, db: Session = Depends(get_db)) -> Any:
+async def reset_password(
+    request: PasswordResetConfirm, db: AsyncSession = Depends(get_async_db)
+) -> Any:
     """
     Reset password with token
     """
-    reset_user = user.reset_password(
-        db, token=request.token, new_password=request.new_password
-    )
+    # Only hash for tokens that can succeed
+    reset_user = await run_crud(db, user.get_by_reset_token, token=request.token)
+    if reset_user:
+        hashed_password = await _password_work(
+            password_hasher.hash(request.new_password)
+        )
+        reset_user = await run_crud(
+            db,
+            user.reset_password,
+            token=request.token,
+            hashed_password=hashed_password,
+        )
     if not reset_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -272,3 +327,23 @@ def get_current_user_info(
     Get current user information
     """
     return current_user
+
+
+@router.get("/password-hasher", response_model=Dict[str, Any])
+def get_password_hasher_metrics(
+    current_user: User = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    Get password hashing pool depth, throughput and average latency
+    """
+    return password_hasher.get_metrics()
+
+
+@router.get("/email-queue", response_model=Dict[str, Any])
+def get_email_queue_metrics(
+    current_user: User = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    Get email delivery queue depth, retry counters and SMTP connection reuse
+    """
+    return email_queue.get_metrics()
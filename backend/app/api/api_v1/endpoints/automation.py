@@ -1,8 +1,19 @@
-from typing import Dict, Any, List
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+from typing import Dict, Any, List, Optional, AsyncIterator
+from fastapi import APIRouter, Depends, Header, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
+from app.core.concurrency import run_in_db_pool
+from app.core.config import settings
+from app.core.config_cache import (
+    ConfigSnapshot,
+    automation_config_cache,
+    config_delta,
+)
+from app.core.database import db_manager
 from app.crud.crud_default_sender import default_sender
 from app.crud.crud_random_url import random_url
 from app.crud.crud_random_website_settings import random_website_settings
@@ -11,35 +22,139 @@ from app.crud.crud_connectivity_settings import connectivity_settings
 router = APIRouter()
 
 
+def build_automation_config(db: Session) -> Dict[str, Any]:
+    """Read every setting the automation system needs from the database"""
+    return {
+        "DEFAULT_SENDERS": default_sender.get_emails_list(db, is_active=True),
+        "RANDOM_URLS": random_url.get_urls_list(db, is_active=True),
+        **random_website_settings.get_config_dict(db),
+        **connectivity_settings.get_config_dict(db),
+    }
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(
+        tag == etag or tag == f"W/{etag}" for tag in candidates
+    )
+
+
 @router.get("/automation-config", response_model=Dict[str, Any])
-def get_complete_automation_config(db: Session = Depends(get_db)):
+def get_complete_automation_config(
+    response: Response,
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+):
     """
     Get complete automation configuration in a single API call
-    This endpoint provides all settings needed by the automation system
+    This endpoint provides all settings needed by the automation system.
+    Served from an in-process snapshot; send the returned ETag back in
+    If-None-Match to get 304 Not Modified while the config is unchanged.
     """
+    snapshot = automation_config_cache.get(db, build_automation_config)
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": "no-cache",
+        "X-Config-Version": str(snapshot.version),
+    }
 
-    # Get default senders
-    default_senders_list = default_sender.get_emails_list(db, is_active=True)
-
-    # Get random URLs
-    random_urls_list = random_url.get_urls_list(db, is_active=True)
-
-    # Get random website settings
-    random_website_config = random_website_settings.get_config_dict(db)
-
-    # Get connectivity settings
-    connectivity_config = connectivity_settings.get_config_dict(db)
+    if _etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
 
+    response.headers.update(headers)
     return {
-        "DEFAULT_SENDERS": default_senders_list,
-        "RANDOM_URLS": random_urls_list,
-        **random_website_config,
-        **connectivity_config,
+        **snapshot.config,
         "api_version": "1.0",
-        "last_updated": None,  # You can add timestamp tracking later
+        "last_updated": snapshot.built_at.isoformat(),
     }
 
 
+@router.get("/automation-config/cache")
+def get_automation_config_cache_status():
+    """
+    Version, ETag and hit/build counters of the automation config snapshot
+    """
+    return automation_config_cache.get_metrics()
+
+
+def _current_snapshot() -> ConfigSnapshot:
+    db = db_manager.SessionLocal()
+    try:
+        return automation_config_cache.get(db, build_automation_config)
+    finally:
+        db.close()
+
+
+def _sse(event: str, data: Dict[str, Any], event_id: str) -> str:
+    payload = json.dumps(data, default=str, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+async def _config_events(
+    request: Request, last_event_id: Optional[str]
+) -> AsyncIterator[str]:
+    changed = automation_config_cache.subscribe()
+    try:
+        snapshot = await run_in_db_pool(_current_snapshot)
+        # A reconnecting client that already holds this config gets no resend
+        if last_event_id != snapshot.etag:
+            yield _sse(
+                "snapshot",
+                {"version": snapshot.version, "config": snapshot.config},
+                snapshot.etag,
+            )
+
+        while True:
+            try:
+                await asyncio.wait_for(
+                    changed.wait(),
+                    timeout=settings.AUTOMATION_CONFIG_STREAM_HEARTBEAT_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                pass
+            changed.clear()
+            if await request.is_disconnected():
+                break
+
+            # Also picks up other workers' writes once the snapshot TTL expires
+            latest = await run_in_db_pool(_current_snapshot)
+            if latest.etag == snapshot.etag:
+                yield ": keep-alive\n\n"
+                continue
+
+            yield _sse(
+                "delta",
+                {
+                    "version": latest.version,
+                    **config_delta(snapshot.config, latest.config),
+                },
+                latest.etag,
+            )
+            snapshot = latest
+    finally:
+        automation_config_cache.unsubscribe(changed)
+
+
+@router.get("/automation-config/stream")
+async def stream_automation_config(
+    request: Request, last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events stream of automation config changes
+    Sends a ``snapshot`` event with the full config, then a ``delta`` event
+    (changed keys and removed keys) each time a config write is committed.
+    Event ids are config ETags, so a reconnect with Last-Event-ID resumes
+    without a resend.
+    """
+    return StreamingResponse(
+        _config_events(request, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/automation-config/default-senders")
 def get_automation_default_senders(db: Session = Depends(get_db)):
     """
@@ -169,6 +284,8 @@ def automation_api_health():
         "message": "Automation API is running",
         "endpoints": [
             "/automation-config",
+            "/automation-config/cache",
+            "/automation-config/stream",
             "/automation-config/default-senders",
             "/automation-config/random-urls",
             "/automation-config/random-website",
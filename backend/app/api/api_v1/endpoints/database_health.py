@@ -2,13 +2,18 @@
 Database health check endpoint
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Dict, Any, Optional
+from app.core.concurrency import run_in_db_pool
 from app.core.database import (
     check_database_health,
     check_database_health_async,
     db_manager,
 )
+from app.core.ingestion import ingestion_queue
+from app.core.retention import get_progress, retention_worker
+from app.core.window_cache import email_processing_window, spam_handler_window
+from app.db.partitioning import describe_partitions
 
 router = APIRouter()
 
@@ -52,13 +57,80 @@ def get_pool_status():
         )
 
 
+@router.get("/ingestion-queue", response_model=Dict[str, Any])
+def get_ingestion_queue_metrics():
+    """
+    Get write-behind ingestion queue depth, throughput counters and flusher status
+    """
+    return ingestion_queue.get_metrics()
+
+
+@router.get("/window-cache", response_model=Dict[str, Any])
+def get_window_cache_metrics():
+    """
+    Get size and refresh counters of the in-memory real-time telemetry windows
+    """
+    return {
+        "email_processing": email_processing_window.get_metrics(),
+        "spam_handler": spam_handler_window.get_metrics(),
+    }
+
+
+@router.get("/partitions", response_model=Dict[str, Any])
+def get_partitions():
+    """
+    Get the time-range partitions of the telemetry tables (MySQL only)
+    """
+    try:
+        return describe_partitions(db_manager.engine)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to get partitions: {str(e)}"
+        )
+
+
+@router.get("/retention", response_model=Dict[str, Any])
+def get_retention_status():
+    """
+    Get the retention policies, worker counters and each table's run progress
+    """
+    db = db_manager.SessionLocal()
+    try:
+        return {"worker": retention_worker.get_metrics(), "tables": get_progress(db)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to get retention status: {str(e)}"
+        )
+    finally:
+        db.close()
+
+
+@router.post("/retention/run", status_code=202, response_model=Dict[str, Any])
+def run_retention(
+    table_name: Optional[str] = Query(
+        None, description="Table to clean up; all tables when omitted"
+    ),
+    days_old: Optional[int] = Query(
+        None, ge=1, description="Override the table's policy for this run"
+    ),
+):
+    """
+    Schedule a background retention run now instead of waiting for the next pass
+    """
+    try:
+        tables = retention_worker.request_run(table_name, days=days_old)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": "Retention run scheduled", "tables": tables}
+
+
 @router.post("/test-connection")
 async def test_database_connection():
     """
     Test database connection manually
     """
     try:
-        sync_test = db_manager.test_connection()
+        sync_test = await run_in_db_pool(db_manager.test_connection)
         async_test = await db_manager.test_connection_async()
 
         return {
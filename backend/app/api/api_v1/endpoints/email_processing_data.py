@@ -1,11 +1,17 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import math
 from datetime import datetime
 
-from app.api.deps import get_db
+from app.api.deps import get_db, get_read_db, queue_telemetry
+from app.core.database import SessionLocal
+from app.core.ingestion import EMAIL_PROCESSING, write_behind_enabled
+from app.core.retention import retention_worker
 from app.crud.crud_email_processing_data import email_processing_data
+from app.utils.export import EXPORT_MEDIA_TYPES, encode_export, export_filename
+from app.utils.pagination import InvalidCursorError
 from app.schemas.email_processing_data import (
     EmailProcessingDataCreate,
     EmailProcessingDataUpdate,
@@ -21,7 +27,7 @@ router = APIRouter()
 
 @router.get("/", response_model=EmailProcessingDataListResponse)
 def get_email_processing_data(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of items to return"),
     agent_name: Optional[str] = Query(None, description="Filter by agent name"),
@@ -41,39 +47,56 @@ def get_email_processing_data(
     start_date: Optional[datetime] = Query(None, description="Filter by start date"),
     end_date: Optional[datetime] = Query(None, description="Filter by end date"),
     search: Optional[str] = Query(None, description="Search in multiple fields"),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from a previous page's next_cursor"
+    ),
+    include_total: bool = Query(
+        True, description="Count all matching rows (disable for constant-cost pages)"
+    ),
 ):
     """
-    Get all email processing data entries with pagination and filtering
-    """
-    items, total = email_processing_data.get_multi(
-        db,
-        skip=skip,
-        limit=limit,
-        agent_name=agent_name,
-        profile_name=profile_name,
-        sender_email=sender_email,
-        is_opened=is_opened,
-        is_link_clicked=is_link_clicked,
-        is_unsubscribe_clicked=is_unsubscribe_clicked,
-        is_reply_sent=is_reply_sent,
-        error_occurred=error_occurred,
-        start_date=start_date,
-        end_date=end_date,
-        search=search,
-    )
+    Get all email processing data entries with pagination and filtering.
+    Follow next_cursor with the cursor parameter for constant-cost deep paging.
+    """
+    try:
+        items, total, next_cursor = email_processing_data.get_page(
+            db,
+            skip=skip,
+            limit=limit,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            sender_email=sender_email,
+            is_opened=is_opened,
+            is_link_clicked=is_link_clicked,
+            is_unsubscribe_clicked=is_unsubscribe_clicked,
+            is_reply_sent=is_reply_sent,
+            error_occurred=error_occurred,
+            start_date=start_date,
+            end_date=end_date,
+            search=search,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    total_pages = None
+    if total is not None:
+        total_pages = math.ceil(total / limit) if total > 0 else 0
 
     return EmailProcessingDataListResponse(
         items=items,
         total=total,
-        page=skip // limit + 1,
+        page=None if cursor else skip // limit + 1,
         per_page=limit,
-        total_pages=math.ceil(total / limit) if total > 0 else 0,
+        total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/recent", response_model=List[EmailProcessingDataResponse])
 def get_recent_email_processing_data(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     hours: int = Query(24, ge=1, le=168, description="Number of hours to look back"),
     limit: int = Query(
         100, ge=1, le=1000, description="Maximum number of entries to return"
@@ -87,7 +110,7 @@ def get_recent_email_processing_data(
 
 @router.get("/statistics", response_model=EmailProcessingDataStats)
 def get_email_processing_statistics(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: Optional[datetime] = Query(
         None, description="Start date for statistics"
     ),
@@ -105,7 +128,7 @@ def get_email_processing_statistics(
 @router.get("/by-agent/{agent_name}", response_model=List[EmailProcessingDataResponse])
 def get_email_processing_data_by_agent(
     agent_name: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     limit: int = Query(
         100, ge=1, le=1000, description="Maximum number of entries to return"
     ),
@@ -121,7 +144,7 @@ def get_email_processing_data_by_agent(
 )
 def get_email_processing_data_by_profile(
     profile_name: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     limit: int = Query(
         100, ge=1, le=1000, description="Maximum number of entries to return"
     ),
@@ -139,7 +162,7 @@ def get_email_processing_data_by_profile(
 )
 def get_email_processing_data_by_sender(
     sender_email: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     limit: int = Query(
         100, ge=1, le=1000, description="Maximum number of entries to return"
     ),
@@ -154,7 +177,7 @@ def get_email_processing_data_by_sender(
 
 @router.get("/analytics", response_model=dict)
 def get_email_processing_analytics(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: Optional[datetime] = Query(
         None, description="Start date for analytics"
     ),
@@ -174,6 +197,30 @@ def get_email_processing_analytics(
     )
 
 
+@router.get("/trends", response_model=List[dict])
+def get_email_processing_trends(
+    db: Session = Depends(get_read_db),
+    bucket: str = Query(
+        "day", pattern="^(hour|day|week)$", description="Bucket size: hour, day or week"
+    ),
+    start_date: Optional[datetime] = Query(None, description="Start of the series"),
+    end_date: Optional[datetime] = Query(None, description="End of the series"),
+    agent_name: Optional[str] = Query(None, description="Filter by agent name"),
+    profile_name: Optional[str] = Query(None, description="Filter by profile name"),
+):
+    """
+    Get analytics metrics per hour, day or week (weeks start on Monday)
+    """
+    return email_processing_data.get_trends(
+        db,
+        bucket=bucket,
+        start_date=start_date,
+        end_date=end_date,
+        agent_name=agent_name,
+        profile_name=profile_name,
+    )
+
+
 @router.get("/{entry_id}", response_model=EmailProcessingDataResponse)
 def get_email_processing_data_entry(entry_id: int, db: Session = Depends(get_db)):
     """
@@ -189,11 +236,18 @@ def get_email_processing_data_entry(entry_id: int, db: Session = Depends(get_db)
 
 @router.post("/", response_model=EmailProcessingDataResponse)
 def create_email_processing_data_entry(
-    entry_in: EmailProcessingDataCreate, db: Session = Depends(get_db)
+    entry_in: EmailProcessingDataCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(
+        None, description="Client key used to de-duplicate retried submissions"
+    ),
 ):
     """
     Create a new email processing data entry
+    In write-behind mode the record is queued and 202 Accepted is returned.
     """
+    if write_behind_enabled():
+        return queue_telemetry(EMAIL_PROCESSING, entry_in, idempotency_key)
     return email_processing_data.create(db, obj_in=entry_in)
 
 
@@ -252,63 +306,73 @@ def bulk_delete_email_processing_data(
     }
 
 
-@router.delete("/cleanup/old")
+@router.delete("/cleanup/old", status_code=status.HTTP_202_ACCEPTED)
 def cleanup_old_email_processing_data(
-    db: Session = Depends(get_db),
     days_old: int = Query(
         30, ge=1, le=365, description="Delete entries older than this many days"
     ),
 ):
     """
-    Delete email processing data entries older than specified days
+    Schedule deletion of email processing data entries older than specified days.
+    The retention worker deletes them in small chunks in the background;
+    follow its progress at /database/retention.
     """
-    deleted_count = email_processing_data.delete_old_entries(db, days_old=days_old)
+    retention_worker.request_run("email_processing_data", days=days_old)
     return {
-        "message": f"Deleted {deleted_count} old email processing data entries",
-        "deleted_count": deleted_count,
+        "message": (
+            f"Scheduled deletion of email processing data entries "
+            f"older than {days_old} days"
+        ),
+        "table_name": "email_processing_data",
+        "days_old": days_old,
     }
 
 
 @router.get("/export/csv")
 def export_email_processing_data_csv(
-    db: Session = Depends(get_db),
     start_date: Optional[datetime] = Query(None, description="Start date for export"),
     end_date: Optional[datetime] = Query(None, description="End date for export"),
     agent_name: Optional[str] = Query(None, description="Filter by agent name"),
     profile_name: Optional[str] = Query(None, description="Filter by profile name"),
     sender_email: Optional[str] = Query(None, description="Filter by sender email"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    gzip: bool = Query(False, description="Gzip-compress the download"),
 ):
     """
-    Export email processing data as CSV (returns download info)
-    """
-    # Get filtered data
-    items, total = email_processing_data.get_multi(
-        db,
-        skip=0,
-        limit=10000,  # Large limit for export
-        agent_name=agent_name,
-        profile_name=profile_name,
-        sender_email=sender_email,
-        start_date=start_date,
-        end_date=end_date,
+    Export email processing data as a streamed CSV or NDJSON download.
+    Rows are read in id-ordered batches on a dedicated session, so memory use is
+    flat regardless of export size.
+    """
+
+    def batches():
+        db = SessionLocal()
+        try:
+            yield from email_processing_data.iter_export_batches(
+                db,
+                agent_name=agent_name,
+                profile_name=profile_name,
+                sender_email=sender_email,
+                start_date=start_date,
+                end_date=end_date,
+            )
+        finally:
+            db.close()
+
+    filename = export_filename("email_processing_data", format, gzip)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    return StreamingResponse(
+        encode_export(
+            format, email_processing_data.EXPORT_COLUMNS, batches(), gzip=gzip
+        ),
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[format],
+        headers=headers,
     )
 
-    return {
-        "message": f"Export ready with {total} entries",
-        "total_entries": total,
-        "filters_applied": {
-            "agent_name": agent_name,
-            "profile_name": profile_name,
-            "sender_email": sender_email,
-            "start_date": start_date.isoformat() if start_date else None,
-            "end_date": end_date.isoformat() if end_date else None,
-        },
-    }
-
 
 @router.get("/performance/summary")
 def get_performance_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: Optional[datetime] = Query(None, description="Start date for summary"),
     end_date: Optional[datetime] = Query(None, description="End date for summary"),
 ):
@@ -322,7 +386,7 @@ def get_performance_summary(
 
 @router.get("/trends/daily")
 def get_daily_trends(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     days: int = Query(30, ge=1, le=365, description="Number of days to analyze"),
     agent_name: Optional[str] = Query(None, description="Filter by agent name"),
 ):
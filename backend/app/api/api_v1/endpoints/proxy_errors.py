@@ -1,11 +1,14 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
+from datetime import datetime, timedelta
 import math
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_user, get_read_db, queue_telemetry
+from app.core.ingestion import PROXY_ERROR, write_behind_enabled
 from app.crud.crud_proxy_error import proxy_error
+from app.utils.pagination import InvalidCursorError
 from app.schemas.proxy_error import ProxyErrorCreate, ProxyErrorUpdate, ProxyError
 from app.schemas.user import User
 
@@ -16,10 +19,11 @@ class ProxyErrorListResponse(BaseModel):
     """Response schema for paginated proxy error list"""
 
     items: List[ProxyError]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class ProxyErrorStatsResponse(BaseModel):
@@ -31,22 +35,37 @@ class ProxyErrorStatsResponse(BaseModel):
     unique_profiles: List[str]
 
 
+class ProxyErrorUniqueCountsResponse(BaseModel):
+    """Response schema for estimated distinct counts of proxy errors"""
+
+    hours: int
+    unique_agents: int
+    unique_proxies: int
+    unique_profiles: int
+
+
 @router.post("/", response_model=ProxyError, status_code=status.HTTP_201_CREATED)
 def create_proxy_error(
     *,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     proxy_error_in: ProxyErrorCreate,
+    idempotency_key: Optional[str] = Header(
+        None, description="Client key used to de-duplicate retried submissions"
+    ),
 ) -> ProxyError:
     """
     Create a new proxy error record.
+    In write-behind mode the record is queued and 202 Accepted is returned.
     """
+    if write_behind_enabled():
+        return queue_telemetry(PROXY_ERROR, proxy_error_in, idempotency_key)
     return proxy_error.create(db=db, obj_in=proxy_error_in)
 
 
 @router.get("/", response_model=ProxyErrorListResponse)
 def read_proxy_errors(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
@@ -54,22 +73,36 @@ def read_proxy_errors(
     proxy: Optional[str] = Query(None, description="Filter by proxy"),
     profile_name: Optional[str] = Query(None, description="Filter by profile name"),
     search: Optional[str] = Query(None, description="Search in all text fields"),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from a previous page's next_cursor"
+    ),
+    include_total: bool = Query(
+        True, description="Count all matching rows (disable for constant-cost pages)"
+    ),
 ) -> ProxyErrorListResponse:
     """
     Retrieve proxy errors with filtering and pagination.
-    """
-    items, total = proxy_error.get_multi(
-        db=db,
-        skip=skip,
-        limit=limit,
-        agent_name=agent_name,
-        proxy=proxy,
-        profile_name=profile_name,
-        search=search,
-    )
+    Follow next_cursor with the cursor parameter for constant-cost deep paging.
+    """
+    try:
+        items, total, next_cursor = proxy_error.get_page(
+            db=db,
+            skip=skip,
+            limit=limit,
+            agent_name=agent_name,
+            proxy=proxy,
+            profile_name=profile_name,
+            search=search,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    page = (skip // limit) + 1
-    total_pages = math.ceil(total / limit) if total > 0 else 1
+    page = None if cursor else (skip // limit) + 1
+    total_pages = None
+    if total is not None:
+        total_pages = math.ceil(total / limit) if total > 0 else 1
 
     return ProxyErrorListResponse(
         items=items,
@@ -77,12 +110,13 @@ def read_proxy_errors(
         page=page,
         per_page=limit,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/stats", response_model=ProxyErrorStatsResponse)
 def get_proxy_error_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ) -> ProxyErrorStatsResponse:
     """
@@ -99,6 +133,28 @@ def get_proxy_error_stats(
     )
 
 
+@router.get("/unique-counts", response_model=ProxyErrorUniqueCountsResponse)
+def get_proxy_error_unique_counts(
+    hours: int = Query(24, ge=1, le=168, description="Number of hours to look back"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+) -> ProxyErrorUniqueCountsResponse:
+    """
+    Estimated number of distinct agents, proxies and profiles reporting proxy
+    errors in the last N hours (about 2% error for large counts).
+    """
+    end_date = datetime.utcnow()
+    counts = proxy_error.get_unique_counts(
+        db=db, start_date=end_date - timedelta(hours=hours), end_date=end_date
+    )
+    return ProxyErrorUniqueCountsResponse(
+        hours=hours,
+        unique_agents=counts["agents"],
+        unique_proxies=counts["proxies"],
+        unique_profiles=counts["profiles"],
+    )
+
+
 @router.get("/{proxy_error_id}", response_model=ProxyError)
 def read_proxy_error(
     *,
@@ -157,7 +213,7 @@ def delete_proxy_error(
 @router.get("/agent/{agent_name}", response_model=List[ProxyError])
 def get_proxy_errors_by_agent(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     agent_name: str,
     limit: int = Query(
@@ -173,7 +229,7 @@ def get_proxy_errors_by_agent(
 @router.get("/proxy/{proxy_address}/count")
 def get_proxy_error_count(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     proxy_address: str,
 ) -> dict:
@@ -1,20 +1,159 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import math
 
-from app.api.deps import get_db
+from app.api.deps import get_read_db
 from app.crud.crud_email_processing_data import email_processing_data
 from app.crud.crud_spam_handler_data import spam_handler_data
 from app.crud.crud_agent import agent
+from app.crud.crud_agent_errors import agent_errors
+from app.crud.crud_error_fingerprint import error_patterns
+from app.crud.crud_distinct_sketch import (
+    email_processing_distinct,
+    spam_handler_distinct,
+)
+from app.crud.crud_telemetry_rollup import (
+    email_processing_rollup,
+    spam_handler_rollup,
+)
+from app.core.window_cache import email_processing_window, spam_handler_window
 
 router = APIRouter()
 
 
+def _spam_source(start_date: datetime):
+    """The in-memory window when it covers start_date, else the hourly rollups"""
+    if spam_handler_window.covers(start_date):
+        return spam_handler_window
+    return spam_handler_rollup
+
+
+def _email_source(start_date: datetime):
+    """The in-memory window when it covers start_date, else the hourly rollups"""
+    if email_processing_window.covers(start_date):
+        return email_processing_window
+    return email_processing_rollup
+
+
+def _error_counts(db: Session, *, start_date: datetime, end_date: datetime):
+    """Totals and per-agent metrics of both telemetry tables for a window"""
+    window = dict(start_date=start_date, end_date=end_date)
+    spam_source = _spam_source(start_date)
+    email_source = _email_source(start_date)
+    return (
+        spam_source.summarize(db, **window),
+        spam_source.get_by_dimension(db, "agent_name", **window),
+        email_source.summarize(db, **window),
+        email_source.get_by_dimension(db, "agent_name", **window),
+    )
+
+
+def _get_error_thresholds(time_filter: int) -> Dict[str, int]:
+    """
+    Dynamic thresholds based on time period
+    Scale thresholds based on time filter to avoid all agents being "severe" for longer periods
+    """
+    if time_filter <= 24:  # 24 hours
+        return {
+            "severe": 15,
+            "moderate": 5,
+            "spam_severe": 8,
+            "email_severe": 8,
+        }
+    elif time_filter <= 168:  # 7 days
+        return {
+            "severe": 35,  # ~5 errors per day
+            "moderate": 10,  # ~1.5 errors per day
+            "spam_severe": 15,
+            "email_severe": 15,
+        }
+    else:  # 30 days and beyond
+        return {
+            "severe": 50,  # ~1.7 errors per day
+            "moderate": 15,  # ~0.5 errors per day
+            "spam_severe": 25,
+            "email_severe": 25,
+        }
+
+
+def _categorize_agents_by_errors(
+    db: Session, *, start_date: datetime, end_date: datetime, time_filter: int
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Categorize registered agents into moderate/severe error levels.
+    Error counts for every agent come from one grouped aggregation query, so the
+    number of round trips does not grow with the number of agents.
+    """
+    # Get all agents
+    all_agents_result = agent.get_multi(db, skip=0, limit=1000)
+    all_agents = (
+        all_agents_result[0]
+        if isinstance(all_agents_result, tuple)
+        else all_agents_result
+    )
+
+    error_counts = agent_errors.get_error_counts_by_agent(
+        db, start_date=start_date, end_date=end_date
+    )
+    thresholds = _get_error_thresholds(time_filter)
+
+    moderate_agents = []
+    severe_agents = []
+
+    for agent_item in all_agents:
+        counts = error_counts.get(agent_item.agent_name)
+        if not counts:
+            continue
+
+        spam_error_count = counts["spam_error_count"]
+        email_error_count = counts["email_error_count"]
+        total_errors = spam_error_count + email_error_count
+
+        agent_data = {
+            "id": agent_item.id,
+            "name": agent_item.agent_name,
+            "email": f"{agent_item.agent_name}@example.com",  # Since email might not exist in Agent model
+            "profile_name": agent_item.agent_name,
+            "status": "active" if agent_item.is_active else "inactive",
+            "spam_error_count": spam_error_count,
+            "email_error_count": email_error_count,
+            "total_errors": total_errors,
+            "last_error_time": counts["last_error_time"],
+            "created_at": agent_item.created_at,
+            "updated_at": agent_item.updated_at,
+        }
+
+        # More nuanced categorization with time-aware thresholds:
+        # Severe: High error count OR both types with significant counts
+        # Moderate: Medium error count OR any errors below severe threshold
+        if total_errors >= thresholds["severe"] or (
+            spam_error_count >= thresholds["spam_severe"]
+            and email_error_count >= thresholds["email_severe"]
+        ):
+            # High error volume or significant errors in both categories = Severe
+            severe_agents.append(agent_data)
+        elif total_errors >= thresholds["moderate"] or total_errors > 0:
+            # Medium error volume or any errors = Moderate
+            moderate_agents.append(agent_data)
+
+    # Sort by error count (descending) and then by last error time (most recent first)
+    moderate_agents.sort(
+        key=lambda x: (-x["total_errors"], x["last_error_time"] or datetime.min),
+        reverse=True,
+    )
+    severe_agents.sort(
+        key=lambda x: (-x["total_errors"], x["last_error_time"] or datetime.min),
+        reverse=True,
+    )
+
+    return moderate_agents, severe_agents
+
+
 @router.get("/agent-error-levels")
 def get_agent_error_levels(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     time_filter: int = Query(
         24, description="Hours to look back (24 for 24h, 168 for 7d)"
     ),
@@ -29,108 +168,8 @@ def get_agent_error_levels(
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(hours=time_filter)
 
-        # Get all agents
-        all_agents_result = agent.get_multi(db, skip=0, limit=1000)
-        all_agents = (
-            all_agents_result[0]
-            if isinstance(all_agents_result, tuple)
-            else all_agents_result
-        )
-
-        moderate_agents = []
-        severe_agents = []
-
-        for agent_item in all_agents:
-            # Get spam handler errors for this agent
-            spam_errors, _ = spam_handler_data.get_multi(
-                db,
-                skip=0,
-                limit=1000,
-                agent_name=agent_item.agent_name,
-                error_occurred=True,
-                start_date=start_date,
-                end_date=end_date,
-            )
-
-            # Get email processing errors for this agent
-            email_errors, _ = email_processing_data.get_multi(
-                db,
-                skip=0,
-                limit=1000,
-                agent_name=agent_item.agent_name,
-                error_occurred=True,
-                start_date=start_date,
-                end_date=end_date,
-            )
-
-            spam_error_count = len(spam_errors)
-            email_error_count = len(email_errors)
-
-            if spam_error_count > 0 or email_error_count > 0:
-                agent_data = {
-                    "id": agent_item.id,
-                    "name": agent_item.agent_name,
-                    "email": f"{agent_item.agent_name}@example.com",
-                    "profile_name": agent_item.agent_name,
-                    "status": "active" if agent_item.is_active else "inactive",
-                    "spam_error_count": spam_error_count,
-                    "email_error_count": email_error_count,
-                    "total_errors": spam_error_count + email_error_count,
-                    "last_error_time": None,
-                    "created_at": agent_item.created_at,
-                    "updated_at": agent_item.updated_at,
-                }
-
-                # Find the most recent error timestamp
-                all_errors = spam_errors + email_errors
-                if all_errors:
-                    most_recent_error = max(all_errors, key=lambda x: x.timestamp)
-                    agent_data["last_error_time"] = most_recent_error.timestamp
-
-                # Categorize agent with time-period aware logic
-                total_errors = spam_error_count + email_error_count
-
-                # Dynamic thresholds based on time period
-                # Scale thresholds based on time filter to avoid all agents being "severe" for longer periods
-                if time_filter <= 24:  # 24 hours
-                    severe_threshold = 15
-                    moderate_threshold = 5
-                    spam_severe_threshold = 8
-                    email_severe_threshold = 8
-                elif time_filter <= 168:  # 7 days
-                    severe_threshold = 35  # ~5 errors per day
-                    moderate_threshold = 10  # ~1.5 errors per day
-                    spam_severe_threshold = 15
-                    email_severe_threshold = 15
-                else:  # 30 days and beyond
-                    severe_threshold = 50  # ~1.7 errors per day
-                    moderate_threshold = 15  # ~0.5 errors per day
-                    spam_severe_threshold = 25
-                    email_severe_threshold = 25
-
-                # More nuanced categorization with time-aware thresholds:
-                # Severe: High error count OR both types with significant counts
-                # Moderate: Medium error count OR any errors below severe threshold
-                if total_errors >= severe_threshold or (
-                    spam_error_count >= spam_severe_threshold
-                    and email_error_count >= email_severe_threshold
-                ):
-                    # High error volume or significant errors in both categories = Severe
-                    severe_agents.append(agent_data)
-                elif total_errors >= moderate_threshold or (
-                    spam_error_count > 0 or email_error_count > 0
-                ):
-                    # Medium error volume or any errors = Moderate
-                    moderate_agents.append(agent_data)
-
-        # Sort by error count (descending) and then by last error time (most recent first)
-        moderate_agents.sort(
-            key=lambda x: (-x["total_errors"], x["last_error_time"] or datetime.min),
-            reverse=True,
-        )
-        severe_agents.sort(
-            key=lambda x: (-x["total_errors"], x["last_error_time"] or datetime.min),
-            reverse=True,
+        moderate_agents, severe_agents = _categorize_agents_by_errors(
+            db, start_date=start_date, end_date=end_date, time_filter=time_filter
         )
 
         return {
@@ -151,7 +190,7 @@ def get_agent_error_levels(
 @router.get("/agent-error-details/{agent_name}")
 def get_agent_error_details(
     agent_name: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     time_filter: int = Query(
         24, description="Hours to look back (24 for 24h, 168 for 7d)"
     ),
@@ -251,18 +290,17 @@ def get_agent_error_details(
             hour_key = error["timestamp"].strftime("%Y-%m-%d %H:00")
             error_by_hour[hour_key] = error_by_hour.get(hour_key, 0) + 1
 
-        # Most common error types
-        error_patterns = {}
-        for error in all_errors:
-            if error["error_details"]:
-                # Extract first few words as error pattern
-                pattern = " ".join(error["error_details"].split()[:5])
-                error_patterns[pattern] = error_patterns.get(pattern, 0) + 1
-
-        # Sort patterns by frequency
-        common_patterns = sorted(
-            error_patterns.items(), key=lambda x: x[1], reverse=True
-        )[:5]
+        # Most common error templates come from the error fingerprint index
+        common_patterns = [
+            (pattern["template"], pattern["count"])
+            for pattern in error_patterns.top(
+                db,
+                limit=5,
+                start_date=start_date,
+                end_date=end_date,
+                agent_name=agent_name,
+            )
+        ]
 
         return {
             "agent_name": agent_name,
@@ -293,9 +331,78 @@ def get_agent_error_details(
         )
 
 
+@router.get("/error-patterns")
+def get_error_patterns(
+    db: Session = Depends(get_read_db),
+    time_filter: int = Query(
+        24, description="Hours to look back (24 for 24h, 168 for 7d)"
+    ),
+    agent_name: Optional[str] = Query(
+        None, description="Filter by specific agent name"
+    ),
+    limit: int = Query(10, ge=1, le=100, description="Number of patterns"),
+):
+    """
+    Most frequent error templates for one agent or the whole fleet, with IDs,
+    numbers, emails and URLs normalized away
+    """
+    try:
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(hours=time_filter)
+        return {
+            "time_filter_hours": time_filter,
+            "agent_name": agent_name,
+            "patterns": error_patterns.top(
+                db,
+                limit=limit,
+                start_date=start_date,
+                end_date=end_date,
+                agent_name=agent_name,
+            ),
+            "query_time": end_date.isoformat(),
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching error patterns: {str(e)}"
+        )
+
+
+@router.get("/new-errors")
+def get_new_errors(
+    db: Session = Depends(get_read_db),
+    since: Optional[datetime] = Query(
+        None, description="Report templates first seen at or after this time"
+    ),
+    time_filter: int = Query(
+        24, description="Hours to look back when no start time is given"
+    ),
+    limit: int = Query(20, ge=1, le=100, description="Number of patterns"),
+):
+    """
+    Error templates never seen anywhere in the fleet before the window, in
+    the order they appeared, with how many errors and agents they have hit
+    """
+    try:
+        end_date = datetime.utcnow()
+        start_date = since or end_date - timedelta(hours=time_filter)
+        return {
+            "since": start_date.isoformat(),
+            "new_patterns": error_patterns.new(
+                db, start_date=start_date, end_date=end_date, limit=limit
+            ),
+            "query_time": end_date.isoformat(),
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching new errors: {str(e)}"
+        )
+
+
 @router.get("/error-summary")
 def get_error_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     time_filter: int = Query(
         24, description="Hours to look back (24 for 24h, 168 for 7d)"
     ),
@@ -308,29 +415,19 @@ def get_error_summary(
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(hours=time_filter)
 
-        # Get all spam handler errors
-        spam_errors, spam_total = spam_handler_data.get_multi(
-            db,
-            skip=0,
-            limit=10000,
-            error_occurred=True,
-            start_date=start_date,
-            end_date=end_date,
-        )
-
-        # Get all email processing errors
-        email_errors, email_total = email_processing_data.get_multi(
-            db,
-            skip=0,
-            limit=10000,
-            error_occurred=True,
-            start_date=start_date,
-            end_date=end_date,
+        spam_totals, spam_by_agent, email_totals, email_by_agent = _error_counts(
+            db, start_date=start_date, end_date=end_date
         )
+        spam_errors_count = int(spam_totals["error_count"])
+        email_errors_count = int(email_totals["error_count"])
 
         # Count affected agents
-        spam_affected_agents = set(error.agent_name for error in spam_errors)
-        email_affected_agents = set(error.agent_name for error in email_errors)
+        spam_affected_agents = {
+            name for name, metrics in spam_by_agent.items() if metrics["error_count"]
+        }
+        email_affected_agents = {
+            name for name, metrics in email_by_agent.items() if metrics["error_count"]
+        }
         all_affected_agents = spam_affected_agents | email_affected_agents
 
         # Agents with both types of errors (severe)
@@ -341,14 +438,14 @@ def get_error_summary(
 
         return {
             "time_filter_hours": time_filter,
-            "total_errors": len(spam_errors) + len(email_errors),
-            "spam_errors_count": len(spam_errors),
-            "email_errors_count": len(email_errors),
+            "total_errors": spam_errors_count + email_errors_count,
+            "spam_errors_count": spam_errors_count,
+            "email_errors_count": email_errors_count,
             "total_affected_agents": len(all_affected_agents),
             "moderate_agents_count": len(moderate_agents),
             "severe_agents_count": len(severe_agents),
             "error_rate_per_hour": (
-                (len(spam_errors) + len(email_errors)) / time_filter
+                (spam_errors_count + email_errors_count) / time_filter
                 if time_filter > 0
                 else 0
             ),
@@ -361,9 +458,48 @@ def get_error_summary(
         )
 
 
+@router.get("/unique-counts")
+def get_unique_counts(
+    db: Session = Depends(get_read_db),
+    time_filter: int = Query(
+        24, description="Hours to look back (24 for 24h, 168 for 7d)"
+    ),
+):
+    """
+    Estimated number of distinct agents, profiles and senders seen by the spam
+    handler and email processing telemetry, from the hourly distinct sketches
+    """
+    try:
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(hours=time_filter)
+        window = dict(start_date=start_date, end_date=end_date)
+
+        spam = spam_handler_distinct.union(db, **window)
+        email = email_processing_distinct.union(db, **window)
+        spam_counts = {name: hll.estimate() for name, hll in spam.items()}
+        email_counts = {name: hll.estimate() for name, hll in email.items()}
+
+        # A value seen by both sources is counted once in the merged sketch
+        for name, hll in spam.items():
+            hll.merge(email[name])
+
+        return {
+            "time_filter_hours": time_filter,
+            "spam_handler": spam_counts,
+            "email_processing": email_counts,
+            "combined": {name: hll.estimate() for name, hll in spam.items()},
+            "query_time": end_date.isoformat(),
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching unique counts: {str(e)}"
+        )
+
+
 @router.get("/real-time-spam-stats")
 def get_real_time_spam_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     time_filter: int = Query(
         24, description="Hours to look back (24 for 24h, 168 for 7d)"
     ),
@@ -379,20 +515,18 @@ def get_real_time_spam_stats(
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(hours=time_filter)
 
-        # Get spam handler data
-        spam_data, total_spam = spam_handler_data.get_multi(
-            db,
-            skip=0,
-            limit=10000,
-            agent_name=agent_name,
-            start_date=start_date,
-            end_date=end_date,
-        )
+        # Totals, per-agent and per-hour counts come from the in-memory window,
+        # or from the hourly rollups when it reaches back further than the window
+        window = dict(start_date=start_date, end_date=end_date, agent_name=agent_name)
+        source = _spam_source(start_date)
+        totals = source.summarize(db, **window)
+        by_agent = source.get_by_dimension(db, "agent_name", **window)
+        hourly = source.get_hourly(db, **window)
 
         # Calculate statistics
-        total_processed = len(spam_data)
-        spam_detected = sum(item.spam_emails_found for item in spam_data)
-        errors_occurred = len([item for item in spam_data if item.error_occurred])
+        total_processed = int(totals["total_count"])
+        spam_detected = int(totals["spam_found"])
+        errors_occurred = int(totals["error_count"])
 
         # Calculate rates
         spam_detection_rate = (
@@ -403,18 +537,17 @@ def get_real_time_spam_stats(
         )
 
         # Get unique agents involved
-        unique_agents = list(set(item.agent_name for item in spam_data))
-
-        # Calculate hourly breakdown
-        hourly_stats = {}
-        for item in spam_data:
-            hour_key = item.timestamp.strftime("%Y-%m-%d %H:00")
-            if hour_key not in hourly_stats:
-                hourly_stats[hour_key] = {"total": 0, "spam_detected": 0, "errors": 0}
-            hourly_stats[hour_key]["total"] += 1
-            hourly_stats[hour_key]["spam_detected"] += item.spam_emails_found
-            if item.error_occurred:
-                hourly_stats[hour_key]["errors"] += 1
+        unique_agents = list(by_agent.keys())
+
+        # Hourly breakdown, most recent hour first
+        hourly_stats = {
+            bucket.strftime("%Y-%m-%d %H:00"): {
+                "total": int(metrics["total_count"]),
+                "spam_detected": int(metrics["spam_found"]),
+                "errors": int(metrics["error_count"]),
+            }
+            for bucket, metrics in reversed(hourly.items())
+        }
 
         # Get recent errors for display
         recent_errors = [
@@ -426,11 +559,8 @@ def get_real_time_spam_stats(
                 "spam_emails_found": item.spam_emails_found,
                 "sender_email": item.sender_email,
             }
-            for item in spam_data
-            if item.error_occurred
-        ][
-            :10
-        ]  # Last 10 errors
+            for item in spam_handler_data.get_recent_errors(db, limit=10, **window)
+        ]
 
         return {
             "summary": {
@@ -456,7 +586,7 @@ def get_real_time_spam_stats(
 
 @router.get("/real-time-email-stats")
 def get_real_time_email_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     time_filter: int = Query(
         24, description="Hours to look back (24 for 24h, 168 for 7d)"
     ),
@@ -472,24 +602,22 @@ def get_real_time_email_stats(
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(hours=time_filter)
 
-        # Get email processing data
-        email_data, total_email = email_processing_data.get_multi(
-            db,
-            skip=0,
-            limit=10000,
-            agent_name=agent_name,
-            start_date=start_date,
-            end_date=end_date,
-        )
+        # Totals, per-agent and per-hour counts come from the in-memory window,
+        # or from the hourly rollups when it reaches back further than the window
+        window = dict(start_date=start_date, end_date=end_date, agent_name=agent_name)
+        source = _email_source(start_date)
+        totals = source.summarize(db, **window)
+        by_agent = source.get_by_dimension(db, "agent_name", **window)
+        hourly = source.get_hourly(db, **window)
 
         # Calculate statistics
-        total_processed = len(email_data)
-        emails_sent = len(
-            [item for item in email_data if item.is_opened]
+        total_processed = int(totals["total_count"])
+        emails_sent = int(
+            totals["opened_count"]
         )  # Assuming opened means sent successfully
-        clicks_generated = len([item for item in email_data if item.is_link_clicked])
-        unsubscribes = len([item for item in email_data if item.is_unsubscribe_clicked])
-        errors_occurred = len([item for item in email_data if item.error_occurred])
+        clicks_generated = int(totals["clicked_count"])
+        unsubscribes = int(totals["unsubscribed_count"])
+        errors_occurred = int(totals["error_count"])
 
         # Calculate rates
         email_success_rate = (
@@ -502,29 +630,19 @@ def get_real_time_email_stats(
         )
 
         # Get unique agents involved
-        unique_agents = list(set(item.agent_name for item in email_data))
-
-        # Calculate hourly breakdown
-        hourly_stats = {}
-        for item in email_data:
-            hour_key = item.timestamp.strftime("%Y-%m-%d %H:00")
-            if hour_key not in hourly_stats:
-                hourly_stats[hour_key] = {
-                    "total": 0,
-                    "emails_sent": 0,
-                    "clicks": 0,
-                    "unsubscribes": 0,
-                    "errors": 0,
-                }
-            hourly_stats[hour_key]["total"] += 1
-            if item.is_opened:
-                hourly_stats[hour_key]["emails_sent"] += 1
-            if item.is_link_clicked:
-                hourly_stats[hour_key]["clicks"] += 1
-            if item.is_unsubscribe_clicked:
-                hourly_stats[hour_key]["unsubscribes"] += 1
-            if item.error_occurred:
-                hourly_stats[hour_key]["errors"] += 1
+        unique_agents = list(by_agent.keys())
+
+        # Hourly breakdown, most recent hour first
+        hourly_stats = {
+            bucket.strftime("%Y-%m-%d %H:00"): {
+                "total": int(metrics["total_count"]),
+                "emails_sent": int(metrics["opened_count"]),
+                "clicks": int(metrics["clicked_count"]),
+                "unsubscribes": int(metrics["unsubscribed_count"]),
+                "errors": int(metrics["error_count"]),
+            }
+            for bucket, metrics in reversed(hourly.items())
+        }
 
         # Get recent errors for display
         recent_errors = [
@@ -537,11 +655,8 @@ def get_real_time_email_stats(
                 "sender_email": item.sender_email,
                 "is_opened": item.is_opened,
             }
-            for item in email_data
-            if item.error_occurred
-        ][
-            :10
-        ]  # Last 10 errors
+            for item in email_processing_data.get_recent_errors(db, limit=10, **window)
+        ]
 
         return {
             "summary": {
@@ -571,7 +686,7 @@ def get_real_time_email_stats(
 
 @router.get("/combined-real-time-stats")
 def get_combined_real_time_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     time_filter: int = Query(
         24, description="Hours to look back (24 for 24h, 168 for 7d)"
     ),
@@ -584,44 +699,28 @@ def get_combined_real_time_stats(
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(hours=time_filter)
 
-        # Get spam handler data
-        spam_data, _ = spam_handler_data.get_multi(
-            db,
-            skip=0,
-            limit=10000,
-            start_date=start_date,
-            end_date=end_date,
+        spam_totals, spam_by_agent, email_totals, email_by_agent = _error_counts(
+            db, start_date=start_date, end_date=end_date
         )
 
         # Calculate spam statistics
-        total_spam_processed = len(spam_data)
-        spam_detected = sum(item.spam_emails_found for item in spam_data)
-        spam_errors_occurred = len([item for item in spam_data if item.error_occurred])
+        total_spam_processed = int(spam_totals["total_count"])
+        spam_detected = int(spam_totals["spam_found"])
+        spam_errors_occurred = int(spam_totals["error_count"])
         spam_detection_rate = (
             (spam_detected / total_spam_processed * 100)
             if total_spam_processed > 0
             else 0
         )
-        spam_agents_involved = list(set(item.agent_name for item in spam_data))
-
-        # Get email processing data
-        email_data, _ = email_processing_data.get_multi(
-            db,
-            skip=0,
-            limit=10000,
-            start_date=start_date,
-            end_date=end_date,
-        )
+        spam_agents_involved = list(spam_by_agent)
 
         # Calculate email statistics
-        total_email_processed = len(email_data)
+        total_email_processed = int(email_totals["total_count"])
         emails_sent = total_email_processed  # All records represent sent emails
-        email_errors_occurred = len(
-            [item for item in email_data if item.error_occurred]
-        )
-        clicks_received = sum(1 for item in email_data if item.is_opened)
+        email_errors_occurred = int(email_totals["error_count"])
+        clicks_received = int(email_totals["opened_count"])
         click_rate = (clicks_received / emails_sent * 100) if emails_sent > 0 else 0
-        email_agents_involved = list(set(item.agent_name for item in email_data))
+        email_agents_involved = list(email_by_agent)
 
         # Combine key metrics
         combined_summary = {
@@ -671,7 +770,7 @@ def get_combined_real_time_stats(
 
 @router.get("/real-time-error-summary")
 def get_real_time_error_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     time_filter: int = Query(
         24, description="Hours to look back (24 for 24h, 168 for 7d)"
     ),
@@ -684,31 +783,21 @@ def get_real_time_error_summary(
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(hours=time_filter)
 
-        # Get spam handler data and errors
-        spam_data, _ = spam_handler_data.get_multi(
-            db,
-            skip=0,
-            limit=10000,
-            start_date=start_date,
-            end_date=end_date,
-        )
-
-        spam_errors = [item for item in spam_data if item.error_occurred]
-
-        # Get email processing data and errors
-        email_data, _ = email_processing_data.get_multi(
-            db,
-            skip=0,
-            limit=10000,
-            start_date=start_date,
-            end_date=end_date,
+        spam_totals, spam_by_agent, email_totals, email_by_agent = _error_counts(
+            db, start_date=start_date, end_date=end_date
         )
-
-        email_errors = [item for item in email_data if item.error_occurred]
+        total_spam_processed = int(spam_totals["total_count"])
+        total_emails_processed = int(email_totals["total_count"])
+        spam_errors_count = int(spam_totals["error_count"])
+        email_errors_count = int(email_totals["error_count"])
 
         # Count affected agents
-        spam_affected_agents = set(error.agent_name for error in spam_errors)
-        email_affected_agents = set(error.agent_name for error in email_errors)
+        spam_affected_agents = {
+            name for name, metrics in spam_by_agent.items() if metrics["error_count"]
+        }
+        email_affected_agents = {
+            name for name, metrics in email_by_agent.items() if metrics["error_count"]
+        }
         all_affected_agents = spam_affected_agents | email_affected_agents
 
         # Agents with both types of errors (severe)
@@ -717,33 +806,31 @@ def get_real_time_error_summary(
         # Agents with only one type of error (moderate)
         moderate_agents = all_affected_agents - severe_agents
 
-        total_errors = len(spam_errors) + len(email_errors)
+        total_errors = spam_errors_count + email_errors_count
         error_rate_per_hour = total_errors / time_filter if time_filter > 0 else 0
 
         return {
             "time_filter_hours": time_filter,
             "total_errors": total_errors,
-            "spam_errors_count": len(spam_errors),
-            "email_errors_count": len(email_errors),
+            "spam_errors_count": spam_errors_count,
+            "email_errors_count": email_errors_count,
             "total_affected_agents": len(all_affected_agents),
             "moderate_agents_count": len(moderate_agents),
             "severe_agents_count": len(severe_agents),
             "error_rate_per_hour": error_rate_per_hour,
             "query_time": end_date.isoformat(),
             "spam_detection_rate": (
-                sum(item.spam_emails_found for item in spam_data) / len(spam_data)
-                if spam_data
+                int(spam_totals["spam_found"]) / total_spam_processed
+                if total_spam_processed
                 else 0
             ),
             "email_success_rate": (
-                len([item for item in email_data if item.is_opened])
-                / len(email_data)
-                * 100
-                if email_data
+                int(email_totals["opened_count"]) / total_emails_processed * 100
+                if total_emails_processed
                 else 0
             ),
-            "total_spam_processed": len(spam_data),
-            "total_emails_processed": len(email_data),
+            "total_spam_processed": total_spam_processed,
+            "total_emails_processed": total_emails_processed,
         }
 
     except Exception as e:
@@ -754,7 +841,7 @@ def get_real_time_error_summary(
 
 @router.get("/real-time-agent-errors")
 def get_real_time_agent_errors(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     time_filter: int = Query(
         24, description="Hours to look back (24 for 24h, 168 for 7d)"
     ),
@@ -770,108 +857,8 @@ def get_real_time_agent_errors(
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(hours=time_filter)
 
-        # Get all agents
-        all_agents_result = agent.get_multi(db, skip=0, limit=1000)
-        all_agents = (
-            all_agents_result[0]
-            if isinstance(all_agents_result, tuple)
-            else all_agents_result
-        )
-
-        moderate_agents = []
-        severe_agents = []
-
-        for agent_item in all_agents:
-            # Get spam handler errors for this agent
-            spam_errors, _ = spam_handler_data.get_multi(
-                db,
-                skip=0,
-                limit=1000,
-                agent_name=agent_item.agent_name,
-                error_occurred=True,
-                start_date=start_date,
-                end_date=end_date,
-            )
-
-            # Get email processing errors for this agent
-            email_errors, _ = email_processing_data.get_multi(
-                db,
-                skip=0,
-                limit=1000,
-                agent_name=agent_item.agent_name,
-                error_occurred=True,
-                start_date=start_date,
-                end_date=end_date,
-            )
-
-            spam_error_count = len(spam_errors)
-            email_error_count = len(email_errors)
-
-            if spam_error_count > 0 or email_error_count > 0:
-                agent_data = {
-                    "id": agent_item.id,
-                    "name": agent_item.agent_name,
-                    "email": f"{agent_item.agent_name}@example.com",  # Since email might not exist in Agent model
-                    "profile_name": agent_item.agent_name,
-                    "status": "active" if agent_item.is_active else "inactive",
-                    "spam_error_count": spam_error_count,
-                    "email_error_count": email_error_count,
-                    "total_errors": spam_error_count + email_error_count,
-                    "last_error_time": None,
-                    "created_at": agent_item.created_at,
-                    "updated_at": agent_item.updated_at,
-                }
-
-                # Find the most recent error timestamp
-                all_errors = spam_errors + email_errors
-                if all_errors:
-                    most_recent_error = max(all_errors, key=lambda x: x.timestamp)
-                    agent_data["last_error_time"] = most_recent_error.timestamp
-
-                # Categorize agent based on real-time data with time-period aware logic
-                total_errors = spam_error_count + email_error_count
-
-                # Dynamic thresholds based on time period
-                # Scale thresholds based on time filter to avoid all agents being "severe" for longer periods
-                if time_filter <= 24:  # 24 hours
-                    severe_threshold = 15
-                    moderate_threshold = 5
-                    spam_severe_threshold = 8
-                    email_severe_threshold = 8
-                elif time_filter <= 168:  # 7 days
-                    severe_threshold = 35  # ~5 errors per day
-                    moderate_threshold = 10  # ~1.5 errors per day
-                    spam_severe_threshold = 15
-                    email_severe_threshold = 15
-                else:  # 30 days and beyond
-                    severe_threshold = 50  # ~1.7 errors per day
-                    moderate_threshold = 15  # ~0.5 errors per day
-                    spam_severe_threshold = 25
-                    email_severe_threshold = 25
-
-                # More nuanced categorization with time-aware thresholds:
-                # Severe: High error count OR both types with significant counts
-                # Moderate: Medium error count OR any errors below severe threshold
-                if total_errors >= severe_threshold or (
-                    spam_error_count >= spam_severe_threshold
-                    and email_error_count >= email_severe_threshold
-                ):
-                    # High error volume or significant errors in both categories = Severe
-                    severe_agents.append(agent_data)
-                elif total_errors >= moderate_threshold or (
-                    spam_error_count > 0 or email_error_count > 0
-                ):
-                    # Medium error volume or any errors = Moderate
-                    moderate_agents.append(agent_data)
-
-        # Sort by error count (descending) and then by last error time (most recent first)
-        moderate_agents.sort(
-            key=lambda x: (-x["total_errors"], x["last_error_time"] or datetime.min),
-            reverse=True,
-        )
-        severe_agents.sort(
-            key=lambda x: (-x["total_errors"], x["last_error_time"] or datetime.min),
-            reverse=True,
+        moderate_agents, severe_agents = _categorize_agents_by_errors(
+            db, start_date=start_date, end_date=end_date, time_filter=time_filter
         )
 
         # Return based on severity filter
@@ -1,11 +1,17 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import math
 from datetime import datetime
 
-from app.api.deps import get_db
+from app.api.deps import get_db, get_read_db, queue_telemetry
+from app.core.database import SessionLocal
+from app.core.ingestion import SPAM_HANDLER, write_behind_enabled
+from app.core.retention import retention_worker
 from app.crud.crud_spam_handler_data import spam_handler_data
+from app.utils.export import EXPORT_MEDIA_TYPES, encode_export, export_filename
+from app.utils.pagination import InvalidCursorError
 from app.schemas.spam_handler_data import (
     SpamHandlerDataCreate,
     SpamHandlerDataUpdate,
@@ -21,7 +27,7 @@ router = APIRouter()
 
 @router.get("/", response_model=SpamHandlerDataListResponse)
 def get_spam_handler_data(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of items to return"),
     agent_name: Optional[str] = Query(None, description="Filter by agent name"),
@@ -31,35 +37,52 @@ def get_spam_handler_data(
     start_date: Optional[datetime] = Query(None, description="Filter by start date"),
     end_date: Optional[datetime] = Query(None, description="Filter by end date"),
     search: Optional[str] = Query(None, description="Search in multiple fields"),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from a previous page's next_cursor"
+    ),
+    include_total: bool = Query(
+        True, description="Count all matching rows (disable for constant-cost pages)"
+    ),
 ):
     """
-    Get all spam handler data entries with pagination and filtering
-    """
-    items, total = spam_handler_data.get_multi(
-        db,
-        skip=skip,
-        limit=limit,
-        agent_name=agent_name,
-        profile_name=profile_name,
-        sender_email=sender_email,
-        error_occurred=error_occurred,
-        start_date=start_date,
-        end_date=end_date,
-        search=search,
-    )
+    Get all spam handler data entries with pagination and filtering.
+    Follow next_cursor with the cursor parameter for constant-cost deep paging.
+    """
+    try:
+        items, total, next_cursor = spam_handler_data.get_page(
+            db,
+            skip=skip,
+            limit=limit,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            sender_email=sender_email,
+            error_occurred=error_occurred,
+            start_date=start_date,
+            end_date=end_date,
+            search=search,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    total_pages = None
+    if total is not None:
+        total_pages = math.ceil(total / limit) if total > 0 else 0
 
     return SpamHandlerDataListResponse(
         items=items,
         total=total,
-        page=skip // limit + 1,
+        page=None if cursor else skip // limit + 1,
         per_page=limit,
-        total_pages=math.ceil(total / limit) if total > 0 else 0,
+        total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/recent", response_model=List[SpamHandlerDataResponse])
 def get_recent_spam_handler_data(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     hours: int = Query(24, ge=1, le=168, description="Number of hours to look back"),
     limit: int = Query(
         100, ge=1, le=1000, description="Maximum number of entries to return"
@@ -73,7 +96,7 @@ def get_recent_spam_handler_data(
 
 @router.get("/statistics", response_model=SpamHandlerDataStats)
 def get_spam_handler_statistics(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     start_date: Optional[datetime] = Query(
         None, description="Start date for statistics"
     ),
@@ -91,7 +114,7 @@ def get_spam_handler_statistics(
 @router.get("/by-agent/{agent_name}", response_model=List[SpamHandlerDataResponse])
 def get_spam_handler_data_by_agent(
     agent_name: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     limit: int = Query(
         100, ge=1, le=1000, description="Maximum number of entries to return"
     ),
@@ -105,7 +128,7 @@ def get_spam_handler_data_by_agent(
 @router.get("/by-profile/{profile_name}", response_model=List[SpamHandlerDataResponse])
 def get_spam_handler_data_by_profile(
     profile_name: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     limit: int = Query(
         100, ge=1, le=1000, description="Maximum number of entries to return"
     ),
@@ -119,7 +142,7 @@ def get_spam_handler_data_by_profile(
 @router.get("/by-sender/{sender_email}", response_model=List[SpamHandlerDataResponse])
 def get_spam_handler_data_by_sender(
     sender_email: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     limit: int = Query(
         100, ge=1, le=1000, description="Maximum number of entries to return"
     ),
@@ -143,11 +166,18 @@ def get_spam_handler_data_entry(entry_id: int, db: Session = Depends(get_db)):
 
 @router.post("/", response_model=SpamHandlerDataResponse)
 def create_spam_handler_data_entry(
-    entry_in: SpamHandlerDataCreate, db: Session = Depends(get_db)
+    entry_in: SpamHandlerDataCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(
+        None, description="Client key used to de-duplicate retried submissions"
+    ),
 ):
     """
     Create a new spam handler data entry
+    In write-behind mode the record is queued and 202 Accepted is returned.
     """
+    if write_behind_enabled():
+        return queue_telemetry(SPAM_HANDLER, entry_in, idempotency_key)
     return spam_handler_data.create(db, obj_in=entry_in)
 
 
@@ -200,52 +230,63 @@ def bulk_delete_spam_handler_data(
     }
 
 
-@router.delete("/cleanup/old")
+@router.delete("/cleanup/old", status_code=status.HTTP_202_ACCEPTED)
 def cleanup_old_spam_handler_data(
-    db: Session = Depends(get_db),
     days_old: int = Query(
         30, ge=1, le=365, description="Delete entries older than this many days"
     ),
 ):
     """
-    Delete spam handler data entries older than specified days
+    Schedule deletion of spam handler data entries older than specified days.
+    The retention worker deletes them in small chunks in the background;
+    follow its progress at /database/retention.
     """
-    deleted_count = spam_handler_data.delete_old_entries(db, days_old=days_old)
+    retention_worker.request_run("spam_handler_data", days=days_old)
     return {
-        "message": f"Deleted {deleted_count} old spam handler data entries",
-        "deleted_count": deleted_count,
+        "message": (
+            f"Scheduled deletion of spam handler data entries "
+            f"older than {days_old} days"
+        ),
+        "table_name": "spam_handler_data",
+        "days_old": days_old,
     }
 
 
 @router.get("/export/csv")
 def export_spam_handler_data_csv(
-    db: Session = Depends(get_db),
     start_date: Optional[datetime] = Query(None, description="Start date for export"),
     end_date: Optional[datetime] = Query(None, description="End date for export"),
     agent_name: Optional[str] = Query(None, description="Filter by agent name"),
     profile_name: Optional[str] = Query(None, description="Filter by profile name"),
+    sender_email: Optional[str] = Query(None, description="Filter by sender email"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    gzip: bool = Query(False, description="Gzip-compress the download"),
 ):
     """
-    Export spam handler data as CSV (returns download info)
-    """
-    # Get filtered data
-    items, total = spam_handler_data.get_multi(
-        db,
-        skip=0,
-        limit=10000,  # Large limit for export
-        agent_name=agent_name,
-        profile_name=profile_name,
-        start_date=start_date,
-        end_date=end_date,
-    )
+    Export spam handler data as a streamed CSV or NDJSON download.
+    Rows are read in id-ordered batches on a dedicated session, so memory use is
+    flat regardless of export size.
+    """
 
-    return {
-        "message": f"Export ready with {total} entries",
-        "total_entries": total,
-        "filters_applied": {
-            "agent_name": agent_name,
-            "profile_name": profile_name,
-            "start_date": start_date.isoformat() if start_date else None,
-            "end_date": end_date.isoformat() if end_date else None,
-        },
-    }
+    def batches():
+        db = SessionLocal()
+        try:
+            yield from spam_handler_data.iter_export_batches(
+                db,
+                agent_name=agent_name,
+                profile_name=profile_name,
+                sender_email=sender_email,
+                start_date=start_date,
+                end_date=end_date,
+            )
+        finally:
+            db.close()
+
+    filename = export_filename("spam_handler_data", format, gzip)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    return StreamingResponse(
+        encode_export(format, spam_handler_data.EXPORT_COLUMNS, batches(), gzip=gzip),
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
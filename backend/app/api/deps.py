@@ -1,24 +1,29 @@
-from typing import Generator, Optional
+from typing import Any, Generator, Optional
 from fastapi import Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import verify_token
+from app.core.auth_cache import principal_cache
+from app.core.database import get_async_db, get_db, get_read_db
+from app.core.ingestion import IngestionQueueFull, ingestion_queue
+from app.core.security import decode_token
 from app.crud import user
 from app.models.user import User
 
 security = HTTPBearer()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> User:
+def _resolve_user(db: Session, token: str) -> User:
     """
-    Get current authenticated user
+    User for a bearer token, from the principal cache when the token has
+    been verified before, otherwise by verifying it and loading the user
     """
-    token = credentials.credentials
-    user_id = verify_token(token)
+    cached_user = principal_cache.get(token, db)
+    if cached_user is not None:
+        return cached_user
+
+    payload = decode_token(token)
+    user_id = payload.get("sub") if payload else None
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -26,12 +31,27 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # An invalidation racing the load below must win over caching its result
+    version = principal_cache.version()
     current_user = user.get(db, id=user_id)
     if not current_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
+    principal_cache.put(token, user_id, current_user, payload.get("exp"), version)
+    return current_user
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> User:
+    """
+    Get current authenticated user
+    """
+    current_user = _resolve_user(db, credentials.credentials)
+
     if not user.is_active(current_user):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
@@ -47,20 +67,7 @@ def get_current_verified_user(
     """
     Get current authenticated and verified user
     """
-    token = credentials.credentials
-    user_id = verify_token(token)
-    if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    current_user = user.get(db, id=user_id)
-    if not current_user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
+    current_user = _resolve_user(db, credentials.credentials)
 
     if not user.is_active(current_user):
         raise HTTPException(
@@ -88,3 +95,27 @@ def get_current_active_superuser(
             detail="The user doesn't have enough privileges",
         )
     return current_user
+
+
+def queue_telemetry(
+    kind: str, obj_in: Any, idempotency_key: Optional[str] = None
+) -> JSONResponse:
+    """
+    Hand a validated telemetry record to the write-behind queue
+
+    Returns 202 with the idempotency key, or raises 503 when the queue is full
+    so agents back off and retry with the same key.
+    """
+    if not ingestion_queue.running:
+        ingestion_queue.start()
+
+    try:
+        receipt = ingestion_queue.submit(kind, obj_in, idempotency_key)
+    except IngestionQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=receipt)
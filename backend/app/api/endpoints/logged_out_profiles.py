@@ -4,13 +4,16 @@ API endpoints for managing logged out profile records
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import math
 
-from app.api.deps import get_db
+from app.api.deps import get_async_db, queue_telemetry
+from app.core.concurrency import run_crud
+from app.core.ingestion import LOGGED_OUT_PROFILE, write_behind_enabled
 from app.crud.crud_logged_out_profile import logged_out_profile
+from app.utils.pagination import InvalidCursorError
 from app.schemas.logged_out_profile import (
     LoggedOutProfileCreate,
     LoggedOutProfileUpdate,
@@ -45,7 +48,10 @@ class BulkDeleteResponse(BaseModel):
 )
 async def create_logged_out_profile(
     logged_out_profile_data: LoggedOutProfileCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(
+        None, description="Client key used to de-duplicate retried submissions"
+    ),
 ):
     """
     Create new logged out profile entry
@@ -71,13 +77,20 @@ async def create_logged_out_profile(
     ```
 
     **Note:** The timestamp is automatically generated when the data is posted.
+    In write-behind mode the record is queued and 202 Accepted is returned.
     """
-    return logged_out_profile.create(db, obj_in=logged_out_profile_data)
+    if write_behind_enabled():
+        return queue_telemetry(
+            LOGGED_OUT_PROFILE, logged_out_profile_data, idempotency_key
+        )
+    return await run_crud(
+        db, logged_out_profile.create, obj_in=logged_out_profile_data
+    )
 
 
 @router.get("/", response_model=LoggedOutProfileListResponse)
 async def get_logged_out_profiles(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
     agent_name: Optional[str] = Query(None, description="Filter by agent name"),
@@ -91,6 +104,12 @@ async def get_logged_out_profiles(
     search: Optional[str] = Query(
         None, description="Search in agent_name and profile_name"
     ),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from a previous page's next_cursor"
+    ),
+    include_total: bool = Query(
+        True, description="Count all matching rows (disable for constant-cost pages)"
+    ),
 ):
     """
     Get logged out profiles with filtering and pagination
@@ -103,6 +122,8 @@ async def get_logged_out_profiles(
     - date_from: Filter from date in ISO format (optional)
     - date_to: Filter to date in ISO format (optional)
     - search: Search in agent_name and profile_name (optional)
+    - cursor: next_cursor from a previous page; skip is ignored when set (optional)
+    - include_total: Set to false to skip counting; total and total_pages are null
 
     **Response:**
     ```json
@@ -120,23 +141,32 @@ async def get_logged_out_profiles(
         "total": 1,
         "page": 1,
         "per_page": 100,
-        "total_pages": 1
+        "total_pages": 1,
+        "next_cursor": null
     }
     ```
     """
-    items, total = logged_out_profile.get_multi(
-        db,
-        skip=skip,
-        limit=limit,
-        agent_name=agent_name,
-        profile_name=profile_name,
-        date_from=date_from,
-        date_to=date_to,
-        search=search,
-    )
+    try:
+        items, total, next_cursor = await run_crud(
+            db,
+            logged_out_profile.get_page,
+            skip=skip,
+            limit=limit,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            date_from=date_from,
+            date_to=date_to,
+            search=search,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    total_pages = math.ceil(total / limit) if limit > 0 else 1
-    current_page = (skip // limit) + 1 if limit > 0 else 1
+    total_pages = None
+    if total is not None:
+        total_pages = math.ceil(total / limit) if limit > 0 else 1
+    current_page = None if cursor else (skip // limit) + 1
 
     return LoggedOutProfileListResponse(
         items=items,
@@ -144,13 +174,14 @@ async def get_logged_out_profiles(
         page=current_page,
         per_page=limit,
         total_pages=total_pages,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/{logged_out_profile_id}", response_model=LoggedOutProfileResponse)
 async def get_logged_out_profile(
     logged_out_profile_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Get a specific logged out profile by ID
@@ -167,7 +198,9 @@ async def get_logged_out_profile(
     }
     ```
     """
-    logged_out_profile_obj = logged_out_profile.get(db, id=logged_out_profile_id)
+    logged_out_profile_obj = await run_crud(
+        db, logged_out_profile.get, id=logged_out_profile_id
+    )
     if not logged_out_profile_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Logged out profile not found"
@@ -179,7 +212,7 @@ async def get_logged_out_profile(
 async def update_logged_out_profile(
     logged_out_profile_id: int,
     logged_out_profile_update: LoggedOutProfileUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Update a logged out profile
@@ -195,21 +228,26 @@ async def update_logged_out_profile(
     **Response:**
     Returns the updated logged out profile record.
     """
-    logged_out_profile_obj = logged_out_profile.get(db, id=logged_out_profile_id)
+    logged_out_profile_obj = await run_crud(
+        db, logged_out_profile.get, id=logged_out_profile_id
+    )
     if not logged_out_profile_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Logged out profile not found"
         )
 
-    return logged_out_profile.update(
-        db, db_obj=logged_out_profile_obj, obj_in=logged_out_profile_update
+    return await run_crud(
+        db,
+        logged_out_profile.update,
+        db_obj=logged_out_profile_obj,
+        obj_in=logged_out_profile_update,
     )
 
 
 @router.delete("/{logged_out_profile_id}", response_model=LoggedOutProfileResponse)
 async def delete_logged_out_profile(
     logged_out_profile_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Delete a logged out profile
@@ -217,19 +255,21 @@ async def delete_logged_out_profile(
     **Response:**
     Returns the deleted logged out profile record.
     """
-    logged_out_profile_obj = logged_out_profile.get(db, id=logged_out_profile_id)
+    logged_out_profile_obj = await run_crud(
+        db, logged_out_profile.get, id=logged_out_profile_id
+    )
     if not logged_out_profile_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Logged out profile not found"
         )
 
-    return logged_out_profile.remove(db, id=logged_out_profile_id)
+    return await run_crud(db, logged_out_profile.remove, id=logged_out_profile_id)
 
 
 @router.post("/bulk-delete", response_model=BulkDeleteResponse)
 async def bulk_delete_logged_out_profiles(
     bulk_delete_request: BulkDeleteRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Bulk delete logged out profiles
@@ -249,8 +289,8 @@ async def bulk_delete_logged_out_profiles(
     }
     ```
     """
-    deleted_count, failed_ids = logged_out_profile.bulk_delete(
-        db, ids=bulk_delete_request.ids
+    deleted_count, failed_ids = await run_crud(
+        db, logged_out_profile.bulk_delete, ids=bulk_delete_request.ids
     )
 
     return BulkDeleteResponse(deleted_count=deleted_count, failed_ids=failed_ids)
@@ -259,7 +299,7 @@ async def bulk_delete_logged_out_profiles(
 @router.get("/agent/{agent_name}", response_model=List[LoggedOutProfileResponse])
 async def get_logged_out_profiles_by_agent(
     agent_name: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     profile_name: Optional[str] = Query(None, description="Filter by profile name"),
 ):
     """
@@ -280,19 +320,22 @@ async def get_logged_out_profiles_by_agent(
     ```
     """
     if profile_name:
-        return logged_out_profile.get_by_agent_and_profile(
-            db, agent_name=agent_name, profile_name=profile_name
+        return await run_crud(
+            db,
+            logged_out_profile.get_by_agent_and_profile,
+            agent_name=agent_name,
+            profile_name=profile_name,
         )
     else:
-        items, _ = logged_out_profile.get_multi(
-            db, skip=0, limit=None, agent_name=agent_name
+        items, _ = await run_crud(
+            db, logged_out_profile.get_multi, skip=0, limit=None, agent_name=agent_name
         )
         return items
 
 
 @router.get("/analytics/stats")
 async def get_logged_out_profile_analytics(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     date_from: Optional[datetime] = Query(
         None, description="Filter from date (ISO format)"
     ),
@@ -324,8 +367,12 @@ async def get_logged_out_profile_analytics(
     }
     ```
     """
-    stats = logged_out_profile.get_analytics(
-        db, date_from=date_from, date_to=date_to, agent_name=agent_name
+    stats = await run_crud(
+        db,
+        logged_out_profile.get_analytics,
+        date_from=date_from,
+        date_to=date_to,
+        agent_name=agent_name,
     )
     return stats
 
@@ -0,0 +1,176 @@
+"""
+In-process cache of authenticated principals for bearer tokens.
+
+``get_current_user`` verifies a JWT and loads its user on every request. A
+token that has been verified once is remembered here, keyed by its SHA-256
+hash, together with a detached snapshot of the user row. Later requests
+with the same token skip both the signature check and the user query: the
+snapshot is merged into the request's session without loading, so the
+active / verified / superuser checks and ``current_user.id`` need no I/O.
+
+Entries live until AUTH_PRINCIPAL_CACHE_TTL_SECONDS pass or the token
+expires, whichever is sooner, and the least recently used entries are
+evicted beyond AUTH_PRINCIPAL_CACHE_MAX_SIZE. Every write through
+``crud_user`` drops the user's entries, and a user loaded before an
+invalidation is not cached after it; writes handled by another worker
+process become visible after the TTL.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.models.user import User
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def detached_copy(user: User) -> User:
+    """Clean, session-less copy of a loaded user's column values"""
+    copy = User(
+        **{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    )
+    make_transient_to_detached(copy)
+    return copy
+
+
+class Principal:
+    """A verified token's subject and the user row it resolved to"""
+
+    def __init__(self, subject: str, user: User, expires_at: float):
+        self.subject = subject
+        self.user_id = user.id
+        self.user = user
+        self.expires_at = expires_at
+
+
+class PrincipalCache:
+    """Thread-safe TTL + LRU map of token hash -> Principal"""
+
+    def __init__(
+        self, ttl_seconds: Optional[float] = None, max_size: Optional[int] = None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Principal]" = OrderedDict()
+        self._by_user: Dict[Any, Set[str]] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "stale_puts": 0,
+        }
+
+    def _ttl(self) -> float:
+        if self.ttl_seconds is not None:
+            return self.ttl_seconds
+        return settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS
+
+    def _max_size(self) -> int:
+        if self.max_size is not None:
+            return self.max_size
+        return settings.AUTH_PRINCIPAL_CACHE_MAX_SIZE
+
+    def _drop(self, key: str) -> None:
+        principal = self._entries.pop(key, None)
+        if principal is not None:
+            keys = self._by_user.get(principal.user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[principal.user_id]
+
+    def get(self, token: str, db: Session) -> Optional[User]:
+        """The token's user merged into db, or None on a miss"""
+        key = token_key(token)
+        with self._lock:
+            principal = self._entries.get(key)
+            if principal is None:
+                self._counters["misses"] += 1
+                return None
+            if time.time() >= principal.expires_at:
+                self._drop(key)
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            snapshot = principal.user
+
+        # load=False builds the session's own instance from the snapshot
+        return db.merge(snapshot, load=False)
+
+    def version(self) -> int:
+        """Invalidation version, to be read before loading a user for ``put``"""
+        with self._lock:
+            return self._version
+
+    def put(
+        self,
+        token: str,
+        subject: str,
+        user: User,
+        token_expires_at: Optional[float],
+        version: Optional[int] = None,
+    ) -> None:
+        """
+        Remember a verified token and the user it resolved to. With the
+        ``version`` read before the user was loaded, the entry is skipped if
+        an invalidation happened since, as the user may be stale.
+        """
+        ttl = self._ttl()
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+
+        key = token_key(token)
+        principal = Principal(subject, detached_copy(user), expires_at)
+        with self._lock:
+            if version is not None and version != self._version:
+                self._counters["stale_puts"] += 1
+                return
+            self._drop(key)
+            self._entries[key] = principal
+            self._by_user.setdefault(principal.user_id, set()).add(key)
+            while len(self._entries) > self._max_size():
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def invalidate_user(self, user_id: Any) -> None:
+        """Forget every cached token of a user whose row changed"""
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._drop(key)
+            self._version += 1
+            self._counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._by_user.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "users": len(self._by_user),
+                "ttl_seconds": self._ttl(),
+                "max_size": self._max_size(),
+                **self._counters,
+            }
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,58 @@
+"""
+Keep blocking database work off the event loop.
+
+``async def`` handlers use an ``AsyncSession`` (aiosqlite / aiomysql) and run
+the existing CRUD code through ``run_crud``, which executes it on the async
+driver without a thread. Code that must stay on the synchronous engine goes
+through ``run_in_db_pool``: a dedicated pool of DB_THREADPOOL_SIZE threads,
+so a slow query waits for a database thread instead of blocking the loop or
+taking threads from the server's shared pool.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+_db_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_db_pool() -> ThreadPoolExecutor:
+    global _db_pool
+    if _db_pool is None:
+        _db_pool = ThreadPoolExecutor(
+            max_workers=settings.DB_THREADPOOL_SIZE, thread_name_prefix="db-worker"
+        )
+    return _db_pool
+
+
+async def run_in_db_pool(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking callable on the bounded database thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_db_pool(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def run_crud(
+    db: AsyncSession, method: Callable[..., T], *args: Any, **kwargs: Any
+) -> T:
+    """
+    Call a synchronous CRUD method as ``method(session, *args, **kwargs)`` on
+    the session behind an AsyncSession, so its I/O runs on the async driver.
+    """
+    return await db.run_sync(method, *args, **kwargs)
+
+
+def shutdown_db_pool() -> None:
+    """Wait for queued database work and stop the pool's threads"""
+    global _db_pool
+    if _db_pool is not None:
+        _db_pool.shutdown(wait=True)
+        _db_pool = None
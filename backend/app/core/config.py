@@ -1,4 +1,4 @@
-from typing import List, Union, Any
+from typing import Dict, List, Union, Any
 from pydantic import AnyHttpUrl, validator
 import secrets
 import os
@@ -21,6 +21,11 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 60  # 0 verifies every request
+    AUTH_PRINCIPAL_CACHE_MAX_SIZE: int = 10000  # Cached tokens before LRU eviction
+    BCRYPT_ROUNDS: int = 12  # Cost of new hashes; existing hashes keep their own
+    PASSWORD_HASH_WORKERS: int = 2  # Threads dedicated to bcrypt
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Queued + running hashes before 503s
 
     # CORS
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
@@ -48,6 +53,11 @@ class Settings(BaseSettings):
 
     # SQLite Configuration
     SQLITE_DATABASE_PATH: str = "./data/gmail_dashboard.db"
+    SQLITE_PROFILE: str = "legacy"  # "production" (WAL + pools) to opt in
+    SQLITE_READ_POOL_SIZE: int = 4  # Reader connections in the production profile
+    SQLITE_BUSY_TIMEOUT_MS: int = 20000  # Wait for the write lock before failing
+    SQLITE_CACHE_SIZE_KB: int = 65536  # Page cache per connection
+    SQLITE_MMAP_SIZE: int = 268435456  # Bytes of the file memory-mapped for reads
 
     # MySQL Configuration (Alternative naming for backward compatibility)
     MYSQL_HOST: str = ""
@@ -79,6 +89,53 @@ class Settings(BaseSettings):
     DB_POOL_RECYCLE: int = 3600  # Recycle connections after 1 hour
     DB_KEEP_ALIVE_INTERVAL: int = 1800  # Keep-alive ping every 30 minutes
     DB_ECHO: bool = False  # Set to True for SQL query logging
+    DB_THREADPOOL_SIZE: int = 8  # Threads for sync DB work called from async code
+
+    # Optional MySQL read replica for analytics and listing endpoints
+    DB_READ_REPLICA_HOST: str = ""  # Empty disables replica routing
+    DB_READ_REPLICA_PORT: int = 0  # 0 uses the primary's port
+    DB_READ_REPLICA_USER: str = ""  # Empty uses the primary's credentials
+    DB_READ_REPLICA_PASSWORD: str = ""
+    DB_READ_REPLICA_POOL_SIZE: int = 5
+    DB_READ_REPLICA_MAX_OVERFLOW: int = 10
+    DB_READ_REPLICA_MAX_LAG_SECONDS: int = 30  # Fall back to the primary beyond this
+    DB_READ_REPLICA_CHECK_INTERVAL: int = 15  # Seconds between health/lag checks
+
+    # Telemetry ingestion (write-behind queue for agent POSTs)
+    INGESTION_WRITE_BEHIND: bool = False  # Queue records and answer 202
+    INGESTION_QUEUE_MAX_SIZE: int = 10000  # Records held before 503s
+    INGESTION_BATCH_SIZE: int = 500  # Max records per flush
+    INGESTION_FLUSH_INTERVAL_MS: int = 200  # Max wait before a flush
+    INGESTION_IDEMPOTENCY_TTL_SECONDS: int = 600  # How long keys are remembered
+    INGESTION_MAX_ATTEMPTS: int = 6  # Batch writes tried for transient DB errors
+    INGESTION_RETRY_BASE_SECONDS: float = 0.5  # Backoff doubles from here
+    BULK_INSERT_CHUNK_SIZE: int = 1000  # Rows per INSERT statement in bulk writes
+
+    # In-memory window of recent telemetry for the real-time dashboards
+    WINDOW_CACHE_DAYS: int = 7  # Longer windows are read from the rollups; 0 disables
+    WINDOW_CACHE_REFRESH_SECONDS: int = 5  # Catch up on other workers' inserts
+    WINDOW_CACHE_RELOAD_SECONDS: int = 600  # Full rebuild for updates and deletes
+
+    # MySQL range partitioning of the telemetry tables, see app.db.partitioning
+    TELEMETRY_PARTITION_INTERVAL: str = ""  # "day" or "month"; empty disables
+    TELEMETRY_PARTITIONS_AHEAD: int = 3  # Future periods kept partitioned
+
+    # Background retention, see app.core.retention
+    RETENTION_ENABLED: bool = False  # Scheduled passes; on-demand cleanups always run
+    RETENTION_RAW_DAYS: int = 30  # Telemetry rows; 0 keeps them forever
+    RETENTION_ROLLUP_DAYS: int = 730  # Hourly rollups, sketches and error counts
+    RETENTION_TABLE_DAYS: Dict[str, int] = {}  # Per-table overrides, by table name
+    RETENTION_INTERVAL_SECONDS: int = 3600  # Between scheduled passes
+    RETENTION_CHUNK_SIZE: int = 1000  # Rows deleted per transaction
+    RETENTION_CHUNK_PAUSE_MS: int = 200  # Sleep between chunks
+    RETENTION_LEASE_SECONDS: int = 120  # A run silent this long is taken over
+
+    # Top-K sketches behind the top senders / subjects / websites widgets
+    TOPK_SKETCH_CAPACITY: int = 64  # Counters per agent, hour and field
+
+    # Automation config snapshot served to polling agents
+    AUTOMATION_CONFIG_CACHE_TTL_SECONDS: int = 30  # Rebuild to see other workers' writes
+    AUTOMATION_CONFIG_STREAM_HEARTBEAT_SECONDS: int = 15  # Keep-alive on idle streams
 
     # Frontend URL for email links
     FRONTEND_URL: str = "http://localhost:5173"
@@ -94,6 +151,13 @@ class Settings(BaseSettings):
     SMTP_HOST: str = "smtp.gmail.com"
     SMTP_USER: str = ""
     SMTP_PASSWORD: str = ""
+    SMTP_POOL_SIZE: int = 2  # Open connections, one delivery thread each
+    SMTP_TIMEOUT_SECONDS: int = 30
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100  # Reconnect after this many
+    SMTP_IDLE_CHECK_SECONDS: int = 60  # NOOP connections idle at least this long
+    EMAIL_QUEUE_MAX_SIZE: int = 5000  # Messages held before sends are refused
+    EMAIL_MAX_ATTEMPTS: int = 5  # Deliveries tried for transient failures
+    EMAIL_RETRY_BASE_SECONDS: float = 2.0  # Backoff doubles from here
 
     # Pagination
     DEFAULT_PAGE_SIZE: int = 20
@@ -0,0 +1,144 @@
+"""
+In-process snapshot of the automation config served to polling agents.
+
+Every write through the default sender, random URL, random website settings
+and connectivity settings CRUDs calls ``automation_config_cache.bump()``,
+which advances a monotonically increasing version and drops the snapshot.
+The next read rebuilds it once; every other read is served from memory.
+
+The ETag is a hash of the config content rather than the version, so it is
+stable across worker processes. Each worker only sees its own bumps, so a
+snapshot is also rebuilt after AUTOMATION_CONFIG_CACHE_TTL_SECONDS to pick
+up writes handled by other workers.
+
+Streaming clients (``subscribe``) are woken on every bump so they can push
+a ``config_delta`` instead of waiting for the next poll.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+def config_delta(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Keys whose values changed or appeared, and keys that disappeared"""
+    return {
+        "changed": {
+            key: value
+            for key, value in new.items()
+            if key not in old or old[key] != value
+        },
+        "removed": sorted(key for key in old if key not in new),
+    }
+
+
+class ConfigSnapshot:
+    """One built config payload and the version it was built at"""
+
+    def __init__(self, version: int, config: Dict[str, Any]):
+        self.version = version
+        self.config = config
+        self.etag = '"{}"'.format(
+            hashlib.sha256(
+                json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()[:32]
+        )
+        self.built_at = datetime.utcnow()
+        self.built_monotonic = time.monotonic()
+
+
+class AutomationConfigCache:
+    """Versioned, lazily rebuilt automation config snapshot"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds
+        self._version = 0
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._lock = threading.Lock()
+        self._subscribers: Dict[asyncio.Event, asyncio.AbstractEventLoop] = {}
+        self._counters = {"hits": 0, "builds": 0, "bumps": 0}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump(self) -> int:
+        """Mark the config as changed; returns the new version"""
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+            self._counters["bumps"] += 1
+            version = self._version
+            subscribers = list(self._subscribers.items())
+
+        # Writes run in worker threads; wake each stream on its own loop
+        for event, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                self.unsubscribe(event)
+        return version
+
+    def subscribe(self) -> asyncio.Event:
+        """Event set on the caller's event loop whenever the config changes"""
+        event = asyncio.Event()
+        with self._lock:
+            self._subscribers[event] = asyncio.get_running_loop()
+        return event
+
+    def unsubscribe(self, event: asyncio.Event) -> None:
+        with self._lock:
+            self._subscribers.pop(event, None)
+
+    def _fresh(self, snapshot: Optional[ConfigSnapshot]) -> bool:
+        if snapshot is None or snapshot.version != self._version:
+            return False
+        ttl = (
+            self.ttl_seconds
+            if self.ttl_seconds is not None
+            else settings.AUTOMATION_CONFIG_CACHE_TTL_SECONDS
+        )
+        return time.monotonic() - snapshot.built_monotonic < ttl
+
+    def get(
+        self, db: Session, builder: Callable[[Session], Dict[str, Any]]
+    ) -> ConfigSnapshot:
+        """Current snapshot, built with builder(db) when missing or stale"""
+        snapshot = self._snapshot
+        if self._fresh(snapshot):
+            with self._lock:
+                self._counters["hits"] += 1
+            return snapshot
+
+        version = self._version
+        config = builder(db)
+        snapshot = ConfigSnapshot(version, config)
+        with self._lock:
+            self._counters["builds"] += 1
+            # A bump during the build leaves the older snapshot uncached
+            if version == self._version:
+                self._snapshot = snapshot
+        return snapshot
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Version, current ETag and hit/build counters"""
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                "version": self._version,
+                "etag": snapshot.etag if snapshot else None,
+                "built_at": snapshot.built_at.isoformat() if snapshot else None,
+                "subscribers": len(self._subscribers),
+                **self._counters,
+            }
+
+
+automation_config_cache = AutomationConfigCache()
@@ -5,6 +5,7 @@ Database configuration using the new advanced database manager
 from database import (
     db_manager,
     get_db,
+    get_read_db,
     get_async_db,
     Base,
     engine,
@@ -19,6 +20,7 @@ from database import (
 __all__ = [
     "db_manager",
     "get_db",
+    "get_read_db",
     "get_async_db",
     "Base",
     "engine",
@@ -1,10 +1,11 @@
-import smtplib
 import secrets
 from datetime import datetime, timedelta
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from email.message import EmailMessage
+from html import escape
+from string import Template
 from typing import Optional
 from app.core.config import settings
+from app.core.email_delivery import email_queue
 
 
 def generate_verification_token() -> str:
@@ -24,60 +25,53 @@ def create_reset_password_link(token: str) -> str:
     return f"{frontend_url}/reset-password?token={token}"
 
 
+def build_message(
+    to_email: str, subject: str, html_content: str, text_content: str = None
+) -> EmailMessage:
+    """Build a multipart/alternative message (plain text first, then HTML)"""
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = settings.SMTP_USER
+    msg["To"] = to_email
+
+    # Add text content if provided
+    if text_content:
+        msg.set_content(text_content)
+        msg.add_alternative(html_content, subtype="html")
+    else:
+        msg.set_content(html_content, subtype="html")
+    return msg
+
+
 def send_email(
     to_email: str, subject: str, html_content: str, text_content: str = None
 ) -> bool:
-    """Send email using SMTP"""
+    """Queue an email for delivery over the pooled SMTP connections"""
     try:
-        # Create message
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = settings.SMTP_USER
-        msg["To"] = to_email
-
-        # Add text content if provided
-        if text_content:
-            part1 = MIMEText(text_content, "plain")
-            msg.attach(part1)
-
-        # Add HTML content
-        part2 = MIMEText(html_content, "html")
-        msg.attach(part2)
-
-        # Connect to server and send email
-        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT)
-        if settings.SMTP_TLS:
-            server.starttls()
-
-        if settings.SMTP_USER and settings.SMTP_PASSWORD:
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-
-        server.send_message(msg)
-        server.quit()
-
+        if not email_queue.running:
+            email_queue.start()
+        email_queue.submit(build_message(to_email, subject, html_content, text_content))
         return True
     except Exception as e:
-        print(f"Failed to send email: {e}")
+        print(f"Failed to queue email: {e}")
         return False
 
 
-def send_verification_email(
-    to_email: str, username: str, verification_link: str
-) -> bool:
-    """Send email verification email"""
-    subject = "Verify Your Email - Gmail Automation Dashboard"
+# Templates are built once at import; values are HTML-escaped when rendered
+VERIFICATION_SUBJECT = "Verify Your Email - Gmail Automation Dashboard"
 
-    html_content = f"""
+VERIFICATION_HTML = Template(
+    """
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="utf-8">
         <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: #1a1a1a; color: white; padding: 20px; text-align: center; }}
-            .content {{ padding: 20px; background: #f9f9f9; }}
-            .button {{ 
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+            .header { background: #1a1a1a; color: white; padding: 20px; text-align: center; }
+            .content { padding: 20px; background: #f9f9f9; }
+            .button { 
                 display: inline-block; 
                 padding: 12px 24px; 
                 background: #4f46e5; 
@@ -85,8 +79,8 @@ def send_verification_email(
                 text-decoration: none; 
                 border-radius: 5px; 
                 margin: 20px 0;
-            }}
-            .footer {{ padding: 20px; text-align: center; color: #666; font-size: 12px; }}
+            }
+            .footer { padding: 20px; text-align: center; color: #666; font-size: 12px; }
         </style>
     </head>
     <body>
@@ -95,15 +89,15 @@ def send_verification_email(
                 <h1>Gmail Automation Dashboard</h1>
             </div>
             <div class="content">
-                <h2>Welcome, {username}!</h2>
+                <h2>Welcome, $username!</h2>
                 <p>Thank you for registering with Gmail Automation Dashboard. To complete your registration and access your account, please verify your email address.</p>
                 
                 <p style="text-align: center;">
-                    <a href="{verification_link}" class="button">Verify Your Email</a>
+                    <a href="$link" class="button">Verify Your Email</a>
                 </p>
                 
                 <p>If the button doesn't work, you can copy and paste this link into your browser:</p>
-                <p style="word-break: break-all; color: #4f46e5;">{verification_link}</p>
+                <p style="word-break: break-all; color: #4f46e5;">$link</p>
                 
                 <p><strong>Important:</strong> This verification link will expire in 24 hours.</p>
                 
@@ -117,14 +111,16 @@ def send_verification_email(
     </body>
     </html>
     """
+)
 
-    text_content = f"""
+VERIFICATION_TEXT = Template(
+    """
     Welcome to Gmail Automation Dashboard!
     
-    Thank you for registering, {username}!
+    Thank you for registering, $username!
     
     Please verify your email address by clicking the following link:
-    {verification_link}
+    $link
     
     This verification link will expire in 24 hours.
     
@@ -132,25 +128,22 @@ def send_verification_email(
     
     Gmail Automation Dashboard
     """
+)
 
-    return send_email(to_email, subject, html_content, text_content)
-
+PASSWORD_RESET_SUBJECT = "Password Reset - Gmail Automation Dashboard"
 
-def send_password_reset_email(to_email: str, username: str, reset_link: str) -> bool:
-    """Send password reset email"""
-    subject = "Password Reset - Gmail Automation Dashboard"
-
-    html_content = f"""
+PASSWORD_RESET_HTML = Template(
+    """
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="utf-8">
         <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: #1a1a1a; color: white; padding: 20px; text-align: center; }}
-            .content {{ padding: 20px; background: #f9f9f9; }}
-            .button {{ 
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+            .header { background: #1a1a1a; color: white; padding: 20px; text-align: center; }
+            .content { padding: 20px; background: #f9f9f9; }
+            .button { 
                 display: inline-block; 
                 padding: 12px 24px; 
                 background: #ef4444; 
@@ -158,8 +151,8 @@ def send_password_reset_email(to_email: str, username: str, reset_link: str) ->
                 text-decoration: none; 
                 border-radius: 5px; 
                 margin: 20px 0;
-            }}
-            .footer {{ padding: 20px; text-align: center; color: #666; font-size: 12px; }}
+            }
+            .footer { padding: 20px; text-align: center; color: #666; font-size: 12px; }
         </style>
     </head>
     <body>
@@ -169,15 +162,15 @@ def send_password_reset_email(to_email: str, username: str, reset_link: str) ->
             </div>
             <div class="content">
                 <h2>Password Reset Request</h2>
-                <p>Hello {username},</p>
+                <p>Hello $username,</p>
                 <p>We received a request to reset your password for your Gmail Automation Dashboard account.</p>
                 
                 <p style="text-align: center;">
-                    <a href="{reset_link}" class="button">Reset Your Password</a>
+                    <a href="$link" class="button">Reset Your Password</a>
                 </p>
                 
                 <p>If the button doesn't work, you can copy and paste this link into your browser:</p>
-                <p style="word-break: break-all; color: #ef4444;">{reset_link}</p>
+                <p style="word-break: break-all; color: #ef4444;">$link</p>
                 
                 <p><strong>Important:</strong> This password reset link will expire in 1 hour.</p>
                 
@@ -191,16 +184,18 @@ def send_password_reset_email(to_email: str, username: str, reset_link: str) ->
     </body>
     </html>
     """
+)
 
-    text_content = f"""
+PASSWORD_RESET_TEXT = Template(
+    """
     Password Reset Request - Gmail Automation Dashboard
     
-    Hello {username},
+    Hello $username,
     
     We received a request to reset your password for your Gmail Automation Dashboard account.
     
     Please reset your password by clicking the following link:
-    {reset_link}
+    $link
     
     This password reset link will expire in 1 hour.
     
@@ -208,8 +203,32 @@ def send_password_reset_email(to_email: str, username: str, reset_link: str) ->
     
     Gmail Automation Dashboard
     """
+)
+
+
+def _render(html_template: Template, text_template: Template, **values: str):
+    html_content = html_template.substitute(
+        {key: escape(value) for key, value in values.items()}
+    )
+    return html_content, text_template.substitute(values)
+
 
-    return send_email(to_email, subject, html_content, text_content)
+def send_verification_email(
+    to_email: str, username: str, verification_link: str
+) -> bool:
+    """Send email verification email"""
+    html_content, text_content = _render(
+        VERIFICATION_HTML, VERIFICATION_TEXT, username=username, link=verification_link
+    )
+    return send_email(to_email, VERIFICATION_SUBJECT, html_content, text_content)
+
+
+def send_password_reset_email(to_email: str, username: str, reset_link: str) -> bool:
+    """Send password reset email"""
+    html_content, text_content = _render(
+        PASSWORD_RESET_HTML, PASSWORD_RESET_TEXT, username=username, link=reset_link
+    )
+    return send_email(to_email, PASSWORD_RESET_SUBJECT, html_content, text_content)
 
 
 def get_token_expiry(hours: int = 24) -> datetime:
@@ -0,0 +1,381 @@
+"""
+Queued email delivery over pooled SMTP connections.
+
+``send_email`` puts a built message on a bounded in-process queue and
+returns immediately. SMTP_POOL_SIZE delivery threads take messages off the
+queue and send them over connections kept open between messages, so a
+burst of verification or reset emails pays for the TCP, STARTTLS and AUTH
+handshake once per connection instead of once per message.
+
+Connections are reused most-recently-used first, checked with NOOP when
+they have been idle for SMTP_IDLE_CHECK_SECONDS, and replaced after
+SMTP_MAX_MESSAGES_PER_CONNECTION messages (providers cap messages per
+session). Transient failures (4xx replies, dropped connections, network
+errors) are retried with exponential backoff up to EMAIL_MAX_ATTEMPTS;
+permanent 5xx failures are dropped and counted.
+
+Messages still queued when the process dies are lost, like the emails a
+crashed BackgroundTasks run would have lost.
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmailQueueFull(Exception):
+    """Raised when the delivery queue cannot take another message"""
+
+
+class PooledConnection:
+    """An open SMTP session and how much it has been used"""
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Authenticated SMTP sessions kept open for reuse"""
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        use_tls: bool = True,
+        user: str = "",
+        password: str = "",
+        size: int = 2,
+        timeout: float = 30,
+        max_messages_per_connection: int = 100,
+        idle_check_seconds: float = 60,
+    ):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.user = user
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_check_seconds = idle_check_seconds
+
+        self._idle: List[PooledConnection] = []
+        self._lock = threading.Lock()
+        self._counters = {"opened": 0, "reused": 0, "closed": 0}
+
+    def _connect(self) -> PooledConnection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.user and self.password:
+                smtp.login(self.user, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        with self._lock:
+            self._counters["opened"] += 1
+        return PooledConnection(smtp)
+
+    def _close(self, connection: PooledConnection) -> None:
+        try:
+            connection.smtp.quit()
+        except Exception:
+            connection.smtp.close()
+        with self._lock:
+            self._counters["closed"] += 1
+
+    def acquire(self) -> PooledConnection:
+        """A live session: an idle one if it still answers, else a new one"""
+        while True:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                return self._connect()
+
+            idle_for = time.monotonic() - connection.last_used
+            if idle_for >= self.idle_check_seconds:
+                try:
+                    code, _ = connection.smtp.noop()
+                except Exception:
+                    code = None
+                if code != 250:
+                    self._close(connection)
+                    continue
+
+            with self._lock:
+                self._counters["reused"] += 1
+            return connection
+
+    def release(self, connection: PooledConnection, *, broken: bool = False) -> None:
+        """Return a session after use; broken or worn-out sessions are closed"""
+        connection.last_used = time.monotonic()
+        if broken or connection.messages_sent >= self.max_messages_per_connection:
+            self._close(connection)
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(connection)
+                return
+        self._close(connection)
+
+    def close(self) -> None:
+        """Close every idle session"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._close(connection)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), **self._counters}
+
+
+class OutgoingEmail:
+    """A queued message and its delivery attempts so far"""
+
+    def __init__(self, message: EmailMessage):
+        self.message = message
+        self.attempts = 0
+        self.queued_at = time.monotonic()
+
+
+def is_transient(error: Exception) -> bool:
+    """True for failures worth retrying: 4xx replies and connection errors"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    # Socket errors: refused connections, resets, timeouts
+    return isinstance(error, OSError)
+
+
+# Failures after which the session itself is still usable
+_SESSION_INTACT_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+
+class EmailDeliveryQueue:
+    """Bounded queue of outgoing messages and the threads that send them"""
+
+    def __init__(
+        self,
+        pool: SMTPConnectionPool,
+        *,
+        max_size: int = 5000,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 2.0,
+    ):
+        self.pool = pool
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+        # (ready_at, sequence, email): retries wait in the same heap
+        self._heap: List[Tuple[float, int, OutgoingEmail]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+
+        self._counters = {
+            "accepted": 0,
+            "rejected": 0,
+            "sent": 0,
+            "retried": 0,
+            "failed": 0,
+        }
+        self._send_seconds = 0.0
+        self._last_error: Optional[str] = None
+
+    # ---------------------------------------------------------------- lifecycle
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> None:
+        """Start one delivery thread per pooled connection"""
+        with self._condition:
+            if self.running:
+                return
+            self._stopping = False
+            self._threads = [
+                threading.Thread(
+                    target=self._run, name=f"email-delivery-{i}", daemon=True
+                )
+                for i in range(self.pool.size)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Send what is queued, skipping retry delays, then close the pool"""
+        if not self.running:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+        self.pool.close()
+
+    # --------------------------------------------------------------- producers
+
+    def submit(self, message: EmailMessage) -> None:
+        """
+        Queue a message for delivery
+
+        Raises:
+            EmailQueueFull: The queue is at capacity
+        """
+        with self._condition:
+            if len(self._heap) + self._in_flight >= self.max_size:
+                self._counters["rejected"] += 1
+                raise EmailQueueFull(f"Email queue is full ({self.max_size} messages)")
+            self._push(time.monotonic(), OutgoingEmail(message))
+            self._counters["accepted"] += 1
+
+    def _push(self, ready_at: float, email: OutgoingEmail) -> None:
+        heapq.heappush(self._heap, (ready_at, next(self._sequence), email))
+        self._condition.notify()
+
+    # ----------------------------------------------------------------- senders
+
+    def _next(self) -> Optional[OutgoingEmail]:
+        """Block until a message is due; None once stopping and drained"""
+        with self._condition:
+            while True:
+                if self._heap:
+                    ready_at = self._heap[0][0]
+                    wait = ready_at - time.monotonic()
+                    if wait <= 0 or self._stopping:
+                        _, _, email = heapq.heappop(self._heap)
+                        self._in_flight += 1
+                        return email
+                    self._condition.wait(wait)
+                elif self._stopping:
+                    return None
+                else:
+                    self._condition.wait()
+
+    def _run(self) -> None:
+        while True:
+            email = self._next()
+            if email is None:
+                return
+            try:
+                self._deliver(email)
+            finally:
+                with self._condition:
+                    self._in_flight -= 1
+
+    def _deliver(self, email: OutgoingEmail) -> None:
+        email.attempts += 1
+        started = time.perf_counter()
+        connection = None
+        try:
+            connection = self.pool.acquire()
+            connection.smtp.send_message(email.message)
+            connection.messages_sent += 1
+        except Exception as e:
+            if connection is not None:
+                intact = isinstance(e, _SESSION_INTACT_ERRORS)
+                if intact:
+                    try:
+                        connection.smtp.rset()
+                    except Exception:
+                        intact = False
+                self.pool.release(connection, broken=not intact)
+            self._handle_failure(email, e)
+            return
+
+        self.pool.release(connection)
+        with self._condition:
+            self._counters["sent"] += 1
+            self._send_seconds += time.perf_counter() - started
+
+    def _handle_failure(self, email: OutgoingEmail, error: Exception) -> None:
+        recipient = email.message["To"]
+        with self._condition:
+            self._last_error = f"{recipient}: {error}"
+            if is_transient(error) and email.attempts < self.max_attempts:
+                delay = self.retry_base_seconds * 2 ** (email.attempts - 1)
+                delay *= random.uniform(0.5, 1.5)
+                self._counters["retried"] += 1
+                self._push(time.monotonic() + delay, email)
+                logger.warning(
+                    f"Email to {recipient} failed (attempt {email.attempts}), "
+                    f"retrying in {delay:.1f}s: {error}"
+                )
+                return
+            self._counters["failed"] += 1
+        logger.error(
+            f"Dropped email to {recipient} after {email.attempts} attempts: {error}"
+        )
+
+    # ----------------------------------------------------------------- metrics
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, delivery counters and connection reuse"""
+        with self._condition:
+            now = time.monotonic()
+            sent = self._counters["sent"]
+            return {
+                "running": self.running,
+                "queued": sum(1 for ready_at, _, _ in self._heap if ready_at <= now),
+                "waiting_retry": sum(
+                    1 for ready_at, _, _ in self._heap if ready_at > now
+                ),
+                "in_flight": self._in_flight,
+                "capacity": self.max_size,
+                **self._counters,
+                "avg_send_ms": (
+                    round(self._send_seconds * 1000 / sent, 2) if sent else 0
+                ),
+                "connections": self.pool.get_metrics(),
+                "last_error": self._last_error,
+            }
+
+
+email_queue = EmailDeliveryQueue(
+    SMTPConnectionPool(
+        host=settings.SMTP_HOST,
+        port=settings.SMTP_PORT,
+        use_tls=settings.SMTP_TLS,
+        user=settings.SMTP_USER,
+        password=settings.SMTP_PASSWORD,
+        size=settings.SMTP_POOL_SIZE,
+        timeout=settings.SMTP_TIMEOUT_SECONDS,
+        max_messages_per_connection=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+        idle_check_seconds=settings.SMTP_IDLE_CHECK_SECONDS,
+    ),
+    max_size=settings.EMAIL_QUEUE_MAX_SIZE,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    retry_base_seconds=settings.EMAIL_RETRY_BASE_SECONDS,
+)
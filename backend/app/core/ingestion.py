@@ -0,0 +1,342 @@
+"""
+Write-behind ingestion for agent telemetry.
+
+When INGESTION_WRITE_BEHIND is enabled, the telemetry POST endpoints validate
+the record, put it on a bounded in-process queue and answer 202 Accepted. A
+background flusher drains the queue every INGESTION_FLUSH_INTERVAL_MS or
+INGESTION_BATCH_SIZE records, whichever comes first, and writes each kind of
+record with one bulk insert and one commit. A full queue is reported to the
+caller (503) instead of blocking the request.
+
+A batch failing with a transient database error (lost connection, lock
+timeout) is retried with exponential backoff up to INGESTION_MAX_ATTEMPTS,
+so a short outage only delays writes while the queue fills and pushes back.
+Records that still cannot be written are dropped and their idempotency keys
+forgotten, so the agent's retry with the same key is accepted again.
+
+Records still queued when the process dies are lost, so this mode trades
+durability of the last few hundred milliseconds for throughput.
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from app.core.config import settings
+from app.core.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+# Record kinds accepted by the queue
+EMAIL_PROCESSING = "email_processing_data"
+SPAM_HANDLER = "spam_handler_data"
+PROXY_ERROR = "proxy_error"
+LOGGED_OUT_PROFILE = "logged_out_profile"
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the write-behind queue cannot take another record"""
+
+
+def _bulk_writers() -> Dict[str, Callable]:
+    # Imported lazily: the CRUD modules import app.core.database as well
+    from app.crud.crud_email_processing_data import email_processing_data
+    from app.crud.crud_spam_handler_data import spam_handler_data
+    from app.crud.crud_proxy_error import proxy_error
+    from app.crud.crud_logged_out_profile import logged_out_profile
+
+    return {
+        EMAIL_PROCESSING: email_processing_data.bulk_create,
+        SPAM_HANDLER: spam_handler_data.bulk_create,
+        PROXY_ERROR: proxy_error.bulk_create,
+        LOGGED_OUT_PROFILE: logged_out_profile.bulk_create,
+    }
+
+
+def is_transient(error: Exception) -> bool:
+    """True for database failures worth retrying: lost connections, timeouts"""
+    if isinstance(error, (OperationalError, InterfaceError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class IngestionQueue:
+    """Bounded queue of validated records plus the thread that flushes it"""
+
+    def __init__(
+        self,
+        *,
+        max_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval_ms: int = 200,
+        idempotency_ttl_seconds: int = 600,
+        max_attempts: int = 6,
+        retry_base_seconds: float = 0.5,
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.idempotency_ttl = idempotency_ttl_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+        # (kind, record, idempotency key)
+        self._queue: "queue.Queue[Tuple[str, Any, str]]" = queue.Queue(
+            maxsize=max_size
+        )
+        self._seen_keys: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._writers: Optional[Dict[str, Callable]] = None
+
+        self._counters = {
+            "accepted": 0,
+            "duplicates": 0,
+            "rejected": 0,
+            "written": 0,
+            "failed": 0,
+            "retries": 0,
+            "batches": 0,
+        }
+        self._max_depth = 0
+        self._last_flush_at: Optional[datetime] = None
+        self._last_flush_seconds: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    # ---------------------------------------------------------------- lifecycle
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the flusher thread (no-op when already running)"""
+        if self.running:
+            return
+        self._writers = _bulk_writers()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="telemetry-ingestion", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flusher after writing everything still queued"""
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Ingestion flusher still writing after {timeout}s")
+            return
+        self._thread = None
+
+    # --------------------------------------------------------------- producers
+
+    def submit(
+        self, kind: str, obj_in: Any, idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a validated record for writing
+
+        Args:
+            kind: One of the record kind constants
+            obj_in: The validated create schema
+            idempotency_key: Client-supplied key; repeats within the TTL are
+                acknowledged without being queued again
+
+        Returns:
+            dict: Receipt with status ("accepted" or "duplicate") and the key
+
+        Raises:
+            IngestionQueueFull: The queue is at capacity
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        now = time.monotonic()
+
+        # Stamp the record now so queueing delay does not shift its timestamp
+        if getattr(obj_in, "timestamp", False) is None:
+            obj_in.timestamp = datetime.utcnow()
+
+        with self._lock:
+            self._expire_keys(now)
+            if (kind, key) in self._seen_keys:
+                self._counters["duplicates"] += 1
+                return {"status": "duplicate", "idempotency_key": key}
+
+            try:
+                self._queue.put_nowait((kind, obj_in, key))
+            except queue.Full:
+                self._counters["rejected"] += 1
+                raise IngestionQueueFull(
+                    f"Ingestion queue is full ({self.max_size} records)"
+                )
+
+            self._seen_keys[(kind, key)] = now
+            self._counters["accepted"] += 1
+            self._max_depth = max(self._max_depth, self._queue.qsize())
+
+        return {"status": "accepted", "idempotency_key": key}
+
+    def _expire_keys(self, now: float) -> None:
+        cutoff = now - self.idempotency_ttl
+        while self._seen_keys:
+            _, seen_at = next(iter(self._seen_keys.items()))
+            if seen_at >= cutoff:
+                break
+            self._seen_keys.popitem(last=False)
+
+    def _forget_key(self, kind: str, key: str) -> None:
+        """Let a client retry a record that could not be written"""
+        with self._lock:
+            self._seen_keys.pop((kind, key), None)
+
+    # ----------------------------------------------------------------- flusher
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._flush(batch)
+
+        # Drain what is left before exiting
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _collect_batch(self) -> List[Tuple[str, Any, str]]:
+        """Wait up to one flush interval, returning early once a batch is full"""
+        deadline = time.monotonic() + self.flush_interval
+        batch: List[Tuple[str, Any, str]] = []
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            batch.extend(self._drain(self.batch_size - len(batch)))
+        return batch
+
+    def _drain(self, limit: int) -> List[Tuple[str, Any, str]]:
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _flush(self, batch: List[Tuple[str, Any, str]]) -> None:
+        started = time.perf_counter()
+        by_kind: Dict[str, List[Tuple[Any, str]]] = {}
+        for kind, obj_in, key in batch:
+            by_kind.setdefault(kind, []).append((obj_in, key))
+
+        for kind, records in by_kind.items():
+            self._write(kind, records)
+
+        with self._lock:
+            self._counters["batches"] += 1
+            self._last_flush_at = datetime.utcnow()
+            self._last_flush_seconds = time.perf_counter() - started
+
+    def _write(self, kind: str, records: List[Tuple[Any, str]]) -> None:
+        writer = self._writers[kind]
+        objs_in = [obj_in for obj_in, _ in records]
+        attempts = 0
+        while True:
+            attempts += 1
+            # A fresh session per attempt, so a dropped connection is replaced
+            db = db_manager.SessionLocal()
+            try:
+                writer(db, objs_in=objs_in, return_rows=False)
+                with self._lock:
+                    self._counters["written"] += len(objs_in)
+                return
+            except Exception as e:
+                db.rollback()
+                error = e
+            finally:
+                db.close()
+            if not is_transient(error) or attempts >= self.max_attempts:
+                break
+            delay = self.retry_base_seconds * 2 ** (attempts - 1)
+            logger.warning(
+                f"Bulk write of {len(objs_in)} {kind} records failed "
+                f"(attempt {attempts}), retrying in {delay:.1f}s: {error}"
+            )
+            with self._lock:
+                self._counters["retries"] += 1
+            time.sleep(delay)
+
+        logger.warning(f"Bulk write of {len(objs_in)} {kind} records failed: {error}")
+        # Retry one by one so a single bad record does not drop the batch
+        written = failed = 0
+        db = db_manager.SessionLocal()
+        try:
+            for obj_in, key in records:
+                try:
+                    writer(db, objs_in=[obj_in], return_rows=False)
+                    written += 1
+                except Exception as row_error:
+                    db.rollback()
+                    failed += 1
+                    self._forget_key(kind, key)
+                    with self._lock:
+                        self._last_error = f"{kind}: {row_error}"
+                    logger.error(f"Dropped {kind} record: {row_error}")
+        finally:
+            db.close()
+
+        with self._lock:
+            self._counters["written"] += written
+            self._counters["failed"] += failed
+
+    # ----------------------------------------------------------------- metrics
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, throughput counters and flusher status"""
+        with self._lock:
+            return {
+                "enabled": settings.INGESTION_WRITE_BEHIND,
+                "running": self.running,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self.max_size,
+                "max_queue_depth": self._max_depth,
+                "batch_size": self.batch_size,
+                "flush_interval_ms": int(self.flush_interval * 1000),
+                "max_attempts": self.max_attempts,
+                **self._counters,
+                "last_flush_at": (
+                    self._last_flush_at.isoformat() if self._last_flush_at else None
+                ),
+                "last_flush_seconds": self._last_flush_seconds,
+                "last_error": self._last_error,
+            }
+
+
+ingestion_queue = IngestionQueue(
+    max_size=settings.INGESTION_QUEUE_MAX_SIZE,
+    batch_size=settings.INGESTION_BATCH_SIZE,
+    flush_interval_ms=settings.INGESTION_FLUSH_INTERVAL_MS,
+    idempotency_ttl_seconds=settings.INGESTION_IDEMPOTENCY_TTL_SECONDS,
+    max_attempts=settings.INGESTION_MAX_ATTEMPTS,
+    retry_base_seconds=settings.INGESTION_RETRY_BASE_SECONDS,
+)
+
+
+def write_behind_enabled() -> bool:
+    """True when telemetry POSTs should be queued instead of written inline"""
+    return settings.INGESTION_WRITE_BEHIND
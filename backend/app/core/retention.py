@@ -0,0 +1,545 @@
+"""
+Background retention for the telemetry tables and their derived tables.
+
+Each table has a policy: raw telemetry is kept RETENTION_RAW_DAYS, hourly
+rollups, sketches and error counts RETENTION_ROLLUP_DAYS, and
+RETENTION_TABLE_DAYS overrides either per table (0 keeps a table forever).
+A worker thread applies the policies every RETENTION_INTERVAL_SECONDS when
+RETENTION_ENABLED is set, and runs on-demand cleanups whenever they are
+requested. Every pass, enabled or not, also adds upcoming MySQL partitions.
+
+A run deletes in primary-key order, RETENTION_CHUNK_SIZE rows per transaction,
+sleeping RETENTION_CHUNK_PAUSE_MS between chunks so no lock is held for long
+and ingestion keeps up. On partitioned MySQL tables whole partitions are
+dropped first. The run's cutoff and the last id deleted are committed together
+with each chunk in ``retention_progress``, so an interrupted run resumes where
+it stopped. The row doubles as a lease: a worker refreshes its heartbeat with
+every chunk and other workers leave the table alone until the heartbeat is
+older than RETENTION_LEASE_SECONDS.
+
+Raw deletes do not retract the rollups; long-range analytics outlive the raw
+rows by design.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import db_manager
+from app.core.window_cache import email_processing_window, spam_handler_window
+from app.db.partitioning import (
+    PARTITIONED_TABLES,
+    drop_partitions_before,
+    extend_partitions,
+)
+from app.models import (
+    EmailProcessingData,
+    EmailProcessingHourlyRollup,
+    ErrorFingerprint,
+    ErrorFingerprintHourlyCount,
+    LoggedOutProfile,
+    ProxyError,
+    RetentionProgress,
+    SpamHandlerData,
+    SpamHandlerHourlyRollup,
+    TelemetryDistinctSketch,
+    TelemetryTopKSketch,
+)
+
+logger = logging.getLogger(__name__)
+
+# Table -> (model, time column) for raw telemetry
+RAW_TABLES: Dict[str, Any] = {
+    "email_processing_data": (EmailProcessingData, EmailProcessingData.timestamp),
+    "spam_handler_data": (SpamHandlerData, SpamHandlerData.timestamp),
+    "proxy_errors": (ProxyError, ProxyError.created_at),
+    "logged_out_profiles": (LoggedOutProfile, LoggedOutProfile.timestamp),
+}
+
+# Table -> (model, time column) for tables derived from the raw telemetry
+ROLLUP_TABLES: Dict[str, Any] = {
+    "email_processing_hourly_rollups": (
+        EmailProcessingHourlyRollup,
+        EmailProcessingHourlyRollup.bucket_start,
+    ),
+    "spam_handler_hourly_rollups": (
+        SpamHandlerHourlyRollup,
+        SpamHandlerHourlyRollup.bucket_start,
+    ),
+    "telemetry_topk_sketches": (TelemetryTopKSketch, TelemetryTopKSketch.bucket_start),
+    "telemetry_distinct_sketches": (
+        TelemetryDistinctSketch,
+        TelemetryDistinctSketch.bucket_start,
+    ),
+    "error_fingerprint_hourly_counts": (
+        ErrorFingerprintHourlyCount,
+        ErrorFingerprintHourlyCount.bucket_start,
+    ),
+    "error_fingerprints": (ErrorFingerprint, ErrorFingerprint.last_seen),
+}
+
+RETENTION_TABLES: Dict[str, Any] = {**RAW_TABLES, **ROLLUP_TABLES}
+
+# Real-time windows rebuilt after their table loses rows
+_WINDOWS = {
+    "email_processing_data": email_processing_window,
+    "spam_handler_data": spam_handler_window,
+}
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def retention_days(table_name: str) -> Optional[int]:
+    """Days of data a table keeps under its policy, None to keep everything"""
+    if table_name in settings.RETENTION_TABLE_DAYS:
+        days = settings.RETENTION_TABLE_DAYS[table_name]
+    elif table_name in RAW_TABLES:
+        days = settings.RETENTION_RAW_DAYS
+    else:
+        days = settings.RETENTION_ROLLUP_DAYS
+    return days if days and days > 0 else None
+
+
+def get_policies() -> Dict[str, Optional[int]]:
+    """Retention days of every table, None where it is kept forever"""
+    return {table_name: retention_days(table_name) for table_name in RETENTION_TABLES}
+
+
+class RetentionWorker:
+    """Thread applying the retention policies one chunk at a time"""
+
+    def __init__(
+        self,
+        *,
+        chunk_size: int = 1000,
+        chunk_pause_ms: int = 200,
+        interval_seconds: int = 3600,
+        lease_seconds: int = 120,
+    ):
+        self.chunk_size = chunk_size
+        self.chunk_pause = chunk_pause_ms / 1000.0
+        self.interval = interval_seconds
+        self.lease = timedelta(seconds=lease_seconds)
+        # Distinguishes the processes of one deployment in the lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        # Table -> days of an on-demand run, None for the table's policy
+        self._requests: Dict[str, Optional[int]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_pass: Optional[float] = None
+
+        self._counters = {
+            "runs": 0,
+            "resumed": 0,
+            "skipped": 0,
+            "failed": 0,
+            "chunks": 0,
+            "deleted": 0,
+            "partition_deleted": 0,
+            "partitions_added": 0,
+        }
+        self._current_table: Optional[str] = None
+        self._last_pass_at: Optional[datetime] = None
+        self._last_error: Optional[str] = None
+
+    # ---------------------------------------------------------------- lifecycle
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the worker thread (no-op when already running)"""
+        if self.running:
+            return
+        self._stop.clear()
+        # The first scheduled pass runs right away and picks up interrupted runs
+        self._next_pass = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="telemetry-retention", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop after the current chunk; the run resumes on the next start"""
+        if not self.running:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Retention worker still deleting after {timeout}s")
+            return
+        self._thread = None
+
+    # ---------------------------------------------------------------- requests
+
+    def request_run(
+        self, table_name: Optional[str] = None, days: Optional[int] = None
+    ) -> List[str]:
+        """
+        Queue an on-demand run and wake the worker
+
+        Args:
+            table_name: Table to clean up; None for every table with a policy
+            days: Delete rows older than this many days instead of the policy
+
+        Returns:
+            list: The tables queued
+
+        Raises:
+            ValueError: The table has no retention policy
+        """
+        if table_name is not None and table_name not in RETENTION_TABLES:
+            raise ValueError(f"No retention policy for table {table_name}")
+        tables = [table_name] if table_name else list(RETENTION_TABLES)
+        with self._lock:
+            for name in tables:
+                self._requests[name] = days
+        self.start()
+        self._wake.set()
+        return tables
+
+    def _take_requests(self) -> Dict[str, Optional[int]]:
+        with self._lock:
+            requests, self._requests = self._requests, {}
+        return requests
+
+    # ------------------------------------------------------------------ worker
+
+    def _run(self) -> None:
+        self._queue_interrupted()
+        while not self._stop.is_set():
+            requests = self._take_requests()
+            if requests:
+                for table_name, days in requests.items():
+                    if self._stop.is_set():
+                        break
+                    self._run_table(table_name, days)
+                continue
+
+            if time.monotonic() >= self._next_pass:
+                self._extend_partitions()
+                if settings.RETENTION_ENABLED:
+                    for table_name in RETENTION_TABLES:
+                        if self._stop.is_set():
+                            break
+                        self._run_table(table_name, None)
+                    with self._lock:
+                        self._last_pass_at = datetime.utcnow()
+                self._next_pass = time.monotonic() + self.interval
+                continue
+
+            self._wake.wait(max(self._next_pass - time.monotonic(), 0))
+            self._wake.clear()
+
+    def _extend_partitions(self) -> None:
+        try:
+            added = extend_partitions(db_manager.engine)
+        except Exception as e:
+            logger.error(f"Adding upcoming partitions failed: {e}")
+            with self._lock:
+                self._last_error = f"partitions: {e}"
+            return
+        for change in added:
+            logger.info(f"Retention pass {change}")
+        with self._lock:
+            self._counters["partitions_added"] += len(added)
+
+    def _queue_interrupted(self) -> None:
+        """Queue runs a previous process left unfinished, so they resume"""
+        db = db_manager.SessionLocal()
+        try:
+            rows = (
+                db.query(RetentionProgress.table_name)
+                .filter(RetentionProgress.status == RUNNING)
+                .all()
+            )
+        except Exception as e:
+            logger.warning(f"Could not read retention progress: {e}")
+            return
+        finally:
+            db.close()
+        with self._lock:
+            for (table_name,) in rows:
+                if table_name in RETENTION_TABLES:
+                    self._requests.setdefault(table_name, None)
+
+    def _run_table(self, table_name: str, days: Optional[int]) -> None:
+        """Resume or start one table's run and delete chunks until it is done"""
+        db = db_manager.SessionLocal()
+        progress_id = None
+        try:
+            progress = self._claim(db, table_name, days)
+            if progress is None:
+                return
+            progress_id = progress.id
+            with self._lock:
+                self._current_table = table_name
+            if self._delete_chunks(db, table_name, progress):
+                self._finish(db, progress_id, DONE)
+                window = _WINDOWS.get(table_name)
+                if window is not None and progress.deleted_count:
+                    window.invalidate()
+            else:
+                # Stopped midway: give up the lease so a restart resumes at once
+                self._release(db, progress_id)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Retention of {table_name} failed: {e}")
+            with self._lock:
+                self._counters["failed"] += 1
+                self._last_error = f"{table_name}: {e}"
+            if progress_id is not None:
+                try:
+                    self._finish(db, progress_id, FAILED, error=str(e))
+                except Exception:
+                    db.rollback()
+        finally:
+            with self._lock:
+                self._current_table = None
+            db.close()
+
+    def _claim(
+        self, db: Session, table_name: str, days: Optional[int]
+    ) -> Optional[RetentionProgress]:
+        """
+        Take the table's lease and return its progress row, set up for a new
+        run unless an interrupted one is resumed. Without ``days`` the table's
+        policy applies. None when the table is kept forever or another worker
+        holds a live lease.
+        """
+        progress = self._get_progress(db, table_name)
+        now = datetime.utcnow()
+        claimed = db.execute(
+            update(RetentionProgress)
+            .where(
+                RetentionProgress.id == progress.id,
+                or_(
+                    RetentionProgress.status != RUNNING,
+                    RetentionProgress.owner.is_(None),
+                    RetentionProgress.owner == self.owner,
+                    RetentionProgress.heartbeat_at < now - self.lease,
+                ),
+            )
+            .values(owner=self.owner, heartbeat_at=now)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            with self._lock:
+                self._counters["skipped"] += 1
+            return None
+        db.refresh(progress)
+
+        # An interrupted run is resumed unless a cleanup asked for other days
+        if progress.status == RUNNING and days is None:
+            with self._lock:
+                self._counters["resumed"] += 1
+            return progress
+        if days is None:
+            days = retention_days(table_name)
+        if days is None:
+            self._release(db, progress.id)
+            return None
+
+        model, column = RETENTION_TABLES[table_name]
+        progress.cutoff = _cutoff(days, now)
+        progress.max_id = db.execute(
+            select(func.max(model.id)).where(column < progress.cutoff)
+        ).scalar()
+        progress.last_id = 0
+        progress.deleted_count = 0
+        progress.status = RUNNING
+        progress.started_at = now
+        progress.finished_at = None
+        progress.last_error = None
+        db.commit()
+        with self._lock:
+            self._counters["runs"] += 1
+
+        if table_name in PARTITIONED_TABLES:
+            dropped = drop_partitions_before(db, table_name, progress.cutoff)
+            if dropped:
+                progress.deleted_count = dropped
+                db.commit()
+                with self._lock:
+                    self._counters["partition_deleted"] += dropped
+        return progress
+
+    def _get_progress(self, db: Session, table_name: str) -> RetentionProgress:
+        progress = (
+            db.query(RetentionProgress)
+            .filter(RetentionProgress.table_name == table_name)
+            .first()
+        )
+        if progress is not None:
+            return progress
+        try:
+            progress = RetentionProgress(table_name=table_name, status=DONE)
+            db.add(progress)
+            db.commit()
+        except IntegrityError:
+            # Another worker created it first
+            db.rollback()
+            progress = (
+                db.query(RetentionProgress)
+                .filter(RetentionProgress.table_name == table_name)
+                .one()
+            )
+        return progress
+
+    def _delete_chunks(
+        self, db: Session, table_name: str, progress: RetentionProgress
+    ) -> bool:
+        """Delete the run's remaining rows; False when stopped or lease lost"""
+        model, column = RETENTION_TABLES[table_name]
+        if progress.max_id is None:
+            return True
+        while not self._stop.is_set():
+            ids = (
+                db.execute(
+                    select(model.id)
+                    .where(
+                        model.id > progress.last_id,
+                        model.id <= progress.max_id,
+                        column < progress.cutoff,
+                    )
+                    .order_by(model.id)
+                    .limit(self.chunk_size)
+                )
+                .scalars()
+                .all()
+            )
+            if not ids:
+                return True
+
+            deleted = db.execute(
+                delete(model)
+                .where(model.id.in_(ids))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            # Progress is committed with the chunk, so a resume never skips rows
+            kept = db.execute(
+                update(RetentionProgress)
+                .where(
+                    RetentionProgress.id == progress.id,
+                    RetentionProgress.owner == self.owner,
+                )
+                .values(
+                    last_id=ids[-1],
+                    deleted_count=RetentionProgress.deleted_count + deleted,
+                    heartbeat_at=datetime.utcnow(),
+                )
+            ).rowcount
+            if not kept:
+                db.rollback()
+                logger.warning(f"Retention of {table_name} lost its lease")
+                return False
+            db.commit()
+            db.refresh(progress)
+            with self._lock:
+                self._counters["chunks"] += 1
+                self._counters["deleted"] += deleted
+
+            self._stop.wait(self.chunk_pause)
+        return False
+
+    def _finish(
+        self, db: Session, progress_id: int, status: str, error: Optional[str] = None
+    ) -> None:
+        db.execute(
+            update(RetentionProgress)
+            .where(RetentionProgress.id == progress_id)
+            .values(
+                status=status,
+                owner=None,
+                finished_at=datetime.utcnow(),
+                last_error=error,
+            )
+        )
+        db.commit()
+
+    def _release(self, db: Session, progress_id: int) -> None:
+        db.execute(
+            update(RetentionProgress)
+            .where(
+                RetentionProgress.id == progress_id,
+                RetentionProgress.owner == self.owner,
+            )
+            .values(owner=None)
+        )
+        db.commit()
+
+    # ----------------------------------------------------------------- metrics
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Worker status, counters and the policies in force"""
+        with self._lock:
+            return {
+                "enabled": settings.RETENTION_ENABLED,
+                "running": self.running,
+                "current_table": self._current_table,
+                "pending": sorted(self._requests),
+                "chunk_size": self.chunk_size,
+                "chunk_pause_ms": int(self.chunk_pause * 1000),
+                "interval_seconds": self.interval,
+                "policies": get_policies(),
+                **self._counters,
+                "last_pass_at": (
+                    self._last_pass_at.isoformat() if self._last_pass_at else None
+                ),
+                "last_error": self._last_error,
+            }
+
+
+def _cutoff(days: int, now: datetime) -> datetime:
+    # Whole seconds, so the cutoff compares equal once stored
+    return (now - timedelta(days=days)).replace(microsecond=0)
+
+
+def get_progress(db: Session) -> List[Dict[str, Any]]:
+    """Stored progress of every table's latest run, for the health endpoints"""
+    rows = db.query(RetentionProgress).order_by(RetentionProgress.table_name).all()
+
+    def iso(value: Optional[datetime]) -> Optional[str]:
+        return value.isoformat() if value else None
+
+    return [
+        {
+            "table_name": row.table_name,
+            "status": row.status,
+            "cutoff": iso(row.cutoff),
+            "last_id": row.last_id,
+            "max_id": row.max_id,
+            "deleted_count": row.deleted_count,
+            "owner": row.owner,
+            "heartbeat_at": iso(row.heartbeat_at),
+            "started_at": iso(row.started_at),
+            "finished_at": iso(row.finished_at),
+            "last_error": row.last_error,
+        }
+        for row in rows
+    ]
+
+
+retention_worker = RetentionWorker(
+    chunk_size=settings.RETENTION_CHUNK_SIZE,
+    chunk_pause_ms=settings.RETENTION_CHUNK_PAUSE_MS,
+    interval_seconds=settings.RETENTION_INTERVAL_SECONDS,
+    lease_seconds=settings.RETENTION_LEASE_SECONDS,
+)
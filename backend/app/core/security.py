@@ -1,10 +1,16 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, Dict, Union, Optional
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 
 def create_access_token(
@@ -31,11 +37,133 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def verify_token(token: str) -> Optional[str]:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+class PasswordHasherBusy(Exception):
+    """Raised when too many password hashes are already queued"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool.
+
+    bcrypt releases the GIL while hashing, so PASSWORD_HASH_WORKERS threads
+    use that many cores without holding the event loop or the threadpool
+    that sync endpoints share. At most PASSWORD_HASH_MAX_PENDING operations
+    may be queued or running; beyond that callers get PasswordHasherBusy
+    instead of an ever-growing queue.
+    """
+
+    def __init__(
+        self, workers: Optional[int] = None, max_pending: Optional[int] = None
+    ):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_pending = max_pending or settings.PASSWORD_HASH_MAX_PENDING
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._counters = {"completed": 0, "rejected": 0, "cancelled": 0}
+        self._wait_seconds = 0.0
+        self._work_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hasher"
+                )
+            return self._executor
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counters["rejected"] += 1
+                raise PasswordHasherBusy(
+                    f"Password hashing queue is full ({self.max_pending} pending)"
+                )
+            self._pending += 1
+        queued_at = time.monotonic()
+
+        def task():
+            started_at = time.monotonic()
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                finished_at = time.monotonic()
+                with self._lock:
+                    self._running -= 1
+                    self._counters["completed"] += 1
+                    self._wait_seconds += started_at - queued_at
+                    self._work_seconds += finished_at - started_at
+
+        def release(future: Future) -> None:
+            # Also runs for hashes cancelled while queued, which never start
+            with self._lock:
+                self._pending -= 1
+                if future.cancelled():
+                    self._counters["cancelled"] += 1
+
+        try:
+            future = executor.submit(task)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(release)
+        return future
+
+    async def hash(self, password: str) -> str:
+        """bcrypt hash of password, computed on the hashing pool"""
+        return await asyncio.wrap_future(self._submit(get_password_hash, password))
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Check a password against its hash on the hashing pool"""
+        return await asyncio.wrap_future(
+            self._submit(verify_password, plain_password, hashed_password)
         )
-        return payload.get("sub")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, throughput and average wait / hash time"""
+        with self._lock:
+            completed = self._counters["completed"]
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                **self._counters,
+                "avg_wait_ms": (
+                    round(self._wait_seconds * 1000 / completed, 2) if completed else 0
+                ),
+                "avg_hash_ms": (
+                    round(self._work_seconds * 1000 / completed, 2) if completed else 0
+                ),
+            }
+
+    def shutdown(self) -> None:
+        """Finish queued hashes and stop the pool's threads"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher()
+
+
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verified claims of a token, or None if it is invalid or expired"""
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except jwt.JWTError:
         return None
+
+
+def verify_token(token: str) -> Optional[str]:
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return payload.get("sub")
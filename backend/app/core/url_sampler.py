@@ -0,0 +1,159 @@
+"""
+In-memory weighted sampler for random website URLs.
+
+Active rows of ``random_urls`` are loaded once and kept as detached objects,
+with a Vose alias table per category (built on first use) so each draw is
+O(1). Sampling k URLs without replacement draws from the alias table and
+rejects repeats, which is O(k) while k is small next to the pool; larger
+requests fall back to one weighted-key pass (Efraimidis-Spirakis).
+
+The pool is reloaded when the automation config version moves (every
+random URL write bumps it) or after AUTOMATION_CONFIG_CACHE_TTL_SECONDS,
+so writes handled by other worker processes are picked up as well.
+"""
+
+import heapq
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.config_cache import automation_config_cache
+from app.models.random_url import RandomUrl
+
+ALL_CATEGORIES = None
+
+
+class AliasTable:
+    """Vose alias table: O(n) to build, O(1) per weighted draw"""
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        scaled = [weight * n / total for weight in weights]
+        self.probability = [0.0] * n
+        self.alias = [0] * n
+
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Leftovers are 1.0 up to rounding error
+        for i in small + large:
+            self.probability[i] = 1.0
+
+    def draw(self, rng: random.Random) -> int:
+        i = rng.randrange(len(self.probability))
+        return i if rng.random() < self.probability[i] else self.alias[i]
+
+
+class UrlPool:
+    """Weighted URLs of one category, sampled without replacement"""
+
+    # Rejection sampling gives up after this many draws per requested URL
+    MAX_DRAWS_PER_ITEM = 4
+
+    def __init__(self, items: List[Any]):
+        self.items = items
+        self.weights = [item.weight for item in items]
+        self.uniform = len(set(self.weights)) <= 1
+        self.table = AliasTable(self.weights) if items and not self.uniform else None
+
+    def sample(self, k: int, rng: random.Random) -> List[Any]:
+        n = len(self.items)
+        k = min(k, n)
+        if k <= 0:
+            return []
+        if self.uniform:
+            return rng.sample(self.items, k)
+
+        if k * 2 <= n:
+            chosen: Dict[int, None] = {}
+            for _ in range(k * self.MAX_DRAWS_PER_ITEM):
+                chosen.setdefault(self.table.draw(rng))
+                if len(chosen) == k:
+                    return [self.items[i] for i in chosen]
+
+        # Large k or heavily skewed weights: key = u ** (1 / w), keep top k
+        keyed = heapq.nlargest(
+            k,
+            range(n),
+            key=lambda i: rng.random() ** (1.0 / self.weights[i]),
+        )
+        return [self.items[i] for i in keyed]
+
+
+class RandomUrlSampler:
+    """Process-wide cache of active URLs with per-category weighted pools"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+        self._urls: Optional[List[RandomUrl]] = None
+        self._pools: Dict[Optional[str], UrlPool] = {}
+        self._version = -1
+        self._loaded_at = float("-inf")
+
+    def invalidate(self) -> None:
+        """Force a reload on the next sample"""
+        self._loaded_at = float("-inf")
+
+    def _stale(self) -> bool:
+        ttl = (
+            self.ttl_seconds
+            if self.ttl_seconds is not None
+            else settings.AUTOMATION_CONFIG_CACHE_TTL_SECONDS
+        )
+        return (
+            self._urls is None
+            or self._version != automation_config_cache.version
+            or time.monotonic() - self._loaded_at >= ttl
+        )
+
+    def _load(self, db: Session) -> None:
+        version = automation_config_cache.version
+        urls = (
+            db.query(RandomUrl)
+            .filter(RandomUrl.is_active == True, RandomUrl.weight > 0)
+            .order_by(RandomUrl.id)
+            .all()
+        )
+        for url in urls:
+            db.expunge(url)
+        with self._lock:
+            self._urls = urls
+            self._pools = {}
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+    def _pool(self, category: Optional[str]) -> UrlPool:
+        with self._lock:
+            pool = self._pools.get(category)
+            if pool is None:
+                items = [
+                    url
+                    for url in self._urls
+                    if category is ALL_CATEGORIES or url.category == category
+                ]
+                pool = self._pools[category] = UrlPool(items)
+            return pool
+
+    def sample(
+        self, db: Session, *, limit: int = 10, category: Optional[str] = None
+    ) -> List[RandomUrl]:
+        """Up to limit distinct active URLs, picked in proportion to weight"""
+        if self._stale():
+            self._load(db)
+        pool = self._pool(category.lower() if category else ALL_CATEGORIES)
+        return pool.sample(limit, self._rng)
+
+
+random_url_sampler = RandomUrlSampler()
@@ -0,0 +1,485 @@
+"""
+Rolling in-memory window of recent telemetry for the real-time dashboards.
+
+The quick-action summaries need a handful of fields per row, so the last
+WINDOW_CACHE_DAYS of each telemetry table are held column by column:
+timestamps and hour numbers in typed ``array``s, agents as indexes into a
+name table, each boolean flag as a 0/1 ``bytearray`` and summed metrics as
+float arrays. Columns are kept sorted by timestamp, so a time window is two
+bisections and its counts are C-level reductions over slices
+(``bytearray.count``, ``sum``, ``itertools.compress``, ``Counter``) instead
+of loops over hydrated ORM objects.
+
+The window answers ``summarize``, ``get_hourly`` and ``get_by_dimension``
+with the same metric names as the hourly rollups, so callers use it for
+windows it covers and the rollups for anything older.
+
+Rows arrive through a column-only query for ids above the highest one
+loaded. The telemetry CRUD create paths, and with them the write-behind
+ingestion flusher, mark the window dirty after they commit, so the next
+read catches up at once; otherwise it catches up every
+WINDOW_CACHE_REFRESH_SECONDS, which is how rows written by other worker
+processes arrive. Updates and deletes invalidate the window, and it is
+rebuilt every WINDOW_CACHE_RELOAD_SECONDS to pick up changes made by other
+workers and rows committed out of id order.
+
+One thread at a time syncs, and it queries the database without holding the
+lock that reads take: a reload is built into fresh columns and swapped in,
+and caught-up rows are inserted once fetched. Reads arriving meanwhile wait
+for the sync only if the window is dirty or invalidated; a periodic refresh
+or reload in progress is not waited for, and they see the current columns.
+"""
+
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import compress
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Boolean, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.email_processing_data import EmailProcessingData
+from app.models.spam_handler_data import SpamHandlerData
+
+EPOCH = datetime(1970, 1, 1)
+
+# Rows are kept this long beyond the covered window, so a request for exactly
+# WINDOW_CACHE_DAYS computed a moment before the read is still covered
+RETENTION_SLACK = timedelta(hours=2)
+COVERAGE_SLACK = timedelta(hours=1)
+
+# Rows fetched per round trip while loading
+FETCH_SIZE = 10000
+
+
+def to_seconds(value: datetime) -> float:
+    """Naive UTC datetime -> seconds since the epoch"""
+    return (value - EPOCH).total_seconds()
+
+
+def intern_name(names: List[str], ids: Dict[str, int], name: str) -> int:
+    """Index of name in names, appended the first time it is seen"""
+    index = ids.get(name)
+    if index is None:
+        index = ids[name] = len(names)
+        names.append(name)
+    return index
+
+
+class WindowColumns:
+    """Column arrays of the rows in the window, sorted by timestamp"""
+
+    def __init__(self, flags: Iterable[str], sums: Iterable[str]):
+        self.timestamps = array("d")
+        self.hours = array("l")
+        self.agents = array("l")
+        self.flags = {metric: bytearray() for metric in flags}
+        self.sums = {metric: array("d") for metric in sums}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def _all(self) -> List[Any]:
+        return [
+            self.timestamps,
+            self.hours,
+            self.agents,
+            *self.flags.values(),
+            *self.sums.values(),
+        ]
+
+    def insert(self, rows: List[Tuple]) -> None:
+        """
+        Add row tuples laid out like ``_all``. Only the rows newer than the
+        oldest incoming timestamp are re-merged, which for live telemetry is
+        the last few seconds.
+        """
+        if not rows:
+            return
+        rows.sort(key=itemgetter(0))
+        columns = self._all()
+        split = bisect_right(self.timestamps, rows[0][0])
+        if split < len(self):
+            tail = list(zip(*(column[split:] for column in columns)))
+            for column in columns:
+                del column[split:]
+            rows = list(heapq.merge(tail, rows, key=itemgetter(0)))
+        for column, values in zip(columns, zip(*rows)):
+            column.extend(values)
+
+    def evict_before(self, seconds: float) -> int:
+        """Drop rows older than seconds; returns how many were dropped"""
+        count = bisect_left(self.timestamps, seconds)
+        if count:
+            for column in self._all():
+                del column[:count]
+        return count
+
+
+class TelemetryWindow:
+    """Recent rows of one telemetry table as columns, with rollup-style reads"""
+
+    def __init__(
+        self,
+        source_model,
+        metrics: Dict[str, Optional[str]],
+        *,
+        days: Optional[int] = None,
+        refresh_seconds: Optional[float] = None,
+        reload_seconds: Optional[float] = None,
+    ):
+        """
+        ``metrics`` maps metric names to source columns like the rollups do:
+        ``None`` counts rows, boolean columns count true values, anything
+        else is summed.
+        """
+        self.source_model = source_model
+        self.metrics = metrics
+        self.days = days
+        self.refresh_seconds = refresh_seconds
+        self.reload_seconds = reload_seconds
+
+        self.flag_columns: Dict[str, str] = {}
+        self.sum_columns: Dict[str, str] = {}
+        for metric, source_column in metrics.items():
+            if source_column is None:
+                continue
+            column = getattr(source_model, source_column)
+            if isinstance(column.property.columns[0].type, Boolean):
+                self.flag_columns[metric] = source_column
+            else:
+                self.sum_columns[metric] = source_column
+
+        self._lock = threading.Lock()
+        # Held by the one thread syncing; the database is read outside _lock
+        self._sync_lock = threading.Lock()
+        self._columns = WindowColumns(self.flag_columns, self.sum_columns)
+        self._agent_names: List[str] = []
+        self._agent_ids: Dict[str, int] = {}
+        self._high_water = 0
+        self._retained_from: Optional[float] = None
+        self._dirty = False
+        self._invalidations = 0
+        self._synced_at = float("-inf")
+        self._loaded_at = float("-inf")
+        self._counters = {"reads": 0, "reloads": 0, "catch_ups": 0, "rows_loaded": 0}
+
+    # ------------------------------------------------------------------ config
+
+    def _days(self) -> int:
+        return self.days if self.days is not None else settings.WINDOW_CACHE_DAYS
+
+    def _refresh_seconds(self) -> float:
+        if self.refresh_seconds is not None:
+            return self.refresh_seconds
+        return settings.WINDOW_CACHE_REFRESH_SECONDS
+
+    def _reload_seconds(self) -> float:
+        if self.reload_seconds is not None:
+            return self.reload_seconds
+        return settings.WINDOW_CACHE_RELOAD_SECONDS
+
+    def covers(self, start_date: Optional[datetime]) -> bool:
+        """True when every row at or after start_date is held in the window"""
+        if start_date is None or self._days() <= 0:
+            return False
+        horizon = datetime.utcnow() - timedelta(days=self._days()) - COVERAGE_SLACK
+        return start_date >= horizon
+
+    # ------------------------------------------------------------ invalidation
+
+    def mark_dirty(self) -> None:
+        """New rows were committed; catch up on the next read"""
+        self._dirty = True
+
+    def invalidate(self) -> None:
+        """Rows were changed or deleted; reload on the next read"""
+        with self._lock:
+            self._invalidations += 1
+            self._loaded_at = float("-inf")
+
+    # ----------------------------------------------------------------- loading
+
+    def _fetch(
+        self, db: Session, since: datetime, high_water: int
+    ) -> Iterator[List[Any]]:
+        """Rows with ids above high_water, in id-ordered partitions"""
+        model = self.source_model
+        sources = [*self.flag_columns.values(), *self.sum_columns.values()]
+        stmt = (
+            select(
+                model.id,
+                model.timestamp,
+                model.agent_name,
+                *[getattr(model, column) for column in sources],
+            )
+            .where(model.id > high_water, model.timestamp >= since)
+            .order_by(model.id)
+            .execution_options(yield_per=FETCH_SIZE)
+        )
+        yield from db.execute(stmt).partitions()
+
+    def _encode(
+        self, partition: List[Any], agent_id: Callable[[str], int]
+    ) -> List[Tuple]:
+        """Fetched rows as tuples laid out like ``WindowColumns._all``"""
+        flag_count = len(self.flag_columns)
+        rows = []
+        for _, timestamp, agent_name, *values in partition:
+            seconds = to_seconds(timestamp)
+            rows.append(
+                (
+                    seconds,
+                    int(seconds // 3600),
+                    agent_id(agent_name),
+                    *[1 if value else 0 for value in values[:flag_count]],
+                    *[float(value or 0) for value in values[flag_count:]],
+                )
+            )
+        return rows
+
+    def _sync_due(self, now: float) -> bool:
+        return (
+            now - self._loaded_at >= self._reload_seconds()
+            or now - self._synced_at >= self._refresh_seconds()
+            or self._dirty
+        )
+
+    def _sync(self, db: Session) -> None:
+        with self._lock:
+            if not self._sync_due(time.monotonic()):
+                return
+            # Only a periodic refresh is not worth waiting for
+            wait = self._dirty or self._loaded_at == float("-inf")
+        if not self._sync_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                now = time.monotonic()
+                if not self._sync_due(now):
+                    return
+                reload = now - self._loaded_at >= self._reload_seconds()
+                self._dirty = False
+                high_water = self._high_water
+                invalidations = self._invalidations
+            since = datetime.utcnow() - timedelta(days=self._days()) - RETENTION_SLACK
+            if reload:
+                self._reload(db, since, now, invalidations)
+            else:
+                self._catch_up(db, since, now, high_water)
+        finally:
+            self._sync_lock.release()
+
+    def _reload(
+        self, db: Session, since: datetime, now: float, invalidations: int
+    ) -> None:
+        """Load the window into fresh columns, then swap them in"""
+        columns = WindowColumns(self.flag_columns, self.sum_columns)
+        names: List[str] = []
+        ids: Dict[str, int] = {}
+        agent_id = partial(intern_name, names, ids)
+        high_water = fetched = 0
+        for partition in self._fetch(db, since, 0):
+            columns.insert(self._encode(partition, agent_id))
+            high_water = max(high_water, partition[-1][0])
+            fetched += len(partition)
+
+        with self._lock:
+            self._columns = columns
+            self._agent_names, self._agent_ids = names, ids
+            self._high_water = high_water
+            self._retained_from = to_seconds(since)
+            # Invalidated while loading: the load may predate the change
+            if self._invalidations == invalidations:
+                self._loaded_at = now
+            self._synced_at = now
+            self._counters["reloads"] += 1
+            self._counters["rows_loaded"] += fetched
+
+    def _catch_up(
+        self, db: Session, since: datetime, now: float, high_water: int
+    ) -> None:
+        """Fetch rows above the high-water mark, then insert them"""
+        partitions = list(self._fetch(db, since, high_water))
+
+        with self._lock:
+            self._columns.evict_before(to_seconds(since))
+            agent_id = partial(intern_name, self._agent_names, self._agent_ids)
+            for partition in partitions:
+                self._columns.insert(self._encode(partition, agent_id))
+                self._high_water = max(self._high_water, partition[-1][0])
+                self._counters["rows_loaded"] += len(partition)
+            self._retained_from = to_seconds(since)
+            self._synced_at = now
+            self._counters["catch_ups"] += 1
+
+    # ---------------------------------------------------------------- selection
+
+    def _select(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        agent_name: Optional[str],
+    ) -> Tuple[int, int, Optional[bytearray]]:
+        """Slice bounds for the time window and a row mask for the agent filter"""
+        timestamps = self._columns.timestamps
+        lo = bisect_left(timestamps, to_seconds(start_date)) if start_date else 0
+        hi = len(timestamps)
+        if end_date:
+            hi = bisect_right(timestamps, to_seconds(end_date))
+        if not agent_name:
+            return lo, hi, None
+        # Substring match, like the rollup and raw table filters
+        needle = agent_name.lower()
+        wanted = {
+            agent_id
+            for agent_id, name in enumerate(self._agent_names)
+            if needle in name.lower()
+        }
+        return lo, hi, bytearray(map(wanted.__contains__, self._columns.agents[lo:hi]))
+
+    @staticmethod
+    def _pick(values: Any, mask: Optional[bytearray]) -> Any:
+        return values if mask is None else compress(values, mask)
+
+    def _prepare(self, db: Session, kwargs: Dict[str, Any]) -> None:
+        """Check the filters and sync, before taking the lock to read"""
+        unsupported = set(kwargs) - {"start_date", "end_date", "agent_name"}
+        if unsupported:
+            raise ValueError(f"Unsupported window filters: {sorted(unsupported)}")
+        self._sync(db)
+
+    def _read(self, kwargs: Dict[str, Any]):
+        self._counters["reads"] += 1
+        return self._select(
+            kwargs.get("start_date"), kwargs.get("end_date"), kwargs.get("agent_name")
+        )
+
+    def _grouped(
+        self, keys: array, lo: int, hi: int, mask: Optional[bytearray]
+    ) -> Dict[int, Dict[str, Any]]:
+        """Metrics per distinct key (hour or agent id) in the selection"""
+        columns = self._columns
+        key_slice = keys[lo:hi]
+        counts = {"total_count": Counter(self._pick(key_slice, mask))}
+        for metric, flags in columns.flags.items():
+            selected = self._pick(flags[lo:hi], mask)
+            counts[metric] = Counter(compress(self._pick(key_slice, mask), selected))
+        sums: Dict[str, Dict[int, float]] = {}
+        for metric, values in columns.sums.items():
+            totals: Dict[int, float] = {}
+            for key, value in zip(
+                self._pick(key_slice, mask), self._pick(values[lo:hi], mask)
+            ):
+                if value:
+                    totals[key] = totals.get(key, 0.0) + value
+            sums[metric] = totals
+
+        return {
+            key: {
+                metric: (
+                    counts[metric].get(key, 0)
+                    if metric in counts
+                    else sums[metric].get(key, 0)
+                )
+                for metric in self.metrics
+            }
+            for key in counts["total_count"]
+        }
+
+    # ------------------------------------------------------------------- reads
+
+    def summarize(self, db: Session, **kwargs) -> Dict[str, Any]:
+        """Totals of every metric for the window"""
+        self._prepare(db, kwargs)
+        with self._lock:
+            lo, hi, mask = self._read(kwargs)
+            columns = self._columns
+            totals: Dict[str, Any] = {}
+            for metric in self.metrics:
+                if metric in columns.flags:
+                    flags = columns.flags[metric]
+                    totals[metric] = (
+                        flags.count(1, lo, hi)
+                        if mask is None
+                        else sum(compress(flags[lo:hi], mask))
+                    )
+                elif metric in columns.sums:
+                    totals[metric] = sum(self._pick(columns.sums[metric][lo:hi], mask))
+                else:
+                    totals[metric] = hi - lo if mask is None else mask.count(1)
+            return totals
+
+    def get_hourly(self, db: Session, **kwargs) -> Dict[datetime, Dict[str, Any]]:
+        """Metrics per hour bucket for the window, oldest first"""
+        self._prepare(db, kwargs)
+        with self._lock:
+            lo, hi, mask = self._read(kwargs)
+            grouped = self._grouped(self._columns.hours, lo, hi, mask)
+        return {
+            EPOCH + timedelta(hours=hour): grouped[hour] for hour in sorted(grouped)
+        }
+
+    def get_by_dimension(
+        self, db: Session, dimension: str, **kwargs
+    ) -> Dict[str, Dict[str, Any]]:
+        """Metrics per agent for the window"""
+        if dimension != "agent_name":
+            raise ValueError(f"Unsupported window dimension: {dimension}")
+        self._prepare(db, kwargs)
+        with self._lock:
+            lo, hi, mask = self._read(kwargs)
+            grouped = self._grouped(self._columns.agents, lo, hi, mask)
+            return {
+                self._agent_names[agent_id]: metrics
+                for agent_id, metrics in grouped.items()
+            }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rows": len(self._columns),
+                "agents": len(self._agent_names),
+                "days": self._days(),
+                "high_water_id": self._high_water,
+                "retained_from": (
+                    (EPOCH + timedelta(seconds=self._retained_from)).isoformat()
+                    if self._retained_from is not None
+                    else None
+                ),
+                **self._counters,
+            }
+
+
+email_processing_window = TelemetryWindow(
+    EmailProcessingData,
+    {
+        "total_count": None,
+        "opened_count": "is_opened",
+        "clicked_count": "is_link_clicked",
+        "unsubscribed_count": "is_unsubscribe_clicked",
+        "replied_count": "is_reply_sent",
+        "error_count": "error_occurred",
+        "total_duration_seconds": "total_duration_seconds",
+        "website_duration_seconds": "random_website_duration_seconds",
+    },
+)
+
+spam_handler_window = TelemetryWindow(
+    SpamHandlerData,
+    {
+        "total_count": None,
+        "error_count": "error_occurred",
+        "spam_found": "spam_emails_found",
+        "moved_to_inbox": "moved_to_inbox",
+        "total_time_seconds": "total_time_seconds",
+    },
+)
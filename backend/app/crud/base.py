@@ -1,8 +1,11 @@
 from typing import Type, TypeVar, Generic, List, Optional, Union, Dict, Any
 from pydantic import BaseModel
+from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.encoders import jsonable_encoder
 from app.core.database import Base
+from app.db.bulk_insert import bulk_insert
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -57,3 +60,149 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db.delete(obj)
         db.commit()
         return obj
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        *,
+        rollup: Any = None,
+        sketches: Any = None,
+        distinct: Any = None,
+        fingerprints: Any = None,
+        window: Any = None,
+    ):
+        """
+        CRUDBase counterpart for an AsyncSession, so handlers await the
+        database instead of blocking the event loop or a worker thread.
+        ``rollup``, ``sketches``, ``distinct`` and ``fingerprints`` are an
+        optional CRUDTelemetryRollup, CRUDTopKSketch, CRUDDistinctSketch and
+        CRUDErrorFingerprint kept in step with writes, ``window`` an optional
+        TelemetryWindow told about them after commit.
+        """
+        self.model = model
+        self.rollup = rollup
+        self.sketches = sketches
+        self.distinct = distinct
+        self.fingerprints = fingerprints
+        self.window = window
+
+    def _create_values(self, obj_in: CreateSchemaType) -> Dict[str, Any]:
+        """Column values for a new row; override to add derived fields"""
+        return obj_in.dict()
+
+    def _assign_fingerprints(self, rows: List[Any]) -> None:
+        if self.fingerprints is not None:
+            self.fingerprints.assign(rows)
+
+    async def _apply_rollup(
+        self, db: AsyncSession, rows: List[Any], *, sign: int = 1
+    ) -> None:
+        if self.rollup is not None:
+            await db.run_sync(self.rollup.apply, rows, sign=sign)
+        if self.sketches is not None:
+            await db.run_sync(self.sketches.apply, rows, sign=sign)
+        # Distinct counts only ever grow: values seen stay seen
+        if self.distinct is not None and sign > 0:
+            await db.run_sync(self.distinct.apply, rows)
+        if self.fingerprints is not None:
+            await db.run_sync(self.fingerprints.apply, rows, sign=sign)
+
+    def _notify_window(self, *, inserted: bool) -> None:
+        if self.window is not None:
+            if inserted:
+                self.window.mark_dirty()
+            else:
+                self.window.invalidate()
+
+    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        return await db.get(self.model, id)
+
+    async def get_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        result = await db.scalars(
+            select(self.model).order_by(self.model.id).offset(skip).limit(limit)
+        )
+        return list(result.all())
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        values = self._create_values(obj_in)
+        self._assign_fingerprints([values])
+        db_obj = self.model(**values)
+        db.add(db_obj)
+        await self._apply_rollup(db, [db_obj])
+        await db.commit()
+        self._notify_window(inserted=True)
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def bulk_create(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: List[CreateSchemaType],
+        return_rows: bool = True,
+    ) -> List[ModelType]:
+        """Insert with one statement per chunk; see app.db.bulk_insert"""
+        rows = [self._create_values(obj_in) for obj_in in objs_in]
+        if not rows:
+            return []
+        self._assign_fingerprints(rows)
+        db_objs = await db.run_sync(
+            bulk_insert, self.model, rows, return_rows=return_rows
+        )
+        await self._apply_rollup(db, rows)
+        await db.commit()
+        self._notify_window(inserted=True)
+        return db_objs
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        previous = {
+            column.key: getattr(db_obj, column.key)
+            for column in self.model.__table__.columns
+        }
+        for field, value in update_data.items():
+            if field in previous:
+                setattr(db_obj, field, value)
+        self._assign_fingerprints([db_obj])
+        db.add(db_obj)
+        # Move the row's contribution in the rollups from old to new values
+        await self._apply_rollup(db, [previous], sign=-1)
+        await self._apply_rollup(db, [db_obj])
+        await db.commit()
+        self._notify_window(inserted=False)
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
+        obj = await db.get(self.model, id)
+        if obj:
+            await self._apply_rollup(db, [obj], sign=-1)
+            await db.delete(obj)
+            await db.commit()
+            self._notify_window(inserted=False)
+        return obj
+
+    async def remove_multi(self, db: AsyncSession, *, ids: List[int]) -> int:
+        if self.rollup is not None:
+            await db.run_sync(self.rollup.retract, ids=ids)
+        if self.sketches is not None:
+            await db.run_sync(self.sketches.retract, ids=ids)
+        if self.fingerprints is not None:
+            await db.run_sync(self.fingerprints.retract, ids=ids)
+        result = await db.execute(delete(self.model).where(self.model.id.in_(ids)))
+        await db.commit()
+        self._notify_window(inserted=False)
+        return result.rowcount
@@ -1,9 +1,11 @@
 from typing import List, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 
-from app.crud.base import CRUDBase
+from app.crud.base import AsyncCRUDBase, CRUDBase
 from app.models.agent import Agent
 from app.schemas.agent import AgentCreate, AgentUpdate
 
@@ -59,4 +61,43 @@ class CRUDAgent(CRUDBase[Agent, AgentCreate, AgentUpdate]):
         return self.update_agent_status(db=db, agent_id=agent_id, is_active=False)
 
 
+class AsyncCRUDAgent(AsyncCRUDBase[Agent, AgentCreate, AgentUpdate]):
+    async def create(self, db: AsyncSession, *, obj_in: AgentCreate) -> Agent:
+        """Create a new agent with unique agent_name validation"""
+        try:
+            return await super().create(db=db, obj_in=obj_in)
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail="Agent name already exists. Please choose a different name.",
+            )
+
+    async def get_by_agent_name(
+        self, db: AsyncSession, *, agent_name: str
+    ) -> Optional[Agent]:
+        """Get agent by agent_name"""
+        result = await db.scalars(select(Agent).filter(Agent.agent_name == agent_name))
+        return result.first()
+
+    async def get_active_agents(
+        self, db: AsyncSession, skip: int = 0, limit: int = 100
+    ) -> List[Agent]:
+        """Get all active agents"""
+        result = await db.scalars(
+            select(Agent).filter(Agent.is_active == True).offset(skip).limit(limit)
+        )
+        return list(result.all())
+
+    async def update_agent_status(
+        self, db: AsyncSession, *, agent_id: int, is_active: bool
+    ) -> Optional[Agent]:
+        """Update agent active status"""
+        agent = await self.get(db=db, id=agent_id)
+        if agent:
+            agent = await self.update(db, db_obj=agent, obj_in={"is_active": is_active})
+        return agent
+
+
 agent = CRUDAgent(Agent)
+async_agent = AsyncCRUDAgent(Agent)
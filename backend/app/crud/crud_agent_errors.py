@@ -0,0 +1,85 @@
+from typing import Dict, Any, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, literal, select, union_all
+from datetime import datetime
+
+from app.models.email_processing_data import EmailProcessingData
+from app.models.spam_handler_data import SpamHandlerData
+
+
+class CRUDAgentErrors:
+    """Grouped error aggregation across spam handler and email processing data"""
+
+    def _error_branch(
+        self,
+        model,
+        *,
+        is_spam: bool,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+    ):
+        """Per-agent error counts for one telemetry table, pre-aggregated"""
+        conditions = [model.error_occurred == True]
+        if start_date:
+            conditions.append(model.timestamp >= start_date)
+        if end_date:
+            conditions.append(model.timestamp <= end_date)
+
+        error_count = func.count(model.id)
+        return (
+            select(
+                model.agent_name.label("agent_name"),
+                (error_count if is_spam else literal(0)).label("spam_errors"),
+                (literal(0) if is_spam else error_count).label("email_errors"),
+                func.max(model.timestamp).label("last_error_time"),
+            )
+            .where(and_(*conditions))
+            .group_by(model.agent_name)
+        )
+
+    def get_error_counts_by_agent(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get spam error count, email error count and last error time for every
+        agent with errors in the window, using a single grouped query
+        """
+        errors = union_all(
+            self._error_branch(
+                SpamHandlerData,
+                is_spam=True,
+                start_date=start_date,
+                end_date=end_date,
+            ),
+            self._error_branch(
+                EmailProcessingData,
+                is_spam=False,
+                start_date=start_date,
+                end_date=end_date,
+            ),
+        ).subquery()
+
+        rows = db.execute(
+            select(
+                errors.c.agent_name,
+                func.sum(errors.c.spam_errors),
+                func.sum(errors.c.email_errors),
+                func.max(errors.c.last_error_time),
+            ).group_by(errors.c.agent_name)
+        ).all()
+
+        return {
+            agent_name: {
+                "spam_error_count": int(spam_errors or 0),
+                "email_error_count": int(email_errors or 0),
+                "last_error_time": last_error_time,
+            }
+            for agent_name, spam_errors, email_errors, last_error_time in rows
+        }
+
+
+agent_errors = CRUDAgentErrors()
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 import json
 
+from app.core.config_cache import automation_config_cache
 from app.models.connectivity_settings import ConnectivitySettings
 from app.schemas.connectivity_settings import (
     ConnectivitySettingsCreate,
@@ -26,6 +27,7 @@ class CRUDConnectivitySettings:
         )
         db.add(db_obj)
         db.commit()
+        automation_config_cache.bump()
         db.refresh(db_obj)
         return db_obj
 
@@ -105,6 +107,7 @@ class CRUDConnectivitySettings:
 
         db.add(db_obj)
         db.commit()
+        automation_config_cache.bump()
         db.refresh(db_obj)
         return db_obj
 
@@ -117,6 +120,7 @@ class CRUDConnectivitySettings:
             db_obj.setting_value = setting_value
             db.add(db_obj)
             db.commit()
+            automation_config_cache.bump()
             db.refresh(db_obj)
         return db_obj
 
@@ -126,6 +130,7 @@ class CRUDConnectivitySettings:
         if obj:
             db.delete(obj)
             db.commit()
+            automation_config_cache.bump()
         return obj
 
     def get_config_dict(self, db: Session) -> Dict[str, Any]:
@@ -201,6 +206,7 @@ class CRUDConnectivitySettings:
                 updated_settings.append(new_setting)
 
         db.commit()
+        automation_config_cache.bump()
         for setting in updated_settings:
             db.refresh(setting)
 
@@ -273,6 +279,7 @@ class CRUDConnectivitySettings:
 
         if created_settings:
             db.commit()
+            automation_config_cache.bump()
             for setting in created_settings:
                 db.refresh(setting)
 
@@ -2,6 +2,7 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
+from app.core.config_cache import automation_config_cache
 from app.models.default_sender import DefaultSender
 from app.schemas.default_sender import DefaultSenderCreate, DefaultSenderUpdate
 
@@ -18,6 +19,7 @@ class CRUDDefaultSender:
         )
         db.add(db_obj)
         db.commit()
+        automation_config_cache.bump()
         db.refresh(db_obj)
         return db_obj
 
@@ -75,6 +77,7 @@ class CRUDDefaultSender:
 
         db.add(db_obj)
         db.commit()
+        automation_config_cache.bump()
         db.refresh(db_obj)
         return db_obj
 
@@ -84,6 +87,7 @@ class CRUDDefaultSender:
         if obj:
             db.delete(obj)
             db.commit()
+            automation_config_cache.bump()
         return obj
 
     def bulk_create(
@@ -105,6 +109,7 @@ class CRUDDefaultSender:
         if db_objs:
             db.add_all(db_objs)
             db.commit()
+            automation_config_cache.bump()
             for obj in db_objs:
                 db.refresh(obj)
 
@@ -118,18 +123,21 @@ class CRUDDefaultSender:
             .delete(synchronize_session=False)
         )
         db.commit()
+        automation_config_cache.bump()
         return deleted_count
 
     def activate_all(self, db: Session) -> int:
         """Activate all default senders"""
         updated_count = db.query(DefaultSender).update({"is_active": True})
         db.commit()
+        automation_config_cache.bump()
         return updated_count
 
     def deactivate_all(self, db: Session) -> int:
         """Deactivate all default senders"""
         updated_count = db.query(DefaultSender).update({"is_active": False})
         db.commit()
+        automation_config_cache.bump()
         return updated_count
 
     def get_emails_list(self, db: Session, *, is_active: bool = True) -> List[str]:
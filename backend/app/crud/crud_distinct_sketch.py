@@ -0,0 +1,279 @@
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, delete, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime
+
+from app.crud.crud_telemetry_rollup import _value, ceil_hour, floor_hour
+from app.models.email_processing_data import EmailProcessingData
+from app.models.proxy_error import ProxyError
+from app.models.spam_handler_data import SpamHandlerData
+from app.models.telemetry_rollup import TelemetryDistinctSketch
+from app.utils.hyperloglog import HyperLogLog
+
+# Raw rows read per round trip when rebuilding sketches
+REBUILD_CHUNK_SIZE = 5000
+
+
+class CRUDDistinctSketch:
+    """
+    Hourly HyperLogLog sketches of distinct agents, profiles, senders or proxies.
+
+    ``apply`` adds the values of new rows to the sketch of their hour inside
+    the caller's transaction. ``count`` unions the sketches of the whole hours
+    in a window (a register-wise maximum) and adds the distinct values of the
+    partial hours at its edges from raw rows, so "distinct X in the last N
+    hours" reads N small rows instead of scanning the table. Deleting rows
+    does not lower the counts: they are counts of values seen.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        source_model,
+        dimensions: Dict[str, str],
+        *,
+        timestamp_column: str = "timestamp",
+    ):
+        """``dimensions`` maps sketch names to the source column they count"""
+        self.model = TelemetryDistinctSketch
+        self.source = source
+        self.source_model = source_model
+        self.dimensions = dimensions
+        self.timestamp_column = timestamp_column
+
+    def _timestamp(self):
+        return getattr(self.source_model, self.timestamp_column)
+
+    # ------------------------------------------------------------------ writes
+
+    def apply(self, db: Session, rows: Iterable[Any]) -> None:
+        """Add raw rows to the sketches. Does not commit."""
+        now = datetime.utcnow()
+        values: Dict[Tuple[str, datetime], set] = {}
+        for row in rows:
+            # Rows inserted without a timestamp get the column default: now
+            hour = floor_hour(_value(row, self.timestamp_column) or now)
+            for dimension, column in self.dimensions.items():
+                value = _value(row, column)
+                if value:
+                    values.setdefault((dimension, hour), set()).add(str(value))
+
+        if not values:
+            return
+
+        keys = sorted(values)
+        self._ensure_rows(db, keys)
+        sketches = {
+            (sketch.dimension, sketch.bucket_start): sketch
+            for sketch in db.scalars(
+                select(self.model)
+                .where(
+                    self.model.source == self.source,
+                    self.model.bucket_start.in_(sorted({key[1] for key in keys})),
+                )
+                .with_for_update()
+            )
+        }
+        for key in keys:
+            sketch = sketches[key]
+            hll = HyperLogLog.loads(sketch.registers)
+            before = bytes(hll.registers)
+            hll.update(values[key])
+            if bytes(hll.registers) != before:
+                sketch.registers = hll.dumps()
+                sketch.updated_at = now
+        db.flush()
+
+    def _ensure_rows(self, db: Session, keys: List[Tuple[str, datetime]]) -> None:
+        """Create empty sketch rows for keys that have none yet"""
+        now = datetime.utcnow()
+        values = [
+            {
+                "source": self.source,
+                "dimension": dimension,
+                "bucket_start": hour,
+                "registers": None,
+                "updated_at": now,
+            }
+            for dimension, hour in keys
+        ]
+        dialect_name = db.get_bind().dialect.name
+        table = self.model.__table__
+
+        if dialect_name == "sqlite":
+            db.execute(sqlite_insert(table).values(values).on_conflict_do_nothing())
+        elif dialect_name == "mysql":
+            # Takes the exclusive lock up front; INSERT IGNORE would take a
+            # shared one on duplicates and deadlock upgrading it FOR UPDATE
+            stmt = mysql_insert(table).values(values)
+            db.execute(
+                stmt.on_duplicate_key_update(updated_at=stmt.inserted.updated_at)
+            )
+        else:
+            for value in values:
+                exists = (
+                    db.query(self.model.id)
+                    .filter(
+                        self.model.source == self.source,
+                        self.model.dimension == value["dimension"],
+                        self.model.bucket_start == value["bucket_start"],
+                    )
+                    .first()
+                )
+                if not exists:
+                    db.add(self.model(**value))
+            db.flush()
+
+    def rebuild(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> None:
+        """
+        Recompute sketches from raw rows for whole hours in [start_date, end_date).
+        Used to backfill history; hours already purged by retention lose theirs.
+        """
+        start_date = floor_hour(start_date) if start_date else None
+        end_date = ceil_hour(end_date) if end_date else None
+
+        sketch_conditions = [self.model.source == self.source]
+        source_conditions = []
+        if start_date:
+            sketch_conditions.append(self.model.bucket_start >= start_date)
+            source_conditions.append(self._timestamp() >= start_date)
+        if end_date:
+            sketch_conditions.append(self.model.bucket_start < end_date)
+            source_conditions.append(self._timestamp() < end_date)
+
+        db.execute(delete(self.model).where(and_(*sketch_conditions)))
+
+        columns = [self._timestamp()] + [
+            getattr(self.source_model, column) for column in self.dimensions.values()
+        ]
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(self.source_model.id, *columns)
+                .where(self.source_model.id > last_id, *source_conditions)
+                .order_by(self.source_model.id)
+                .limit(REBUILD_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                break
+            self.apply(db, [row._mapping for row in rows])
+            last_id = rows[-1].id
+        db.commit()
+
+    def ensure_backfilled(self, db: Session) -> bool:
+        """Build sketches from history the first time none exist for the source"""
+        has_sketches = (
+            db.query(self.model.id).filter(self.model.source == self.source).first()
+            is not None
+        )
+        has_source_rows = db.query(self.source_model.id).first() is not None
+        if has_sketches or not has_source_rows:
+            return False
+        self.rebuild(db)
+        return True
+
+    # ------------------------------------------------------------------- reads
+
+    def union(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, HyperLogLog]:
+        """
+        One sketch per dimension of the values seen for
+        start_date <= timestamp <= end_date. Sketches of different sources can
+        be merged further, e.g. to count agents active in either table.
+        """
+        unions = {dimension: HyperLogLog() for dimension in self.dimensions}
+
+        # Whole hours come from the sketches
+        sketch_start = ceil_hour(start_date) if start_date else None
+        sketch_end = floor_hour(end_date) if end_date else None
+        raw_ranges: List[Tuple[datetime, Optional[datetime], bool]] = []
+
+        if sketch_start and sketch_end and sketch_start > sketch_end:
+            # Window sits inside a single hour
+            raw_ranges.append((start_date, end_date, True))
+        else:
+            conditions = [
+                self.model.source == self.source,
+                self.model.registers.isnot(None),
+            ]
+            if sketch_start:
+                conditions.append(self.model.bucket_start >= sketch_start)
+            if sketch_end:
+                conditions.append(self.model.bucket_start < sketch_end)
+            rows = db.execute(
+                select(self.model.dimension, self.model.registers).where(*conditions)
+            ).all()
+            for dimension, registers in rows:
+                if dimension in unions:
+                    unions[dimension].merge(HyperLogLog.loads(registers))
+
+            # Partial hours at the edges come from raw rows
+            if start_date and sketch_start > start_date:
+                raw_ranges.append((start_date, sketch_start, False))
+            if end_date:
+                raw_ranges.append((sketch_end, end_date, True))
+
+        for range_start, range_end, inclusive_end in raw_ranges:
+            conditions = [self._timestamp() >= range_start]
+            if inclusive_end:
+                conditions.append(self._timestamp() <= range_end)
+            else:
+                conditions.append(self._timestamp() < range_end)
+            for dimension, column in self.dimensions.items():
+                source_column = getattr(self.source_model, column)
+                unions[dimension].update(
+                    str(value)
+                    for value in db.scalars(
+                        select(source_column).where(*conditions).distinct()
+                    )
+                    if value
+                )
+
+        return unions
+
+    def count(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, int]:
+        """
+        Estimated distinct values of every dimension for
+        start_date <= timestamp <= end_date, within about 2% for large counts
+        """
+        unions = self.union(db, start_date=start_date, end_date=end_date)
+        return {dimension: hll.estimate() for dimension, hll in unions.items()}
+
+
+email_processing_distinct = CRUDDistinctSketch(
+    "email_processing",
+    EmailProcessingData,
+    {"agents": "agent_name", "profiles": "profile_name", "senders": "sender_email"},
+)
+
+spam_handler_distinct = CRUDDistinctSketch(
+    "spam_handler",
+    SpamHandlerData,
+    {"agents": "agent_name", "profiles": "profile_name", "senders": "sender_email"},
+)
+
+proxy_error_distinct = CRUDDistinctSketch(
+    "proxy_error",
+    ProxyError,
+    {"agents": "agent_name", "proxies": "proxy", "profiles": "profile_name"},
+    timestamp_column="created_at",
+)
@@ -1,9 +1,19 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc
+from typing import List, Optional, Tuple, Dict, Any, Iterator
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, desc, case, literal, select, union_all
 from datetime import datetime, timedelta
 
+from app.core.window_cache import email_processing_window
+from app.crud.base import AsyncCRUDBase
+from app.crud.crud_telemetry_rollup import email_processing_rollup
+from app.crud.crud_distinct_sketch import email_processing_distinct
+from app.crud.crud_error_fingerprint import email_processing_fingerprints
+from app.crud.crud_topk_sketch import email_processing_sketches
 from app.models.email_processing_data import EmailProcessingData
+from app.db.bulk_insert import bulk_insert
+from app.db.search_index import search_condition
+from app.utils.pagination import paginate
 from app.schemas.email_processing_data import (
     EmailProcessingDataCreate,
     EmailProcessingDataUpdate,
@@ -13,6 +23,26 @@ from app.schemas.email_processing_data import (
 class CRUDEmailProcessingData:
     """CRUD operations for Email Processing Data"""
 
+    # Columns written by exports, in output order
+    EXPORT_COLUMNS = [
+        "id",
+        "agent_name",
+        "profile_name",
+        "sender_email",
+        "email_subject",
+        "is_opened",
+        "is_link_clicked",
+        "is_unsubscribe_clicked",
+        "is_reply_sent",
+        "random_website_visited",
+        "random_website_duration_seconds",
+        "total_duration_seconds",
+        "error_occurred",
+        "error_details",
+        "timestamp",
+        "created_at",
+    ]
+
     def create(
         self, db: Session, *, obj_in: EmailProcessingDataCreate
     ) -> EmailProcessingData:
@@ -36,8 +66,14 @@ class CRUDEmailProcessingData:
             error_details=obj_in.error_details,
             timestamp=timestamp,
         )
+        email_processing_fingerprints.assign([db_obj])
         db.add(db_obj)
+        email_processing_rollup.apply(db, [db_obj])
+        email_processing_sketches.apply(db, [db_obj])
+        email_processing_distinct.apply(db, [db_obj])
+        email_processing_fingerprints.apply(db, [db_obj])
         db.commit()
+        email_processing_window.mark_dirty()
         db.refresh(db_obj)
         return db_obj
 
@@ -47,12 +83,10 @@ class CRUDEmailProcessingData:
             db.query(EmailProcessingData).filter(EmailProcessingData.id == id).first()
         )
 
-    def get_multi(
+    def _filtered_query(
         self,
         db: Session,
         *,
-        skip: int = 0,
-        limit: int = 100,
         agent_name: Optional[str] = None,
         profile_name: Optional[str] = None,
         sender_email: Optional[str] = None,
@@ -64,8 +98,8 @@ class CRUDEmailProcessingData:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         search: Optional[str] = None,
-    ) -> tuple[List[EmailProcessingData], int]:
-        """Get multiple email processing data entries with filtering and pagination"""
+    ) -> Query:
+        """Build the filtered query shared by the listing methods"""
         query = db.query(EmailProcessingData)
 
         # Apply filters
@@ -108,19 +142,48 @@ class CRUDEmailProcessingData:
             query = query.filter(EmailProcessingData.timestamp <= end_date)
 
         if search:
-            query = query.filter(
-                or_(
-                    EmailProcessingData.agent_name.ilike(f"%{search}%"),
-                    EmailProcessingData.profile_name.ilike(f"%{search}%"),
-                    EmailProcessingData.sender_email.ilike(f"%{search}%"),
-                    EmailProcessingData.email_subject.ilike(f"%{search}%"),
-                    EmailProcessingData.random_website_visited.ilike(f"%{search}%"),
-                    EmailProcessingData.error_details.ilike(f"%{search}%"),
-                )
-            )
+            query = query.filter(search_condition(db, EmailProcessingData, search))
+
+        return query
+
+    def get_multi(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        sender_email: Optional[str] = None,
+        is_opened: Optional[bool] = None,
+        is_link_clicked: Optional[bool] = None,
+        is_unsubscribe_clicked: Optional[bool] = None,
+        is_reply_sent: Optional[bool] = None,
+        error_occurred: Optional[bool] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        search: Optional[str] = None,
+    ) -> tuple[List[EmailProcessingData], int]:
+        """Get multiple email processing data entries with filtering and pagination"""
+        query = self._filtered_query(
+            db,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            sender_email=sender_email,
+            is_opened=is_opened,
+            is_link_clicked=is_link_clicked,
+            is_unsubscribe_clicked=is_unsubscribe_clicked,
+            is_reply_sent=is_reply_sent,
+            error_occurred=error_occurred,
+            start_date=start_date,
+            end_date=end_date,
+            search=search,
+        )
 
         # Order by timestamp descending (most recent first)
-        query = query.order_by(desc(EmailProcessingData.timestamp))
+        query = query.order_by(
+            desc(EmailProcessingData.timestamp), desc(EmailProcessingData.id)
+        )
 
         # Get total count before pagination
         total = query.count()
@@ -130,6 +193,96 @@ class CRUDEmailProcessingData:
 
         return items, total
 
+    def get_page(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        sender_email: Optional[str] = None,
+        is_opened: Optional[bool] = None,
+        is_link_clicked: Optional[bool] = None,
+        is_unsubscribe_clicked: Optional[bool] = None,
+        is_reply_sent: Optional[bool] = None,
+        error_occurred: Optional[bool] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> Tuple[List[EmailProcessingData], Optional[int], Optional[str]]:
+        """
+        Get a page of email processing data entries, newest first.
+        Uses the keyset cursor when one is given; total is None unless requested.
+        Returns (items, total, next_cursor).
+        """
+        query = self._filtered_query(
+            db,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            sender_email=sender_email,
+            is_opened=is_opened,
+            is_link_clicked=is_link_clicked,
+            is_unsubscribe_clicked=is_unsubscribe_clicked,
+            is_reply_sent=is_reply_sent,
+            error_occurred=error_occurred,
+            start_date=start_date,
+            end_date=end_date,
+            search=search,
+        )
+        return paginate(
+            query,
+            sort_column=EmailProcessingData.timestamp,
+            id_column=EmailProcessingData.id,
+            limit=limit,
+            skip=skip,
+            cursor=cursor,
+            include_total=include_total,
+        )
+
+    def iter_export_batches(
+        self,
+        db: Session,
+        *,
+        batch_size: int = 5000,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        sender_email: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Iterator[List[Any]]:
+        """
+        Yield filtered email processing rows for export as batches of column tuples.
+        Batches are fetched by ascending id, so memory stays bounded by batch_size
+        however many rows match.
+        """
+        columns = [
+            getattr(EmailProcessingData, column) for column in self.EXPORT_COLUMNS
+        ]
+        query = self._filtered_query(
+            db,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            sender_email=sender_email,
+            start_date=start_date,
+            end_date=end_date,
+        ).with_entities(*columns)
+
+        last_id = 0
+        while True:
+            rows = (
+                query.filter(EmailProcessingData.id > last_id)
+                .order_by(EmailProcessingData.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
     def update(
         self,
         db: Session,
@@ -139,11 +292,25 @@ class CRUDEmailProcessingData:
     ) -> EmailProcessingData:
         """Update an email processing data entry"""
         update_data = obj_in.dict(exclude_unset=True)
+        # Move the entry's contribution in the rollups from old to new values
+        previous = {
+            column.key: getattr(db_obj, column.key)
+            for column in EmailProcessingData.__table__.columns
+        }
         for field, value in update_data.items():
             setattr(db_obj, field, value)
+        email_processing_fingerprints.assign([db_obj])
 
         db.add(db_obj)
+        email_processing_rollup.apply(db, [previous], sign=-1)
+        email_processing_sketches.apply(db, [previous], sign=-1)
+        email_processing_fingerprints.apply(db, [previous], sign=-1)
+        email_processing_rollup.apply(db, [db_obj])
+        email_processing_sketches.apply(db, [db_obj])
+        email_processing_distinct.apply(db, [db_obj])
+        email_processing_fingerprints.apply(db, [db_obj])
         db.commit()
+        email_processing_window.invalidate()
         db.refresh(db_obj)
         return db_obj
 
@@ -151,51 +318,70 @@ class CRUDEmailProcessingData:
         """Delete an email processing data entry"""
         obj = db.query(EmailProcessingData).get(id)
         if obj:
+            email_processing_rollup.apply(db, [obj], sign=-1)
+            email_processing_sketches.apply(db, [obj], sign=-1)
+            email_processing_fingerprints.apply(db, [obj], sign=-1)
             db.delete(obj)
             db.commit()
+            email_processing_window.invalidate()
         return obj
 
     def bulk_create(
-        self, db: Session, *, objs_in: List[EmailProcessingDataCreate]
+        self,
+        db: Session,
+        *,
+        objs_in: List[EmailProcessingDataCreate],
+        return_rows: bool = True,
     ) -> List[EmailProcessingData]:
-        """Bulk create email processing data entries"""
-        db_objs = []
-        for obj_in in objs_in:
-            timestamp = obj_in.timestamp or datetime.utcnow()
-            db_obj = EmailProcessingData(
-                agent_name=obj_in.agent_name,
-                profile_name=obj_in.profile_name,
-                sender_email=obj_in.sender_email,
-                email_subject=obj_in.email_subject,
-                is_opened=obj_in.is_opened,
-                is_link_clicked=obj_in.is_link_clicked,
-                is_unsubscribe_clicked=obj_in.is_unsubscribe_clicked,
-                is_reply_sent=obj_in.is_reply_sent,
-                random_website_visited=obj_in.random_website_visited,
-                random_website_duration_seconds=obj_in.random_website_duration_seconds,
-                total_duration_seconds=obj_in.total_duration_seconds,
-                error_occurred=obj_in.error_occurred,
-                error_details=obj_in.error_details,
-                timestamp=timestamp,
-            )
-            db_objs.append(db_obj)
-
-        if db_objs:
-            db.add_all(db_objs)
-            db.commit()
-            for obj in db_objs:
-                db.refresh(obj)
-
+        """
+        Bulk create email processing data entries with one INSERT per chunk.
+        Pass ``return_rows=False`` when the inserted rows are not needed.
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                "agent_name": obj_in.agent_name,
+                "profile_name": obj_in.profile_name,
+                "sender_email": obj_in.sender_email,
+                "email_subject": obj_in.email_subject,
+                "is_opened": obj_in.is_opened,
+                "is_link_clicked": obj_in.is_link_clicked,
+                "is_unsubscribe_clicked": obj_in.is_unsubscribe_clicked,
+                "is_reply_sent": obj_in.is_reply_sent,
+                "random_website_visited": obj_in.random_website_visited,
+                "random_website_duration_seconds": obj_in.random_website_duration_seconds,
+                "total_duration_seconds": obj_in.total_duration_seconds,
+                "error_occurred": obj_in.error_occurred,
+                "error_details": obj_in.error_details,
+                "timestamp": obj_in.timestamp or now,
+            }
+            for obj_in in objs_in
+        ]
+        if not rows:
+            return []
+
+        email_processing_fingerprints.assign(rows)
+        db_objs = bulk_insert(db, EmailProcessingData, rows, return_rows=return_rows)
+        email_processing_rollup.apply(db, rows)
+        email_processing_sketches.apply(db, rows)
+        email_processing_distinct.apply(db, rows)
+        email_processing_fingerprints.apply(db, rows)
+        db.commit()
+        email_processing_window.mark_dirty()
         return db_objs
 
     def bulk_delete(self, db: Session, *, ids: List[int]) -> int:
         """Bulk delete email processing data entries"""
+        email_processing_rollup.retract(db, ids=ids)
+        email_processing_sketches.retract(db, ids=ids)
+        email_processing_fingerprints.retract(db, ids=ids)
         deleted_count = (
             db.query(EmailProcessingData)
             .filter(EmailProcessingData.id.in_(ids))
             .delete(synchronize_session=False)
         )
         db.commit()
+        email_processing_window.invalidate()
         return deleted_count
 
     def get_by_agent(
@@ -241,16 +427,43 @@ class CRUDEmailProcessingData:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
     ) -> Dict[str, Any]:
-        """Get email processing statistics"""
-        query = db.query(EmailProcessingData)
-
+        """
+        Get email processing statistics.
+
+        The scalar KPIs come from one conditional aggregation over the window,
+        the agent and profile breakdowns from one statement over a shared CTE
+        and the top senders and websites from the top-K sketches.
+        """
+        conditions = []
         if start_date:
-            query = query.filter(EmailProcessingData.timestamp >= start_date)
+            conditions.append(EmailProcessingData.timestamp >= start_date)
         if end_date:
-            query = query.filter(EmailProcessingData.timestamp <= end_date)
+            conditions.append(EmailProcessingData.timestamp <= end_date)
+
+        def count_true(column):
+            return func.coalesce(func.sum(case((column == True, 1), else_=0)), 0)
 
         # Basic stats
-        total_emails_processed = query.count()
+        kpis = db.execute(
+            select(
+                func.count(EmailProcessingData.id).label("total"),
+                count_true(EmailProcessingData.is_opened).label("opened"),
+                count_true(EmailProcessingData.is_link_clicked).label("clicked"),
+                count_true(EmailProcessingData.is_unsubscribe_clicked).label(
+                    "unsubscribed"
+                ),
+                count_true(EmailProcessingData.is_reply_sent).label("replied"),
+                count_true(EmailProcessingData.error_occurred).label("errors"),
+                func.avg(EmailProcessingData.total_duration_seconds).label(
+                    "avg_processing_time"
+                ),
+                func.avg(EmailProcessingData.random_website_duration_seconds).label(
+                    "avg_website_duration"
+                ),
+            ).where(and_(True, *conditions))
+        ).one()
+
+        total_emails_processed = kpis.total
         if total_emails_processed == 0:
             return {
                 "total_emails_processed": 0,
@@ -268,148 +481,102 @@ class CRUDEmailProcessingData:
                 "website_visit_stats": [],
             }
 
-        emails_opened = query.filter(EmailProcessingData.is_opened == True).count()
-        links_clicked = query.filter(
-            EmailProcessingData.is_link_clicked == True
-        ).count()
-        unsubscribe_clicked = query.filter(
-            EmailProcessingData.is_unsubscribe_clicked == True
-        ).count()
-        replies_sent = query.filter(EmailProcessingData.is_reply_sent == True).count()
-
-        average_processing_time = (
-            query.with_entities(
-                func.avg(EmailProcessingData.total_duration_seconds)
-            ).scalar()
-            or 0
-        )
-        average_website_duration = (
-            query.with_entities(
-                func.avg(EmailProcessingData.random_website_duration_seconds)
-            ).scalar()
-            or 0
-        )
-
-        error_count = query.filter(EmailProcessingData.error_occurred == True).count()
+        error_count = int(kpis.errors)
         success_rate = (
             (total_emails_processed - error_count) / total_emails_processed
         ) * 100
         error_rate = (error_count / total_emails_processed) * 100
 
-        # Top senders by email count
-        top_senders = (
-            db.query(
-                EmailProcessingData.sender_email,
-                func.count(EmailProcessingData.id).label("email_count"),
-                func.avg(EmailProcessingData.total_duration_seconds).label("avg_time"),
-            )
-            .group_by(EmailProcessingData.sender_email)
-            .order_by(desc("email_count"))
-            .limit(10)
-            .all()
-        )
-
-        # Processing by agent
-        processing_by_agent = (
-            db.query(
+        # Agent and profile breakdowns over one filtered set
+        filtered = (
+            select(
+                EmailProcessingData.id,
                 EmailProcessingData.agent_name,
-                func.count(EmailProcessingData.id).label("emails_processed"),
-                func.avg(EmailProcessingData.total_duration_seconds).label("avg_time"),
-            )
-            .group_by(EmailProcessingData.agent_name)
-            .order_by(desc("emails_processed"))
-            .all()
-        )
-
-        # Processing by profile
-        processing_by_profile = (
-            db.query(
                 EmailProcessingData.profile_name,
-                func.count(EmailProcessingData.id).label("emails_processed"),
-                func.avg(EmailProcessingData.total_duration_seconds).label("avg_time"),
+                EmailProcessingData.total_duration_seconds,
             )
-            .group_by(EmailProcessingData.profile_name)
-            .order_by(desc("emails_processed"))
-            .all()
+            .where(and_(True, *conditions))
+            .cte("filtered")
         )
 
-        # Website visit stats
-        website_visit_stats = (
-            db.query(
-                EmailProcessingData.random_website_visited,
-                func.count(EmailProcessingData.id).label("visit_count"),
-                func.avg(EmailProcessingData.random_website_duration_seconds).label(
-                    "avg_duration"
-                ),
-            )
-            .filter(EmailProcessingData.random_website_visited.isnot(None))
-            .group_by(EmailProcessingData.random_website_visited)
-            .order_by(desc("visit_count"))
-            .limit(10)
-            .all()
-        )
+        def breakdown(kind: str, key, metric):
+            count = func.count(filtered.c.id)
+            return select(
+                literal(kind).label("kind"),
+                key.label("key"),
+                count.label("count"),
+                func.avg(metric).label("average"),
+            ).group_by(key)
+
+        breakdowns = union_all(
+            breakdown(
+                "agent", filtered.c.agent_name, filtered.c.total_duration_seconds
+            ),
+            breakdown(
+                "profile", filtered.c.profile_name, filtered.c.total_duration_seconds
+            ),
+        ).subquery()
+
+        grouped: Dict[str, List[Any]] = {"agent": [], "profile": []}
+        rows = db.execute(
+            select(breakdowns).order_by(breakdowns.c.kind, desc(breakdowns.c.count))
+        ).all()
+        for row in rows:
+            grouped[row.kind].append(row)
+
+        # Top senders and websites come from the top-K sketches
+        window = dict(start_date=start_date, end_date=end_date)
+        top_senders = email_processing_sketches.top(db, "sender", k=10, **window)
+        top_websites = email_processing_sketches.top(db, "website", k=10, **window)
 
         return {
             "total_emails_processed": total_emails_processed,
-            "emails_opened": emails_opened,
-            "links_clicked": links_clicked,
-            "unsubscribe_clicked": unsubscribe_clicked,
-            "replies_sent": replies_sent,
-            "average_processing_time": float(average_processing_time),
-            "average_website_duration": float(average_website_duration),
+            "emails_opened": int(kpis.opened),
+            "links_clicked": int(kpis.clicked),
+            "unsubscribe_clicked": int(kpis.unsubscribed),
+            "replies_sent": int(kpis.replied),
+            "average_processing_time": float(kpis.avg_processing_time or 0),
+            "average_website_duration": float(kpis.avg_website_duration or 0),
             "success_rate": float(success_rate),
             "error_rate": float(error_rate),
             "top_senders": [
                 {
-                    "sender_email": sender,
-                    "email_count": int(count),
-                    "avg_time": float(avg_time),
+                    "sender_email": entry["value"],
+                    "email_count": entry["count"],
+                    "avg_time": entry["average"],
                 }
-                for sender, count, avg_time in top_senders
+                for entry in top_senders
             ],
             "processing_by_agent": [
                 {
-                    "agent_name": agent,
-                    "emails_processed": int(count),
-                    "avg_time": float(avg_time),
+                    "agent_name": row.key,
+                    "emails_processed": int(row.count),
+                    "avg_time": float(row.average),
                 }
-                for agent, count, avg_time in processing_by_agent
+                for row in grouped["agent"]
             ],
             "processing_by_profile": [
                 {
-                    "profile_name": profile,
-                    "emails_processed": int(count),
-                    "avg_time": float(avg_time),
+                    "profile_name": row.key,
+                    "emails_processed": int(row.count),
+                    "avg_time": float(row.average),
                 }
-                for profile, count, avg_time in processing_by_profile
+                for row in grouped["profile"]
             ],
             "website_visit_stats": [
                 {
-                    "website": website,
-                    "visit_count": int(count),
-                    "avg_duration": float(duration),
+                    "website": entry["value"],
+                    "visit_count": entry["count"],
+                    "avg_duration": entry["average"],
                 }
-                for website, count, duration in website_visit_stats
-                if website
+                for entry in top_websites
             ],
         }
 
-    def get_analytics(
-        self,
-        db: Session,
-        *,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None,
-    ) -> Dict[str, float]:
-        """Get email processing analytics with rates"""
-        query = db.query(EmailProcessingData)
-
-        if start_date:
-            query = query.filter(EmailProcessingData.timestamp >= start_date)
-        if end_date:
-            query = query.filter(EmailProcessingData.timestamp <= end_date)
-
-        total_processed = query.count()
+    @staticmethod
+    def _rates(totals: Dict[str, Any]) -> Dict[str, float]:
+        """Analytics rates and averages from summed rollup metrics"""
+        total_processed = int(totals["total_count"])
         if total_processed == 0:
             return {
                 "open_rate": 0.0,
@@ -422,36 +589,117 @@ class CRUDEmailProcessingData:
                 "total_processed": 0,
             }
 
-        opened = query.filter(EmailProcessingData.is_opened == True).count()
-        clicked = query.filter(EmailProcessingData.is_link_clicked == True).count()
-        unsubscribed = query.filter(
-            EmailProcessingData.is_unsubscribe_clicked == True
-        ).count()
-        replied = query.filter(EmailProcessingData.is_reply_sent == True).count()
-        errors = query.filter(EmailProcessingData.error_occurred == True).count()
-
-        avg_processing_time = (
-            query.with_entities(
-                func.avg(EmailProcessingData.total_duration_seconds)
-            ).scalar()
-            or 0
+        return {
+            "open_rate": (totals["opened_count"] / total_processed) * 100,
+            "click_rate": (totals["clicked_count"] / total_processed) * 100,
+            "unsubscribe_rate": (totals["unsubscribed_count"] / total_processed) * 100,
+            "reply_rate": (totals["replied_count"] / total_processed) * 100,
+            "error_rate": (totals["error_count"] / total_processed) * 100,
+            "avg_processing_time": float(totals["total_duration_seconds"])
+            / total_processed,
+            "avg_website_time": float(totals["website_duration_seconds"])
+            / total_processed,
+            "total_processed": total_processed,
+        }
+
+    def get_analytics(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+    ) -> Dict[str, float]:
+        """Get email processing analytics with rates, read from the hourly rollups"""
+        totals = email_processing_rollup.summarize(
+            db,
+            start_date=start_date,
+            end_date=end_date,
+            agent_name=agent_name,
+            profile_name=profile_name,
         )
-        avg_website_time = (
-            query.with_entities(
-                func.avg(EmailProcessingData.random_website_duration_seconds)
-            ).scalar()
-            or 0
+        return self._rates(totals)
+
+    def get_trends(
+        self,
+        db: Session,
+        *,
+        bucket: str = "day",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Analytics metrics per hour, day or week, oldest first, read from the
+        hourly rollups. Buckets without activity are included with zeros.
+        """
+        series = email_processing_rollup.get_series(
+            db,
+            bucket=bucket,
+            start_date=start_date,
+            end_date=end_date,
+            agent_name=agent_name,
+            profile_name=profile_name,
         )
+        return [
+            {"bucket_start": bucket_start, **self._rates(metrics)}
+            for bucket_start, metrics in series
+        ]
 
+    def get_daily_trends(
+        self, db: Session, *, days: int = 30, agent_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Daily analytics for the last ``days`` days, including today"""
+        end_date = datetime.utcnow()
+        start_date = (end_date - timedelta(days=days - 1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
         return {
-            "open_rate": (opened / total_processed) * 100,
-            "click_rate": (clicked / total_processed) * 100,
-            "unsubscribe_rate": (unsubscribed / total_processed) * 100,
-            "reply_rate": (replied / total_processed) * 100,
-            "error_rate": (errors / total_processed) * 100,
-            "avg_processing_time": float(avg_processing_time),
-            "avg_website_time": float(avg_website_time),
-            "total_processed": total_processed,
+            "days": days,
+            "agent_name": agent_name,
+            "start_date": start_date,
+            "end_date": end_date,
+            "trends": self.get_trends(
+                db,
+                bucket="day",
+                start_date=start_date,
+                end_date=end_date,
+                agent_name=agent_name,
+            ),
+        }
+
+    def get_performance_summary(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Overall success rate and timings, plus the same figures per agent"""
+        overall = self.get_analytics(db, start_date=start_date, end_date=end_date)
+        by_agent = email_processing_rollup.get_by_dimension(
+            db, "agent_name", start_date=start_date, end_date=end_date
+        )
+        agents = [
+            {"agent_name": name, **self._rates(metrics)}
+            for name, metrics in by_agent.items()
+        ]
+        agents.sort(key=lambda item: item["total_processed"], reverse=True)
+
+        def success_rate(rates: Dict[str, Any]) -> float:
+            return 100.0 - rates["error_rate"] if rates["total_processed"] else 0.0
+
+        for item in agents:
+            item["success_rate"] = success_rate(item)
+
+        return {
+            "start_date": start_date,
+            "end_date": end_date,
+            **overall,
+            "success_rate": success_rate(overall),
+            "agents": agents,
         }
 
     def get_recent_entries(
@@ -467,16 +715,97 @@ class CRUDEmailProcessingData:
             .all()
         )
 
-    def delete_old_entries(self, db: Session, *, days_old: int = 30) -> int:
-        """Delete entries older than specified days"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days_old)
-        deleted_count = (
-            db.query(EmailProcessingData)
-            .filter(EmailProcessingData.timestamp < cutoff_date)
-            .delete(synchronize_session=False)
+    def get_recent_errors(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        agent_name: Optional[str] = None,
+        limit: int = 10,
+    ) -> List[EmailProcessingData]:
+        """Get the most recent email processing entries with errors"""
+        query = db.query(EmailProcessingData).filter(
+            EmailProcessingData.error_occurred == True
         )
-        db.commit()
-        return deleted_count
+
+        if agent_name:
+            query = query.filter(
+                EmailProcessingData.agent_name.ilike(f"%{agent_name}%")
+            )
+        if start_date:
+            query = query.filter(EmailProcessingData.timestamp >= start_date)
+        if end_date:
+            query = query.filter(EmailProcessingData.timestamp <= end_date)
+
+        return query.order_by(desc(EmailProcessingData.timestamp)).limit(limit).all()
+
+    def get_status_counts(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        agent_name: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """
+        Entries per outcome, each counted once by the furthest step it reached:
+        Error, then Unsubscribed, Clicked, Opened, otherwise Sent
+        """
+        status = case(
+            (EmailProcessingData.error_occurred == True, "Error"),
+            (EmailProcessingData.is_unsubscribe_clicked == True, "Unsubscribed"),
+            (EmailProcessingData.is_link_clicked == True, "Clicked"),
+            (EmailProcessingData.is_opened == True, "Opened"),
+            else_="Sent",
+        )
+        rows = (
+            self._filtered_query(
+                db, agent_name=agent_name, start_date=start_date, end_date=end_date
+            )
+            .with_entities(status, func.count(EmailProcessingData.id))
+            .group_by(status)
+            .all()
+        )
+        counts = dict.fromkeys(
+            ["Sent", "Opened", "Clicked", "Unsubscribed", "Error"], 0
+        )
+        for name, count in rows:
+            counts[name] = int(count)
+        return counts
+
+
+class AsyncCRUDEmailProcessingData(
+    AsyncCRUDBase[
+        EmailProcessingData, EmailProcessingDataCreate, EmailProcessingDataUpdate
+    ]
+):
+    """Async CRUD operations for Email Processing Data"""
+
+    def _create_values(self, obj_in: EmailProcessingDataCreate) -> Dict[str, Any]:
+        values = obj_in.dict()
+        values["timestamp"] = obj_in.timestamp or datetime.utcnow()
+        return values
+
+    async def get_by_agent(
+        self, db: AsyncSession, agent_name: str, limit: int = 100
+    ) -> List[EmailProcessingData]:
+        """Get the newest email processing data for an agent"""
+        result = await db.scalars(
+            select(EmailProcessingData)
+            .filter(EmailProcessingData.agent_name == agent_name)
+            .order_by(desc(EmailProcessingData.timestamp))
+            .limit(limit)
+        )
+        return list(result.all())
 
 
 email_processing_data = CRUDEmailProcessingData()
+async_email_processing_data = AsyncCRUDEmailProcessingData(
+    EmailProcessingData,
+    rollup=email_processing_rollup,
+    sketches=email_processing_sketches,
+    distinct=email_processing_distinct,
+    fingerprints=email_processing_fingerprints,
+    window=email_processing_window,
+)
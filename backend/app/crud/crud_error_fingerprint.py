@@ -0,0 +1,491 @@
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, delete, func, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime
+
+from app.crud.crud_telemetry_rollup import _value, ceil_hour, floor_hour
+from app.models.email_processing_data import EmailProcessingData
+from app.models.error_fingerprint import ErrorFingerprint, ErrorFingerprintHourlyCount
+from app.models.spam_handler_data import SpamHandlerData
+from app.utils.error_fingerprint import (
+    MAX_TEMPLATE_LENGTH,
+    error_template,
+    template_fingerprint,
+)
+
+# Raw rows read per round trip when rebuilding counts
+REBUILD_CHUNK_SIZE = 5000
+
+COUNT_KEY_COLUMNS = ("source", "fingerprint", "bucket_start", "agent_name")
+
+
+def _set_value(row: Any, name: str, value: Any) -> None:
+    if isinstance(row, dict):
+        row[name] = value
+    else:
+        setattr(row, name, value)
+
+
+class CRUDErrorFingerprint:
+    """
+    Error fingerprints of a telemetry table and their hourly counts per agent.
+
+    ``assign`` stamps the fingerprint of each error's template on the raw row
+    before it is written; ``apply`` registers new templates and adds the rows
+    to the hourly counts inside the caller's transaction, like the rollups.
+    ``counts`` answers whole hours from the count table and reads raw rows
+    only for the partial hours at the edges of a window.
+    """
+
+    def __init__(self, source: str, source_model):
+        self.source = source
+        self.source_model = source_model
+
+    def assign(self, rows: Iterable[Any]) -> None:
+        """Set error_fingerprint on rows about to be inserted or updated"""
+        for row in rows:
+            fingerprint = None
+            details = _value(row, "error_details")
+            if _value(row, "error_occurred") and details and details.strip():
+                fingerprint = template_fingerprint(error_template(details))
+            _set_value(row, "error_fingerprint", fingerprint)
+
+    # ------------------------------------------------------------------ writes
+
+    def apply(self, db: Session, rows: Iterable[Any], *, sign: int = 1) -> None:
+        """
+        Add (or with ``sign=-1`` subtract) fingerprinted rows in the hourly
+        counts. Does not commit. Templates and their first and last sightings
+        are only ever extended, so a fingerprint stays known after its errors
+        are deleted.
+        """
+        deltas: Dict[Tuple, int] = {}
+        seen: Dict[str, Dict[str, Any]] = {}
+        now = datetime.utcnow()
+        for row in rows:
+            fingerprint = _value(row, "error_fingerprint")
+            if not fingerprint or not _value(row, "error_occurred"):
+                continue
+            timestamp = _value(row, "timestamp")
+            key = (fingerprint, floor_hour(timestamp), _value(row, "agent_name"))
+            deltas[key] = deltas.get(key, 0) + sign
+            if sign < 0:
+                continue
+            sighting = seen.get(fingerprint)
+            if sighting is None:
+                details = _value(row, "error_details")
+                seen[fingerprint] = {
+                    "fingerprint": fingerprint,
+                    "template": error_template(details)[:MAX_TEMPLATE_LENGTH],
+                    "example": details,
+                    "first_seen": timestamp,
+                    "last_seen": timestamp,
+                    "created_at": now,
+                }
+            else:
+                sighting["first_seen"] = min(sighting["first_seen"], timestamp)
+                sighting["last_seen"] = max(sighting["last_seen"], timestamp)
+
+        if seen:
+            self._upsert_fingerprints(db, [seen[key] for key in sorted(seen)])
+        if deltas:
+            self._upsert_counts(
+                db,
+                [
+                    {
+                        "source": self.source,
+                        "fingerprint": fingerprint,
+                        "bucket_start": hour,
+                        "agent_name": agent_name,
+                        "error_count": delta,
+                        "updated_at": now,
+                    }
+                    for (fingerprint, hour, agent_name), delta in sorted(
+                        deltas.items()
+                    )
+                    if delta
+                ],
+            )
+
+    def _upsert_fingerprints(self, db: Session, values: List[Dict[str, Any]]) -> None:
+        dialect_name = db.get_bind().dialect.name
+        table = ErrorFingerprint.__table__
+
+        if dialect_name == "sqlite":
+            stmt = sqlite_insert(table).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["fingerprint"],
+                set_={
+                    # Two-argument min() and max() are scalar in SQLite
+                    "first_seen": func.min(
+                        table.c.first_seen, stmt.excluded.first_seen
+                    ),
+                    "last_seen": func.max(table.c.last_seen, stmt.excluded.last_seen),
+                },
+            )
+            db.execute(stmt)
+        elif dialect_name == "mysql":
+            stmt = mysql_insert(table).values(values)
+            stmt = stmt.on_duplicate_key_update(
+                {
+                    "first_seen": func.least(
+                        table.c.first_seen, stmt.inserted.first_seen
+                    ),
+                    "last_seen": func.greatest(
+                        table.c.last_seen, stmt.inserted.last_seen
+                    ),
+                }
+            )
+            db.execute(stmt)
+        else:
+            for value in values:
+                existing = (
+                    db.query(ErrorFingerprint)
+                    .filter(ErrorFingerprint.fingerprint == value["fingerprint"])
+                    .first()
+                )
+                if existing:
+                    existing.first_seen = min(existing.first_seen, value["first_seen"])
+                    existing.last_seen = max(existing.last_seen, value["last_seen"])
+                else:
+                    db.add(ErrorFingerprint(**value))
+            db.flush()
+
+    def _upsert_counts(self, db: Session, values: List[Dict[str, Any]]) -> None:
+        if not values:
+            return
+        dialect_name = db.get_bind().dialect.name
+        table = ErrorFingerprintHourlyCount.__table__
+
+        if dialect_name == "sqlite":
+            stmt = sqlite_insert(table).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(COUNT_KEY_COLUMNS),
+                set_={
+                    "error_count": table.c.error_count + stmt.excluded.error_count,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            db.execute(stmt)
+        elif dialect_name == "mysql":
+            stmt = mysql_insert(table).values(values)
+            stmt = stmt.on_duplicate_key_update(
+                {
+                    "error_count": table.c.error_count + stmt.inserted.error_count,
+                    "updated_at": stmt.inserted.updated_at,
+                }
+            )
+            db.execute(stmt)
+        else:
+            model = ErrorFingerprintHourlyCount
+            for value in values:
+                existing = (
+                    db.query(model)
+                    .filter(
+                        *[
+                            getattr(model, column) == value[column]
+                            for column in COUNT_KEY_COLUMNS
+                        ]
+                    )
+                    .first()
+                )
+                if existing:
+                    existing.error_count += value["error_count"]
+                    existing.updated_at = value["updated_at"]
+                else:
+                    db.add(model(**value))
+            db.flush()
+
+    def _raw_columns(self) -> List[Any]:
+        return [
+            getattr(self.source_model, column)
+            for column in (
+                "agent_name",
+                "timestamp",
+                "error_occurred",
+                "error_details",
+                "error_fingerprint",
+            )
+        ]
+
+    def retract(self, db: Session, *, ids: List[int]) -> None:
+        """Subtract raw rows about to be deleted by id"""
+        rows = db.execute(
+            select(*self._raw_columns()).where(
+                self.source_model.id.in_(ids),
+                self.source_model.error_fingerprint.isnot(None),
+            )
+        ).all()
+        self.apply(db, [row._mapping for row in rows], sign=-1)
+
+    def rebuild(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> None:
+        """
+        Recompute counts from raw rows for whole hours in [start_date, end_date),
+        fingerprinting errors written before fingerprints existed on the way.
+        Hours already purged by retention lose their counts.
+        """
+        start_date = floor_hour(start_date) if start_date else None
+        end_date = ceil_hour(end_date) if end_date else None
+        model = ErrorFingerprintHourlyCount
+
+        count_conditions = [model.source == self.source]
+        source_conditions = [self.source_model.error_occurred == True]
+        if start_date:
+            count_conditions.append(model.bucket_start >= start_date)
+            source_conditions.append(self.source_model.timestamp >= start_date)
+        if end_date:
+            count_conditions.append(model.bucket_start < end_date)
+            source_conditions.append(self.source_model.timestamp < end_date)
+
+        db.execute(delete(model).where(and_(*count_conditions)))
+
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(self.source_model.id, *self._raw_columns())
+                .where(self.source_model.id > last_id, *source_conditions)
+                .order_by(self.source_model.id)
+                .limit(REBUILD_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                break
+            values = [dict(row._mapping) for row in rows]
+            missing = [value for value in values if not value["error_fingerprint"]]
+            self.assign(missing)
+            missing = [value for value in missing if value["error_fingerprint"]]
+            if missing:
+                db.execute(
+                    update(self.source_model),
+                    [
+                        {
+                            "id": value["id"],
+                            "error_fingerprint": value["error_fingerprint"],
+                        }
+                        for value in missing
+                    ],
+                )
+            self.apply(db, values)
+            last_id = rows[-1].id
+        db.commit()
+
+    def ensure_backfilled(self, db: Session) -> bool:
+        """Fingerprint and count historical errors the first time none are counted"""
+        has_counts = (
+            db.query(ErrorFingerprintHourlyCount.id)
+            .filter(ErrorFingerprintHourlyCount.source == self.source)
+            .first()
+            is not None
+        )
+        has_errors = (
+            db.query(self.source_model.id)
+            .filter(self.source_model.error_occurred == True)
+            .first()
+            is not None
+        )
+        if has_counts or not has_errors:
+            return False
+        self.rebuild(db)
+        return True
+
+    # ------------------------------------------------------------------- reads
+
+    def counts(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        agent_name: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """
+        Errors per fingerprint for start_date <= timestamp <= end_date. The
+        agent filter matches substrings, like the raw table filters do.
+        """
+        model = ErrorFingerprintHourlyCount
+        results: Dict[str, int] = {}
+
+        # Whole hours come from the count table
+        counts_start = ceil_hour(start_date) if start_date else None
+        counts_end = floor_hour(end_date) if end_date else None
+        raw_ranges: List[Tuple[datetime, Optional[datetime], bool]] = []
+
+        if counts_start and counts_end and counts_start > counts_end:
+            # Window sits inside a single hour
+            raw_ranges.append((start_date, end_date, True))
+        else:
+            conditions = [model.source == self.source]
+            if agent_name:
+                conditions.append(model.agent_name.ilike(f"%{agent_name}%"))
+            if counts_start:
+                conditions.append(model.bucket_start >= counts_start)
+            if counts_end:
+                conditions.append(model.bucket_start < counts_end)
+            rows = db.execute(
+                select(model.fingerprint, func.sum(model.error_count))
+                .where(*conditions)
+                .group_by(model.fingerprint)
+            ).all()
+            for fingerprint, error_count in rows:
+                results[fingerprint] = int(error_count or 0)
+
+            # Partial hours at the edges come from raw rows
+            if start_date and counts_start > start_date:
+                raw_ranges.append((start_date, counts_start, False))
+            if end_date:
+                raw_ranges.append((counts_end, end_date, True))
+
+        fingerprint_column = self.source_model.error_fingerprint
+        for range_start, range_end, inclusive_end in raw_ranges:
+            conditions = [
+                self.source_model.error_occurred == True,
+                fingerprint_column.isnot(None),
+                self.source_model.timestamp >= range_start,
+            ]
+            if inclusive_end:
+                conditions.append(self.source_model.timestamp <= range_end)
+            else:
+                conditions.append(self.source_model.timestamp < range_end)
+            if agent_name:
+                conditions.append(
+                    self.source_model.agent_name.ilike(f"%{agent_name}%")
+                )
+            rows = db.execute(
+                select(fingerprint_column, func.count(self.source_model.id))
+                .where(*conditions)
+                .group_by(fingerprint_column)
+            ).all()
+            for fingerprint, error_count in rows:
+                results[fingerprint] = results.get(fingerprint, 0) + error_count
+
+        return {key: value for key, value in results.items() if value > 0}
+
+
+class CRUDErrorPatterns:
+    """Error patterns across the fingerprinted telemetry tables"""
+
+    def __init__(self, indexes: List[CRUDErrorFingerprint]):
+        self.indexes = {index.source: index for index in indexes}
+
+    def _describe(self, db: Session, fingerprints: List[str]) -> Dict[str, Any]:
+        if not fingerprints:
+            return {}
+        return {
+            row.fingerprint: row
+            for row in db.scalars(
+                select(ErrorFingerprint).where(
+                    ErrorFingerprint.fingerprint.in_(fingerprints)
+                )
+            )
+        }
+
+    def top(
+        self,
+        db: Session,
+        *,
+        limit: int = 5,
+        sources: Optional[List[str]] = None,
+        **window,
+    ) -> List[Dict[str, Any]]:
+        """
+        The most frequent error templates in a window, most frequent first,
+        with their count in each source. Accepts the window and agent filter
+        of ``CRUDErrorFingerprint.counts``.
+        """
+        totals: Dict[str, int] = {}
+        by_source: Dict[str, Dict[str, int]] = {}
+        for source in sources or list(self.indexes):
+            for fingerprint, count in self.indexes[source].counts(db, **window).items():
+                totals[fingerprint] = totals.get(fingerprint, 0) + count
+                by_source.setdefault(fingerprint, {})[source] = count
+
+        top = sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        described = self._describe(db, [fingerprint for fingerprint, _ in top])
+        return [
+            {
+                "fingerprint": fingerprint,
+                "template": described[fingerprint].template,
+                "example": described[fingerprint].example,
+                "count": count,
+                "by_source": by_source[fingerprint],
+                "first_seen": described[fingerprint].first_seen,
+                "last_seen": described[fingerprint].last_seen,
+            }
+            for fingerprint, count in top
+            if fingerprint in described
+        ]
+
+    def new(
+        self,
+        db: Session,
+        *,
+        start_date: datetime,
+        end_date: Optional[datetime] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Error templates first seen anywhere in the fleet within the window,
+        earliest first, with how many errors and agents they have had since
+        """
+        conditions = [ErrorFingerprint.first_seen >= start_date]
+        if end_date:
+            conditions.append(ErrorFingerprint.first_seen <= end_date)
+        fingerprints = list(
+            db.scalars(
+                select(ErrorFingerprint)
+                .where(*conditions)
+                .order_by(ErrorFingerprint.first_seen, ErrorFingerprint.id)
+                .limit(limit)
+            )
+        )
+        if not fingerprints:
+            return []
+
+        model = ErrorFingerprintHourlyCount
+        spread = {
+            fingerprint: (int(error_count or 0), agent_count)
+            for fingerprint, error_count, agent_count in db.execute(
+                select(
+                    model.fingerprint,
+                    func.sum(model.error_count),
+                    func.count(
+                        func.distinct(
+                            case((model.error_count > 0, model.agent_name))
+                        )
+                    ),
+                )
+                .where(
+                    model.fingerprint.in_([row.fingerprint for row in fingerprints]),
+                    model.bucket_start >= floor_hour(start_date),
+                )
+                .group_by(model.fingerprint)
+            )
+        }
+        return [
+            {
+                "fingerprint": row.fingerprint,
+                "template": row.template,
+                "example": row.example,
+                "first_seen": row.first_seen,
+                "last_seen": row.last_seen,
+                "error_count": spread.get(row.fingerprint, (0, 0))[0],
+                "agent_count": spread.get(row.fingerprint, (0, 0))[1],
+            }
+            for row in fingerprints
+        ]
+
+
+email_processing_fingerprints = CRUDErrorFingerprint(
+    "email_processing", EmailProcessingData
+)
+spam_handler_fingerprints = CRUDErrorFingerprint("spam_handler", SpamHandlerData)
+error_patterns = CRUDErrorPatterns(
+    [spam_handler_fingerprints, email_processing_fingerprints]
+)
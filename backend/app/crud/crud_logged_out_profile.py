@@ -1,10 +1,13 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import and_, desc
 from datetime import datetime, timedelta
 import math
 
 from app.models.logged_out_profile import LoggedOutProfile
+from app.db.bulk_insert import bulk_insert
+from app.db.search_index import search_condition
+from app.utils.pagination import paginate
 from app.schemas.logged_out_profile import (
     LoggedOutProfileCreate,
     LoggedOutProfileUpdate,
@@ -28,23 +31,43 @@ class CRUDLoggedOutProfile:
         db.refresh(db_obj)
         return db_obj
 
+    def bulk_create(
+        self,
+        db: Session,
+        *,
+        objs_in: List[LoggedOutProfileCreate],
+        return_rows: bool = True,
+    ) -> List[LoggedOutProfile]:
+        """Create several logged out profile records in one transaction"""
+        timestamp = datetime.utcnow()
+        rows = [
+            {
+                "agent_name": obj_in.agent_name,
+                "profile_name": obj_in.profile_name,
+                "timestamp": timestamp,
+            }
+            for obj_in in objs_in
+        ]
+        db_objs = bulk_insert(db, LoggedOutProfile, rows, return_rows=return_rows)
+        if rows:
+            db.commit()
+        return db_objs
+
     def get(self, db: Session, id: int) -> Optional[LoggedOutProfile]:
         """Get a logged out profile by ID"""
         return db.query(LoggedOutProfile).filter(LoggedOutProfile.id == id).first()
 
-    def get_multi(
+    def _filtered_query(
         self,
         db: Session,
         *,
-        skip: int = 0,
-        limit: Optional[int] = 100,
         agent_name: Optional[str] = None,
         profile_name: Optional[str] = None,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
         search: Optional[str] = None,
-    ) -> tuple[List[LoggedOutProfile], int]:
-        """Get multiple logged out profiles with filtering and pagination"""
+    ) -> Query:
+        """Build the filtered query shared by the listing methods"""
         query = db.query(LoggedOutProfile)
 
         # Apply filters
@@ -63,12 +86,31 @@ class CRUDLoggedOutProfile:
             query = query.filter(LoggedOutProfile.timestamp <= date_to)
 
         if search:
-            query = query.filter(
-                or_(
-                    LoggedOutProfile.agent_name.ilike(f"%{search}%"),
-                    LoggedOutProfile.profile_name.ilike(f"%{search}%"),
-                )
-            )
+            query = query.filter(search_condition(db, LoggedOutProfile, search))
+
+        return query
+
+    def get_multi(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        search: Optional[str] = None,
+    ) -> tuple[List[LoggedOutProfile], int]:
+        """Get multiple logged out profiles with filtering and pagination"""
+        query = self._filtered_query(
+            db,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            date_from=date_from,
+            date_to=date_to,
+            search=search,
+        )
 
         # Get total count before pagination
         total = query.count()
@@ -76,16 +118,61 @@ class CRUDLoggedOutProfile:
         # Apply pagination and ordering (newest first)
         if limit is not None:
             items = (
-                query.order_by(desc(LoggedOutProfile.timestamp))
+                query.order_by(
+                    desc(LoggedOutProfile.timestamp), desc(LoggedOutProfile.id)
+                )
                 .offset(skip)
                 .limit(limit)
                 .all()
             )
         else:
-            items = query.order_by(desc(LoggedOutProfile.timestamp)).offset(skip).all()
+            items = (
+                query.order_by(
+                    desc(LoggedOutProfile.timestamp), desc(LoggedOutProfile.id)
+                )
+                .offset(skip)
+                .all()
+            )
 
         return items, total
 
+    def get_page(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> Tuple[List[LoggedOutProfile], Optional[int], Optional[str]]:
+        """
+        Get a page of logged out profiles, newest first.
+        Uses the keyset cursor when one is given; total is None unless requested.
+        Returns (items, total, next_cursor).
+        """
+        query = self._filtered_query(
+            db,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            date_from=date_from,
+            date_to=date_to,
+            search=search,
+        )
+        return paginate(
+            query,
+            sort_column=LoggedOutProfile.timestamp,
+            id_column=LoggedOutProfile.id,
+            limit=limit,
+            skip=skip,
+            cursor=cursor,
+            include_total=include_total,
+        )
+
     def update(
         self, db: Session, *, db_obj: LoggedOutProfile, obj_in: LoggedOutProfileUpdate
     ) -> LoggedOutProfile:
@@ -1,8 +1,15 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, desc, select
+from datetime import datetime
 
+from app.crud.base import AsyncCRUDBase
+from app.crud.crud_distinct_sketch import proxy_error_distinct
 from app.models.proxy_error import ProxyError
+from app.db.bulk_insert import bulk_insert
+from app.db.search_index import search_condition
+from app.utils.pagination import paginate
 from app.schemas.proxy_error import ProxyErrorCreate, ProxyErrorUpdate
 
 
@@ -18,26 +25,48 @@ class CRUDProxyError:
             profile_name=obj_in.profile_name,
         )
         db.add(db_obj)
+        proxy_error_distinct.apply(db, [db_obj])
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
+    def bulk_create(
+        self,
+        db: Session,
+        *,
+        objs_in: List[ProxyErrorCreate],
+        return_rows: bool = True,
+    ) -> List[ProxyError]:
+        """Create several proxy error records in one transaction"""
+        rows = [
+            {
+                "agent_name": obj_in.agent_name,
+                "proxy": obj_in.proxy,
+                "error_details": obj_in.error_details,
+                "profile_name": obj_in.profile_name,
+            }
+            for obj_in in objs_in
+        ]
+        db_objs = bulk_insert(db, ProxyError, rows, return_rows=return_rows)
+        if rows:
+            proxy_error_distinct.apply(db, rows)
+            db.commit()
+        return db_objs
+
     def get(self, db: Session, id: int) -> Optional[ProxyError]:
         """Get a proxy error by ID"""
         return db.query(ProxyError).filter(ProxyError.id == id).first()
 
-    def get_multi(
+    def _filtered_query(
         self,
         db: Session,
         *,
-        skip: int = 0,
-        limit: int = 100,
         agent_name: Optional[str] = None,
         proxy: Optional[str] = None,
         profile_name: Optional[str] = None,
         search: Optional[str] = None,
-    ) -> tuple[List[ProxyError], int]:
-        """Get multiple proxy errors with filtering and pagination"""
+    ) -> Query:
+        """Build the filtered query shared by the listing methods"""
         query = db.query(ProxyError)
 
         # Apply filters
@@ -51,25 +80,78 @@ class CRUDProxyError:
             query = query.filter(ProxyError.profile_name.ilike(f"%{profile_name}%"))
 
         if search:
-            query = query.filter(
-                or_(
-                    ProxyError.agent_name.ilike(f"%{search}%"),
-                    ProxyError.proxy.ilike(f"%{search}%"),
-                    ProxyError.profile_name.ilike(f"%{search}%"),
-                    ProxyError.error_details.ilike(f"%{search}%"),
-                )
-            )
+            query = query.filter(search_condition(db, ProxyError, search))
+
+        return query
+
+    def get_multi(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        agent_name: Optional[str] = None,
+        proxy: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> tuple[List[ProxyError], int]:
+        """Get multiple proxy errors with filtering and pagination"""
+        query = self._filtered_query(
+            db,
+            agent_name=agent_name,
+            proxy=proxy,
+            profile_name=profile_name,
+            search=search,
+        )
 
         # Get total count before pagination
         total = query.count()
 
         # Apply pagination and ordering (newest first)
         items = (
-            query.order_by(desc(ProxyError.created_at)).offset(skip).limit(limit).all()
+            query.order_by(desc(ProxyError.created_at), desc(ProxyError.id))
+            .offset(skip)
+            .limit(limit)
+            .all()
         )
 
         return items, total
 
+    def get_page(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        agent_name: Optional[str] = None,
+        proxy: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> Tuple[List[ProxyError], Optional[int], Optional[str]]:
+        """
+        Get a page of proxy errors, newest first.
+        Uses the keyset cursor when one is given; total is None unless requested.
+        Returns (items, total, next_cursor).
+        """
+        query = self._filtered_query(
+            db,
+            agent_name=agent_name,
+            proxy=proxy,
+            profile_name=profile_name,
+            search=search,
+        )
+        return paginate(
+            query,
+            sort_column=ProxyError.created_at,
+            id_column=ProxyError.id,
+            limit=limit,
+            skip=skip,
+            cursor=cursor,
+            include_total=include_total,
+        )
+
     def update(
         self, db: Session, *, db_obj: ProxyError, obj_in: ProxyErrorUpdate
     ) -> ProxyError:
@@ -152,5 +234,37 @@ class CRUDProxyError:
             .all()
         ]
 
+    def get_unique_counts(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, int]:
+        """
+        Estimated number of distinct agents, proxies and profiles with errors
+        in the window, from the hourly distinct sketches
+        """
+        return proxy_error_distinct.count(db, start_date=start_date, end_date=end_date)
+
+
+class AsyncCRUDProxyError(
+    AsyncCRUDBase[ProxyError, ProxyErrorCreate, ProxyErrorUpdate]
+):
+    """Async CRUD operations for Proxy Error"""
+
+    async def get_by_agent(
+        self, db: AsyncSession, agent_name: str, limit: int = 100
+    ) -> List[ProxyError]:
+        """Get the newest proxy errors for an agent"""
+        result = await db.scalars(
+            select(ProxyError)
+            .filter(ProxyError.agent_name == agent_name)
+            .order_by(desc(ProxyError.created_at))
+            .limit(limit)
+        )
+        return list(result.all())
+
 
 proxy_error = CRUDProxyError()
+async_proxy_error = AsyncCRUDProxyError(ProxyError, distinct=proxy_error_distinct)
@@ -2,6 +2,10 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
+from app.core.config import settings
+from app.core.config_cache import automation_config_cache
+from app.core.url_sampler import random_url_sampler
+from app.db.bulk_insert import bulk_insert, chunked
 from app.models.random_url import RandomUrl
 from app.schemas.random_url import RandomUrlCreate, RandomUrlUpdate
 
@@ -16,9 +20,11 @@ class CRUDRandomUrl:
             description=obj_in.description,
             category=obj_in.category,
             is_active=obj_in.is_active,
+            weight=obj_in.weight,
         )
         db.add(db_obj)
         db.commit()
+        automation_config_cache.bump()
         db.refresh(db_obj)
         return db_obj
 
@@ -106,6 +112,7 @@ class CRUDRandomUrl:
 
         db.add(db_obj)
         db.commit()
+        automation_config_cache.bump()
         db.refresh(db_obj)
         return db_obj
 
@@ -115,31 +122,38 @@ class CRUDRandomUrl:
         if obj:
             db.delete(obj)
             db.commit()
+            automation_config_cache.bump()
         return obj
 
     def bulk_create(
         self, db: Session, *, objs_in: List[RandomUrlCreate]
     ) -> List[RandomUrl]:
-        """Bulk create random URLs"""
-        db_objs = []
+        """
+        Bulk create random URLs, skipping URLs that already exist or repeat
+        within the payload. Existing URLs are found with one IN query per chunk.
+        """
+        rows_by_url = {}
         for obj_in in objs_in:
-            # Check if URL already exists
-            existing = self.get_by_url(db, str(obj_in.url))
-            if not existing:
-                db_obj = RandomUrl(
-                    url=str(obj_in.url),
-                    description=obj_in.description,
-                    category=obj_in.category,
-                    is_active=obj_in.is_active,
-                )
-                db_objs.append(db_obj)
-
-        if db_objs:
-            db.add_all(db_objs)
+            url = str(obj_in.url)
+            if url not in rows_by_url:
+                rows_by_url[url] = {
+                    "url": url,
+                    "description": obj_in.description,
+                    "category": obj_in.category,
+                    "is_active": obj_in.is_active,
+                    "weight": obj_in.weight,
+                }
+
+        existing = set()
+        for urls in chunked(list(rows_by_url), settings.BULK_INSERT_CHUNK_SIZE):
+            query = db.query(RandomUrl.url).filter(RandomUrl.url.in_(urls))
+            existing.update(url for (url,) in query)
+
+        rows = [row for url, row in rows_by_url.items() if url not in existing]
+        db_objs = bulk_insert(db, RandomUrl, rows)
+        if rows:
             db.commit()
-            for obj in db_objs:
-                db.refresh(obj)
-
+            automation_config_cache.bump()
         return db_objs
 
     def bulk_delete(self, db: Session, *, ids: List[int]) -> int:
@@ -150,18 +164,21 @@ class CRUDRandomUrl:
             .delete(synchronize_session=False)
         )
         db.commit()
+        automation_config_cache.bump()
         return deleted_count
 
     def activate_all(self, db: Session) -> int:
         """Activate all random URLs"""
         updated_count = db.query(RandomUrl).update({"is_active": True})
         db.commit()
+        automation_config_cache.bump()
         return updated_count
 
     def deactivate_all(self, db: Session) -> int:
         """Deactivate all random URLs"""
         updated_count = db.query(RandomUrl).update({"is_active": False})
         db.commit()
+        automation_config_cache.bump()
         return updated_count
 
     def get_urls_list(
@@ -178,15 +195,8 @@ class CRUDRandomUrl:
     def get_random_urls(
         self, db: Session, *, limit: int = 10, category: Optional[str] = None
     ) -> List[RandomUrl]:
-        """Get random URLs (shuffled)"""
-        from sqlalchemy import func
-
-        query = db.query(RandomUrl).filter(RandomUrl.is_active == True)
-        if category:
-            query = query.filter(RandomUrl.category == category.lower())
-
-        # Use database random function (for SQLite use RANDOM())
-        return query.order_by(func.random()).limit(limit).all()
+        """Get distinct random active URLs, weighted, from the in-memory sampler"""
+        return random_url_sampler.sample(db, limit=limit, category=category)
 
 
 random_url = CRUDRandomUrl()
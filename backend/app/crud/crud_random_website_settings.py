@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 import json
 
+from app.core.config_cache import automation_config_cache
 from app.models.random_website_settings import RandomWebsiteSettings
 from app.schemas.random_website_settings import (
     RandomWebsiteSettingsCreate,
@@ -26,6 +27,7 @@ class CRUDRandomWebsiteSettings:
         )
         db.add(db_obj)
         db.commit()
+        automation_config_cache.bump()
         db.refresh(db_obj)
         return db_obj
 
@@ -107,6 +109,7 @@ class CRUDRandomWebsiteSettings:
 
         db.add(db_obj)
         db.commit()
+        automation_config_cache.bump()
         db.refresh(db_obj)
         return db_obj
 
@@ -119,6 +122,7 @@ class CRUDRandomWebsiteSettings:
             db_obj.setting_value = setting_value
             db.add(db_obj)
             db.commit()
+            automation_config_cache.bump()
             db.refresh(db_obj)
         return db_obj
 
@@ -128,6 +132,7 @@ class CRUDRandomWebsiteSettings:
         if obj:
             db.delete(obj)
             db.commit()
+            automation_config_cache.bump()
         return obj
 
     def get_config_dict(self, db: Session) -> Dict[str, Any]:
@@ -194,6 +199,7 @@ class CRUDRandomWebsiteSettings:
                 updated_settings.append(new_setting)
 
         db.commit()
+        automation_config_cache.bump()
         for setting in updated_settings:
             db.refresh(setting)
 
@@ -264,6 +270,7 @@ class CRUDRandomWebsiteSettings:
 
         if created_settings:
             db.commit()
+            automation_config_cache.bump()
             for setting in created_settings:
                 db.refresh(setting)
 
@@ -1,15 +1,41 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc
+from typing import List, Optional, Tuple, Dict, Any, Iterator
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, func, desc, case, literal, select, union_all
 from datetime import datetime, timedelta
 
+from app.core.window_cache import spam_handler_window
+from app.crud.base import AsyncCRUDBase
+from app.crud.crud_telemetry_rollup import spam_handler_rollup
+from app.crud.crud_distinct_sketch import spam_handler_distinct
+from app.crud.crud_error_fingerprint import spam_handler_fingerprints
+from app.crud.crud_topk_sketch import spam_handler_sketches
 from app.models.spam_handler_data import SpamHandlerData
+from app.db.bulk_insert import bulk_insert
+from app.db.search_index import search_condition
+from app.utils.pagination import paginate
 from app.schemas.spam_handler_data import SpamHandlerDataCreate, SpamHandlerDataUpdate
 
 
 class CRUDSpamHandlerData:
     """CRUD operations for Spam Handler Data"""
 
+    # Columns written by exports, in output order
+    EXPORT_COLUMNS = [
+        "id",
+        "agent_name",
+        "profile_name",
+        "sender_email",
+        "spam_emails_found",
+        "moved_to_inbox",
+        "total_time_seconds",
+        "error_occurred",
+        "error_details",
+        "spam_email_subjects",
+        "timestamp",
+        "created_at",
+    ]
+
     def create(self, db: Session, *, obj_in: SpamHandlerDataCreate) -> SpamHandlerData:
         """Create a new spam handler data entry"""
         # Set timestamp if not provided
@@ -27,8 +53,14 @@ class CRUDSpamHandlerData:
             timestamp=timestamp,
             spam_email_subjects=obj_in.spam_email_subjects or [],
         )
+        spam_handler_fingerprints.assign([db_obj])
         db.add(db_obj)
+        spam_handler_rollup.apply(db, [db_obj])
+        spam_handler_sketches.apply(db, [db_obj])
+        spam_handler_distinct.apply(db, [db_obj])
+        spam_handler_fingerprints.apply(db, [db_obj])
         db.commit()
+        spam_handler_window.mark_dirty()
         db.refresh(db_obj)
         return db_obj
 
@@ -36,12 +68,10 @@ class CRUDSpamHandlerData:
         """Get a spam handler data entry by ID"""
         return db.query(SpamHandlerData).filter(SpamHandlerData.id == id).first()
 
-    def get_multi(
+    def _filtered_query(
         self,
         db: Session,
         *,
-        skip: int = 0,
-        limit: int = 100,
         agent_name: Optional[str] = None,
         profile_name: Optional[str] = None,
         sender_email: Optional[str] = None,
@@ -49,8 +79,8 @@ class CRUDSpamHandlerData:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         search: Optional[str] = None,
-    ) -> tuple[List[SpamHandlerData], int]:
-        """Get multiple spam handler data entries with filtering and pagination"""
+    ) -> Query:
+        """Build the filtered query shared by the listing methods"""
         query = db.query(SpamHandlerData)
 
         # Apply filters
@@ -77,17 +107,40 @@ class CRUDSpamHandlerData:
             query = query.filter(SpamHandlerData.timestamp <= end_date)
 
         if search:
-            query = query.filter(
-                or_(
-                    SpamHandlerData.agent_name.ilike(f"%{search}%"),
-                    SpamHandlerData.profile_name.ilike(f"%{search}%"),
-                    SpamHandlerData.sender_email.ilike(f"%{search}%"),
-                    SpamHandlerData.error_details.ilike(f"%{search}%"),
-                )
-            )
+            query = query.filter(search_condition(db, SpamHandlerData, search))
+
+        return query
+
+    def get_multi(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        sender_email: Optional[str] = None,
+        error_occurred: Optional[bool] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        search: Optional[str] = None,
+    ) -> tuple[List[SpamHandlerData], int]:
+        """Get multiple spam handler data entries with filtering and pagination"""
+        query = self._filtered_query(
+            db,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            sender_email=sender_email,
+            error_occurred=error_occurred,
+            start_date=start_date,
+            end_date=end_date,
+            search=search,
+        )
 
         # Order by timestamp descending (most recent first)
-        query = query.order_by(desc(SpamHandlerData.timestamp))
+        query = query.order_by(
+            desc(SpamHandlerData.timestamp), desc(SpamHandlerData.id)
+        )
 
         # Get total count before pagination
         total = query.count()
@@ -97,16 +150,110 @@ class CRUDSpamHandlerData:
 
         return items, total
 
+    def get_page(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        sender_email: Optional[str] = None,
+        error_occurred: Optional[bool] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> Tuple[List[SpamHandlerData], Optional[int], Optional[str]]:
+        """
+        Get a page of spam handler data entries, newest first.
+        Uses the keyset cursor when one is given; total is None unless requested.
+        Returns (items, total, next_cursor).
+        """
+        query = self._filtered_query(
+            db,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            sender_email=sender_email,
+            error_occurred=error_occurred,
+            start_date=start_date,
+            end_date=end_date,
+            search=search,
+        )
+        return paginate(
+            query,
+            sort_column=SpamHandlerData.timestamp,
+            id_column=SpamHandlerData.id,
+            limit=limit,
+            skip=skip,
+            cursor=cursor,
+            include_total=include_total,
+        )
+
+    def iter_export_batches(
+        self,
+        db: Session,
+        *,
+        batch_size: int = 5000,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        sender_email: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Iterator[List[Any]]:
+        """
+        Yield filtered spam handler rows for export as batches of column tuples.
+        Batches are fetched by ascending id, so memory stays bounded by batch_size
+        however many rows match.
+        """
+        columns = [getattr(SpamHandlerData, column) for column in self.EXPORT_COLUMNS]
+        query = self._filtered_query(
+            db,
+            agent_name=agent_name,
+            profile_name=profile_name,
+            sender_email=sender_email,
+            start_date=start_date,
+            end_date=end_date,
+        ).with_entities(*columns)
+
+        last_id = 0
+        while True:
+            rows = (
+                query.filter(SpamHandlerData.id > last_id)
+                .order_by(SpamHandlerData.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
     def update(
         self, db: Session, *, db_obj: SpamHandlerData, obj_in: SpamHandlerDataUpdate
     ) -> SpamHandlerData:
         """Update a spam handler data entry"""
         update_data = obj_in.dict(exclude_unset=True)
+        # Move the entry's contribution in the rollups from old to new values
+        previous = {
+            column.key: getattr(db_obj, column.key)
+            for column in SpamHandlerData.__table__.columns
+        }
         for field, value in update_data.items():
             setattr(db_obj, field, value)
+        spam_handler_fingerprints.assign([db_obj])
 
         db.add(db_obj)
+        spam_handler_rollup.apply(db, [previous], sign=-1)
+        spam_handler_sketches.apply(db, [previous], sign=-1)
+        spam_handler_fingerprints.apply(db, [previous], sign=-1)
+        spam_handler_rollup.apply(db, [db_obj])
+        spam_handler_sketches.apply(db, [db_obj])
+        spam_handler_distinct.apply(db, [db_obj])
+        spam_handler_fingerprints.apply(db, [db_obj])
         db.commit()
+        spam_handler_window.invalidate()
         db.refresh(db_obj)
         return db_obj
 
@@ -114,47 +261,66 @@ class CRUDSpamHandlerData:
         """Delete a spam handler data entry"""
         obj = db.query(SpamHandlerData).get(id)
         if obj:
+            spam_handler_rollup.apply(db, [obj], sign=-1)
+            spam_handler_sketches.apply(db, [obj], sign=-1)
+            spam_handler_fingerprints.apply(db, [obj], sign=-1)
             db.delete(obj)
             db.commit()
+            spam_handler_window.invalidate()
         return obj
 
     def bulk_create(
-        self, db: Session, *, objs_in: List[SpamHandlerDataCreate]
+        self,
+        db: Session,
+        *,
+        objs_in: List[SpamHandlerDataCreate],
+        return_rows: bool = True,
     ) -> List[SpamHandlerData]:
-        """Bulk create spam handler data entries"""
-        db_objs = []
-        for obj_in in objs_in:
-            timestamp = obj_in.timestamp or datetime.utcnow()
-            db_obj = SpamHandlerData(
-                agent_name=obj_in.agent_name,
-                profile_name=obj_in.profile_name,
-                sender_email=obj_in.sender_email,
-                spam_emails_found=obj_in.spam_emails_found,
-                moved_to_inbox=obj_in.moved_to_inbox,
-                total_time_seconds=obj_in.total_time_seconds,
-                error_occurred=obj_in.error_occurred,
-                error_details=obj_in.error_details,
-                timestamp=timestamp,
-                spam_email_subjects=obj_in.spam_email_subjects or [],
-            )
-            db_objs.append(db_obj)
-
-        if db_objs:
-            db.add_all(db_objs)
-            db.commit()
-            for obj in db_objs:
-                db.refresh(obj)
-
+        """
+        Bulk create spam handler data entries with one INSERT per chunk.
+        Pass ``return_rows=False`` when the inserted rows are not needed.
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                "agent_name": obj_in.agent_name,
+                "profile_name": obj_in.profile_name,
+                "sender_email": obj_in.sender_email,
+                "spam_emails_found": obj_in.spam_emails_found,
+                "moved_to_inbox": obj_in.moved_to_inbox,
+                "total_time_seconds": obj_in.total_time_seconds,
+                "error_occurred": obj_in.error_occurred,
+                "error_details": obj_in.error_details,
+                "timestamp": obj_in.timestamp or now,
+                "spam_email_subjects": obj_in.spam_email_subjects or [],
+            }
+            for obj_in in objs_in
+        ]
+        if not rows:
+            return []
+
+        spam_handler_fingerprints.assign(rows)
+        db_objs = bulk_insert(db, SpamHandlerData, rows, return_rows=return_rows)
+        spam_handler_rollup.apply(db, rows)
+        spam_handler_sketches.apply(db, rows)
+        spam_handler_distinct.apply(db, rows)
+        spam_handler_fingerprints.apply(db, rows)
+        db.commit()
+        spam_handler_window.mark_dirty()
         return db_objs
 
     def bulk_delete(self, db: Session, *, ids: List[int]) -> int:
         """Bulk delete spam handler data entries"""
+        spam_handler_rollup.retract(db, ids=ids)
+        spam_handler_sketches.retract(db, ids=ids)
+        spam_handler_fingerprints.retract(db, ids=ids)
         deleted_count = (
             db.query(SpamHandlerData)
             .filter(SpamHandlerData.id.in_(ids))
             .delete(synchronize_session=False)
         )
         db.commit()
+        spam_handler_window.invalidate()
         return deleted_count
 
     def get_by_agent(
@@ -200,16 +366,34 @@ class CRUDSpamHandlerData:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
     ) -> Dict[str, Any]:
-        """Get spam handler statistics"""
-        query = db.query(SpamHandlerData)
+        """
+        Get spam handler statistics.
 
+        The scalar KPIs come from one conditional aggregation over the window and
+        the three breakdowns from one statement over a shared CTE.
+        """
+        conditions = []
         if start_date:
-            query = query.filter(SpamHandlerData.timestamp >= start_date)
+            conditions.append(SpamHandlerData.timestamp >= start_date)
         if end_date:
-            query = query.filter(SpamHandlerData.timestamp <= end_date)
+            conditions.append(SpamHandlerData.timestamp <= end_date)
 
         # Basic stats
-        total_operations = query.count()
+        kpis = db.execute(
+            select(
+                func.count(SpamHandlerData.id).label("total"),
+                func.sum(SpamHandlerData.spam_emails_found).label("spam_found"),
+                func.sum(SpamHandlerData.moved_to_inbox).label("moved_to_inbox"),
+                func.avg(SpamHandlerData.total_time_seconds).label(
+                    "avg_processing_time"
+                ),
+                func.sum(
+                    case((SpamHandlerData.error_occurred == True, 1), else_=0)
+                ).label("errors"),
+            ).where(and_(True, *conditions))
+        ).one()
+
+        total_operations = kpis.total
         if total_operations == 0:
             return {
                 "total_operations": 0,
@@ -223,85 +407,86 @@ class CRUDSpamHandlerData:
                 "operations_by_profile": [],
             }
 
-        total_spam_found = (
-            query.with_entities(func.sum(SpamHandlerData.spam_emails_found)).scalar()
-            or 0
-        )
-        total_moved_to_inbox = (
-            query.with_entities(func.sum(SpamHandlerData.moved_to_inbox)).scalar() or 0
-        )
-        average_processing_time = (
-            query.with_entities(func.avg(SpamHandlerData.total_time_seconds)).scalar()
-            or 0
-        )
-
-        error_count = query.filter(SpamHandlerData.error_occurred == True).count()
+        error_count = int(kpis.errors or 0)
         success_rate = ((total_operations - error_count) / total_operations) * 100
         error_rate = (error_count / total_operations) * 100
 
-        # Top senders by spam found
-        top_senders = (
-            db.query(
+        # Sender, agent and profile breakdowns over one filtered set
+        filtered = (
+            select(
+                SpamHandlerData.id,
                 SpamHandlerData.sender_email,
-                func.sum(SpamHandlerData.spam_emails_found).label("total_spam"),
-                func.count(SpamHandlerData.id).label("operations"),
-            )
-            .group_by(SpamHandlerData.sender_email)
-            .order_by(desc("total_spam"))
-            .limit(10)
-            .all()
-        )
-
-        # Operations by agent
-        operations_by_agent = (
-            db.query(
                 SpamHandlerData.agent_name,
-                func.count(SpamHandlerData.id).label("operations"),
-                func.sum(SpamHandlerData.spam_emails_found).label("total_spam"),
+                SpamHandlerData.profile_name,
+                SpamHandlerData.spam_emails_found,
             )
-            .group_by(SpamHandlerData.agent_name)
-            .order_by(desc("operations"))
-            .all()
+            .where(and_(True, *conditions))
+            .cte("filtered")
         )
 
-        # Operations by profile
-        operations_by_profile = (
-            db.query(
-                SpamHandlerData.profile_name,
-                func.count(SpamHandlerData.id).label("operations"),
-                func.sum(SpamHandlerData.spam_emails_found).label("total_spam"),
+        def breakdown(kind: str, key, rank_by_spam: bool):
+            operations = func.count(filtered.c.id)
+            total_spam = func.sum(filtered.c.spam_emails_found)
+            return select(
+                literal(kind).label("kind"),
+                key.label("key"),
+                operations.label("operations"),
+                total_spam.label("total_spam"),
+                func.row_number()
+                .over(order_by=desc(total_spam if rank_by_spam else operations))
+                .label("rank"),
+            ).group_by(key)
+
+        breakdowns = union_all(
+            breakdown("sender", filtered.c.sender_email, rank_by_spam=True),
+            breakdown("agent", filtered.c.agent_name, rank_by_spam=False),
+            breakdown("profile", filtered.c.profile_name, rank_by_spam=False),
+        ).subquery()
+
+        grouped: Dict[str, List[Any]] = {"sender": [], "agent": [], "profile": []}
+        rows = db.execute(
+            select(breakdowns)
+            .where(
+                or_(
+                    breakdowns.c.kind.in_(["agent", "profile"]),
+                    breakdowns.c.rank <= 10,
+                )
             )
-            .group_by(SpamHandlerData.profile_name)
-            .order_by(desc("operations"))
-            .all()
-        )
+            .order_by(breakdowns.c.kind, breakdowns.c.rank)
+        ).all()
+        for row in rows:
+            grouped[row.kind].append(row)
 
         return {
             "total_operations": total_operations,
-            "total_spam_found": int(total_spam_found),
-            "total_moved_to_inbox": int(total_moved_to_inbox),
-            "average_processing_time": float(average_processing_time),
+            "total_spam_found": int(kpis.spam_found or 0),
+            "total_moved_to_inbox": int(kpis.moved_to_inbox or 0),
+            "average_processing_time": float(kpis.avg_processing_time or 0),
             "success_rate": float(success_rate),
             "error_rate": float(error_rate),
             "top_senders": [
                 {
-                    "sender_email": sender,
-                    "total_spam": int(spam),
-                    "operations": int(ops),
+                    "sender_email": row.key,
+                    "total_spam": int(row.total_spam),
+                    "operations": int(row.operations),
                 }
-                for sender, spam, ops in top_senders
+                for row in grouped["sender"]
             ],
             "operations_by_agent": [
-                {"agent_name": agent, "operations": int(ops), "total_spam": int(spam)}
-                for agent, ops, spam in operations_by_agent
+                {
+                    "agent_name": row.key,
+                    "operations": int(row.operations),
+                    "total_spam": int(row.total_spam),
+                }
+                for row in grouped["agent"]
             ],
             "operations_by_profile": [
                 {
-                    "profile_name": profile,
-                    "operations": int(ops),
-                    "total_spam": int(spam),
+                    "profile_name": row.key,
+                    "operations": int(row.operations),
+                    "total_spam": int(row.total_spam),
                 }
-                for profile, ops, spam in operations_by_profile
+                for row in grouped["profile"]
             ],
         }
 
@@ -318,16 +503,58 @@ class CRUDSpamHandlerData:
             .all()
         )
 
-    def delete_old_entries(self, db: Session, *, days_old: int = 30) -> int:
-        """Delete entries older than specified days"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days_old)
-        deleted_count = (
-            db.query(SpamHandlerData)
-            .filter(SpamHandlerData.timestamp < cutoff_date)
-            .delete(synchronize_session=False)
+    def get_recent_errors(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        agent_name: Optional[str] = None,
+        limit: int = 10,
+    ) -> List[SpamHandlerData]:
+        """Get the most recent spam handler entries with errors"""
+        query = db.query(SpamHandlerData).filter(SpamHandlerData.error_occurred == True)
+
+        if agent_name:
+            query = query.filter(SpamHandlerData.agent_name.ilike(f"%{agent_name}%"))
+        if start_date:
+            query = query.filter(SpamHandlerData.timestamp >= start_date)
+        if end_date:
+            query = query.filter(SpamHandlerData.timestamp <= end_date)
+
+        return query.order_by(desc(SpamHandlerData.timestamp)).limit(limit).all()
+
+
+class AsyncCRUDSpamHandlerData(
+    AsyncCRUDBase[SpamHandlerData, SpamHandlerDataCreate, SpamHandlerDataUpdate]
+):
+    """Async CRUD operations for Spam Handler Data"""
+
+    def _create_values(self, obj_in: SpamHandlerDataCreate) -> Dict[str, Any]:
+        values = obj_in.dict()
+        values["timestamp"] = obj_in.timestamp or datetime.utcnow()
+        values["spam_email_subjects"] = obj_in.spam_email_subjects or []
+        return values
+
+    async def get_by_agent(
+        self, db: AsyncSession, agent_name: str, limit: int = 100
+    ) -> List[SpamHandlerData]:
+        """Get the newest spam handler data for an agent"""
+        result = await db.scalars(
+            select(SpamHandlerData)
+            .filter(SpamHandlerData.agent_name == agent_name)
+            .order_by(desc(SpamHandlerData.timestamp))
+            .limit(limit)
         )
-        db.commit()
-        return deleted_count
+        return list(result.all())
 
 
 spam_handler_data = CRUDSpamHandlerData()
+async_spam_handler_data = AsyncCRUDSpamHandlerData(
+    SpamHandlerData,
+    rollup=spam_handler_rollup,
+    sketches=spam_handler_sketches,
+    distinct=spam_handler_distinct,
+    fingerprints=spam_handler_fingerprints,
+    window=spam_handler_window,
+)
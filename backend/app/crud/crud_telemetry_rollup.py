@@ -0,0 +1,468 @@
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import Boolean, and_, case, delete, func, insert, literal, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime, timedelta
+
+from app.db.sql_functions import BUCKET_UNITS, truncate_timestamp, truncate_to_hour
+from app.models.email_processing_data import EmailProcessingData
+from app.models.spam_handler_data import SpamHandlerData
+from app.models.telemetry_rollup import (
+    EmailProcessingHourlyRollup,
+    SpamHandlerHourlyRollup,
+)
+
+KEY_COLUMNS = ("bucket_start", "agent_name", "profile_name", "sender_email")
+DIMENSIONS = ("agent_name", "profile_name", "sender_email")
+
+
+def _value(row: Any, name: str) -> Any:
+    """Read a field from an ORM object, a result row or a plain dict"""
+    if isinstance(row, dict):
+        return row.get(name)
+    return getattr(row, name)
+
+
+def floor_hour(value: datetime) -> datetime:
+    """Start of the hour containing value"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value: datetime) -> datetime:
+    """Start of the first hour that begins at or after value"""
+    floored = floor_hour(value)
+    return floored if floored == value else floored + timedelta(hours=1)
+
+
+def floor_bucket(value: datetime, unit: str) -> datetime:
+    """Start of the hour, day or week (from Monday) containing value"""
+    if unit == "hour":
+        return floor_hour(value)
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "day":
+        return day
+    return day - timedelta(days=day.weekday())
+
+
+def next_bucket(value: datetime, unit: str) -> datetime:
+    """Start of the bucket after the one starting at value"""
+    return value + {
+        "hour": timedelta(hours=1),
+        "day": timedelta(days=1),
+        "week": timedelta(weeks=1),
+    }[unit]
+
+
+def _as_datetime(value: Any) -> Any:
+    """Truncated buckets come back as text on SQLite and MySQL; bucket only"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+class CRUDTelemetryRollup:
+    """
+    Hourly rollups of a telemetry table, keyed by hour, agent, profile and sender.
+
+    Rollups are maintained incrementally inside the caller's transaction by
+    ``apply`` and read back by ``aggregate``, which answers whole hours from
+    the rollup table and only scans raw rows for the partial hours at the
+    edges of the requested window.
+    """
+
+    def __init__(self, model, source_model, metrics: Dict[str, Optional[str]]):
+        """
+        ``metrics`` maps rollup columns to source columns. ``None`` counts rows,
+        boolean source columns count true values, anything else is summed.
+        """
+        self.model = model
+        self.source_model = source_model
+        self.metrics = metrics
+
+    def _is_flag(self, source_column: str) -> bool:
+        return isinstance(
+            getattr(self.source_model, source_column).property.columns[0].type,
+            Boolean,
+        )
+
+    def _row_contribution(self, row: Any) -> Dict[str, Any]:
+        contribution = {}
+        for metric, source_column in self.metrics.items():
+            if source_column is None:
+                contribution[metric] = 1
+            elif self._is_flag(source_column):
+                contribution[metric] = 1 if _value(row, source_column) else 0
+            else:
+                contribution[metric] = _value(row, source_column) or 0
+        return contribution
+
+    def _source_aggregates(self) -> List[Any]:
+        """SQL aggregates over the source table, one per rollup metric"""
+        aggregates = []
+        for metric, source_column in self.metrics.items():
+            if source_column is None:
+                expression = func.count(self.source_model.id)
+            else:
+                column = getattr(self.source_model, source_column)
+                if self._is_flag(source_column):
+                    expression = func.sum(case((column == True, 1), else_=0))
+                else:
+                    expression = func.sum(column)
+            aggregates.append(func.coalesce(expression, 0).label(metric))
+        return aggregates
+
+    def apply(self, db: Session, rows: Iterable[Any], *, sign: int = 1) -> None:
+        """
+        Add (or with ``sign=-1`` subtract) the contribution of raw rows to the
+        rollups. Does not commit; runs in the caller's transaction.
+        """
+        deltas: Dict[Tuple, Dict[str, Any]] = {}
+        for row in rows:
+            key = (
+                floor_hour(_value(row, "timestamp")),
+                _value(row, "agent_name"),
+                _value(row, "profile_name") or "",
+                _value(row, "sender_email") or "",
+            )
+            bucket = deltas.setdefault(key, dict.fromkeys(self.metrics, 0))
+            for metric, amount in self._row_contribution(row).items():
+                bucket[metric] += amount * sign
+
+        if not deltas:
+            return
+
+        now = datetime.utcnow()
+        values = [
+            {**dict(zip(KEY_COLUMNS, key)), **metrics, "updated_at": now}
+            for key, metrics in sorted(deltas.items(), key=lambda item: item[0])
+        ]
+        self._upsert(db, values)
+
+    def retract(self, db: Session, *, ids: List[int]) -> None:
+        """Subtract the contribution of raw rows about to be deleted by id"""
+        columns = [*KEY_COLUMNS[1:], "timestamp"] + [
+            column for column in self.metrics.values() if column
+        ]
+        rows = (
+            db.query(*[getattr(self.source_model, column) for column in columns])
+            .filter(self.source_model.id.in_(ids))
+            .all()
+        )
+        self.apply(db, [row._mapping for row in rows], sign=-1)
+
+    def _upsert(self, db: Session, values: List[Dict[str, Any]]) -> None:
+        dialect_name = db.get_bind().dialect.name
+        table = self.model.__table__
+
+        if dialect_name == "sqlite":
+            stmt = sqlite_insert(table).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(KEY_COLUMNS),
+                set_={
+                    **{
+                        metric: table.c[metric] + stmt.excluded[metric]
+                        for metric in self.metrics
+                    },
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            db.execute(stmt)
+        elif dialect_name == "mysql":
+            stmt = mysql_insert(table).values(values)
+            stmt = stmt.on_duplicate_key_update(
+                {
+                    **{
+                        metric: table.c[metric] + stmt.inserted[metric]
+                        for metric in self.metrics
+                    },
+                    "updated_at": stmt.inserted.updated_at,
+                }
+            )
+            db.execute(stmt)
+        else:
+            for value in values:
+                existing = (
+                    db.query(self.model)
+                    .filter(
+                        *[
+                            getattr(self.model, column) == value[column]
+                            for column in KEY_COLUMNS
+                        ]
+                    )
+                    .first()
+                )
+                if existing:
+                    for metric in self.metrics:
+                        setattr(
+                            existing,
+                            metric,
+                            getattr(existing, metric) + value[metric],
+                        )
+                    existing.updated_at = value["updated_at"]
+                else:
+                    db.add(self.model(**value))
+            db.flush()
+
+    def rebuild(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> None:
+        """
+        Recompute rollups from raw rows for whole hours in [start_date, end_date).
+        Used to backfill history and to repair drift. Hours whose raw rows have
+        already been purged by retention lose their history when rebuilt.
+        """
+        start_date = floor_hour(start_date) if start_date else None
+        end_date = ceil_hour(end_date) if end_date else None
+
+        rollup_conditions = []
+        source_conditions = []
+        if start_date:
+            rollup_conditions.append(self.model.bucket_start >= start_date)
+            source_conditions.append(self.source_model.timestamp >= start_date)
+        if end_date:
+            rollup_conditions.append(self.model.bucket_start < end_date)
+            source_conditions.append(self.source_model.timestamp < end_date)
+
+        db.execute(delete(self.model).where(and_(True, *rollup_conditions)))
+
+        bucket = truncate_to_hour(
+            self.source_model.timestamp, db.get_bind().dialect.name
+        )
+        source = (
+            select(
+                bucket.label("bucket_start"),
+                *[getattr(self.source_model, column) for column in DIMENSIONS],
+                *self._source_aggregates(),
+                literal(datetime.utcnow()).label("updated_at"),
+            )
+            .where(and_(True, *source_conditions))
+            .group_by(
+                bucket, *[getattr(self.source_model, column) for column in DIMENSIONS]
+            )
+        )
+        db.execute(
+            insert(self.model).from_select(
+                [*KEY_COLUMNS, *self.metrics, "updated_at"], source
+            )
+        )
+        db.commit()
+
+    def ensure_backfilled(self, db: Session) -> bool:
+        """Build rollups from history the first time the rollup table is empty"""
+        has_rollups = db.query(self.model.id).first() is not None
+        has_source_rows = db.query(self.source_model.id).first() is not None
+        if has_rollups or not has_source_rows:
+            return False
+        self.rebuild(db)
+        return True
+
+    def aggregate(
+        self,
+        db: Session,
+        *,
+        group_by: Tuple[str, ...] = (),
+        bucket: str = "hour",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        agent_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        sender_email: Optional[str] = None,
+    ) -> Dict[Tuple, Dict[str, Any]]:
+        """
+        Aggregate metrics for start_date <= timestamp <= end_date, grouped by any
+        of ``bucket_start``, ``agent_name``, ``profile_name``, ``sender_email``.
+        ``bucket_start`` groups by hour, or by day or week when ``bucket`` says
+        so, truncated in SQL. Name filters match substrings, like the raw
+        table filters do. Returns a mapping of group key tuples to metric dicts.
+        """
+        if bucket not in BUCKET_UNITS:
+            raise ValueError(f"Unsupported bucket: {bucket}")
+        filters = {
+            "agent_name": agent_name,
+            "profile_name": profile_name,
+            "sender_email": sender_email,
+        }
+        results: Dict[Tuple, Dict[str, Any]] = {}
+
+        def merge(key: Tuple, metrics: Dict[str, Any]) -> None:
+            bucket = results.setdefault(key, dict.fromkeys(self.metrics, 0))
+            for metric in self.metrics:
+                bucket[metric] += metrics[metric] or 0
+
+        # Whole hours come from the rollup table
+        rollup_start = ceil_hour(start_date) if start_date else None
+        rollup_end = floor_hour(end_date) if end_date else None
+        raw_ranges: List[Tuple[datetime, Optional[datetime], bool]] = []
+
+        if rollup_start and rollup_end and rollup_start > rollup_end:
+            # Window sits inside a single hour
+            raw_ranges.append((start_date, end_date, True))
+        else:
+            conditions = [
+                getattr(self.model, column).ilike(f"%{value}%")
+                for column, value in filters.items()
+                if value
+            ]
+            if rollup_start:
+                conditions.append(self.model.bucket_start >= rollup_start)
+            if rollup_end:
+                conditions.append(self.model.bucket_start < rollup_end)
+
+            group_columns = [
+                (
+                    truncate_timestamp(
+                        self.model.bucket_start, bucket, db.get_bind().dialect.name
+                    )
+                    if column == "bucket_start" and bucket != "hour"
+                    else getattr(self.model, column)
+                )
+                for column in group_by
+            ]
+            rows = (
+                db.query(
+                    *group_columns,
+                    *[func.sum(getattr(self.model, metric)) for metric in self.metrics],
+                )
+                .filter(*conditions)
+                .group_by(*group_columns)
+                .all()
+            )
+            for row in rows:
+                metrics = dict(zip(self.metrics, row[len(group_columns) :]))
+                if any(metrics.values()) or not group_by:
+                    # Only the bucket is a datetime; names can look like dates
+                    key = tuple(
+                        _as_datetime(value) if column == "bucket_start" else value
+                        for column, value in zip(group_by, row)
+                    )
+                    merge(key, metrics)
+
+            # Partial hours at the edges come from raw rows
+            if start_date and rollup_start > start_date:
+                raw_ranges.append((start_date, rollup_start, False))
+            if end_date:
+                raw_ranges.append((rollup_end, end_date, True))
+
+        for range_start, range_end, inclusive_end in raw_ranges:
+            conditions = [
+                getattr(self.source_model, column).ilike(f"%{value}%")
+                for column, value in filters.items()
+                if value
+            ]
+            conditions.append(self.source_model.timestamp >= range_start)
+            if inclusive_end:
+                conditions.append(self.source_model.timestamp <= range_end)
+            else:
+                conditions.append(self.source_model.timestamp < range_end)
+
+            dimension_columns = [
+                getattr(self.source_model, column)
+                for column in group_by
+                if column != "bucket_start"
+            ]
+            rows = (
+                db.query(*dimension_columns, *self._source_aggregates())
+                .filter(*conditions)
+                .group_by(*dimension_columns)
+                .all()
+            )
+            for row in rows:
+                metrics = dict(zip(self.metrics, row[len(dimension_columns) :]))
+                if not any(metrics.values()):
+                    continue
+                dimension_values = iter(row[: len(dimension_columns)])
+                key = tuple(
+                    (
+                        floor_bucket(range_start, bucket)
+                        if column == "bucket_start"
+                        else next(dimension_values)
+                    )
+                    for column in group_by
+                )
+                merge(key, metrics)
+
+        if not group_by and () not in results:
+            results[()] = dict.fromkeys(self.metrics, 0)
+
+        return results
+
+    def summarize(self, db: Session, **kwargs) -> Dict[str, Any]:
+        """Totals of every metric for the window"""
+        return self.aggregate(db, **kwargs)[()]
+
+    def get_hourly(self, db: Session, **kwargs) -> Dict[datetime, Dict[str, Any]]:
+        """Metrics per hour bucket for the window, oldest first"""
+        rows = self.aggregate(db, group_by=("bucket_start",), **kwargs)
+        return {key[0]: metrics for key, metrics in sorted(rows.items())}
+
+    def get_series(
+        self,
+        db: Session,
+        *,
+        bucket: str = "day",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        **kwargs,
+    ) -> List[Tuple[datetime, Dict[str, Any]]]:
+        """
+        Metrics per hour, day or week bucket, oldest first. With a start_date,
+        buckets without data up to end_date (or now) are filled with zeros.
+        """
+        rows = self.aggregate(
+            db,
+            group_by=("bucket_start",),
+            bucket=bucket,
+            start_date=start_date,
+            end_date=end_date,
+            **kwargs,
+        )
+        series = {key[0]: metrics for key, metrics in rows.items()}
+
+        if start_date:
+            current = floor_bucket(start_date, bucket)
+            last = floor_bucket(end_date or datetime.utcnow(), bucket)
+            while current <= last:
+                series.setdefault(current, dict.fromkeys(self.metrics, 0))
+                current = next_bucket(current, bucket)
+
+        return sorted(series.items(), key=lambda item: item[0])
+
+    def get_by_dimension(
+        self, db: Session, dimension: str, **kwargs
+    ) -> Dict[str, Dict[str, Any]]:
+        """Metrics per agent, profile or sender for the window"""
+        rows = self.aggregate(db, group_by=(dimension,), **kwargs)
+        return {key[0]: metrics for key, metrics in rows.items()}
+
+
+email_processing_rollup = CRUDTelemetryRollup(
+    EmailProcessingHourlyRollup,
+    EmailProcessingData,
+    {
+        "total_count": None,
+        "opened_count": "is_opened",
+        "clicked_count": "is_link_clicked",
+        "unsubscribed_count": "is_unsubscribe_clicked",
+        "replied_count": "is_reply_sent",
+        "error_count": "error_occurred",
+        "total_duration_seconds": "total_duration_seconds",
+        "website_duration_seconds": "random_website_duration_seconds",
+    },
+)
+
+spam_handler_rollup = CRUDTelemetryRollup(
+    SpamHandlerHourlyRollup,
+    SpamHandlerData,
+    {
+        "total_count": None,
+        "error_count": "error_occurred",
+        "spam_found": "spam_emails_found",
+        "moved_to_inbox": "moved_to_inbox",
+        "total_time_seconds": "total_time_seconds",
+    },
+)
@@ -0,0 +1,368 @@
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, delete, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime
+import heapq
+import json
+import unicodedata
+
+from app.core.config import settings
+from app.crud.crud_telemetry_rollup import _value, ceil_hour, floor_hour
+from app.models.email_processing_data import EmailProcessingData
+from app.models.spam_handler_data import SpamHandlerData
+from app.models.telemetry_rollup import TelemetryTopKSketch
+from app.utils.space_saving import Counters, SpaceSaving, merge_counters
+
+# Raw rows read per round trip when rebuilding sketches
+REBUILD_CHUNK_SIZE = 5000
+
+
+def _collation_key(key: Tuple) -> Tuple:
+    """
+    A sketch key as a case- and accent-insensitive collation compares it, for
+    finding the stored row when the agent name was written differently
+    """
+    dimension, hour, agent_name = key
+    folded = unicodedata.normalize("NFKD", agent_name.rstrip(" ").casefold())
+    return dimension, hour, "".join(c for c in folded if not unicodedata.combining(c))
+
+
+class CRUDTopKSketch:
+    """
+    Hourly heavy-hitter sketches of a telemetry table's text fields, per agent.
+
+    Each (field, hour, agent) keeps a Space-Saving summary of at most
+    TOPK_SKETCH_CAPACITY values, updated by ``apply`` inside the caller's
+    transaction like the hourly rollups. ``top`` merges the summaries of the
+    whole hours in a window and reads raw rows only for the partial hours at
+    its edges, so its cost depends on the window length, not the row count.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        source_model,
+        dimensions: Dict[str, Tuple[str, Optional[str], Optional[str]]],
+        capacity: Optional[int] = None,
+    ):
+        """
+        ``dimensions`` maps sketch names to (value column, weight column,
+        summed column). Without a weight column every row weighs 1; list
+        values (JSON columns) count each element.
+        """
+        self.model = TelemetryTopKSketch
+        self.source = source
+        self.source_model = source_model
+        self.dimensions = dimensions
+        self.capacity = capacity
+
+    def _capacity(self) -> int:
+        if self.capacity is not None:
+            return self.capacity
+        return settings.TOPK_SKETCH_CAPACITY
+
+    def _source_columns(self) -> List[str]:
+        columns = ["timestamp", "agent_name"]
+        for spec in self.dimensions.values():
+            for column in spec:
+                if column and column not in columns:
+                    columns.append(column)
+        return columns
+
+    def _raw_columns(self) -> List[Any]:
+        return [getattr(self.source_model, column) for column in self._source_columns()]
+
+    def _entries(self, row: Any) -> Iterator[Tuple[str, str, float, float]]:
+        """(dimension, value, weight, summed value) contributed by a raw row"""
+        for dimension, (column, weight_column, value_column) in self.dimensions.items():
+            weight = (_value(row, weight_column) or 0) if weight_column else 1
+            if weight <= 0:
+                continue
+            amount = (_value(row, value_column) or 0) if value_column else 0.0
+            values = _value(row, column)
+            if not isinstance(values, list):
+                values = [values]
+            for value in values:
+                if value:
+                    yield dimension, str(value), weight, amount
+
+    # ------------------------------------------------------------------ writes
+
+    def apply(self, db: Session, rows: Iterable[Any], *, sign: int = 1) -> None:
+        """
+        Add (or with ``sign=-1`` take back) raw rows in the sketches. Does not
+        commit; runs in the caller's transaction. Taking back only adjusts
+        values still monitored, which keeps the summaries approximately right
+        after the occasional update or delete.
+        """
+        deltas: Dict[Tuple, Dict[str, List[float]]] = {}
+        for row in rows:
+            hour = floor_hour(_value(row, "timestamp"))
+            agent_name = _value(row, "agent_name")
+            for dimension, value, weight, amount in self._entries(row):
+                items = deltas.setdefault((dimension, hour, agent_name), {})
+                delta = items.setdefault(value, [0, 0.0])
+                delta[0] += weight
+                delta[1] += amount
+
+        if not deltas:
+            return
+
+        keys = sorted(deltas)
+        self._ensure_rows(db, keys)
+        # Keyed by the rows read back: a case-insensitive collation may have
+        # matched an existing row whose agent name is spelled differently
+        sketches: Dict[Tuple, Any] = {}
+        collated: Dict[Tuple, Any] = {}
+        for sketch in db.scalars(
+            select(self.model)
+            .where(
+                self.model.source == self.source,
+                self.model.bucket_start.in_(sorted({key[1] for key in keys})),
+                self.model.agent_name.in_(sorted({key[2] for key in keys})),
+            )
+            .with_for_update()
+        ):
+            stored = (sketch.dimension, sketch.bucket_start, sketch.agent_name)
+            sketches[stored] = sketch
+            collated[_collation_key(stored)] = sketch
+
+        capacity = self._capacity()
+        now = datetime.utcnow()
+        for key in keys:
+            sketch = sketches.get(key) or collated[_collation_key(key)]
+            summary = SpaceSaving.loads(capacity, sketch.counters)
+            items = deltas[key]
+            # Heaviest first, so a batch's heavy hitters are not evicted by its tail
+            for value in sorted(items, key=lambda item: -items[item][0]):
+                weight, amount = items[value]
+                if sign > 0:
+                    summary.add(value, weight, amount)
+                else:
+                    summary.remove(value, weight, amount)
+            sketch.counters = summary.dumps()
+            sketch.observed = max(
+                0.0, sketch.observed + sign * sum(w for w, _ in items.values())
+            )
+            sketch.updated_at = now
+        db.flush()
+
+    def _ensure_rows(self, db: Session, keys: List[Tuple]) -> None:
+        """Create empty sketch rows for keys that have none yet"""
+        now = datetime.utcnow()
+        values = [
+            {
+                "source": self.source,
+                "dimension": dimension,
+                "bucket_start": hour,
+                "agent_name": agent_name,
+                "counters": "{}",
+                "observed": 0.0,
+                "updated_at": now,
+            }
+            for dimension, hour, agent_name in keys
+        ]
+        dialect_name = db.get_bind().dialect.name
+        table = self.model.__table__
+
+        if dialect_name == "sqlite":
+            db.execute(sqlite_insert(table).values(values).on_conflict_do_nothing())
+        elif dialect_name == "mysql":
+            # Takes the exclusive lock up front; INSERT IGNORE would take a
+            # shared one on duplicates and deadlock upgrading it FOR UPDATE
+            stmt = mysql_insert(table).values(values)
+            db.execute(
+                stmt.on_duplicate_key_update(updated_at=stmt.inserted.updated_at)
+            )
+        else:
+            for value in values:
+                exists = (
+                    db.query(self.model.id)
+                    .filter(
+                        self.model.source == self.source,
+                        self.model.dimension == value["dimension"],
+                        self.model.bucket_start == value["bucket_start"],
+                        self.model.agent_name == value["agent_name"],
+                    )
+                    .first()
+                )
+                if not exists:
+                    db.add(self.model(**value))
+            db.flush()
+
+    def retract(self, db: Session, *, ids: List[int]) -> None:
+        """Take back raw rows about to be deleted by id"""
+        rows = db.execute(
+            select(*self._raw_columns()).where(self.source_model.id.in_(ids))
+        ).all()
+        self.apply(db, [row._mapping for row in rows], sign=-1)
+
+    def rebuild(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> None:
+        """
+        Recompute sketches from raw rows for whole hours in [start_date, end_date).
+        Used to backfill history; hours already purged by retention lose theirs.
+        """
+        start_date = floor_hour(start_date) if start_date else None
+        end_date = ceil_hour(end_date) if end_date else None
+
+        sketch_conditions = [self.model.source == self.source]
+        source_conditions = []
+        if start_date:
+            sketch_conditions.append(self.model.bucket_start >= start_date)
+            source_conditions.append(self.source_model.timestamp >= start_date)
+        if end_date:
+            sketch_conditions.append(self.model.bucket_start < end_date)
+            source_conditions.append(self.source_model.timestamp < end_date)
+
+        db.execute(delete(self.model).where(and_(*sketch_conditions)))
+
+        columns = self._raw_columns()
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(self.source_model.id, *columns)
+                .where(self.source_model.id > last_id, *source_conditions)
+                .order_by(self.source_model.id)
+                .limit(REBUILD_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                break
+            self.apply(db, [row._mapping for row in rows])
+            last_id = rows[-1].id
+        db.commit()
+
+    def ensure_backfilled(self, db: Session) -> bool:
+        """Build sketches from history the first time none exist for the source"""
+        has_sketches = (
+            db.query(self.model.id).filter(self.model.source == self.source).first()
+            is not None
+        )
+        has_source_rows = db.query(self.source_model.id).first() is not None
+        if has_sketches or not has_source_rows:
+            return False
+        self.rebuild(db)
+        return True
+
+    # ------------------------------------------------------------------- reads
+
+    def top(
+        self,
+        db: Session,
+        dimension: str,
+        *,
+        k: int = 5,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        agent_name: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        The k heaviest values of a field for start_date <= timestamp <= end_date,
+        ranked by ``count``, the weight each value is guaranteed to have. It is
+        exact unless hourly sketches filled up; the true weight is then at most
+        ``count + error``, where ``error`` includes what a value may have lost
+        to eviction in hours whose sketch no longer tracks it. ``average`` is
+        the summed column per counted row. The agent filter matches
+        substrings, like the rollup and raw table filters do.
+        """
+        if dimension not in self.dimensions:
+            raise ValueError(f"Unsupported sketch dimension: {dimension}")
+        merged: Counters = {}
+
+        # Whole hours come from the sketches
+        sketch_start = ceil_hour(start_date) if start_date else None
+        sketch_end = floor_hour(end_date) if end_date else None
+        raw_ranges: List[Tuple[datetime, Optional[datetime], bool]] = []
+
+        if sketch_start and sketch_end and sketch_start > sketch_end:
+            # Window sits inside a single hour
+            raw_ranges.append((start_date, end_date, True))
+        else:
+            conditions = [
+                self.model.source == self.source,
+                self.model.dimension == dimension,
+            ]
+            if agent_name:
+                conditions.append(self.model.agent_name.ilike(f"%{agent_name}%"))
+            if sketch_start:
+                conditions.append(self.model.bucket_start >= sketch_start)
+            if sketch_end:
+                conditions.append(self.model.bucket_start < sketch_end)
+            merged = merge_counters(
+                (
+                    json.loads(counters)
+                    for counters in db.scalars(
+                        select(self.model.counters).where(*conditions)
+                    )
+                ),
+                self._capacity(),
+            )
+
+            # Partial hours at the edges come from raw rows
+            if start_date and sketch_start > start_date:
+                raw_ranges.append((start_date, sketch_start, False))
+            if end_date:
+                raw_ranges.append((sketch_end, end_date, True))
+
+        for range_start, range_end, inclusive_end in raw_ranges:
+            conditions = [self.source_model.timestamp >= range_start]
+            if inclusive_end:
+                conditions.append(self.source_model.timestamp <= range_end)
+            else:
+                conditions.append(self.source_model.timestamp < range_end)
+            if agent_name:
+                conditions.append(
+                    self.source_model.agent_name.ilike(f"%{agent_name}%")
+                )
+            rows = db.execute(select(*self._raw_columns()).where(*conditions)).all()
+            for row in rows:
+                for entry_dimension, value, weight, amount in self._entries(
+                    row._mapping
+                ):
+                    if entry_dimension != dimension:
+                        continue
+                    counter = merged.setdefault(value, [0, 0, 0.0])
+                    counter[0] += weight
+                    counter[2] += amount
+
+        # Merged counts are upper bounds; rank and report the guaranteed part
+        return [
+            {
+                "value": value,
+                "count": int(count - error),
+                "error": int(error),
+                "average": total / (count - error) if count > error else 0.0,
+            }
+            for value, (count, error, total) in heapq.nlargest(
+                k, merged.items(), key=lambda entry: entry[1][0] - entry[1][1]
+            )
+        ]
+
+
+email_processing_sketches = CRUDTopKSketch(
+    "email_processing",
+    EmailProcessingData,
+    {
+        "sender": ("sender_email", None, "total_duration_seconds"),
+        "subject": ("email_subject", None, None),
+        "profile": ("profile_name", None, None),
+        "website": ("random_website_visited", None, "random_website_duration_seconds"),
+    },
+)
+
+spam_handler_sketches = CRUDTopKSketch(
+    "spam_handler",
+    SpamHandlerData,
+    {
+        "sender": ("sender_email", "spam_emails_found", None),
+        "profile": ("profile_name", None, None),
+        "subject": ("spam_email_subjects", None, None),
+    },
+)
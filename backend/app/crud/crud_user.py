@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Any, Dict, Optional, Union
 from datetime import datetime
 from sqlalchemy.orm import Session
+from app.core.auth_cache import principal_cache
 from app.crud.base import CRUDBase
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
@@ -12,11 +13,14 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
 
-    def create(self, db: Session, *, obj_in: UserCreate) -> User:
+    def create(
+        self, db: Session, *, obj_in: UserCreate, hashed_password: Optional[str] = None
+    ) -> User:
+        """Create a user; pass hashed_password when it was hashed elsewhere"""
         db_obj = User(
             email=obj_in.email,
             name=obj_in.name,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password or get_password_hash(obj_in.password),
             phone=obj_in.phone,
             company=obj_in.company,
             bio=obj_in.bio,
@@ -37,6 +41,22 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             return None
         return user
 
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: User,
+        obj_in: Union[UserUpdate, Dict[str, Any]]
+    ) -> User:
+        updated = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        principal_cache.invalidate_user(updated.id)
+        return updated
+
+    def remove(self, db: Session, *, id: int) -> User:
+        removed = super().remove(db, id=id)
+        principal_cache.invalidate_user(id)
+        return removed
+
     def is_active(self, user: User) -> bool:
         return user.is_active
 
@@ -52,6 +72,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate_user(user.id)
         return user
 
     def disconnect_gmail(self, db: Session, *, user: User) -> User:
@@ -61,6 +82,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate_user(user.id)
         return user
 
     def is_verified(self, user: User) -> bool:
@@ -75,6 +97,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate_user(user.id)
         return token
 
     def verify_email(self, db: Session, *, token: str) -> Optional[User]:
@@ -95,6 +118,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             db.add(user)
             db.commit()
             db.refresh(user)
+            principal_cache.invalidate_user(user.id)
 
         return user
 
@@ -106,12 +130,18 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate_user(user.id)
         return token
 
     def reset_password(
-        self, db: Session, *, token: str, new_password: str
+        self,
+        db: Session,
+        *,
+        token: str,
+        new_password: Optional[str] = None,
+        hashed_password: Optional[str] = None,
     ) -> Optional[User]:
-        """Reset user password with token"""
+        """Reset user password with token, from new_password or a ready hash"""
         user = (
             db.query(User)
             .filter(
@@ -122,12 +152,13 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         )
 
         if user:
-            user.hashed_password = get_password_hash(new_password)
+            user.hashed_password = hashed_password or get_password_hash(new_password)
             user.reset_password_token = None
             user.reset_password_token_expires = None
             db.add(user)
             db.commit()
             db.refresh(user)
+            principal_cache.invalidate_user(user.id)
 
         return user
 
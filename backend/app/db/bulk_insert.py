@@ -0,0 +1,128 @@
+"""
+Set-based bulk inserts for the CRUD layer
+
+Rows are written in chunks of BULK_INSERT_CHUNK_SIZE with one statement per
+chunk instead of one INSERT plus one refresh SELECT per row:
+
+- dialects with executemany RETURNING (SQLite 3.35+, PostgreSQL, MariaDB)
+  get ``INSERT ... RETURNING`` and the ORM objects straight from it;
+- MySQL gets a multi-row ``INSERT ... VALUES`` and one range SELECT on the
+  auto-increment ids it allocated. InnoDB only hands those out consecutively
+  with ``innodb_autoinc_lock_mode`` 0 or 1 and an ``auto_increment_increment``
+  of 1; both are checked once per engine, and a server in interleaved mode 2
+  (MySQL 8's default) falls back to the ORM flush path below;
+- when the caller does not need the rows back, a plain executemany.
+"""
+
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Type
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Engine -> whether a multi-row INSERT gets consecutive auto-increment ids
+_consecutive_ids: Dict[Any, bool] = {}
+
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    """Yield consecutive slices of at most size items"""
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _apply_python_defaults(model: Type, rows: List[Dict[str, Any]]) -> None:
+    """
+    Fill Python-side column defaults (e.g. ``datetime.utcnow``) once per chunk
+    so every row carries the same keys and the values match what is returned.
+    """
+    for column in model.__table__.columns:
+        default = column.default
+        if default is None or column.primary_key or default.is_sequence:
+            continue
+        missing = [row for row in rows if row.get(column.key) is None]
+        if not missing:
+            continue
+        if default.is_callable:
+            value = default.arg(None)
+        elif default.is_scalar:
+            value = default.arg
+        else:
+            continue
+        for row in missing:
+            row[column.key] = value
+
+
+def _mysql_ids_consecutive(db: Session) -> bool:
+    """True when InnoDB allocates a multi-row INSERT's ids as one range"""
+    bind = db.get_bind()
+    consecutive = _consecutive_ids.get(bind)
+    if consecutive is None:
+        lock_mode, increment = db.execute(
+            text("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment")
+        ).one()
+        consecutive = int(lock_mode) < 2 and int(increment) == 1
+        if not consecutive:
+            logger.warning(
+                "innodb_autoinc_lock_mode=%s, auto_increment_increment=%s: "
+                "bulk inserts load rows back one INSERT at a time; set the "
+                "lock mode to 1 and the increment to 1 for range reads",
+                lock_mode,
+                increment,
+            )
+        _consecutive_ids[bind] = consecutive
+    return consecutive
+
+
+def bulk_insert(
+    db: Session,
+    model: Type,
+    rows: List[Dict[str, Any]],
+    *,
+    return_rows: bool = True,
+    chunk_size: Optional[int] = None,
+) -> List[Any]:
+    """
+    Insert plain dict rows into model's table without committing.
+
+    With ``return_rows`` the inserted ORM objects are returned, fully loaded
+    and detached from the session so the caller's commit does not expire them
+    (which would otherwise cost one SELECT per object on first access).
+    """
+    if not rows:
+        return []
+
+    chunk_size = chunk_size or settings.BULK_INSERT_CHUNK_SIZE
+    dialect = db.get_bind().dialect
+    table = model.__table__
+    inserted: List[Any] = []
+
+    for chunk in chunked(rows, chunk_size):
+        chunk = [dict(row) for row in chunk]
+        _apply_python_defaults(model, chunk)
+
+        if not return_rows:
+            db.execute(insert(table), chunk)
+        elif dialect.insert_executemany_returning:
+            inserted.extend(db.scalars(insert(model).returning(model), chunk).all())
+        elif dialect.name == "mysql" and _mysql_ids_consecutive(db):
+            result = db.execute(insert(table).values(chunk))
+            first_id = result.lastrowid
+            inserted.extend(
+                db.query(model)
+                .filter(model.id.between(first_id, first_id + len(chunk) - 1))
+                .order_by(model.id)
+                .all()
+            )
+        else:
+            objs = [model(**row) for row in chunk]
+            db.add_all(objs)
+            db.flush()
+            inserted.extend(objs)
+
+    for obj in inserted:
+        db.expunge(obj)
+    return inserted
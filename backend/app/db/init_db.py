@@ -16,7 +16,25 @@ from app.models import (
     agent,
     proxy_error,
     logged_out_profile,
+    telemetry_rollup,
+    error_fingerprint,
+    retention_progress,
 )  # Import all models
+from app.db.schema_upgrades import run_schema_upgrades
+from app.crud.crud_telemetry_rollup import (
+    email_processing_rollup,
+    spam_handler_rollup,
+)
+from app.crud.crud_topk_sketch import email_processing_sketches, spam_handler_sketches
+from app.crud.crud_error_fingerprint import (
+    email_processing_fingerprints,
+    spam_handler_fingerprints,
+)
+from app.crud.crud_distinct_sketch import (
+    email_processing_distinct,
+    proxy_error_distinct,
+    spam_handler_distinct,
+)
 
 
 def init_db():
@@ -30,6 +48,32 @@ def init_db():
 
         # Create all tables
         db_manager.create_tables()
+        run_schema_upgrades(db_manager.engine)
+
+        # Build rollups and sketches for telemetry recorded before they existed
+        db = db_manager.SessionLocal()
+        try:
+            for rollup in (email_processing_rollup, spam_handler_rollup):
+                if rollup.ensure_backfilled(db):
+                    print(f"Backfilled {rollup.model.__tablename__}")
+            for sketches in (email_processing_sketches, spam_handler_sketches):
+                if sketches.ensure_backfilled(db):
+                    print(f"Backfilled {sketches.source} top-K sketches")
+            for distinct in (
+                email_processing_distinct,
+                spam_handler_distinct,
+                proxy_error_distinct,
+            ):
+                if distinct.ensure_backfilled(db):
+                    print(f"Backfilled {distinct.source} distinct sketches")
+            for fingerprints in (
+                email_processing_fingerprints,
+                spam_handler_fingerprints,
+            ):
+                if fingerprints.ensure_backfilled(db):
+                    print(f"Backfilled {fingerprints.source} error fingerprints")
+        finally:
+            db.close()
 
         print(f"Database tables created successfully!")
         print(f"Database type: {db_manager.db_type}")
@@ -0,0 +1,276 @@
+"""
+Time-range partitioning of the telemetry tables on MySQL.
+
+With TELEMETRY_PARTITION_INTERVAL set to "day" or "month", each table in
+PARTITIONED_TABLES is converted once to ``PARTITION BY RANGE COLUMNS`` on its
+time column, with one partition per period and a MAXVALUE partition catching
+rows beyond the newest boundary. Queries filtering on the time column are
+pruned to the partitions they touch, and retention drops whole partitions
+instead of deleting rows one by one.
+
+MySQL requires every unique key of a partitioned table to contain the
+partitioning column, so the primary key becomes (id, <time column>); ``id``
+stays auto-incremented and unique in practice. Partitioned InnoDB tables cannot
+carry FULLTEXT indexes, so their ``search`` filter falls back to ILIKE.
+SQLite has no partitioning; there retention keeps deleting by range.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+# Table -> time column it is partitioned on
+PARTITIONED_TABLES: Dict[str, str] = {
+    "email_processing_data": "timestamp",
+    "spam_handler_data": "timestamp",
+    "proxy_errors": "created_at",
+    "logged_out_profiles": "timestamp",
+}
+
+INTERVALS = ("day", "month")
+MAXVALUE_PARTITION = "pmax"
+
+# Older history is folded into the first partition beyond this many
+MAX_INITIAL_PARTITIONS = 400
+
+
+def partition_interval() -> Optional[str]:
+    """The configured partition period, None when partitioning is disabled"""
+    interval = settings.TELEMETRY_PARTITION_INTERVAL
+    return interval if interval in INTERVALS else None
+
+
+def floor_period(value: datetime, interval: str) -> datetime:
+    """Start of the day or month containing value"""
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day if interval == "day" else day.replace(day=1)
+
+
+def next_period(value: datetime, interval: str) -> datetime:
+    """Start of the period after the one starting at value"""
+    if interval == "day":
+        return value + timedelta(days=1)
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1)
+    return value.replace(month=value.month + 1)
+
+
+def partition_name(period_start: datetime) -> str:
+    return f"p{period_start:%Y%m%d}"
+
+
+def _definition(period_start: datetime, period_end: datetime) -> str:
+    return (
+        f"PARTITION {partition_name(period_start)} "
+        f"VALUES LESS THAN ('{period_end:%Y-%m-%d %H:%M:%S}')"
+    )
+
+
+def _maxvalue_definition() -> str:
+    return f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN (MAXVALUE)"
+
+
+def get_partitions(bind: Any, table_name: str) -> List[Tuple[str, Optional[datetime]]]:
+    """
+    (name, exclusive upper bound) of a table's partitions in order, the
+    MAXVALUE partition with None. Empty for tables that are not partitioned.
+    ``bind`` is a Session or Connection.
+    """
+    rows = bind.execute(
+        text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION "
+            "FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name "
+            "AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ),
+        {"table_name": table_name},
+    ).all()
+    partitions = []
+    for name, description in rows:
+        if description == "MAXVALUE":
+            partitions.append((name, None))
+        else:
+            partitions.append((name, datetime.fromisoformat(description.strip("'"))))
+    return partitions
+
+
+def is_partitioned(engine: Engine, table_name: str) -> bool:
+    if engine.dialect.name != "mysql":
+        return False
+    with engine.connect() as connection:
+        return bool(get_partitions(connection, table_name))
+
+
+def partition_table(engine: Engine, table_name: str, interval: str) -> bool:
+    """Convert an unpartitioned table; returns whether it was converted"""
+    if is_partitioned(engine, table_name):
+        return False
+    column = PARTITIONED_TABLES[table_name]
+    now = datetime.utcnow()
+
+    with engine.connect() as connection:
+        oldest = connection.execute(
+            text(f"SELECT MIN({column}) FROM {table_name}")
+        ).scalar()
+
+    # One partition per period from the oldest row to the periods ahead
+    starts = [floor_period(oldest or now, interval)]
+    last = floor_period(now, interval)
+    for _ in range(settings.TELEMETRY_PARTITIONS_AHEAD):
+        last = next_period(last, interval)
+    while starts[-1] < last:
+        starts.append(next_period(starts[-1], interval))
+    # The first partition also takes everything older than the second
+    starts = [starts[0]] + starts[1:][-MAX_INITIAL_PARTITIONS:]
+    ends = starts[1:] + [next_period(starts[-1], interval)]
+    definitions = [_definition(start, end) for start, end in zip(starts, ends)]
+    definitions.append(_maxvalue_definition())
+
+    fulltext_indexes = [
+        index["name"]
+        for index in inspect(engine).get_indexes(table_name)
+        if index.get("dialect_options", {}).get("mysql_prefix") == "FULLTEXT"
+    ]
+    with engine.begin() as connection:
+        for index_name in fulltext_indexes:
+            connection.execute(
+                text(f"ALTER TABLE {table_name} DROP INDEX {index_name}")
+            )
+        connection.execute(
+            text(
+                f"ALTER TABLE {table_name} DROP PRIMARY KEY, "
+                f"ADD PRIMARY KEY (id, {column})"
+            )
+        )
+        connection.execute(
+            text(
+                f"ALTER TABLE {table_name} PARTITION BY RANGE COLUMNS({column}) "
+                f"({', '.join(definitions)})"
+            )
+        )
+    return True
+
+
+def add_future_partitions(bind: Any, table_name: str, interval: str) -> List[str]:
+    """
+    Split the MAXVALUE partition so TELEMETRY_PARTITIONS_AHEAD periods past
+    the current one have partitions of their own. Returns the names added.
+    """
+    partitions = get_partitions(bind, table_name)
+    if not partitions or partitions[-1][1] is not None:
+        return []
+    bounds = [upper for _, upper in partitions if upper is not None]
+    now = datetime.utcnow()
+    start = max(bounds) if bounds else floor_period(now, interval)
+    target = next_period(floor_period(now, interval), interval)
+    for _ in range(settings.TELEMETRY_PARTITIONS_AHEAD):
+        target = next_period(target, interval)
+
+    added = []
+    definitions = []
+    while start < target:
+        end = next_period(start, interval)
+        definitions.append(_definition(start, end))
+        added.append(partition_name(start))
+        start = end
+    if definitions:
+        definitions.append(_maxvalue_definition())
+        bind.execute(
+            text(
+                f"ALTER TABLE {table_name} REORGANIZE PARTITION {MAXVALUE_PARTITION} "
+                f"INTO ({', '.join(definitions)})"
+            )
+        )
+    return added
+
+
+def drop_partitions_before(db: Session, table_name: str, cutoff: datetime) -> int:
+    """
+    Drop the partitions whose rows are all older than cutoff and return how
+    many rows they held. A no-op returning 0 for unpartitioned tables and
+    databases other than MySQL; rows older than cutoff in the partition
+    straddling it are left for a range delete, which is pruned to that
+    partition.
+    """
+    if db.get_bind().dialect.name != "mysql":
+        return 0
+    expired = [
+        name
+        for name, upper in get_partitions(db, table_name)
+        if upper is not None and upper <= cutoff
+    ]
+    if not expired:
+        return 0
+    names = ", ".join(expired)
+    dropped = db.execute(
+        text(f"SELECT COUNT(*) FROM {table_name} PARTITION ({names})")
+    ).scalar()
+    db.execute(text(f"ALTER TABLE {table_name} DROP PARTITION {names}"))
+    return int(dropped or 0)
+
+
+def ensure_partitions(engine: Engine) -> List[str]:
+    """
+    Partition tables that are not yet and add upcoming partitions to the rest.
+    Safe to run on each start; returns a description of each change made.
+    """
+    interval = partition_interval()
+    if engine.dialect.name != "mysql" or interval is None:
+        return []
+
+    existing_tables = set(inspect(engine).get_table_names())
+    changes = []
+    for table_name in PARTITIONED_TABLES:
+        if table_name not in existing_tables:
+            continue
+        if partition_table(engine, table_name, interval):
+            changes.append(f"partitioned {table_name} by {interval}")
+    return changes + extend_partitions(engine)
+
+
+def extend_partitions(engine: Engine) -> List[str]:
+    """
+    Add upcoming partitions to the tables already partitioned, converting
+    none. The retention worker runs this every pass so a long-lived process
+    never writes into the MAXVALUE partition; returns the partitions added.
+    """
+    interval = partition_interval()
+    if engine.dialect.name != "mysql" or interval is None:
+        return []
+
+    changes = []
+    for table_name in PARTITIONED_TABLES:
+        # No-op for tables that are missing or not partitioned
+        with engine.begin() as connection:
+            for name in add_future_partitions(connection, table_name, interval):
+                changes.append(f"added partition {table_name}.{name}")
+    return changes
+
+
+def describe_partitions(engine: Engine) -> Dict[str, Any]:
+    """Partitions of each partitionable table, for the health endpoints"""
+    description: Dict[str, Any] = {
+        "interval": partition_interval(),
+        "tables": {},
+    }
+    if engine.dialect.name != "mysql":
+        return description
+    existing_tables = set(inspect(engine).get_table_names())
+    with engine.connect() as connection:
+        for table_name in PARTITIONED_TABLES:
+            if table_name not in existing_tables:
+                continue
+            description["tables"][table_name] = [
+                {
+                    "name": name,
+                    "less_than": upper.isoformat() if upper else "MAXVALUE",
+                }
+                for name, upper in get_partitions(connection, table_name)
+            ]
+    return description
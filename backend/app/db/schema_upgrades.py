@@ -0,0 +1,115 @@
+"""
+Idempotent schema upgrades for databases created by older releases.
+
+``create_all`` only creates missing tables, so indexes and columns added to
+existing models are applied here. Every step checks the live schema first and
+is safe to run on each start.
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from app.core.database import Base
+from app.db.partitioning import ensure_partitions
+from app.db.search_index import ensure_search_indexes
+
+
+def ensure_indexes(engine: Engine) -> list:
+    """Create indexes declared on the models that are missing from existing tables"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {
+            index["name"] for index in inspector.get_indexes(table.name)
+        }
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine)
+                created.append(index.name)
+
+    return created
+
+
+def ensure_columns(engine: Engine) -> list:
+    """
+    Add columns declared on the models that are missing from existing tables.
+    Only nullable columns or columns with a server default can be added.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {
+            column["name"] for column in inspector.get_columns(table.name)
+        }
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                print(f"Cannot add NOT NULL column {table.name}.{column.name}")
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+                )
+            added.append(f"{table.name}.{column.name}")
+
+    return added
+
+
+def ensure_text_sizes(engine: Engine) -> list:
+    """
+    Widen MySQL TEXT columns that the models now declare MEDIUMTEXT or
+    LONGTEXT. TEXT holds 64 KB and strict mode rejects longer values.
+    """
+    if engine.dialect.name != "mysql":
+        return []
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    widened = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        live_types = {
+            column["name"]: type(column["type"]).__name__
+            for column in inspector.get_columns(table.name)
+        }
+        for column in table.columns:
+            declared = column.type.compile(dialect=engine.dialect)
+            if live_types.get(column.name) != "TEXT":
+                continue
+            if not declared.startswith(("MEDIUMTEXT", "LONGTEXT")):
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(
+                    text(f"ALTER TABLE {table.name} MODIFY COLUMN {column_ddl}")
+                )
+            widened.append(f"{table.name}.{column.name}")
+
+    return widened
+
+
+def run_schema_upgrades(engine: Engine) -> None:
+    """Apply all pending schema upgrades"""
+    for column_name in ensure_columns(engine):
+        print(f"Added column {column_name}")
+    for column_name in ensure_text_sizes(engine):
+        print(f"Widened column {column_name}")
+    for index_name in ensure_indexes(engine):
+        print(f"Created index {index_name}")
+    # Before search indexes: partitioned tables cannot have FULLTEXT ones
+    for change in ensure_partitions(engine):
+        print(f"Partitioning: {change}")
+    for index_name in ensure_search_indexes(engine):
+        print(f"Created search index {index_name}")
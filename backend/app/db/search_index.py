@@ -0,0 +1,200 @@
+"""
+Full-text search indexes for the ``search`` filter on telemetry tables.
+
+SQLite gets an external-content FTS5 table per source table, using the trigram
+tokenizer so matches keep the substring semantics of ``ILIKE '%term%'``, and
+kept in sync by insert/update/delete triggers. MySQL gets a FULLTEXT index with
+the ngram parser. Other databases, terms shorter than a trigram, and databases
+where the index has not been built fall back to the original ILIKE predicates.
+"""
+
+from typing import Dict, Tuple
+
+from sqlalchemy import column, inspect, or_, select, table, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.db.partitioning import is_partitioned
+
+# Columns covered by the ``search`` filter, per table
+SEARCH_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "email_processing_data": (
+        "agent_name",
+        "profile_name",
+        "sender_email",
+        "email_subject",
+        "random_website_visited",
+        "error_details",
+    ),
+    "spam_handler_data": (
+        "agent_name",
+        "profile_name",
+        "sender_email",
+        "error_details",
+    ),
+    "proxy_errors": ("agent_name", "proxy", "profile_name", "error_details"),
+    "logged_out_profiles": ("agent_name", "profile_name"),
+}
+
+# Shorter terms cannot be answered from trigram / ngram tokens
+MIN_INDEXED_TERM_LENGTH = 3
+
+# table name -> whether a search index is usable, filled on first use
+_available: Dict[str, bool] = {}
+
+
+def fts_table_name(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+
+def fulltext_index_name(table_name: str) -> str:
+    return f"ft_{table_name}_search"
+
+
+def _sqlite_statements(table_name: str) -> list:
+    fts = fts_table_name(table_name)
+    columns = SEARCH_COLUMNS[table_name]
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    delete_old = (
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = (
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values});"
+    )
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{column_list}, content='{table_name}', content_rowid='id', "
+        f"tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} "
+        f"BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} "
+        f"BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table_name} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def _ensure_sqlite_index(engine: Engine, table_name: str) -> bool:
+    fts = fts_table_name(table_name)
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": fts},
+        ).first()
+        for statement in _sqlite_statements(table_name):
+            conn.execute(text(statement))
+        if not exists:
+            # Index rows written before the FTS table existed
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    return not exists
+
+
+def _ensure_mysql_index(engine: Engine, table_name: str) -> bool:
+    index_name = fulltext_index_name(table_name)
+    existing = {index["name"] for index in inspect(engine).get_indexes(table_name)}
+    if index_name in existing:
+        return False
+    column_list = ", ".join(SEARCH_COLUMNS[table_name])
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"ALTER TABLE {table_name} ADD FULLTEXT INDEX {index_name} "
+                f"({column_list}) WITH PARSER ngram"
+            )
+        )
+    return True
+
+
+def ensure_search_indexes(engine: Engine) -> list:
+    """
+    Create missing search indexes for every table in SEARCH_COLUMNS
+
+    Returns:
+        list: Names of the indexes created by this call
+    """
+    dialect_name = engine.dialect.name
+    if dialect_name not in ("sqlite", "mysql"):
+        return []
+
+    existing_tables = set(inspect(engine).get_table_names())
+    created = []
+    for table_name in SEARCH_COLUMNS:
+        if table_name not in existing_tables:
+            continue
+        if dialect_name == "mysql" and is_partitioned(engine, table_name):
+            # Partitioned InnoDB tables cannot have FULLTEXT indexes
+            _available[table_name] = False
+            continue
+        try:
+            if dialect_name == "sqlite":
+                if _ensure_sqlite_index(engine, table_name):
+                    created.append(fts_table_name(table_name))
+            elif _ensure_mysql_index(engine, table_name):
+                created.append(fulltext_index_name(table_name))
+            _available[table_name] = True
+        except Exception as e:
+            # e.g. SQLite built without FTS5; searches keep using ILIKE
+            print(f"Search index for {table_name} unavailable: {e}")
+            _available[table_name] = False
+    return created
+
+
+def _index_available(db: Session, table_name: str) -> bool:
+    if table_name not in _available:
+        bind = db.get_bind()
+        dialect_name = bind.dialect.name
+        if dialect_name == "sqlite":
+            found = db.execute(
+                text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+                ),
+                {"name": fts_table_name(table_name)},
+            ).first()
+            _available[table_name] = found is not None
+        elif dialect_name == "mysql":
+            existing = {
+                index["name"] for index in inspect(bind).get_indexes(table_name)
+            }
+            _available[table_name] = fulltext_index_name(table_name) in existing
+        else:
+            _available[table_name] = False
+    return _available[table_name]
+
+
+def _ilike_condition(model, term: str):
+    columns = SEARCH_COLUMNS[model.__tablename__]
+    return or_(*(getattr(model, name).ilike(f"%{term}%") for name in columns))
+
+
+def search_condition(db: Session, model, term: str):
+    """
+    Build the WHERE clause for a free-text search over a model's search columns
+
+    Uses the full-text index when one is available for the current database,
+    otherwise the equivalent OR of ILIKE predicates.
+    """
+    table_name = model.__tablename__
+    if len(term) < MIN_INDEXED_TERM_LENGTH or not _index_available(db, table_name):
+        return _ilike_condition(model, term)
+
+    # A quoted phrase matches the term as a substring across token boundaries
+    dialect_name = db.get_bind().dialect.name
+
+    if dialect_name == "sqlite":
+        phrase = '"' + term.replace('"', '""') + '"'
+        fts_name = fts_table_name(table_name)
+        fts = table(fts_name, column("rowid"), column(fts_name))
+        return model.id.in_(
+            select(fts.c.rowid).where(fts.c[fts_name].op("MATCH")(phrase))
+        )
+
+    if dialect_name == "mysql":
+        phrase = '"' + term.replace('"', " ") + '"'
+        columns = [getattr(model, name) for name in SEARCH_COLUMNS[table_name]]
+        return match(*columns, against=phrase).in_boolean_mode()
+
+    return _ilike_condition(model, term)
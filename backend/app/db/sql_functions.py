@@ -0,0 +1,43 @@
+"""
+Dialect-aware SQL expression helpers shared by the CRUD layer
+"""
+
+from sqlalchemy import func
+
+# Units accepted by truncate_timestamp; weeks start on Monday
+BUCKET_UNITS = ("hour", "day", "week")
+
+
+def truncate_timestamp(column, unit: str, dialect_name: str):
+    """
+    Truncate a DateTime column to the start of its hour, day or week.
+
+    On SQLite the result uses the same text layout SQLAlchemy writes for
+    DateTime values, so truncated buckets compare equal to stored ones.
+    """
+    if unit not in BUCKET_UNITS:
+        raise ValueError(f"Unsupported bucket unit: {unit}")
+
+    if dialect_name == "sqlite":
+        if unit == "hour":
+            return func.strftime("%Y-%m-%d %H:00:00.000000", column)
+        if unit == "day":
+            return func.strftime("%Y-%m-%d 00:00:00.000000", column)
+        # Forward to Sunday, then back to that week's Monday
+        return func.strftime(
+            "%Y-%m-%d 00:00:00.000000", column, "weekday 0", "-6 days"
+        )
+    if dialect_name == "mysql":
+        if unit == "hour":
+            return func.date_format(column, "%Y-%m-%d %H:00:00")
+        if unit == "day":
+            return func.date_format(column, "%Y-%m-%d 00:00:00")
+        return func.date_format(
+            func.subdate(column, func.weekday(column)), "%Y-%m-%d 00:00:00"
+        )
+    return func.date_trunc(unit, column)
+
+
+def truncate_to_hour(column, dialect_name: str):
+    """Truncate a DateTime column to the start of its hour"""
+    return truncate_timestamp(column, "hour", dialect_name)
@@ -10,6 +10,14 @@ from .email_processing_data import EmailProcessingData
 from .agent import Agent
 from .proxy_error import ProxyError
 from .logged_out_profile import LoggedOutProfile
+from .telemetry_rollup import (
+    EmailProcessingHourlyRollup,
+    SpamHandlerHourlyRollup,
+    TelemetryTopKSketch,
+    TelemetryDistinctSketch,
+)
+from .error_fingerprint import ErrorFingerprint, ErrorFingerprintHourlyCount
+from .retention_progress import RetentionProgress
 
 __all__ = [
     "User",
@@ -28,4 +36,11 @@ __all__ = [
     "Agent",
     "ProxyError",
     "LoggedOutProfile",
+    "EmailProcessingHourlyRollup",
+    "SpamHandlerHourlyRollup",
+    "TelemetryTopKSketch",
+    "TelemetryDistinctSketch",
+    "ErrorFingerprint",
+    "ErrorFingerprintHourlyCount",
+    "RetentionProgress",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, Index
 from datetime import datetime
 
 from app.core.database import Base
@@ -8,6 +8,10 @@ class EmailProcessingData(Base):
     """Model for storing email processing operation data"""
 
     __tablename__ = "email_processing_data"
+    __table_args__ = (
+        # Keyset pagination walks this index newest first
+        Index("ix_email_processing_data_timestamp_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     agent_name = Column(String(255), nullable=False, index=True)
@@ -23,6 +27,8 @@ class EmailProcessingData(Base):
     total_duration_seconds = Column(Float, default=0.0, nullable=False)
     error_occurred = Column(Boolean, default=False, nullable=False)
     error_details = Column(Text, nullable=True)
+    # Fingerprint of error_details' template, see app.utils.error_fingerprint
+    error_fingerprint = Column(String(16), nullable=True, index=True)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(
@@ -0,0 +1,59 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Text,
+    Index,
+    UniqueConstraint,
+)
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class ErrorFingerprint(Base):
+    """Normalized error message template shared by the errors it matches"""
+
+    __tablename__ = "error_fingerprints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fingerprint = Column(String(16), nullable=False, unique=True, index=True)
+    template = Column(Text, nullable=False)
+    example = Column(Text, nullable=False)  # First raw message seen
+    first_seen = Column(DateTime, nullable=False, index=True)
+    last_seen = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ErrorFingerprint(fingerprint='{self.fingerprint}', template='{self.template[:50]}...')>"
+
+
+class ErrorFingerprintHourlyCount(Base):
+    """Hourly error count per fingerprint and agent for one telemetry table"""
+
+    __tablename__ = "error_fingerprint_hourly_counts"
+    __table_args__ = (
+        UniqueConstraint(
+            "source",
+            "fingerprint",
+            "bucket_start",
+            "agent_name",
+            name="uq_error_fingerprint_count_bucket",
+        ),
+        # Fleet-wide "what errored in this window" lookups
+        Index("ix_error_fingerprint_counts_bucket", "bucket_start", "fingerprint"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(64), nullable=False)
+    fingerprint = Column(String(16), nullable=False, index=True)
+    bucket_start = Column(DateTime, nullable=False)
+    agent_name = Column(String(255), nullable=False, index=True)
+    error_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self):
+        return f"<ErrorFingerprintHourlyCount(source='{self.source}', fingerprint='{self.fingerprint}', bucket='{self.bucket_start}', agent='{self.agent_name}', errors={self.error_count})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from datetime import datetime
 
 from app.core.database import Base
@@ -8,6 +8,10 @@ class LoggedOutProfile(Base):
     """Model for storing logged out profile records"""
 
     __tablename__ = "logged_out_profiles"
+    __table_args__ = (
+        # Keyset pagination walks this index newest first
+        Index("ix_logged_out_profiles_timestamp_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     agent_name = Column(String(255), nullable=False, index=True)
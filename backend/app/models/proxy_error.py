@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from datetime import datetime
 
 from app.core.database import Base
@@ -8,6 +8,10 @@ class ProxyError(Base):
     """Model for storing proxy error logs"""
 
     __tablename__ = "proxy_errors"
+    __table_args__ = (
+        # Keyset pagination walks this index newest first
+        Index("ix_proxy_errors_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     agent_name = Column(String(255), nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float
 from datetime import datetime
 
 from app.core.database import Base
@@ -16,6 +16,9 @@ class RandomUrl(Base):
         String(100), nullable=True
     )  # e.g., 'social', 'news', 'shopping', etc.
     is_active = Column(Boolean, default=True, nullable=False)
+    weight = Column(
+        Float, default=1.0, server_default="1", nullable=False
+    )  # Relative chance of being picked by the random URL sampler
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
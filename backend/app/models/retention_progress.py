@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class RetentionProgress(Base):
+    """Progress of the background retention run for one table"""
+
+    __tablename__ = "retention_progress"
+
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String(64), nullable=False, unique=True, index=True)
+    status = Column(String(16), nullable=False, default="idle")  # running/done/failed
+    cutoff = Column(DateTime, nullable=True)  # Rows older than this are deleted
+    max_id = Column(Integer, nullable=True)  # Highest id older than the cutoff
+    last_id = Column(Integer, nullable=False, default=0)  # Deleted up to this id
+    deleted_count = Column(Integer, nullable=False, default=0)
+    owner = Column(String(64), nullable=True)  # Worker process holding the run
+    heartbeat_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self):
+        return f"<RetentionProgress(table='{self.table_name}', status='{self.status}', last_id={self.last_id}, deleted={self.deleted_count})>"
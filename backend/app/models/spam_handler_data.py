@@ -1,4 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, JSON
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Boolean,
+    Float,
+    Text,
+    JSON,
+    Index,
+)
 from datetime import datetime
 
 from app.core.database import Base
@@ -8,6 +18,10 @@ class SpamHandlerData(Base):
     """Model for storing spam handler operation data"""
 
     __tablename__ = "spam_handler_data"
+    __table_args__ = (
+        # Keyset pagination walks this index newest first
+        Index("ix_spam_handler_data_timestamp_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     agent_name = Column(String(255), nullable=False, index=True)
@@ -18,6 +32,8 @@ class SpamHandlerData(Base):
     total_time_seconds = Column(Float, default=0.0, nullable=False)
     error_occurred = Column(Boolean, default=False, nullable=False)
     error_details = Column(Text, nullable=True)
+    # Fingerprint of error_details' template, see app.utils.error_fingerprint
+    error_fingerprint = Column(String(16), nullable=True, index=True)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     spam_email_subjects = Column(
         JSON, nullable=True
@@ -0,0 +1,140 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Float,
+    LargeBinary,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects import mysql
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class EmailProcessingHourlyRollup(Base):
+    """Hourly pre-aggregated email processing counters per agent, profile and sender"""
+
+    __tablename__ = "email_processing_hourly_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "bucket_start",
+            "agent_name",
+            "profile_name",
+            "sender_email",
+            name="uq_email_rollup_bucket",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    agent_name = Column(String(255), nullable=False, index=True)
+    profile_name = Column(String(255), nullable=False, default="")
+    sender_email = Column(String(255), nullable=False, default="")
+    total_count = Column(Integer, default=0, nullable=False)
+    opened_count = Column(Integer, default=0, nullable=False)
+    clicked_count = Column(Integer, default=0, nullable=False)
+    unsubscribed_count = Column(Integer, default=0, nullable=False)
+    replied_count = Column(Integer, default=0, nullable=False)
+    error_count = Column(Integer, default=0, nullable=False)
+    total_duration_seconds = Column(Float, default=0.0, nullable=False)
+    website_duration_seconds = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self):
+        return f"<EmailProcessingHourlyRollup(bucket='{self.bucket_start}', agent='{self.agent_name}', total={self.total_count})>"
+
+
+class SpamHandlerHourlyRollup(Base):
+    """Hourly pre-aggregated spam handler counters per agent, profile and sender"""
+
+    __tablename__ = "spam_handler_hourly_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "bucket_start",
+            "agent_name",
+            "profile_name",
+            "sender_email",
+            name="uq_spam_rollup_bucket",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    agent_name = Column(String(255), nullable=False, index=True)
+    profile_name = Column(String(255), nullable=False, default="")
+    sender_email = Column(String(255), nullable=False, default="")
+    total_count = Column(Integer, default=0, nullable=False)
+    error_count = Column(Integer, default=0, nullable=False)
+    spam_found = Column(Integer, default=0, nullable=False)
+    moved_to_inbox = Column(Integer, default=0, nullable=False)
+    total_time_seconds = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self):
+        return f"<SpamHandlerHourlyRollup(bucket='{self.bucket_start}', agent='{self.agent_name}', total={self.total_count})>"
+
+
+class TelemetryTopKSketch(Base):
+    """Hourly Space-Saving summary of the heaviest values of one telemetry field"""
+
+    __tablename__ = "telemetry_topk_sketches"
+    __table_args__ = (
+        UniqueConstraint(
+            "source",
+            "dimension",
+            "bucket_start",
+            "agent_name",
+            name="uq_topk_sketch_bucket",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(64), nullable=False)
+    dimension = Column(String(64), nullable=False)
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    agent_name = Column(String(255), nullable=False, index=True)
+    # JSON item -> [n, err, sum]; keys can be long URLs or subjects, beyond
+    # the 64 KB of a MySQL TEXT column
+    counters = Column(
+        Text().with_variant(mysql.MEDIUMTEXT(), "mysql"), nullable=False, default="{}"
+    )
+    observed = Column(Float, default=0.0, nullable=False)  # Total weight summarized
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self):
+        return f"<TelemetryTopKSketch(source='{self.source}', dimension='{self.dimension}', bucket='{self.bucket_start}', agent='{self.agent_name}')>"
+
+
+class TelemetryDistinctSketch(Base):
+    """Hourly HyperLogLog registers of one field's distinct values"""
+
+    __tablename__ = "telemetry_distinct_sketches"
+    __table_args__ = (
+        UniqueConstraint(
+            "source",
+            "dimension",
+            "bucket_start",
+            name="uq_distinct_sketch_bucket",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(64), nullable=False)
+    dimension = Column(String(64), nullable=False)
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    registers = Column(LargeBinary, nullable=True)  # zlib-compressed registers
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self):
+        return f"<TelemetryDistinctSketch(source='{self.source}', dimension='{self.dimension}', bucket='{self.bucket_start}')>"
@@ -62,6 +62,7 @@ class EmailProcessingDataInDB(EmailProcessingDataBase):
     """Schema for email processing data in database"""
 
     id: int
+    error_fingerprint: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -79,10 +80,11 @@ class EmailProcessingDataListResponse(BaseModel):
     """Schema for paginated email processing data list response"""
 
     items: List[EmailProcessingDataResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class EmailProcessingDataBulkCreate(BaseModel):
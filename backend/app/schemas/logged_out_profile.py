@@ -29,7 +29,8 @@ class LoggedOutProfileResponse(LoggedOutProfileBase):
 
 class LoggedOutProfileListResponse(BaseModel):
     items: list[LoggedOutProfileResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl, validator
+from pydantic import BaseModel, Field, HttpUrl, validator
 from typing import Optional
 from datetime import datetime
 
@@ -10,6 +10,7 @@ class RandomUrlBase(BaseModel):
     description: Optional[str] = None
     category: Optional[str] = None
     is_active: bool = True
+    weight: float = Field(1.0, ge=0, description="Relative sampling weight")
 
     @validator("category")
     def validate_category(cls, v):
@@ -46,6 +47,7 @@ class RandomUrlUpdate(BaseModel):
     description: Optional[str] = None
     category: Optional[str] = None
     is_active: Optional[bool] = None
+    weight: Optional[float] = Field(None, ge=0)
 
     @validator("category")
     def validate_category(cls, v):
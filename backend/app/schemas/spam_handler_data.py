@@ -54,6 +54,7 @@ class SpamHandlerDataInDB(SpamHandlerDataBase):
     """Schema for spam handler data in database"""
 
     id: int
+    error_fingerprint: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -71,10 +72,11 @@ class SpamHandlerDataListResponse(BaseModel):
     """Schema for paginated spam handler data list response"""
 
     items: List[SpamHandlerDataResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class SpamHandlerDataBulkCreate(BaseModel):
@@ -0,0 +1,49 @@
+"""
+Error message fingerprints: messages that differ only in IDs, numbers, email
+addresses, URLs or IP addresses share a template and its fingerprint
+"""
+
+import hashlib
+import re
+from typing import Optional
+
+# Templates are stored up to this length; fingerprints cover the whole template
+MAX_TEMPLATE_LENGTH = 500
+
+# Applied in order: emails and URLs before the numbers inside them
+_PLACEHOLDERS = [
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"\b(?:https?|ftp|socks[45]h?)://\S+|\bwww\.\S+", re.I), "<url>"),
+    (
+        re.compile(
+            r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I
+        ),
+        "<id>",
+    ),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<ip>"),
+    (re.compile(r"\b0x[0-9a-f]+\b|\b(?=[a-f]*\d)[0-9a-f]{12,}\b", re.I), "<id>"),
+    # Session ids, tokens and other long words containing digits
+    (re.compile(r"\b(?=[a-z_]*\d)\w{16,}\b", re.I), "<id>"),
+    (re.compile(r"\d+(?:[.,:]\d+)*"), "<n>"),
+]
+_WHITESPACE = re.compile(r"\s+")
+
+
+def error_template(details: str) -> str:
+    """``details`` with variable parts replaced by placeholders"""
+    template = details
+    for pattern, placeholder in _PLACEHOLDERS:
+        template = pattern.sub(placeholder, template)
+    return _WHITESPACE.sub(" ", template).strip()
+
+
+def template_fingerprint(template: str) -> str:
+    """16 hex digit fingerprint of a template"""
+    return hashlib.blake2b(template.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def error_fingerprint(details: Optional[str]) -> Optional[str]:
+    """Fingerprint of an error message, None for an empty one"""
+    if not details or not details.strip():
+        return None
+    return template_fingerprint(error_template(details))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Keyset (cursor) pagination helpers for newest-first listings
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, desc, or_
+from sqlalchemy.orm import Query
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+    pass
+
+
+def encode_cursor(sort_value: datetime, id: int) -> str:
+    """
+    Encode the position of a row as an opaque cursor
+
+    Args:
+        sort_value: Value of the ordering column of the last row on the page
+        id: Primary key of that row, used as tiebreaker
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    payload = json.dumps({"t": sort_value.isoformat(), "i": id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+
+def paginate(
+    query: Query,
+    *,
+    sort_column: Any,
+    id_column: Any,
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+) -> Tuple[List[Any], Optional[int], Optional[str]]:
+    """
+    Page through a query newest first, ordered by (sort_column, id_column).
+
+    With a cursor, rows strictly after the cursor position are returned and
+    skip is ignored, so every page costs one index range scan regardless of
+    depth. Without one, classic offset pagination is used. Either way the
+    response carries a cursor for the next page when more rows exist.
+
+    Returns:
+        Tuple of (items, total or None when include_total is False, next_cursor)
+    """
+    total = query.order_by(None).count() if include_total else None
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < last_id),
+            )
+        )
+        skip = 0
+
+    # Fetch one extra row to know whether another page exists
+    rows = (
+        query.order_by(desc(sort_column), desc(id_column))
+        .offset(skip)
+        .limit(limit + 1)
+        .all()
+    )
+    items = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(
+            getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+
+    return items, total, next_cursor
@@ -0,0 +1,93 @@
+"""
+Space-Saving heavy-hitter summary (Metwally, Agrawal, El Abbadi)
+"""
+
+import heapq
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# item -> [count, error, total]: count overestimates the item's weight by at
+# most error; total sums the item's value while it was being counted
+Counters = Dict[str, List[float]]
+
+
+class SpaceSaving:
+    """
+    Keeps at most ``capacity`` counters. An unseen item arriving when the
+    summary is full takes over the smallest counter and inherits its count
+    as error, so every item heavier than total / capacity is guaranteed to
+    be present and no count is underestimated while monitored.
+    """
+
+    def __init__(self, capacity: int, counters: Optional[Counters] = None):
+        self.capacity = capacity
+        self.counters: Counters = counters if counters is not None else {}
+
+    def add(self, item: str, weight: float = 1, value: float = 0.0) -> None:
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+            counter[2] += value
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0, value]
+            return
+        smallest = min(self.counters, key=lambda key: self.counters[key][0])
+        floor = self.counters.pop(smallest)[0]
+        self.counters[item] = [floor + weight, floor, value]
+
+    def remove(self, item: str, weight: float = 1, value: float = 0.0) -> None:
+        """Take back weight added earlier; unmonitored items are ignored"""
+        counter = self.counters.get(item)
+        if counter is None:
+            return
+        counter[0] -= weight
+        counter[2] -= value
+        if counter[0] <= 0:
+            del self.counters[item]
+        else:
+            counter[1] = min(counter[1], counter[0])
+
+    def top(self, k: int) -> List[Tuple[str, List[float]]]:
+        """The k items with the highest counts, highest first"""
+        return heapq.nlargest(k, self.counters.items(), key=lambda entry: entry[1][0])
+
+    def dumps(self) -> str:
+        return json.dumps(self.counters, separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, capacity: int, data: Optional[str]) -> "SpaceSaving":
+        return cls(capacity, json.loads(data) if data else {})
+
+
+def merge_counters(summaries: Iterable[Counters], capacity: int) -> Counters:
+    """
+    Merge summaries of disjoint streams without truncating. An item missing
+    from a full summary may have been evicted from it with up to that
+    summary's smallest count, so that count is added to the item's count and
+    error. The merged counts then keep the Space-Saving guarantees: no count
+    is underestimated, and none overestimates by more than its error.
+    """
+    merged: Counters = {}
+    floor_total = 0
+    # item -> summed floors of the summaries tracking it, which it needs not
+    floors_seen: Dict[str, float] = {}
+    for counters in summaries:
+        floor = 0
+        if counters and len(counters) >= capacity:
+            floor = min(counter[0] for counter in counters.values())
+        floor_total += floor
+        for item, (count, error, total) in counters.items():
+            counter = merged.get(item)
+            if counter is None:
+                merged[item] = [count, error, total]
+            else:
+                counter[0] += count
+                counter[1] += error
+                counter[2] += total
+            floors_seen[item] = floors_seen.get(item, 0) + floor
+    for item, counter in merged.items():
+        missing = floor_total - floors_seen[item]
+        counter[0] += missing
+        counter[1] += missing
+    return merged
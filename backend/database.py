@@ -5,9 +5,12 @@ Supports SQLite and MySQL with connection pooling for 1000+ concurrent users
 
 import os
 import logging
-from typing import AsyncGenerator, Generator
+import threading
+from typing import AsyncGenerator, Generator, Optional
 from contextlib import asynccontextmanager, contextmanager
 from sqlalchemy import create_engine, event, pool, text, Engine, MetaData, Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.expression import TextClause, UpdateBase
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.asyncio import (
@@ -16,7 +19,7 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     AsyncEngine,
 )
-from sqlalchemy.pool import QueuePool, StaticPool, NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool, NullPool
 from urllib.parse import quote_plus
 from app.core.config import settings
 import asyncio
@@ -31,6 +34,142 @@ logger = logging.getLogger(__name__)
 Base = declarative_base()
 
 
+class RoutingSession(Session):
+    """
+    Session that sends flushes and DML to the writer engine and plain reads
+    to a pool of reader connections. Once a transaction has written, its
+    reads also go to the writer so they see their own uncommitted changes.
+    """
+
+    writer: Engine = None
+    reader: Engine = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.reader is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        if (
+            self._flushing
+            or isinstance(clause, UpdateBase)
+            or (isinstance(clause, TextClause) and not _is_select_text(clause))
+            or self.info.get("wrote")
+        ):
+            self.info["wrote"] = True
+            return self.writer
+        return self.reader
+
+
+def _is_select_text(clause: TextClause) -> bool:
+    return clause.text.lstrip().upper().startswith("SELECT")
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("wrote", None)
+
+
+class ReadReplica:
+    """
+    Pooled engine for a read replica and a cached verdict on whether it may
+    serve reads. The verdict is refreshed at most every check_interval
+    seconds by whichever request finds it stale; other requests keep using
+    the cached value meanwhile. A replica is unhealthy when it cannot be
+    reached, when replication is stopped, or when it lags the primary by
+    more than max_lag_seconds. Connection errors during a request mark it
+    unhealthy straight away.
+    """
+
+    def __init__(
+        self, engine: Engine, *, max_lag_seconds: float, check_interval: float
+    ):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.fallbacks = 0
+        self._checked_at = float("-inf")
+        self._check_lock = threading.Lock()
+
+        # Lost connections, and failures to connect at all
+        @event.listens_for(engine, "handle_error")
+        def mark_on_disconnect(context):
+            if context.is_disconnect or context.connection is None:
+                self.mark_unhealthy(str(context.original_exception))
+
+    def _measure_lag(self, connection: Connection) -> Optional[float]:
+        """
+        Seconds behind the primary, or None when the server does not report
+        replication status (no privilege, or a managed reader endpoint)
+        """
+        # MySQL 8.0.22 renamed SLAVE/Master to REPLICA/Source
+        for statement, column in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                row = connection.exec_driver_sql(statement).mappings().first()
+            except DBAPIError:
+                continue
+            if row is None:
+                return None
+            lag = row.get(column)
+            # NULL while the replication threads are stopped
+            return float("inf") if lag is None else float(lag)
+        return None
+
+    def check(self) -> bool:
+        """Probe the replica now and record the verdict"""
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                lag = self._measure_lag(connection)
+            healthy = lag is None or lag <= self.max_lag_seconds
+            error = None if healthy else f"Replica lag {lag}s exceeds limit"
+        except Exception as e:
+            healthy, lag, error = False, None, str(e)
+
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Read replica is healthy again")
+            else:
+                logger.warning(f"Read replica unavailable, using primary: {error}")
+        self.healthy = healthy
+        self.lag_seconds = lag
+        self.last_error = error
+        self._checked_at = time.monotonic()
+        return healthy
+
+    def is_healthy(self) -> bool:
+        """Cached verdict, refreshed when older than check_interval"""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            if self._check_lock.acquire(blocking=False):
+                try:
+                    self.check()
+                finally:
+                    self._check_lock.release()
+        return self.healthy
+
+    def mark_unhealthy(self, error: str) -> None:
+        """Route reads to the primary until the next check succeeds"""
+        if self.healthy:
+            logger.warning(f"Read replica failed, using primary: {error}")
+        self.healthy = False
+        self.last_error = error
+        self._checked_at = time.monotonic()
+
+    def get_status(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_error": self.last_error,
+            "fallbacks": self.fallbacks,
+        }
+
+
 class DatabaseManager:
     """
     Advanced Database Manager with support for SQLite and MySQL
@@ -39,6 +178,8 @@ class DatabaseManager:
 
     def __init__(self):
         self.engine: Engine = None
+        self.read_engine: Engine = None
+        self.replica: Optional[ReadReplica] = None
         self.async_engine: AsyncEngine = None
         self.SessionLocal: sessionmaker = None
         self.AsyncSessionLocal: async_sessionmaker = None
@@ -92,15 +233,46 @@ class DatabaseManager:
             },
         }
 
-        return {
+        config = {
             "sync_url": sync_url,
             "async_url": async_url,
             "pool_settings": pool_settings,
             "db_type": "mysql",
         }
 
+        if settings.DB_READ_REPLICA_HOST:
+            replica_user = settings.DB_READ_REPLICA_USER or settings.MYSQL_USER
+            replica_password = (
+                settings.DB_READ_REPLICA_PASSWORD
+                if settings.DB_READ_REPLICA_USER
+                else settings.MYSQL_PASSWORD
+            )
+            replica_port = settings.DB_READ_REPLICA_PORT or port
+            config["replica_url"] = (
+                f"mysql+mysqlconnector://{quote_plus(replica_user)}:"
+                f"{quote_plus(replica_password)}@{settings.DB_READ_REPLICA_HOST}:"
+                f"{replica_port}/{database}"
+            )
+            config["replica_pool_settings"] = {
+                **pool_settings,
+                "pool_size": settings.DB_READ_REPLICA_POOL_SIZE,
+                "max_overflow": settings.DB_READ_REPLICA_MAX_OVERFLOW,
+            }
+
+        return config
+
     def _get_sqlite_config(self) -> dict:
-        """Configure SQLite database"""
+        """
+        Configure SQLite database.
+
+        The production profile (opt-in) uses WAL journaling with one pooled
+        writer connection and SQLITE_READ_POOL_SIZE reader connections, so
+        dashboard reads proceed while agents write telemetry. The aiosqlite
+        engine behind the async telemetry writes is limited to one connection
+        as well, so at most two writers, one sync and one async, contend for
+        SQLite's lock through busy_timeout. The legacy profile, the default,
+        shares a single autocommit connection between all threads.
+        """
         database_path = settings.SQLITE_DATABASE_PATH
 
         # Ensure directory exists
@@ -109,21 +281,61 @@ class DatabaseManager:
         sync_url = f"sqlite:///{database_path}"
         async_url = f"sqlite+aiosqlite:///{database_path}"
 
-        # SQLite pool settings
+        if settings.SQLITE_PROFILE.lower() == "legacy":
+            # SQLite pool settings
+            pool_settings = {
+                "poolclass": StaticPool,
+                "pool_pre_ping": True,
+                "connect_args": {
+                    "check_same_thread": False,
+                    "timeout": 20,
+                    "isolation_level": None,
+                },
+            }
+            return {
+                "sync_url": sync_url,
+                "async_url": async_url,
+                "pool_settings": pool_settings,
+                "db_type": "sqlite",
+            }
+
+        connect_args = {
+            "check_same_thread": False,
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+        # A single writer serializes writes in the pool instead of in SQLite
         pool_settings = {
-            "poolclass": StaticPool,
+            "poolclass": QueuePool,
+            "pool_size": 1,
+            "max_overflow": 0,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
             "pool_pre_ping": True,
-            "connect_args": {
-                "check_same_thread": False,
-                "timeout": 20,
-                "isolation_level": None,
-            },
+            "connect_args": connect_args,
+        }
+        read_pool_settings = {
+            "poolclass": QueuePool,
+            "pool_size": settings.SQLITE_READ_POOL_SIZE,
+            "max_overflow": settings.SQLITE_READ_POOL_SIZE,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_pre_ping": True,
+            "connect_args": connect_args,
+        }
+        # Async writes queue on their own single connection too
+        async_pool_settings = {
+            "poolclass": AsyncAdaptedQueuePool,
+            "pool_size": 1,
+            "max_overflow": 0,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_pre_ping": True,
+            "connect_args": {"timeout": connect_args["timeout"]},
         }
 
         return {
             "sync_url": sync_url,
             "async_url": async_url,
             "pool_settings": pool_settings,
+            "read_pool_settings": read_pool_settings,
+            "async_pool_settings": async_pool_settings,
             "db_type": "sqlite",
         }
 
@@ -138,6 +350,26 @@ class DatabaseManager:
                 config["sync_url"], echo=settings.DB_ECHO, **config["pool_settings"]
             )
 
+            # Separate reader pool, when the configuration has one
+            if "read_pool_settings" in config:
+                self.read_engine = create_engine(
+                    config["sync_url"],
+                    echo=settings.DB_ECHO,
+                    **config["read_pool_settings"],
+                )
+
+            # Optional read replica for analytics reads
+            if "replica_url" in config:
+                self.replica = ReadReplica(
+                    create_engine(
+                        config["replica_url"],
+                        echo=settings.DB_ECHO,
+                        **config["replica_pool_settings"],
+                    ),
+                    max_lag_seconds=settings.DB_READ_REPLICA_MAX_LAG_SECONDS,
+                    check_interval=settings.DB_READ_REPLICA_CHECK_INTERVAL,
+                )
+
             # Create asynchronous engine (for async operations)
             if config["db_type"] == "mysql":
                 self.async_engine = create_async_engine(
@@ -151,19 +383,32 @@ class DatabaseManager:
                 )
             else:
                 self.async_engine = create_async_engine(
-                    config["async_url"], echo=settings.DB_ECHO, pool_pre_ping=True
+                    config["async_url"],
+                    echo=settings.DB_ECHO,
+                    **config.get("async_pool_settings", {"pool_pre_ping": True}),
                 )
 
             # Create session makers
+            session_class = type(
+                "BoundRoutingSession",
+                (RoutingSession,),
+                {"writer": self.engine, "reader": self.read_engine},
+            )
             self.SessionLocal = sessionmaker(
-                autocommit=False, autoflush=False, bind=self.engine
+                autocommit=False,
+                autoflush=False,
+                bind=self.engine,
+                class_=session_class,
             )
 
+            # Objects must stay readable after commit: an expired attribute
+            # would need I/O outside the session's greenlet
             self.AsyncSessionLocal = async_sessionmaker(
                 self.async_engine,
                 class_=AsyncSession,
                 autocommit=False,
                 autoflush=False,
+                expire_on_commit=False,
             )
 
             # Set up event listeners
@@ -181,6 +426,9 @@ class DatabaseManager:
     def _setup_event_listeners(self):
         """Set up SQLAlchemy event listeners"""
 
+        if self.read_engine is not None:
+            self._setup_sqlite_pragmas()
+
         @event.listens_for(self.engine, "connect")
         def set_mysql_mode(dbapi_connection, connection_record):
             """Configure MySQL connection settings"""
@@ -191,6 +439,15 @@ class DatabaseManager:
                     cursor.execute("SET SESSION autocommit=0")
                     cursor.execute("SET SESSION innodb_lock_wait_timeout=50")
 
+        if self.replica is not None:
+
+            @event.listens_for(self.replica.engine, "connect")
+            def set_replica_mode(dbapi_connection, connection_record):
+                """Replica sessions only read"""
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute("SET SESSION sql_mode='STRICT_TRANS_TABLES'")
+                    cursor.execute("SET SESSION TRANSACTION READ ONLY")
+
         @event.listens_for(self.engine, "checkout")
         def ping_connection(dbapi_connection, connection_record, connection_proxy):
             """Ping connection on checkout to ensure it's alive"""
@@ -204,6 +461,40 @@ class DatabaseManager:
                 if usage_time > 10:  # Log slow connections
                     logger.warning(f"Long connection usage: {usage_time:.2f}s")
 
+    def _setup_sqlite_pragmas(self):
+        """Connect-time pragmas for the production SQLite profile"""
+
+        def apply_pragmas(dbapi_connection, *, read_only: bool):
+            cursor = dbapi_connection.cursor()
+            try:
+                if not read_only:
+                    cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+                cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+                cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+                cursor.execute("PRAGMA temp_store=MEMORY")
+                if read_only:
+                    cursor.execute("PRAGMA query_only=ON")
+            finally:
+                cursor.close()
+
+        @event.listens_for(self.engine, "connect")
+        def set_writer_pragmas(dbapi_connection, connection_record):
+            apply_pragmas(dbapi_connection, read_only=False)
+
+        @event.listens_for(self.read_engine, "connect")
+        def set_reader_pragmas(dbapi_connection, connection_record):
+            apply_pragmas(dbapi_connection, read_only=True)
+
+        @event.listens_for(self.async_engine.sync_engine, "connect")
+        def set_async_pragmas(dbapi_connection, connection_record):
+            apply_pragmas(dbapi_connection, read_only=False)
+
+        # Switch the file to WAL before any reader opens it
+        with self.engine.connect():
+            pass
+
     def _start_keep_alive(self):
         """Start keep-alive mechanism to prevent connection timeouts"""
         if self.db_type == "mysql":
@@ -243,6 +534,30 @@ class DatabaseManager:
         finally:
             db.close()
 
+    def get_read_db(self) -> Generator[Session, None, None]:
+        """
+        Dependency for read-only endpoints that tolerate replication lag.
+        Uses the read replica while it is healthy, otherwise the primary.
+        """
+        replica = self.replica
+        if replica is None:
+            yield from self.get_db()
+            return
+        if not replica.is_healthy():
+            replica.fallbacks += 1
+            yield from self.get_db()
+            return
+
+        db = replica.SessionLocal()
+        try:
+            yield db
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Read replica session error: {e}")
+            raise
+        finally:
+            db.close()
+
     @asynccontextmanager
     async def get_async_db(self) -> AsyncGenerator[AsyncSession, None]:
         """Async context manager to get database session"""
@@ -315,21 +630,29 @@ class DatabaseManager:
             logger.error(f"Async database connection test failed: {e}")
             return False
 
-    def get_pool_status(self) -> dict:
-        """Get current connection pool status"""
-        if hasattr(self.engine.pool, "size"):
+    def _describe_pool(self, engine: Engine) -> dict:
+        if hasattr(engine.pool, "size"):
             status = {
-                "pool_size": self.engine.pool.size(),
-                "checked_in": self.engine.pool.checkedin(),
-                "checked_out": self.engine.pool.checkedout(),
-                "overflow": self.engine.pool.overflow(),
+                "pool_size": engine.pool.size(),
+                "checked_in": engine.pool.checkedin(),
+                "checked_out": engine.pool.checkedout(),
+                "overflow": engine.pool.overflow(),
             }
             # Only add invalidated if the method exists
-            if hasattr(self.engine.pool, "invalidated"):
-                status["invalidated"] = self.engine.pool.invalidated()
+            if hasattr(engine.pool, "invalidated"):
+                status["invalidated"] = engine.pool.invalidated()
             return status
         return {"status": "Pool information not available"}
 
+    def get_pool_status(self) -> dict:
+        """Get current connection pool status"""
+        status = self._describe_pool(self.engine)
+        if self.read_engine is not None:
+            status["read_pool"] = self._describe_pool(self.read_engine)
+        if self.replica is not None:
+            status["replica_pool"] = self._describe_pool(self.replica.engine)
+        return status
+
     def close(self):
         """Close database connections and cleanup"""
         try:
@@ -339,6 +662,12 @@ class DatabaseManager:
             if self.engine:
                 self.engine.dispose()
 
+            if self.read_engine:
+                self.read_engine.dispose()
+
+            if self.replica:
+                self.replica.engine.dispose()
+
             # For async engine, we need to handle it properly
             if self.async_engine:
                 try:
@@ -373,6 +702,11 @@ def get_db() -> Generator[Session, None, None]:
     yield from db_manager.get_db()
 
 
+def get_read_db() -> Generator[Session, None, None]:
+    """Get a read-only session, from the replica when one is healthy"""
+    yield from db_manager.get_read_db()
+
+
 async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     """Get async database session"""
     async with db_manager.get_async_db() as session:
@@ -404,6 +738,11 @@ def check_database_health() -> dict:
         # Get pool status
         health_status["pool_status"] = db_manager.get_pool_status()
 
+        # A failed replica is degraded service, reads fall back to the primary
+        if db_manager.replica is not None:
+            db_manager.replica.check()
+            health_status["read_replica"] = db_manager.replica.get_status()
+
         if not health_status["connection_test"]:
             health_status["status"] = "unhealthy"
 
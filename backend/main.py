@@ -5,7 +5,13 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.api_v1.api import api_router
+from app.core.concurrency import shutdown_db_pool
 from app.core.config import settings
+from app.core.database import db_manager
+from app.core.email_delivery import email_queue
+from app.core.security import password_hasher
+from app.core.ingestion import ingestion_queue, write_behind_enabled
+from app.core.retention import retention_worker
 from app.db.init_db import init_db
 
 # Add the backend directory to Python path
@@ -19,9 +25,19 @@ from z.gmailhandlerautomation import router as gmail_automation_router
 async def lifespan(app: FastAPI):
     # Startup
     init_db()
+    if write_behind_enabled():
+        ingestion_queue.start()
+    # Resumes interrupted runs; scheduled passes need RETENTION_ENABLED
+    retention_worker.start()
     yield
-    # Shutdown
-    pass
+    # Shutdown: write out telemetry still waiting in the queue
+    ingestion_queue.stop()
+    retention_worker.stop()
+    shutdown_db_pool()
+    # Pooled aiosqlite connections run on non-daemon threads
+    await db_manager.async_engine.dispose()
+    password_hasher.shutdown()
+    email_queue.stop()
 
 
 app = FastAPI(
@@ -18,6 +18,10 @@ from app.core.database import get_db
 from app.models.agent import Agent
 from app.models.email_processing_data import EmailProcessingData
 from app.models.spam_handler_data import SpamHandlerData
+from app.crud.crud_telemetry_rollup import (
+    email_processing_rollup,
+    spam_handler_rollup,
+)
 from sqlalchemy.orm import Session
 
 
@@ -427,6 +431,12 @@ def main():
         generator.add_recent_data(db)
         print()
 
+        # Records were inserted directly, so rebuild the hourly rollups
+        email_processing_rollup.rebuild(db)
+        spam_handler_rollup.rebuild(db)
+        print("Rebuilt hourly rollups")
+        print()
+
         print("=" * 60)
         print("✅ Dummy data generation completed successfully!")
         print()
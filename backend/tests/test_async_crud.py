@@ -0,0 +1,104 @@
+"""
+Test the async CRUD layer
+Creates, reads, updates and deletes telemetry through AsyncSession-based
+CRUD objects and checks that rollups follow the writes.
+"""
+
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.database import db_manager
+from app.crud.crud_proxy_error import async_proxy_error
+from app.crud.crud_spam_handler_data import async_spam_handler_data
+from app.crud.crud_telemetry_rollup import spam_handler_rollup
+from app.schemas.proxy_error import ProxyErrorCreate
+from app.schemas.spam_handler_data import SpamHandlerDataCreate, SpamHandlerDataUpdate
+
+AGENT = "async_crud_test_agent"
+
+
+def _run(coroutine):
+    """Run on a fresh loop, closing the pooled async connections before it ends"""
+
+    async def run_and_dispose():
+        try:
+            return await coroutine
+        finally:
+            # Pooled aiosqlite threads are not daemons and would keep us alive
+            await db_manager.async_engine.dispose()
+
+    return asyncio.run(run_and_dispose())
+
+
+def _spam_found_total() -> int:
+    db = next(db_manager.get_db())
+    try:
+        return spam_handler_rollup.summarize(db, agent_name=AGENT)["spam_found"]
+    finally:
+        db.close()
+
+
+def test_spam_handler_round_trip():
+    """Create, update and remove keep the rollups in step"""
+    print("1. Round trip through the async spam handler CRUD...")
+    before = _spam_found_total()
+
+    async def round_trip():
+        async with db_manager.get_async_db() as db:
+            created = await async_spam_handler_data.create(
+                db,
+                obj_in=SpamHandlerDataCreate(
+                    agent_name=AGENT,
+                    profile_name="profile_test",
+                    sender_email="sender@example.com",
+                    spam_emails_found=4,
+                ),
+            )
+            updated = await async_spam_handler_data.update(
+                db, db_obj=created, obj_in=SpamHandlerDataUpdate(spam_emails_found=6)
+            )
+            assert updated.spam_emails_found == 6
+            after_update = await asyncio.to_thread(_spam_found_total)
+            await async_spam_handler_data.remove(db, id=created.id)
+            return after_update
+
+    after_update = _run(round_trip())
+    assert after_update == before + 6
+    assert _spam_found_total() == before
+    print("✓ Rollups followed the create, update and delete")
+
+
+def test_proxy_error_bulk_create(records: int = 20):
+    """Bulk create returns loaded rows"""
+    print("\n2. Bulk creating proxy errors asynchronously...")
+
+    async def bulk():
+        async with db_manager.get_async_db() as db:
+            created = await async_proxy_error.bulk_create(
+                db,
+                objs_in=[
+                    ProxyErrorCreate(
+                        agent_name=AGENT,
+                        proxy="10.0.0.1:8080",
+                        error_details=f"timeout {i}",
+                        profile_name="profile_test",
+                    )
+                    for i in range(records)
+                ],
+            )
+            deleted = await async_proxy_error.remove_multi(
+                db, ids=[obj.id for obj in created]
+            )
+            return created, deleted
+
+    created, deleted = _run(bulk())
+    assert len(created) == records and deleted == records
+    print(f"✓ Created and removed {records} proxy errors")
+
+
+if __name__ == "__main__":
+    test_spam_handler_round_trip()
+    test_proxy_error_bulk_create()
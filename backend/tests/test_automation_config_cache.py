@@ -0,0 +1,90 @@
+"""
+Test the automation config snapshot cache
+Checks that reads are served from memory until a write bumps the version,
+and that the ETag only changes when the config content does.
+"""
+
+import asyncio
+import sys
+import os
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.config_cache import AutomationConfigCache, config_delta
+
+
+class _Builder:
+    def __init__(self):
+        self.calls = 0
+        self.config = {"DEFAULT_SENDERS": ["a@example.com"], "DEFAULT_TIMEOUT": 20}
+
+    def __call__(self, db):
+        self.calls += 1
+        return dict(self.config)
+
+
+def test_snapshot_reused_until_bump():
+    """Only the first read and the first read after a bump build the config"""
+    print("1. Testing snapshot reuse...")
+    cache = AutomationConfigCache(ttl_seconds=60)
+    builder = _Builder()
+
+    first = cache.get(None, builder)
+    second = cache.get(None, builder)
+    assert builder.calls == 1 and first is second
+    print(f"✓ Two reads, one build (etag {first.etag})")
+
+    cache.bump()
+    rebuilt = cache.get(None, builder)
+    assert builder.calls == 2 and rebuilt.version == first.version + 1
+    assert rebuilt.etag == first.etag
+    print("✓ Bump rebuilt the snapshot; unchanged content kept its ETag")
+
+    builder.config["DEFAULT_TIMEOUT"] = 30
+    cache.bump()
+    changed = cache.get(None, builder)
+    assert changed.etag != first.etag
+    print("✓ Changed content produced a new ETag")
+
+
+def test_ttl_expiry():
+    """A zero TTL rebuilds on every read"""
+    print("\n2. Testing TTL expiry...")
+    cache = AutomationConfigCache(ttl_seconds=0)
+    builder = _Builder()
+    cache.get(None, builder)
+    cache.get(None, builder)
+    assert builder.calls == 2
+    print("✓ Expired snapshot was rebuilt")
+
+
+def test_delta_and_subscribers():
+    """Bumps from worker threads wake subscribers; deltas are compact"""
+    print("\n3. Testing change notifications...")
+    delta = config_delta(
+        {"DEFAULT_TIMEOUT": 20, "RANDOM_URLS": ["a"], "OLD": 1},
+        {"DEFAULT_TIMEOUT": 20, "RANDOM_URLS": ["a", "b"]},
+    )
+    assert delta == {"changed": {"RANDOM_URLS": ["a", "b"]}, "removed": ["OLD"]}
+    print(f"✓ Delta: {delta}")
+
+    cache = AutomationConfigCache(ttl_seconds=60)
+
+    async def wait_for_bump():
+        changed = cache.subscribe()
+        try:
+            threading.Thread(target=cache.bump).start()
+            await asyncio.wait_for(changed.wait(), timeout=2)
+        finally:
+            cache.unsubscribe(changed)
+
+    asyncio.run(wait_for_bump())
+    assert cache.get_metrics()["subscribers"] == 0
+    print("✓ Subscriber woken by a bump from another thread")
+
+
+if __name__ == "__main__":
+    test_snapshot_reused_until_bump()
+    test_ttl_expiry()
+    test_delta_and_subscribers()
@@ -0,0 +1,87 @@
+"""
+Test the set-based bulk insert path
+Bulk creates telemetry and random URLs in small chunks and checks that rows
+come back loaded and that duplicate URLs are skipped.
+"""
+
+import sys
+import os
+import uuid
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.database import db_manager
+from app.crud.crud_random_url import random_url
+from app.crud.crud_spam_handler_data import spam_handler_data
+from app.db.bulk_insert import bulk_insert
+from app.models.proxy_error import ProxyError
+from app.schemas.random_url import RandomUrlCreate
+from app.schemas.spam_handler_data import SpamHandlerDataCreate
+
+AGENT = "bulk_insert_test_agent"
+
+
+def test_bulk_create_returns_rows(records: int = 25):
+    """Inserted rows are returned with ids and defaults, without refreshes"""
+    print("1. Bulk creating spam handler data...")
+    db = next(db_manager.get_db())
+    try:
+        objs_in = [
+            SpamHandlerDataCreate(
+                agent_name=AGENT,
+                profile_name=f"profile_{i}",
+                sender_email="sender@example.com",
+                spam_emails_found=i,
+            )
+            for i in range(records)
+        ]
+        created = spam_handler_data.bulk_create(db, objs_in=objs_in)
+        ids = [obj.id for obj in created]
+        assert len(set(ids)) == records and all(ids)
+        assert all(obj.created_at for obj in created)
+        print(f"✓ {len(created)} rows returned with ids {min(ids)}..{max(ids)}")
+
+        rows = [
+            {
+                "agent_name": AGENT,
+                "proxy": "10.0.0.1:8080",
+                "error_details": f"timeout {i}",
+                "profile_name": "profile_test",
+            }
+            for i in range(7)
+        ]
+        chunked_rows = bulk_insert(db, ProxyError, rows, chunk_size=3)
+        db.commit()
+        assert len(chunked_rows) == 7
+        print("✓ Payload split across chunks returned every row")
+    finally:
+        db.close()
+
+
+def test_random_url_duplicates():
+    """Existing and repeated URLs are skipped with set-based lookups"""
+    print("\n2. Bulk creating random URLs with duplicates...")
+    db = next(db_manager.get_db())
+    try:
+        base = f"https://bulk-{uuid.uuid4().hex[:8]}.example.com"
+        first = random_url.bulk_create(db, objs_in=[RandomUrlCreate(url=f"{base}/a")])
+        second = random_url.bulk_create(
+            db,
+            objs_in=[
+                RandomUrlCreate(url=f"{base}/a"),
+                RandomUrlCreate(url=f"{base}/b"),
+                RandomUrlCreate(url=f"{base}/b"),
+            ],
+        )
+        assert len(first) == 1
+        assert [obj.url for obj in second] == [f"{base}/b"]
+        print("✓ Only the new URL was inserted")
+
+        random_url.bulk_delete(db, ids=[obj.id for obj in first + second])
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_bulk_create_returns_rows()
+    test_random_url_duplicates()
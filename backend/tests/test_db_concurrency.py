@@ -0,0 +1,65 @@
+"""
+Test that database work called from async code leaves the event loop free
+Runs slow blocking calls on the database thread pool and CRUD reads on an
+AsyncSession while a ticker keeps running on the loop.
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.concurrency import run_crud, run_in_db_pool
+from app.core.database import db_manager
+from app.crud.crud_logged_out_profile import logged_out_profile
+
+
+def _run(coroutine):
+    """Run on a fresh loop, closing the pooled async connections before it ends"""
+
+    async def run_and_dispose():
+        try:
+            return await coroutine
+        finally:
+            # Pooled aiosqlite threads are not daemons and would keep us alive
+            await db_manager.async_engine.dispose()
+
+    return asyncio.run(run_and_dispose())
+
+
+async def _ticks_during(awaitable, interval: float = 0.01) -> int:
+    ticks = 0
+    task = asyncio.ensure_future(awaitable)
+    while not task.done():
+        await asyncio.sleep(interval)
+        ticks += 1
+    await task
+    return ticks
+
+
+def test_pool_does_not_block_loop():
+    """A blocking call on the pool lets other coroutines run"""
+    print("1. Running a blocking call on the database pool...")
+    ticks = asyncio.run(_ticks_during(run_in_db_pool(time.sleep, 0.2)))
+    assert ticks >= 5
+    print(f"✓ Event loop ticked {ticks} times during a 200ms blocking call")
+
+
+def test_crud_on_async_session():
+    """Synchronous CRUD methods run unchanged on an AsyncSession"""
+    print("\n2. Reading through an AsyncSession...")
+
+    async def read():
+        async with db_manager.get_async_db() as db:
+            return await run_crud(db, logged_out_profile.get_multi, skip=0, limit=5)
+
+    items, total = _run(read())
+    assert len(items) <= 5 and total >= len(items)
+    print(f"✓ Read {len(items)} of {total} logged out profiles")
+
+
+if __name__ == "__main__":
+    test_pool_does_not_block_loop()
+    test_crud_on_async_session()
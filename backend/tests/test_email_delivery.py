@@ -0,0 +1,142 @@
+"""
+Test queued email delivery over pooled SMTP connections
+Runs a minimal local SMTP server and checks that messages share one
+connection and that a transient 421 is retried on a fresh one.
+"""
+
+import socketserver
+import sys
+import os
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.email import (
+    VERIFICATION_HTML,
+    VERIFICATION_TEXT,
+    _render,
+    build_message,
+)
+from app.core.email_delivery import EmailDeliveryQueue, SMTPConnectionPool
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib.send_message"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, fail_first_mail: int = 0):
+        super().__init__(("127.0.0.1", 0), LocalSMTPHandler)
+        self.fail_first_mail = fail_first_mail
+        self.connections = 0
+        self.messages = []
+        self.lock = threading.Lock()
+
+
+class LocalSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost ready")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == "QUIT":
+                self.reply("221 bye")
+                return
+            if command in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif command == "MAIL":
+                with server.lock:
+                    refuse = server.fail_first_mail > 0
+                    server.fail_first_mail -= 1
+                if refuse:
+                    self.reply("421 try again later")
+                    return
+                self.reply("250 ok")
+            elif command == "DATA":
+                self.reply("354 end with .")
+                body = []
+                while True:
+                    data = self.rfile.readline().decode()
+                    if data.rstrip("\r\n") == ".":
+                        break
+                    body.append(data)
+                with server.lock:
+                    server.messages.append("".join(body))
+                self.reply("250 queued")
+            else:
+                # RCPT, NOOP, RSET
+                self.reply("250 ok")
+
+
+def _run_queue(server: LocalSMTPServer, count: int) -> EmailDeliveryQueue:
+    pool = SMTPConnectionPool(
+        host="127.0.0.1", port=server.server_address[1], use_tls=False, size=1
+    )
+    delivery = EmailDeliveryQueue(pool, max_attempts=3, retry_base_seconds=0.01)
+    delivery.start()
+    for i in range(count):
+        delivery.submit(
+            build_message(f"user{i}@example.com", "Hello", "<p>hi</p>", "hi")
+        )
+    deadline = time.monotonic() + 10
+    while len(server.messages) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    delivery.stop()
+    return delivery
+
+
+def test_connection_reuse(count: int = 20):
+    """All messages go over one SMTP session"""
+    print("1. Sending through the pool...")
+    server = LocalSMTPServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        delivery = _run_queue(server, count)
+        metrics = delivery.get_metrics()
+        assert len(server.messages) == count and metrics["sent"] == count
+        assert server.connections == 1
+        print(f"✓ {count} messages over {server.connections} connection")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_transient_failure_retried(count: int = 5):
+    """A 421 drops the session and the message is retried"""
+    print("\n2. Retrying a transient failure...")
+    server = LocalSMTPServer(fail_first_mail=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        delivery = _run_queue(server, count)
+        metrics = delivery.get_metrics()
+        assert len(server.messages) == count
+        assert metrics["retried"] == 1 and metrics["failed"] == 0
+        assert server.connections == 2
+        print(f"✓ Delivered all {count} after one retry on a new connection")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_templates_escape_values():
+    """Rendered HTML escapes user-supplied values"""
+    print("\n3. Rendering a template...")
+    html, text = _render(
+        VERIFICATION_HTML, VERIFICATION_TEXT, username="<b>x</b>", link="l"
+    )
+    assert "&lt;b&gt;x&lt;/b&gt;" in html and "<b>x</b>" in text
+    print("✓ HTML escaped, plain text left as is")
+
+
+if __name__ == "__main__":
+    test_connection_reuse()
+    test_transient_failure_retried()
+    test_templates_escape_values()
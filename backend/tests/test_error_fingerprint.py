@@ -0,0 +1,114 @@
+"""
+Test the error fingerprint index behind the common error patterns
+Checks message normalization on its own, then the fingerprints and hourly
+counts maintained by the email processing CRUD.
+"""
+
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.utils.error_fingerprint import error_fingerprint, error_template
+
+
+def test_error_templates():
+    """Messages differing only in variable parts share a fingerprint"""
+    print("1. Normalizing error messages...")
+    first = "Timeout after 30 seconds for jane@example.com on https://a.example/x?id=7"
+    second = "Timeout after 12.5 seconds for joe@example.org on http://b.example/"
+    assert error_template(first) == (
+        "Timeout after <n> seconds for <email> on <url>"
+    ), error_template(first)
+    assert error_fingerprint(first) == error_fingerprint(second)
+    print(f"✓ Template: {error_template(first)}")
+
+    print("\n2. IDs, addresses and distinct messages...")
+    assert error_template(
+        "Task 550e8400-e29b-41d4-a716-446655440000 failed on 10.0.0.1:8080"
+    ) == ("Task <id> failed on <ip>")
+    assert error_template("Session 3f2a1b9c8d7e6f50a1b2 expired") == (
+        "Session <id> expired"
+    )
+    assert error_fingerprint("Login failed") != error_fingerprint("Inbox not found")
+    assert error_fingerprint("   ") is None
+    print("✓ Variable parts replaced, different messages kept apart")
+
+
+def test_fingerprint_counts():
+    """Top patterns and new patterns agree with the raw entries"""
+    from app.core.database import db_manager
+    from app.crud.crud_email_processing_data import email_processing_data
+    from app.crud.crud_error_fingerprint import error_patterns
+    from app.schemas.email_processing_data import EmailProcessingDataCreate
+
+    agent = f"fingerprint_agent_{uuid.uuid4().hex[:8]}"
+    # Letters only, so the marker survives normalization
+    marker = uuid.uuid4().hex[:8].translate(str.maketrans("0123456789", "ghijklmnop"))
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=2)
+    messages = [f"Proxy {i} refused login for user{i}@example.com" for i in range(4)]
+    messages += [f"Unexpected {marker} page layout after {i} retries" for i in range(2)]
+    db = db_manager.SessionLocal()
+    ids = []
+    try:
+        print("\n3. Writing failed entries...")
+        created = email_processing_data.bulk_create(
+            db,
+            objs_in=[
+                EmailProcessingDataCreate(
+                    agent_name=agent,
+                    profile_name="profile",
+                    sender_email="sender@example.com",
+                    email_subject="Subject",
+                    error_occurred=True,
+                    error_details=message,
+                    timestamp=start + timedelta(minutes=20 * i),
+                )
+                for i, message in enumerate(messages)
+            ],
+        )
+        ids = [row.id for row in created]
+        assert created[0].error_fingerprint == created[1].error_fingerprint
+        print(f"✓ {len(ids)} entries written with fingerprints")
+
+        print("\n4. Top patterns for the agent...")
+        top = error_patterns.top(
+            db,
+            limit=2,
+            start_date=start - timedelta(minutes=5),
+            end_date=datetime.utcnow(),
+            agent_name=agent,
+        )
+        assert [(entry["template"], entry["count"]) for entry in top] == [
+            ("Proxy <n> refused login for <email>", 4),
+            (f"Unexpected {marker} page layout after <n> retries", 2),
+        ], top
+        print(f"✓ Top patterns: {[entry['template'] for entry in top]}")
+
+        print("\n5. New patterns across the fleet...")
+        new = error_patterns.new(db, start_date=start - timedelta(minutes=5), limit=100)
+        matching = [entry for entry in new if marker in entry["template"]]
+        assert len(matching) == 1 and matching[0]["agent_count"] == 1
+        print(f"✓ New pattern first seen at {matching[0]['first_seen']}")
+
+        print("\n6. Deletes are taken back...")
+        email_processing_data.bulk_delete(db, ids=ids[:4])
+        ids = ids[4:]
+        top = error_patterns.top(
+            db,
+            start_date=start - timedelta(minutes=5),
+            end_date=datetime.utcnow(),
+            agent_name=agent,
+        )
+        assert [entry["count"] for entry in top] == [2]
+        print("✓ Deleted errors no longer counted")
+    finally:
+        email_processing_data.bulk_delete(db, ids=ids)
+        db.close()
+
+
+if __name__ == "__main__":
+    test_error_templates()
+    test_fingerprint_counts()
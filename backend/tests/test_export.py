@@ -0,0 +1,162 @@
+"""
+Test the streaming CSV / NDJSON exports
+Checks the encoders chunk by chunk across batch boundaries, the gzip stream,
+and the export endpoint end to end. Only rows dated in 2000 are written.
+"""
+
+import sys
+import os
+import csv
+import gzip
+import io
+import json
+import uuid
+import zlib
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.utils.export import encode_export, export_filename
+
+COLUMNS = ["id", "agent_name", "error_details", "timestamp"]
+
+
+def _batches(pulled, count=3, size=2):
+    """Yield count batches of size rows, recording how many were pulled"""
+    for batch in range(count):
+        pulled.append(batch)
+        yield [
+            (
+                batch * size + i,
+                f"agent_{batch}",
+                None if i else 'quote "and, comma"',
+                datetime(2000, 1, 1) + timedelta(minutes=batch * size + i),
+            )
+            for i in range(size)
+        ]
+
+
+def test_encoders():
+    """Each batch is encoded as it is pulled, in every format"""
+    print("1. Testing the CSV encoder...")
+    pulled = []
+    chunks = encode_export("csv", COLUMNS, _batches(pulled))
+    assert next(chunks) == b"id,agent_name,error_details,timestamp\r\n"
+    assert pulled == []
+    first = next(chunks)
+    assert pulled == [0] and first.count(b"\r\n") == 2
+    rows = list(csv.reader(io.StringIO((first + b"".join(chunks)).decode())))
+    assert pulled == [0, 1, 2] and len(rows) == 6
+    assert [int(row[0]) for row in rows] == list(range(6))
+    assert rows[0][2] == 'quote "and, comma"' and rows[1][2] == ""
+    assert rows[5][3] == "2000-01-01T00:05:00"
+    print("✓ Header first, then one chunk per batch across 3 batches")
+
+    print("\n2. Testing the NDJSON encoder...")
+    pulled = []
+    chunks = list(encode_export("ndjson", COLUMNS, _batches(pulled)))
+    assert len(chunks) == 3
+    records = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [record["id"] for record in records] == list(range(6))
+    assert list(records[0]) == COLUMNS and records[1]["error_details"] is None
+    print(f"✓ {len(records)} objects in {len(chunks)} chunks")
+
+    print("\n3. Testing gzip compression...")
+    for export_format in ("csv", "ndjson"):
+        plain = b"".join(encode_export(export_format, COLUMNS, _batches([])))
+        pulled = []
+        chunks = encode_export(export_format, COLUMNS, _batches(pulled), gzip=True)
+        # Every chunk is sync-flushed, so it decompresses as soon as it arrives
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        streamed = decompressor.decompress(next(chunks))
+        assert streamed and len(pulled) <= 1
+        compressed = list(chunks)
+        streamed += b"".join(decompressor.decompress(chunk) for chunk in compressed)
+        assert streamed == plain
+        print(f"✓ {export_format} gzip stream decodes incrementally")
+
+    assert export_filename("spam", "ndjson", gzip=True).endswith(".ndjson.gz")
+    assert export_filename("spam", "csv").endswith(".csv")
+
+
+def test_export_request(rows: int = 5, batch_size: int = 2):
+    """The endpoint streams every matching row across several batches"""
+    from fastapi.testclient import TestClient
+
+    from app.core.config import settings
+    from app.core.database import db_manager
+    from app.crud.crud_email_processing_data import email_processing_data
+    from app.main import app
+    from app.models import EmailProcessingData
+
+    agent = f"export_agent_{uuid.uuid4().hex[:8]}"
+    db = db_manager.SessionLocal()
+    iter_export_batches = type(email_processing_data).iter_export_batches
+    batches = []
+
+    def small_batches(db, **filters):
+        # Small batches, so the few test rows cross batch boundaries
+        for batch in iter_export_batches(
+            email_processing_data, db, batch_size=batch_size, **filters
+        ):
+            batches.append(len(batch))
+            yield batch
+
+    email_processing_data.iter_export_batches = small_batches
+    try:
+        print("\n4. Exporting through the endpoint...")
+        db.add_all(
+            EmailProcessingData(
+                agent_name=agent,
+                profile_name=f"profile_{i}",
+                sender_email="sender@example.com",
+                email_subject=f"subject {i}",
+                timestamp=datetime(2000, 1, 1) + timedelta(minutes=i),
+            )
+            for i in range(rows)
+        )
+        db.commit()
+
+        client = TestClient(app)
+        url = f"{settings.API_V1_STR}/email-processing-data/export/csv"
+        params = {"agent_name": agent, "end_date": datetime(2000, 1, 2).isoformat()}
+        columns = email_processing_data.EXPORT_COLUMNS
+
+        response = client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        assert response.headers["content-type"].startswith("text/csv")
+        lines = list(csv.reader(io.StringIO(response.text)))
+        assert lines[0] == columns and len(lines) == rows + 1
+        assert {line[1] for line in lines[1:]} == {agent}
+        assert batches == [2, 2, 1], batches
+        print(f"✓ CSV: header and {len(lines) - 1} rows in {len(batches)} batches")
+
+        response = client.get(url, params={**params, "format": "ndjson"})
+        assert response.status_code == 200, response.text
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert len(records) == rows and list(records[0]) == columns
+        ids = [record["id"] for record in records]
+        assert ids == sorted(set(ids))
+        print(f"✓ NDJSON: {len(records)} rows in id order")
+
+        response = client.get(url, params={**params, "format": "csv", "gzip": True})
+        assert response.status_code == 200, response.text
+        assert 'csv.gz"' in response.headers["content-disposition"]
+        assert response.headers["content-type"] == "application/gzip"
+        text = gzip.decompress(response.content).decode()
+        lines = list(csv.reader(io.StringIO(text)))
+        assert lines[0] == columns and len(lines) == rows + 1
+        print(f"✓ gzip CSV: header and {len(lines) - 1} rows")
+    finally:
+        del email_processing_data.iter_export_batches
+        db.query(EmailProcessingData).filter(
+            EmailProcessingData.agent_name == agent
+        ).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    test_encoders()
+    test_export_request()
@@ -0,0 +1,130 @@
+"""
+Test the write-behind ingestion queue
+Queues telemetry records, checks idempotency and backpressure, retries of
+failed writes, then verifies that stopping the flusher writes everything that
+was accepted.
+"""
+
+import sys
+import os
+
+from sqlalchemy.exc import OperationalError
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.database import db_manager
+from app.core.ingestion import (
+    IngestionQueue,
+    IngestionQueueFull,
+    PROXY_ERROR,
+    SPAM_HANDLER,
+)
+from app.models.proxy_error import ProxyError
+from app.models.spam_handler_data import SpamHandlerData
+from app.schemas.proxy_error import ProxyErrorCreate
+from app.schemas.spam_handler_data import SpamHandlerDataCreate
+
+AGENT = "ingestion_test_agent"
+
+
+def _spam_record():
+    return SpamHandlerDataCreate(
+        agent_name=AGENT,
+        profile_name="profile_test",
+        sender_email="sender@example.com",
+        spam_emails_found=3,
+        moved_to_inbox=2,
+        total_time_seconds=12.5,
+    )
+
+
+def _count(model):
+    db = next(db_manager.get_db())
+    try:
+        return db.query(model).filter(model.agent_name == AGENT).count()
+    finally:
+        db.close()
+
+
+def test_idempotency_and_backpressure():
+    """Repeated keys are acknowledged once; a full queue raises"""
+    print("1. Testing idempotency keys and backpressure...")
+    ingestion = IngestionQueue(max_size=2)
+
+    first = ingestion.submit(SPAM_HANDLER, _spam_record(), "key-1")
+    repeat = ingestion.submit(SPAM_HANDLER, _spam_record(), "key-1")
+    assert first["status"] == "accepted" and repeat["status"] == "duplicate"
+    print("✓ Duplicate submission acknowledged without queueing")
+
+    ingestion.submit(SPAM_HANDLER, _spam_record(), "key-2")
+    try:
+        ingestion.submit(SPAM_HANDLER, _spam_record(), "key-3")
+        print("✗ Full queue accepted another record")
+    except IngestionQueueFull:
+        print(f"✓ Full queue rejected record: {ingestion.get_metrics()['rejected']}")
+
+
+def test_failed_writes():
+    """Transient failures are retried; dropped records can be sent again"""
+    print("\n2. Testing retries and dropped records...")
+    calls = []
+
+    def flaky_writer(db, objs_in, return_rows):
+        calls.append(len(objs_in))
+        if len(calls) == 1:
+            raise OperationalError("INSERT", {}, Exception("connection lost"))
+
+    ingestion = IngestionQueue(retry_base_seconds=0)
+    ingestion._writers = {SPAM_HANDLER: flaky_writer}
+    ingestion.submit(SPAM_HANDLER, _spam_record(), "key-retry")
+    ingestion._flush(ingestion._drain(10))
+    metrics = ingestion.get_metrics()
+    assert metrics["retries"] == 1 and metrics["written"] == 1, metrics
+    print("✓ Batch written after a lost connection")
+
+    def broken_writer(db, objs_in, return_rows):
+        raise ValueError("bad record")
+
+    ingestion._writers = {SPAM_HANDLER: broken_writer}
+    ingestion.submit(SPAM_HANDLER, _spam_record(), "key-dropped")
+    ingestion._flush(ingestion._drain(10))
+    assert ingestion.get_metrics()["failed"] == 1
+    retry = ingestion.submit(SPAM_HANDLER, _spam_record(), "key-dropped")
+    assert retry["status"] == "accepted"
+    print("✓ Dropped record accepted again under its key")
+
+
+def test_flush_on_stop(records: int = 50):
+    """Everything accepted is written once the flusher stops"""
+    print("\n3. Testing flush of queued records...")
+    spam_before = _count(SpamHandlerData)
+    proxy_before = _count(ProxyError)
+
+    ingestion = IngestionQueue(batch_size=20, flush_interval_ms=50)
+    ingestion.start()
+    for i in range(records):
+        ingestion.submit(SPAM_HANDLER, _spam_record())
+        ingestion.submit(
+            PROXY_ERROR,
+            ProxyErrorCreate(
+                agent_name=AGENT,
+                proxy="10.0.0.1:8080",
+                error_details=f"timeout {i}",
+                profile_name="profile_test",
+            ),
+        )
+    ingestion.stop()
+
+    metrics = ingestion.get_metrics()
+    spam_written = _count(SpamHandlerData) - spam_before
+    proxy_written = _count(ProxyError) - proxy_before
+    if spam_written == records and proxy_written == records:
+        print(f"✓ {metrics['written']} records written in {metrics['batches']} batches")
+    else:
+        print(f"✗ Wrote {spam_written} spam and {proxy_written} proxy records")
+
+
+if __name__ == "__main__":
+    test_idempotency_and_backpressure()
+    test_failed_writes()
+    test_flush_on_stop()
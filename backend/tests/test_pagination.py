@@ -0,0 +1,91 @@
+"""
+Test keyset (cursor) pagination
+Walks the proxy error list page by page with cursors and checks the result
+matches the offset listing.
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from datetime import datetime
+from app.core.database import db_manager
+from app.crud.crud_proxy_error import proxy_error
+from app.utils.pagination import encode_cursor, decode_cursor, InvalidCursorError
+
+
+def test_cursor_round_trip():
+    """Cursors decode back to the position they encode"""
+    print("1. Testing cursor encoding...")
+    position = (datetime(2025, 7, 13, 10, 30, 0, 123456), 42)
+    cursor = encode_cursor(*position)
+    assert decode_cursor(cursor) == position
+    print(f"✓ Cursor {cursor} round-trips")
+
+    for malformed in ("not-a-cursor", encode_cursor(position[0], 42)[:-4], ""):
+        try:
+            decode_cursor(malformed)
+        except InvalidCursorError as e:
+            assert isinstance(e, ValueError)
+        else:
+            raise AssertionError(f"Malformed cursor {malformed!r} was accepted")
+    print("✓ Malformed cursors rejected")
+
+
+def test_cursor_walk(page_size: int = 7):
+    """Following next_cursor visits the same rows as the offset listing"""
+    print("\n2. Testing cursor walk over proxy errors...")
+    db = next(db_manager.get_db())
+
+    try:
+        expected, total = proxy_error.get_multi(db, skip=0, limit=100000)
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            items, page_total, cursor = proxy_error.get_page(
+                db, limit=page_size, cursor=cursor, include_total=False
+            )
+            assert page_total is None
+            seen.extend(item.id for item in items)
+            pages += 1
+            if not cursor:
+                break
+
+        assert len(seen) == len(set(seen)), "Cursor walk repeated rows"
+        assert seen == [item.id for item in expected], (
+            "Cursor walk differs from offset listing"
+        )
+        assert len(seen) == total
+        print(f"✓ {len(seen)} of {total} rows visited in {pages} pages, same order")
+    finally:
+        db.close()
+
+
+def test_malformed_cursor_request():
+    """The list endpoint answers a malformed cursor with 400"""
+    from fastapi.testclient import TestClient
+
+    from app.api.deps import get_current_user
+    from app.core.config import settings
+    from app.main import app
+
+    print("\n3. Testing a malformed cursor over HTTP...")
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        client = TestClient(app)
+        response = client.get(
+            f"{settings.API_V1_STR}/proxy-errors/", params={"cursor": "not-a-cursor"}
+        )
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert response.status_code == 400, response.text
+    print("✓ Malformed cursor answered with 400")
+
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_cursor_walk()
+    test_malformed_cursor_request()
@@ -0,0 +1,71 @@
+"""
+Test time-range partitioning of the telemetry tables
+Checks the period arithmetic everywhere, and partition maintenance and
+partition-drop retention when the database is MySQL.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.db.partitioning import floor_period, next_period, partition_name
+
+
+def test_periods():
+    """Days and months, including the turn of the year"""
+    print("1. Partition periods...")
+    value = datetime(2024, 12, 31, 23, 59, 59)
+    assert floor_period(value, "day") == datetime(2024, 12, 31)
+    assert floor_period(value, "month") == datetime(2024, 12, 1)
+    assert next_period(datetime(2024, 12, 1), "month") == datetime(2025, 1, 1)
+    assert next_period(datetime(2024, 2, 28), "day") == datetime(2024, 2, 29)
+    assert partition_name(datetime(2025, 1, 1)) == "p20250101"
+    print("✓ Periods and partition names line up")
+
+
+def test_partition_retention():
+    """Partitioned tables have upcoming partitions and drop nothing live"""
+    from app.core.config import settings
+    from app.core.database import db_manager
+    from app.db.partitioning import (
+        drop_partitions_before,
+        ensure_partitions,
+        extend_partitions,
+        get_partitions,
+        partition_interval,
+    )
+
+    print("\n2. Partition maintenance...")
+    if db_manager.engine.dialect.name != "mysql" or partition_interval() is None:
+        print("✓ Skipped: needs MySQL and TELEMETRY_PARTITION_INTERVAL")
+        return
+
+    table_name = "proxy_errors"
+    ensure_partitions(db_manager.engine)
+    with db_manager.engine.connect() as connection:
+        partitions = get_partitions(connection, table_name)
+    assert partitions[-1] == ("pmax", None)
+    newest = max(upper for _, upper in partitions if upper)
+    ahead = timedelta(days=settings.TELEMETRY_PARTITIONS_AHEAD)
+    assert newest > datetime.utcnow() + ahead
+    # The retention passes find nothing left to add right after a start
+    assert extend_partitions(db_manager.engine) == []
+    print(f"✓ {len(partitions)} partitions, newest bound {newest}")
+
+    print("\n3. Dropping partitions before a cutoff...")
+    db = db_manager.SessionLocal()
+    try:
+        oldest = partitions[0][1]
+        dropped = drop_partitions_before(db, table_name, oldest - timedelta(days=1))
+        assert dropped == 0
+        assert get_partitions(db, table_name) == partitions
+        print("✓ Nothing dropped before the oldest partition")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_periods()
+    test_partition_retention()
@@ -0,0 +1,85 @@
+"""
+Test the dedicated password hashing pool
+Hashes and verifies passwords off the event loop, checks that a full
+queue is refused instead of growing and that cancelled hashes free their slot.
+"""
+
+import asyncio
+import sys
+import os
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.security import PasswordHasher, PasswordHasherBusy
+
+
+def test_hash_and_verify():
+    """Hashes made on the pool verify on the pool"""
+    print("1. Hashing on the pool...")
+    hasher = PasswordHasher(workers=2, max_pending=4)
+
+    async def run():
+        hashed = await hasher.hash("correct horse")
+        assert await hasher.verify("correct horse", hashed)
+        assert not await hasher.verify("wrong horse", hashed)
+
+    try:
+        asyncio.run(run())
+        metrics = hasher.get_metrics()
+        assert metrics["completed"] == 3 and metrics["queued"] == 0
+        print(f"✓ 3 operations, avg {metrics['avg_hash_ms']} ms each")
+    finally:
+        hasher.shutdown()
+
+
+def test_queue_limit():
+    """Submissions beyond max_pending are rejected"""
+    print("\n2. Filling the queue...")
+    hasher = PasswordHasher(workers=1, max_pending=1)
+
+    async def run():
+        first = asyncio.ensure_future(hasher.hash("one"))
+        await asyncio.sleep(0)
+        try:
+            await hasher.hash("two")
+            assert False, "Second hash should have been refused"
+        except PasswordHasherBusy:
+            pass
+        await first
+
+    try:
+        asyncio.run(run())
+        assert hasher.get_metrics()["rejected"] == 1
+        print("✓ Full queue refused the extra hash")
+    finally:
+        hasher.shutdown()
+
+
+def test_cancelled_hash():
+    """A hash cancelled while queued gives its slot back"""
+    print("\n3. Cancelling a queued hash...")
+    hasher = PasswordHasher(workers=1, max_pending=2)
+
+    async def run():
+        # Keeps the only worker busy so the hash below stays queued
+        blocker = asyncio.wrap_future(hasher._submit(time.sleep, 0.2))
+        queued = asyncio.ensure_future(hasher.hash("queued"))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await blocker
+        await hasher.hash("after")
+
+    try:
+        asyncio.run(run())
+        metrics = hasher.get_metrics()
+        assert metrics["cancelled"] == 1 and metrics["queued"] == 0, metrics
+        print("✓ Cancelled hash released its slot")
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    test_hash_and_verify()
+    test_queue_limit()
+    test_cancelled_hash()
@@ -0,0 +1,123 @@
+"""
+Test the authenticated principal cache
+Checks that a verified token resolves without a user query on later
+requests, that user writes invalidate it, that a user loaded before an
+invalidation is not cached and that entries are bounded.
+"""
+
+import sys
+import os
+import time
+import uuid
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import HTTPException
+
+from app.api.deps import _resolve_user
+from app.core.auth_cache import PrincipalCache, principal_cache
+from app.core.database import db_manager
+from app.core.security import create_access_token
+from app.crud import user
+from app.models.user import User
+from app.schemas.user import UserCreate
+
+
+def test_cached_resolution():
+    """Second request with a token is served from the cache"""
+    print("1. Resolving a token twice...")
+    db = db_manager.SessionLocal()
+    try:
+        created = user.create(
+            db,
+            obj_in=UserCreate(
+                email=f"principal-{uuid.uuid4().hex[:8]}@example.com",
+                name="Principal Test",
+                password="secret-password",
+            ),
+        )
+        token = create_access_token(created.id)
+    finally:
+        db.close()
+
+    principal_cache.clear()
+    db = db_manager.SessionLocal()
+    try:
+        first = _resolve_user(db, token)
+    finally:
+        db.close()
+
+    hits = principal_cache.get_metrics()["hits"]
+    db = db_manager.SessionLocal()
+    try:
+        second = _resolve_user(db, token)
+        assert principal_cache.get_metrics()["hits"] == hits + 1
+        assert second.id == first.id and second is not first
+        # The cached user is the session's own instance
+        assert user.get(db, id=second.id) is second
+        print("✓ Cache hit merged the user into the request session")
+
+        print("\n2. Updating the user...")
+        user.update(db, db_obj=second, obj_in={"name": "Renamed"})
+        assert principal_cache.get_metrics()["size"] == 0
+        assert _resolve_user(db, token).name == "Renamed"
+        print("✓ Update invalidated the cached principal")
+
+        user.remove(db, id=second.id)
+    finally:
+        db.close()
+
+    db = db_manager.SessionLocal()
+    try:
+        _resolve_user(db, token)
+        assert False, "Removed user must not resolve"
+    except HTTPException as e:
+        assert e.status_code == 404
+        print("✓ Removed user is no longer served from the cache")
+    finally:
+        db.close()
+
+
+def test_bounds():
+    """Entries expire with the token and are evicted beyond max_size"""
+    print("\n3. Checking expiry and eviction...")
+    cache = PrincipalCache(ttl_seconds=60, max_size=2)
+    users = [User(id=i, email=f"u{i}@example.com", name="u") for i in range(3)]
+
+    cache.put("expired", "0", users[0], time.time() - 1)
+    db = db_manager.SessionLocal()
+    try:
+        assert cache.get("expired", db) is None
+    finally:
+        db.close()
+    print("✓ Expired token was not served")
+
+    for i, item in enumerate(users):
+        cache.put(f"token-{i}", str(i), item, None)
+    metrics = cache.get_metrics()
+    assert metrics["size"] == 2 and metrics["evictions"] >= 1
+    print(f"✓ LRU kept {metrics['size']} entries")
+
+
+def test_invalidation_race():
+    """A user loaded before an invalidation is not cached after it"""
+    print("\n4. Invalidating while a user is being loaded...")
+    cache = PrincipalCache(ttl_seconds=60, max_size=10)
+    loaded = User(id=1, email="u1@example.com", name="before")
+
+    version = cache.version()
+    cache.invalidate_user(1)
+    cache.put("token-1", "1", loaded, None, version)
+    metrics = cache.get_metrics()
+    assert metrics["size"] == 0 and metrics["stale_puts"] == 1
+    print("✓ Stale user was not cached")
+
+    cache.put("token-1", "1", loaded, None, cache.version())
+    assert cache.get_metrics()["size"] == 1
+    print("✓ User loaded after the invalidation was cached")
+
+
+if __name__ == "__main__":
+    test_cached_resolution()
+    test_bounds()
+    test_invalidation_race()
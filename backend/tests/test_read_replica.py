@@ -0,0 +1,73 @@
+"""
+Test read replica routing
+Uses a second SQLite engine as a stand-in replica to check the health
+verdict, fallback to the primary and recovery.
+"""
+
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import create_engine
+
+from app.core.database import db_manager
+from database import ReadReplica
+
+
+def _replica(check_interval: float = 0) -> ReadReplica:
+    path = os.path.join(tempfile.mkdtemp(), "replica.db")
+    return ReadReplica(
+        create_engine(f"sqlite:///{path}"),
+        max_lag_seconds=30,
+        check_interval=check_interval,
+    )
+
+
+def test_health_verdict():
+    """A reachable replica without replication status counts as healthy"""
+    print("1. Checking a reachable replica...")
+    replica = _replica()
+    assert replica.is_healthy()
+    assert replica.lag_seconds is None
+    print(f"✓ Healthy: {replica.get_status()}")
+
+    print("\n2. Marking it unhealthy...")
+    replica.check_interval = 60
+    replica.mark_unhealthy("connection lost")
+    assert not replica.is_healthy()
+    print("✓ Stays unhealthy until the next check")
+
+    replica.check_interval = 0
+    assert replica.is_healthy()
+    print("✓ Recovered on the next check")
+
+
+def test_get_read_db_fallback():
+    """Requests use the primary while the replica is unhealthy"""
+    print("\n3. Routing read sessions...")
+    original = db_manager.replica
+    replica = _replica(check_interval=60)
+    db_manager.replica = replica
+    try:
+        replica.check()
+        db = next(db_manager.get_read_db())
+        assert db.get_bind().url == replica.engine.url
+        db.close()
+        print("✓ Healthy replica served the session")
+
+        replica.mark_unhealthy("lag")
+        db = next(db_manager.get_read_db())
+        assert db.get_bind().url == db_manager.engine.url
+        db.close()
+        assert replica.fallbacks == 1
+        print("✓ Unhealthy replica fell back to the primary")
+    finally:
+        db_manager.replica = original
+        replica.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_health_verdict()
+    test_get_read_db_fallback()
@@ -0,0 +1,124 @@
+"""
+Test the background retention worker
+Checks the per-table policies, a chunked run, and that a run interrupted in
+one worker is left alone while its lease is live and resumed once released.
+Only rows dated in 2000 are written and deleted.
+"""
+
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.config import settings
+from app.core.retention import RetentionWorker, retention_days
+
+TABLE_NAME = "logged_out_profiles"
+
+
+def test_policies():
+    """Raw and rollup defaults, per-table overrides and keep-forever"""
+    print("1. Retention policies...")
+    overrides = settings.RETENTION_TABLE_DAYS
+    try:
+        settings.RETENTION_TABLE_DAYS = {"proxy_errors": 7, "spam_handler_data": 0}
+        assert retention_days("email_processing_data") == settings.RETENTION_RAW_DAYS
+        assert retention_days("email_processing_hourly_rollups") == (
+            settings.RETENTION_ROLLUP_DAYS
+        )
+        assert retention_days("proxy_errors") == 7
+        assert retention_days("spam_handler_data") is None
+    finally:
+        settings.RETENTION_TABLE_DAYS = overrides
+    print("✓ Defaults, overrides and keep-forever resolved")
+
+
+def _write_old_profiles(db, agent, count):
+    from app.models import LoggedOutProfile
+
+    start = datetime(2000, 1, 1)
+    db.add_all(
+        LoggedOutProfile(
+            agent_name=agent,
+            profile_name=f"profile_{i}",
+            timestamp=start + timedelta(minutes=i),
+        )
+        for i in range(count)
+    )
+    db.commit()
+
+
+def _count(db, agent):
+    from app.models import LoggedOutProfile
+
+    return (
+        db.query(LoggedOutProfile).filter(LoggedOutProfile.agent_name == agent).count()
+    )
+
+
+def _progress(db):
+    from app.models import RetentionProgress
+
+    db.expire_all()
+    return (
+        db.query(RetentionProgress)
+        .filter(RetentionProgress.table_name == TABLE_NAME)
+        .one()
+    )
+
+
+def test_chunked_run():
+    """Old rows are deleted in chunks and the run is recorded"""
+    from app.core.database import db_manager
+
+    # Cuts off during 2000-01-02, so only the test rows qualify
+    days = (datetime.utcnow() - datetime(2000, 1, 2)).days
+    agent = f"retention_agent_{uuid.uuid4().hex[:8]}"
+    db = db_manager.SessionLocal()
+    try:
+        print("\n2. Chunked run...")
+        _write_old_profiles(db, agent, 5)
+        worker = RetentionWorker(chunk_size=2, chunk_pause_ms=0)
+        worker._run_table(TABLE_NAME, days)
+        assert _count(db, agent) == 0
+        progress = _progress(db)
+        assert progress.status == "done" and progress.owner is None
+        assert progress.deleted_count >= 5
+        metrics = worker.get_metrics()
+        assert metrics["runs"] == 1 and metrics["chunks"] >= 3, metrics
+        deleted, chunks = progress.deleted_count, metrics["chunks"]
+        print(f"✓ {deleted} rows deleted in {chunks} chunks")
+
+        print("\n3. Interrupted run and its lease...")
+        _write_old_profiles(db, agent, 3)
+        interrupted = RetentionWorker(chunk_size=2, chunk_pause_ms=0)
+        progress = interrupted._claim(db, TABLE_NAME, days)
+        assert progress.status == "running"
+        other = RetentionWorker(chunk_size=2, chunk_pause_ms=0)
+        other._run_table(TABLE_NAME, None)
+        assert other.get_metrics()["skipped"] == 1
+        assert _count(db, agent) == 3
+        print("✓ Live lease respected")
+
+        print("\n4. Resuming after the lease is released...")
+        interrupted._release(db, progress.id)
+        other._run_table(TABLE_NAME, None)
+        assert other.get_metrics()["resumed"] == 1
+        assert _count(db, agent) == 0
+        assert _progress(db).status == "done"
+        print("✓ Interrupted run resumed and finished")
+    finally:
+        from app.models import LoggedOutProfile
+
+        db.query(LoggedOutProfile).filter(LoggedOutProfile.agent_name == agent).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    test_policies()
+    test_chunked_run()
@@ -0,0 +1,55 @@
+"""
+Test the full-text search index
+Checks that indexed searches return the same rows as the ILIKE fallback.
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.database import db_manager
+from app.db import search_index
+from app.db.search_index import ensure_search_indexes
+from app.crud.crud_email_processing_data import email_processing_data
+from app.crud.crud_proxy_error import proxy_error
+
+
+def _ids(crud, db, term, use_index):
+    search_index._available.clear()
+    if not use_index:
+        search_index._available.update(
+            {name: False for name in search_index.SEARCH_COLUMNS}
+        )
+    try:
+        return [row.id for row in crud._filtered_query(db, search=term).all()]
+    finally:
+        search_index._available.clear()
+
+
+def test_index_matches_ilike():
+    """Indexed and ILIKE searches agree"""
+    print("1. Building search indexes...")
+    created = ensure_search_indexes(db_manager.engine)
+    print(f"✓ Indexes ready (created: {created or 'none'})")
+
+    print("\n2. Comparing indexed search with ILIKE...")
+    db = next(db_manager.get_db())
+    try:
+        for crud in (email_processing_data, proxy_error):
+            for term in ("agent", "gmail", "timeout", "@", "zz-no-match"):
+                indexed = sorted(_ids(crud, db, term, True))
+                scanned = sorted(_ids(crud, db, term, False))
+                name = type(crud).__name__
+                assert indexed == scanned, (
+                    f"{name} '{term}': {len(indexed)} indexed vs {len(scanned)} scanned"
+                )
+                if term == "zz-no-match":
+                    assert not indexed, f"{name} '{term}' matched {len(indexed)} rows"
+                print(f"✓ {name} '{term}': {len(indexed)} rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_index_matches_ilike()
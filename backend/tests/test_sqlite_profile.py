@@ -0,0 +1,65 @@
+"""
+Test the production SQLite profile
+Checks WAL journaling, the reader/writer split and that reads are not
+blocked by an open write transaction.
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import text
+
+from app.core.database import db_manager
+from app.models.proxy_error import ProxyError
+
+
+def test_wal_and_routing():
+    """Writes go to the writer, reads to the reader pool"""
+    if db_manager.read_engine is None:
+        print("Skipping: not using the production SQLite profile")
+        return
+
+    print("1. Checking journal mode...")
+    with db_manager.engine.connect() as connection:
+        mode = connection.execute(text("PRAGMA journal_mode")).scalar()
+    assert mode.lower() == "wal"
+    print(f"✓ journal_mode={mode}")
+
+    print("\n1b. Checking the async writer pool...")
+    assert db_manager.async_engine.pool.size() == 1
+    print("✓ Async telemetry writes share one connection")
+
+    print("\n2. Checking session routing...")
+    db = db_manager.SessionLocal()
+    try:
+        assert db.get_bind(clause=text("SELECT 1")) is db_manager.read_engine
+        db.add(
+            ProxyError(
+                agent_name="sqlite_profile_test",
+                proxy="10.0.0.1:8080",
+                error_details="routing",
+                profile_name="profile_test",
+            )
+        )
+        db.flush()
+        # Reads inside the write transaction must see the pending row
+        assert db.get_bind(clause=text("SELECT 1")) is db_manager.engine
+        print("✓ Reads follow the writer once the transaction has written")
+
+        print("\n3. Reading from another session during the write...")
+        reader = db_manager.SessionLocal()
+        try:
+            count = reader.query(ProxyError).count()
+            print(f"✓ Concurrent read returned {count} committed rows")
+        finally:
+            reader.close()
+        db.rollback()
+        assert db.get_bind(clause=text("SELECT 1")) is db_manager.read_engine
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_wal_and_routing()
@@ -0,0 +1,145 @@
+"""
+Test the hourly telemetry rollups directly
+Applies rollups for a few hours of raw rows, then checks aggregate() against
+an aggregate of the raw rows for windows with partial edge hours, open-ended
+windows and a window inside one hour, before and after a retract.
+Only rows dated in 2000 are written.
+"""
+
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.crud.crud_telemetry_rollup import email_processing_rollup, floor_bucket
+
+START = datetime(2000, 1, 1)
+METRICS = email_processing_rollup.metrics
+
+WINDOWS = [
+    ("partial edge hours", START.replace(minute=20), START.replace(hour=3, minute=40)),
+    ("whole hours", START.replace(hour=1), START.replace(hour=4)),
+    ("open end", START.replace(minute=50), None),
+    ("open start", None, START.replace(hour=2, minute=40)),
+    (
+        "inside one hour",
+        START.replace(hour=2, minute=10),
+        START.replace(hour=2, minute=50),
+    ),
+]
+
+
+def _raw_rows(tag, count=30):
+    """Rows every 13 minutes over about six and a half hours, for two agents"""
+    return [
+        {
+            "agent_name": f"{tag}_{'a' if i % 3 else 'b'}",
+            "profile_name": f"profile_{i % 4}",
+            "sender_email": "sender@example.com",
+            "email_subject": f"subject {i}",
+            "is_opened": i % 2 == 0,
+            "is_link_clicked": i % 5 == 0,
+            "is_reply_sent": i % 7 == 0,
+            "error_occurred": i % 6 == 0,
+            "total_duration_seconds": 1.5 * i,
+            "random_website_duration_seconds": 0.5 * (i % 3),
+            "timestamp": START + timedelta(minutes=13 * i),
+        }
+        for i in range(count)
+    ]
+
+
+def _expected(rows, group_by, bucket, start_date, end_date):
+    """The aggregate computed straight from raw rows"""
+    results = {}
+    for row in rows:
+        if start_date and row["timestamp"] < start_date:
+            continue
+        if end_date and row["timestamp"] > end_date:
+            continue
+        key = tuple(
+            floor_bucket(row["timestamp"], bucket)
+            if column == "bucket_start"
+            else row[column]
+            for column in group_by
+        )
+        metrics = results.setdefault(key, dict.fromkeys(METRICS, 0))
+        for metric, column in METRICS.items():
+            metrics[metric] += 1 if column is None else float(row.get(column) or 0)
+    return results
+
+
+def _check(db, tag, rows):
+    for name, start_date, end_date in WINDOWS:
+        for group_by, bucket in (
+            (("agent_name",), "hour"),
+            (("bucket_start",), "hour"),
+            (("bucket_start", "agent_name"), "day"),
+        ):
+            actual = email_processing_rollup.aggregate(
+                db,
+                group_by=group_by,
+                bucket=bucket,
+                start_date=start_date,
+                end_date=end_date,
+                agent_name=tag,
+            )
+            actual = {
+                key: {metric: float(value) for metric, value in metrics.items()}
+                for key, metrics in actual.items()
+            }
+            expected = _expected(rows, group_by, bucket, start_date, end_date)
+            assert actual == expected, (name, group_by, bucket, actual, expected)
+        print(f"✓ {name}: matches the raw rows")
+
+
+def test_apply_and_aggregate():
+    """Merged rollup and raw edge hours agree with the raw rows"""
+    from app.core.database import db_manager
+    from app.models import EmailProcessingData
+    from app.models.telemetry_rollup import EmailProcessingHourlyRollup
+
+    tag = f"rollup_agent_{uuid.uuid4().hex[:8]}"
+    rows = _raw_rows(tag)
+    db = db_manager.SessionLocal()
+    try:
+        print("1. Applying rollups for raw rows...")
+        objs = [EmailProcessingData(**row) for row in rows]
+        db.add_all(objs)
+        db.flush()
+        for row, obj in zip(rows, objs):
+            row["id"] = obj.id
+        email_processing_rollup.apply(db, objs)
+        db.commit()
+        print(f"✓ {len(rows)} rows rolled up")
+
+        print("\n2. Comparing aggregates with the raw rows...")
+        _check(db, tag, rows)
+
+        print("\n3. Retracting rows before deleting them...")
+        retracted = [row for row in rows if row["agent_name"].endswith("_b")][:3]
+        retracted += [rows[10]]
+        ids = [row["id"] for row in retracted]
+        email_processing_rollup.retract(db, ids=ids)
+        db.query(EmailProcessingData).filter(EmailProcessingData.id.in_(ids)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        rows = [row for row in rows if row["id"] not in ids]
+        _check(db, tag, rows)
+    finally:
+        db.rollback()
+        db.query(EmailProcessingData).filter(
+            EmailProcessingData.agent_name.like(f"{tag}%")
+        ).delete(synchronize_session=False)
+        db.query(EmailProcessingHourlyRollup).filter(
+            EmailProcessingHourlyRollup.agent_name.like(f"{tag}%")
+        ).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    test_apply_and_aggregate()
@@ -0,0 +1,132 @@
+"""
+Test the top-K sketches behind the top senders / subjects widgets
+Checks the Space-Saving summary on its own, then the hourly sketches
+maintained by the email processing CRUD against the raw entries.
+"""
+
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.utils.space_saving import SpaceSaving, merge_counters
+
+
+def test_space_saving():
+    """Heavy hitters survive a long tail of distinct values"""
+    print("1. Space-Saving summary...")
+    summary = SpaceSaving(capacity=8)
+    for i in range(1000):
+        summary.add("heavy-a")
+        if i % 2 == 0:
+            summary.add("heavy-b")
+        summary.add(f"tail-{i}")
+
+    top = summary.top(2)
+    assert [item for item, _ in top] == ["heavy-a", "heavy-b"]
+    count, error, _ = top[0][1]
+    assert count - error <= 1000 <= count
+    assert len(summary.counters) == 8
+    print(f"✓ Top two found among 1000 distinct values: {top}")
+
+    print("\n2. Merging and round-tripping summaries...")
+    restored = SpaceSaving.loads(8, summary.dumps())
+    assert restored.counters == summary.counters
+    merged = merge_counters([summary.counters, restored.counters], 8)
+    assert merged["heavy-a"][0] == 2 * summary.counters["heavy-a"][0]
+    print("✓ Counts of merged summaries add up")
+
+    print("\n2b. Merging a summary that evicted an item...")
+    other = SpaceSaving(capacity=2)
+    for item in ["kept"] * 3 + ["gone", "tail"]:
+        other.add(item)
+    assert "gone" not in other.counters
+    floor = min(counter[0] for counter in other.counters.values())
+    merged = merge_counters([{"gone": [4, 0, 0.0]}, other.counters], 2)
+    count, error, _ = merged["gone"]
+    # True count is 5: 4 in the first summary, 1 evicted from the second
+    assert count == 4 + floor and error == floor and count - error <= 5 <= count
+    print(f"✓ Evicted item bounded: count {count}, error {error}")
+
+    print("\n2c. Values seen once across many full hours...")
+    hours = []
+    for hour in range(24):
+        summary = SpaceSaving(capacity=2)
+        for item in ["steady", "steady", f"once-{hour}"]:
+            summary.add(item)
+        hours.append(summary.counters)
+    merged = merge_counters(hours, 2)
+    count, error, _ = merged["once-0"]
+    # The guaranteed part, which top() reports, is not inflated by the floors
+    assert count - error == 1 and merged["steady"][0] - merged["steady"][1] == 48
+    print(f"✓ Guaranteed count 1, possibly up to {count}")
+
+
+def test_sketch_top_values():
+    """Sketch top lists agree with the raw entries"""
+    from app.core.database import db_manager
+    from app.crud.crud_email_processing_data import email_processing_data
+    from app.crud.crud_topk_sketch import email_processing_sketches
+    from app.schemas.email_processing_data import EmailProcessingDataCreate
+
+    agent = f"topk_agent_{uuid.uuid4().hex[:8]}"
+    start = datetime(2001, 1, 1, 10)
+    subjects = ["Invoice"] * 5 + ["Welcome"] * 3 + ["Reminder"]
+    db = db_manager.SessionLocal()
+    ids = []
+    try:
+        print("\n3. Writing entries across two hours...")
+        created = email_processing_data.bulk_create(
+            db,
+            objs_in=[
+                EmailProcessingDataCreate(
+                    agent_name=agent,
+                    profile_name="profile",
+                    sender_email=f"sender{i % 2}@example.com",
+                    email_subject=subject,
+                    timestamp=start + timedelta(minutes=15 * i),
+                )
+                for i, subject in enumerate(subjects)
+            ],
+        )
+        ids = [row.id for row in created]
+        print(f"✓ {len(ids)} entries written")
+
+        print("\n4. Top subjects over whole and partial hours...")
+        window = {
+            "start_date": start,
+            "end_date": start + timedelta(hours=3),
+            "agent_name": agent,
+        }
+        top = email_processing_sketches.top(db, "subject", k=2, **window)
+        assert [(entry["value"], entry["count"]) for entry in top] == [
+            ("Invoice", 5),
+            ("Welcome", 3),
+        ]
+        partial = email_processing_sketches.top(
+            db,
+            "subject",
+            k=5,
+            start_date=start + timedelta(minutes=50),
+            end_date=start + timedelta(hours=3),
+            agent_name=agent,
+        )
+        assert sum(entry["count"] for entry in partial) == len(subjects) - 4
+        print(f"✓ Top subjects: {top}")
+
+        print("\n5. Deletes are taken back...")
+        email_processing_data.bulk_delete(db, ids=ids[:5])
+        top = email_processing_sketches.top(db, "subject", k=1, **window)
+        assert top[0]["value"] == "Welcome"
+        ids = ids[5:]
+        print("✓ Deleted entries no longer counted")
+    finally:
+        email_processing_data.bulk_delete(db, ids=ids)
+        db.close()
+
+
+if __name__ == "__main__":
+    test_space_saving()
+    test_sketch_top_values()
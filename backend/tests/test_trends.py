@@ -0,0 +1,115 @@
+"""
+Test the time-bucketed trends engine
+Writes a few entries at known times and checks hour, day and week series
+built from the hourly rollups, then the open-ended windows of the
+performance summary.
+"""
+
+import sys
+import os
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.database import db_manager
+from app.crud.crud_email_processing_data import email_processing_data
+from app.crud.crud_telemetry_rollup import email_processing_rollup
+from app.schemas.email_processing_data import EmailProcessingDataCreate
+
+# 2001-01-01 was a Monday
+ENTRIES = [
+    (datetime(2001, 1, 1, 10, 15), {}),
+    (datetime(2001, 1, 1, 10, 45), {"is_opened": True}),
+    (datetime(2001, 1, 3, 12, 0), {"error_occurred": True}),
+    (datetime(2001, 1, 9, 8, 30), {}),
+]
+
+
+def test_trend_buckets():
+    """Day, week and hour series agree with the raw entries"""
+    agent = f"trends_agent_{uuid.uuid4().hex[:8]}"
+    db = db_manager.SessionLocal()
+    ids = []
+    try:
+        for timestamp, flags in ENTRIES:
+            created = email_processing_data.create(
+                db,
+                obj_in=EmailProcessingDataCreate(
+                    agent_name=agent,
+                    profile_name="profile",
+                    sender_email="sender@example.com",
+                    email_subject="Trend",
+                    timestamp=timestamp,
+                    **flags,
+                ),
+            )
+            ids.append(created.id)
+
+        window = {
+            "start_date": datetime(2001, 1, 1),
+            "end_date": datetime(2001, 1, 10),
+            "agent_name": agent,
+        }
+
+        print("1. Daily buckets...")
+        daily = email_processing_data.get_trends(db, bucket="day", **window)
+        by_day = {item["bucket_start"]: item for item in daily}
+        assert len(daily) == 10
+        assert by_day[datetime(2001, 1, 1)]["total_processed"] == 2
+        assert by_day[datetime(2001, 1, 1)]["open_rate"] == 50.0
+        assert by_day[datetime(2001, 1, 3)]["error_rate"] == 100.0
+        assert by_day[datetime(2001, 1, 2)]["total_processed"] == 0
+        print(f"✓ {len(daily)} days, empty days filled with zeros")
+
+        print("\n2. Weekly buckets...")
+        weekly = email_processing_data.get_trends(db, bucket="week", **window)
+        totals = {item["bucket_start"]: item["total_processed"] for item in weekly}
+        assert totals == {datetime(2001, 1, 1): 3, datetime(2001, 1, 8): 1}
+        print(f"✓ Weeks start on Monday: {totals}")
+
+        print("\n3. Hourly buckets over a partial hour...")
+        hourly = email_processing_data.get_trends(
+            db,
+            bucket="hour",
+            start_date=datetime(2001, 1, 1, 10, 30),
+            end_date=datetime(2001, 1, 1, 11, 0),
+            agent_name=agent,
+        )
+        assert hourly[0]["bucket_start"] == datetime(2001, 1, 1, 10)
+        assert hourly[0]["total_processed"] == 1
+        print("✓ Edge of the window read from raw rows")
+
+        print("\n4. Per-agent figures over open-ended windows...")
+        for open_window in ({}, {"start_date": datetime(2001, 1, 1)}):
+            by_agent = email_processing_rollup.get_by_dimension(
+                db, "agent_name", **open_window
+            )
+            assert by_agent[agent]["total_count"] == len(ENTRIES)
+        print("✓ Agent names kept as text without an end date")
+    finally:
+        email_processing_data.bulk_delete(db, ids=ids)
+        db.close()
+
+
+def test_performance_summary_request():
+    """The summary endpoint answers with its default parameters"""
+    from fastapi.testclient import TestClient
+
+    from app.core.config import settings
+    from app.main import app
+
+    print("\n5. GET /performance/summary with default parameters...")
+    client = TestClient(app)
+    response = client.get(
+        f"{settings.API_V1_STR}/email-processing-data/performance/summary"
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert "success_rate" in body and isinstance(body["agents"], list)
+    print(f"✓ Summary of {len(body['agents'])} agents")
+
+
+if __name__ == "__main__":
+    test_trend_buckets()
+    test_performance_summary_request()
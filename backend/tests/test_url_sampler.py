@@ -0,0 +1,55 @@
+"""
+Test the in-memory random URL sampler
+Checks weighted draws, sampling without replacement and category pools.
+"""
+
+import sys
+import os
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.url_sampler import AliasTable, UrlPool
+
+
+def _urls(weights, category="news"):
+    return [
+        SimpleNamespace(
+            id=i, url=f"https://site{i}.example.com", weight=w, category=category
+        )
+        for i, w in enumerate(weights)
+    ]
+
+
+def test_alias_table_follows_weights(draws: int = 40000):
+    """Draw frequencies track the weights"""
+    print("1. Testing alias table frequencies...")
+    weights = [1.0, 2.0, 3.0, 4.0]
+    table = AliasTable(weights)
+    rng = random.Random(7)
+    counts = Counter(table.draw(rng) for _ in range(draws))
+    for i, weight in enumerate(weights):
+        expected = draws * weight / sum(weights)
+        assert abs(counts[i] - expected) < expected * 0.1
+    print(f"✓ Frequencies {dict(sorted(counts.items()))}")
+
+
+def test_pool_samples_without_replacement():
+    """Samples are distinct and capped at the pool size"""
+    print("\n2. Testing sampling without replacement...")
+    rng = random.Random(11)
+    for weights in ([1.0] * 50, [1.0] * 45 + [100.0] * 5):
+        pool = UrlPool(_urls(weights))
+        for k in (1, 5, 30, 50, 80):
+            picked = pool.sample(k, rng)
+            assert len(picked) == min(k, 50)
+            assert len({url.id for url in picked}) == len(picked)
+    assert UrlPool([]).sample(3, rng) == []
+    print("✓ Uniform and skewed pools return distinct URLs")
+
+
+if __name__ == "__main__":
+    test_alias_table_follows_weights()
+    test_pool_samples_without_replacement()
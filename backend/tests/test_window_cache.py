@@ -0,0 +1,96 @@
+"""
+Test the in-memory telemetry window behind the real-time dashboards
+Writes entries in the last few hours and checks that the window agrees
+with the hourly rollups for totals, per-agent and per-hour metrics.
+"""
+
+import sys
+import os
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.database import db_manager
+from app.core.window_cache import TelemetryWindow, spam_handler_window
+from app.crud.crud_spam_handler_data import spam_handler_data
+from app.crud.crud_telemetry_rollup import spam_handler_rollup
+from app.models.spam_handler_data import SpamHandlerData
+from app.schemas.spam_handler_data import SpamHandlerDataCreate
+
+
+def _entry(agent: str, timestamp: datetime, **values) -> SpamHandlerDataCreate:
+    return SpamHandlerDataCreate(
+        agent_name=agent,
+        profile_name="profile",
+        sender_email="sender@example.com",
+        timestamp=timestamp,
+        **values,
+    )
+
+
+def test_window_matches_rollups():
+    """Window reads agree with the rollups over the same range"""
+    agent = f"window_agent_{uuid.uuid4().hex[:8]}"
+    now = datetime.utcnow()
+    db = db_manager.SessionLocal()
+    ids = []
+    try:
+        print("1. Writing entries over the last three hours...")
+        created = spam_handler_data.bulk_create(
+            db,
+            objs_in=[
+                _entry(agent, now - timedelta(hours=3), spam_emails_found=2),
+                _entry(agent, now - timedelta(hours=2), error_occurred=True),
+                _entry(f"{agent}_b", now - timedelta(hours=1), spam_emails_found=5),
+            ],
+        )
+        ids = [row.id for row in created]
+        print(f"✓ {len(ids)} entries written")
+
+        window = {"start_date": now - timedelta(hours=4), "end_date": now}
+
+        print("\n2. Totals...")
+        totals = spam_handler_window.summarize(db, agent_name=agent, **window)
+        expected = spam_handler_rollup.summarize(db, agent_name=agent, **window)
+        assert totals["total_count"] == 3
+        assert totals["error_count"] == 1
+        assert totals["spam_found"] == 7
+        for metric in ("total_count", "error_count", "spam_found"):
+            assert totals[metric] == expected[metric], metric
+        print(f"✓ Window totals match the rollups: {totals}")
+
+        print("\n3. Per-agent and per-hour metrics...")
+        by_agent = spam_handler_window.get_by_dimension(
+            db, "agent_name", agent_name=agent, **window
+        )
+        assert set(by_agent) == {agent, f"{agent}_b"}
+        assert by_agent[agent]["error_count"] == 1
+        hourly = spam_handler_window.get_hourly(db, agent_name=agent, **window)
+        assert sum(metrics["total_count"] for metrics in hourly.values()) == 3
+        assert list(hourly) == sorted(hourly)
+        print(f"✓ {len(by_agent)} agents, {len(hourly)} hourly buckets")
+
+        print("\n4. Deletes invalidate the window...")
+        spam_handler_data.bulk_delete(db, ids=ids[:1])
+        totals = spam_handler_window.summarize(db, agent_name=agent, **window)
+        assert totals["total_count"] == 2
+        print("✓ Deleted entry gone from the window")
+    finally:
+        spam_handler_data.bulk_delete(db, ids=ids)
+        db.close()
+
+
+def test_window_coverage():
+    """Only ranges inside the configured days are answered from memory"""
+    window = TelemetryWindow(SpamHandlerData, {"total_count": None}, days=7)
+    now = datetime.utcnow()
+    assert window.covers(now - timedelta(days=7))
+    assert not window.covers(now - timedelta(days=30))
+    assert not window.covers(None)
+    print("✓ 7-day window covers 7 days, not 30")
+
+
+if __name__ == "__main__":
+    test_window_matches_rollups()
+    test_window_coverage()
@@ -10,21 +10,32 @@ Comprehensive API endpoints for Gmail automation handling including:
 """
 
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, HttpUrl, validator
 from datetime import datetime
 import math
 
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_async_db, get_current_user, queue_telemetry
+from app.core.concurrency import run_crud
+from app.core.ingestion import (
+    EMAIL_PROCESSING,
+    LOGGED_OUT_PROFILE,
+    PROXY_ERROR,
+    SPAM_HANDLER,
+    write_behind_enabled,
+)
 from app.crud.crud_default_sender import default_sender
 from app.utils.email_validator import EmailStr, validate_email
 from app.crud.crud_random_url import random_url
 from app.crud.crud_connectivity_settings import connectivity_settings
 from app.crud.crud_random_website_settings import random_website_settings
-from app.crud.crud_spam_handler_data import spam_handler_data
-from app.crud.crud_email_processing_data import email_processing_data
-from app.crud.crud_proxy_error import proxy_error
+from app.crud.crud_spam_handler_data import async_spam_handler_data, spam_handler_data
+from app.crud.crud_email_processing_data import (
+    async_email_processing_data,
+    email_processing_data,
+)
+from app.crud.crud_proxy_error import async_proxy_error
 from app.crud.crud_logged_out_profile import logged_out_profile
 from app.schemas.user import User
 
@@ -380,7 +391,7 @@ class LoggedOutProfileListResponse(BaseModel):
 
 @router.get("/random-urls", response_model=List[str])
 async def get_random_urls(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Get all random URLs
@@ -397,8 +408,9 @@ async def get_random_urls(
     ]
     ```
     """
-    items, _ = random_url.get_multi(
+    items, _ = await run_crud(
         db,
+        random_url.get_multi,
         skip=0,
         limit=None,  # No limit to get all items
         is_active=None,
@@ -417,7 +429,7 @@ async def get_random_urls(
 
 @router.get("/default-senders", response_model=List[str])
 async def get_default_senders(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Get all default senders
@@ -434,8 +446,8 @@ async def get_default_senders(
     ]
     ```
     """
-    items, _ = default_sender.get_multi(
-        db, skip=0, limit=None, is_active=None, search=None
+    items, _ = await run_crud(
+        db, default_sender.get_multi, skip=0, limit=None, is_active=None, search=None
     )
 
     # Extract just the email addresses as strings
@@ -449,7 +461,7 @@ async def get_default_senders(
 
 @router.get("/connectivity-settings", response_model=List[ConnectivitySettingsResponse])
 async def get_connectivity_settings(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Get all connectivity settings
@@ -480,8 +492,13 @@ async def get_connectivity_settings(
     ]
     ```
     """
-    items, _ = connectivity_settings.get_multi(
-        db, skip=0, limit=None, is_active=None, search=None
+    items, _ = await run_crud(
+        db,
+        connectivity_settings.get_multi,
+        skip=0,
+        limit=None,
+        is_active=None,
+        search=None,
     )
 
     return items
@@ -496,7 +513,7 @@ async def get_connectivity_settings(
     "/random-website-settings", response_model=List[RandomWebsiteSettingsResponse]
 )
 async def get_random_website_settings(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Get all random website settings
@@ -527,8 +544,13 @@ async def get_random_website_settings(
     ]
     ```
     """
-    items, _ = random_website_settings.get_multi(
-        db, skip=0, limit=None, is_active=None, search=None
+    items, _ = await run_crud(
+        db,
+        random_website_settings.get_multi,
+        skip=0,
+        limit=None,
+        is_active=None,
+        search=None,
     )
 
     return items
@@ -542,7 +564,10 @@ async def get_random_website_settings(
 @router.post("/spam-handler-data", response_model=SpamHandlerDataResponse)
 async def create_spam_handler_data(
     spam_data: SpamHandlerDataCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(
+        None, description="Client key used to de-duplicate retried submissions"
+    ),
 ):
     """
     Create new spam handler data entry
@@ -587,7 +612,9 @@ async def create_spam_handler_data(
     }
     ```
     """
-    return spam_handler_data.create(db, obj_in=spam_data)
+    if write_behind_enabled():
+        return queue_telemetry(SPAM_HANDLER, spam_data, idempotency_key)
+    return await async_spam_handler_data.create(db, obj_in=spam_data)
 
 
 # ================================
@@ -598,7 +625,10 @@ async def create_spam_handler_data(
 @router.post("/email-processing-data", response_model=EmailProcessingDataResponse)
 async def create_email_processing_data(
     email_data: EmailProcessingDataCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(
+        None, description="Client key used to de-duplicate retried submissions"
+    ),
 ):
     """
     Create new email processing data entry
@@ -647,7 +677,9 @@ async def create_email_processing_data(
     }
     ```
     """
-    return email_processing_data.create(db, obj_in=email_data)
+    if write_behind_enabled():
+        return queue_telemetry(EMAIL_PROCESSING, email_data, idempotency_key)
+    return await async_email_processing_data.create(db, obj_in=email_data)
 
 
 # ================================
@@ -657,7 +689,7 @@ async def create_email_processing_data(
 
 @router.get("/analytics/spam-handler-stats")
 async def get_spam_handler_analytics(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     date_from: Optional[datetime] = Query(
         None, description="Filter from date (ISO format)"
     ),
@@ -689,15 +721,19 @@ async def get_spam_handler_analytics(
     }
     ```
     """
-    stats = spam_handler_data.get_analytics(
-        db, date_from=date_from, date_to=date_to, agent_name=agent_name
+    stats = await run_crud(
+        db,
+        spam_handler_data.get_analytics,
+        date_from=date_from,
+        date_to=date_to,
+        agent_name=agent_name,
     )
     return stats
 
 
 @router.get("/analytics/email-processing-stats")
 async def get_email_processing_analytics(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     date_from: Optional[datetime] = Query(
         None, description="Filter from date (ISO format)"
     ),
@@ -730,8 +766,12 @@ async def get_email_processing_analytics(
     }
     ```
     """
-    stats = email_processing_data.get_analytics(
-        db, date_from=date_from, date_to=date_to, agent_name=agent_name
+    stats = await run_crud(
+        db,
+        email_processing_data.get_analytics,
+        date_from=date_from,
+        date_to=date_to,
+        agent_name=agent_name,
     )
     return stats
 
@@ -746,10 +786,13 @@ async def get_email_processing_analytics(
     response_model=ProxyErrorResponse,
     status_code=status.HTTP_201_CREATED,
 )
-def create_proxy_error(
+async def create_proxy_error(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     proxy_error_in: ProxyErrorCreate,
+    idempotency_key: Optional[str] = Header(
+        None, description="Client key used to de-duplicate retried submissions"
+    ),
 ) -> ProxyErrorResponse:
     """
     Create a new proxy error record.
@@ -767,7 +810,9 @@ def create_proxy_error(
     **Response:**
     Returns the created proxy error record with ID and timestamps.
     """
-    return proxy_error.create(db=db, obj_in=proxy_error_in)
+    if write_behind_enabled():
+        return queue_telemetry(PROXY_ERROR, proxy_error_in, idempotency_key)
+    return await async_proxy_error.create(db, obj_in=proxy_error_in)
 
 
 # ================================
@@ -778,7 +823,10 @@ def create_proxy_error(
 @router.post("/logged-out-profiles", response_model=LoggedOutProfileResponse)
 async def create_logged_out_profile(
     logged_out_profile_data: LoggedOutProfileCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(
+        None, description="Client key used to de-duplicate retried submissions"
+    ),
 ):
     """
     Create new logged out profile entry
@@ -805,7 +853,13 @@ async def create_logged_out_profile(
 
     **Note:** The timestamp is automatically generated when the data is posted.
     """
-    return logged_out_profile.create(db, obj_in=logged_out_profile_data)
+    if write_behind_enabled():
+        return queue_telemetry(
+            LOGGED_OUT_PROFILE, logged_out_profile_data, idempotency_key
+        )
+    return await run_crud(
+        db, logged_out_profile.create, obj_in=logged_out_profile_data
+    )
 
 
 # ================================